@@ -5,18 +5,45 @@ Base Agent class and state management for JobCatcher multi-agent system
 Using Claude 4 latest features including Tool Calling, Document Processing and Extended Thinking
 """
 
+import asyncio
 import logging
+import operator
 from abc import ABC, abstractmethod
-from typing import Dict, List, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Annotated, Dict, List, Any, Optional, AsyncIterator
 from datetime import datetime
 
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage
-from langchain_core.tools import BaseTool
+from langchain_core.tools import BaseTool, StructuredTool
 from langgraph.graph import MessagesState
 from pydantic import BaseModel
-import anthropic
 
 from app.core.config import settings
+from app.services.llm_gateway import get_llm_gateway
+
+
+# 提示缓存断点 - 缓存系统提示词和工具定义等稳定前缀
+# Prompt-cache breakpoint - caches stable prefixes such as system prompt and tool definitions
+CACHE_CONTROL_EPHEMERAL = {"type": "ephemeral"}
+
+
+# 同步工具共享线程池，避免阻塞事件循环
+# Shared thread pool for synchronous tools so they never block the event loop
+_tool_executor = ThreadPoolExecutor(
+    max_workers=settings.AGENT_TOOL_THREAD_POOL_SIZE,
+    thread_name_prefix="agent-tool"
+)
+
+
+def merge_agent_results(
+    left: Optional[Dict[str, Any]],
+    right: Optional[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    合并并行Agent节点的结果字典
+    Merge the result dicts of concurrently running agent nodes
+    """
+    return {**(left or {}), **(right or {})}
 
 
 class AgentState(MessagesState):
@@ -39,6 +66,16 @@ class AgentState(MessagesState):
     workflow_context: Optional[str] = None
     thinking_enabled: bool = True
     document_context: Optional[List[Dict[str, Any]]] = None
+    
+    # 工作流编排状态 / Workflow orchestration state
+    workflow_type: Optional[str] = None
+    user_input: Optional[Dict[str, Any]] = None
+    session_start_time: Optional[datetime] = None
+    
+    # 并行分支通过reducer合并的字段 / Fields merged across parallel branches via reducers
+    completed_agents: Annotated[List[str], operator.add]
+    agent_results: Annotated[Dict[str, Any], merge_agent_results]
+    error_count: Annotated[int, operator.add]
 
 
 class BaseAgent(ABC):
@@ -57,18 +94,19 @@ class BaseAgent(ABC):
         self.name = name
         self.description = description
         
-        # 使用原生Anthropic客户端 - 支持Claude 4所有特性
-        # Use native Anthropic client - supports all Claude 4 features
-        self.anthropic_client = anthropic.AsyncAnthropic(
-            api_key=settings.ANTHROPIC_API_KEY,
-            base_url=settings.ANTHROPIC_BASE_URL
-        )
+        # 通过共享LLM网关调用原生Anthropic客户端 - 统一连接池和速率控制
+        # Call the native Anthropic client through the shared LLM gateway - pooled connections and rate control
+        self.llm_gateway = get_llm_gateway()
         
         # 模型配置 / Model configuration
         self.model_name = "claude-sonnet-4-20250514"  # 使用rules中指定的Claude 4模型
         self.temperature = settings.CLAUDE_TEMPERATURE  # 使用统一的温度设置
         self.max_tokens = 8000
         
+        # 工具调用循环配置 / Tool-calling loop configuration
+        self.max_tool_rounds = settings.AGENT_MAX_TOOL_ROUNDS
+        self.tool_timeout = settings.AGENT_TOOL_TIMEOUT_SECONDS
+        
         # 工具配置 / Tools configuration
         self.tools: List[BaseTool] = []
         self._setup_tools()
@@ -102,27 +140,16 @@ class BaseAgent(ABC):
             # 构建消息历史 / Build message history
             messages = self._build_messages(state)
             
-            # 准备工具定义 / Prepare tool definitions
+            # 准备工具定义和系统提示词 / Prepare tool definitions and system prompt
             tools_definitions = self._prepare_tool_definitions()
+            system = self._build_system_prompt(state)
             
             # 调用Claude 4原生API - 支持工具调用和思考
             # Call Claude 4 native API - supports tool calling and thinking
-            if tools_definitions:
-                response = await self.anthropic_client.messages.create(
-                    model=self.model_name,
-                    max_tokens=self.max_tokens,
-                    temperature=self.temperature,
-                    tools=tools_definitions,
-                    tool_choice={"type": "auto"},
-                    messages=messages
-                )
-            else:
-                response = await self.anthropic_client.messages.create(
-                    model=self.model_name,
-                    max_tokens=self.max_tokens,
-                    temperature=self.temperature,
-                    messages=messages
-                )
+            response = await self.llm_gateway.create_message(
+                self.name,
+                **self._build_request_kwargs(messages, tools_definitions, system=system)
+            )
             
             # 处理响应和工具调用 / Process response and tool calls
             return await self._process_response(response, state)
@@ -134,6 +161,189 @@ class BaseAgent(ABC):
                 "error": str(e)
             }
 
+    async def invoke_stream(self, state: AgentState) -> AsyncIterator[Dict[str, Any]]:
+        """
+        流式调用 - 逐步产出文本增量、工具调用和工具结果事件
+        Streaming invocation - yields text deltas, tool-use starts and tool results as they happen
+
+        最后一个事件为 message_complete，包含最后一轮的文本（与非流式路径一致）和更新后的状态
+        The last event is message_complete, carrying the last round's text (as in the non-streaming path) and the
+        updated state
+        """
+        started_at = datetime.now()
+        text_parts: List[str] = []
+        final_text = ""
+        executed_tools: List[Dict[str, Any]] = []
+        usage = {
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "cache_creation_input_tokens": 0,
+            "cache_read_input_tokens": 0
+        }
+        updated_state = dict(state)
+
+        try:
+            self.logger.info(f"Agent {self.name} 开始流式处理 / Starting streaming invocation")
+            yield {"type": "agent_stream_start", "agent": self.name}
+
+            messages = self._build_messages(state)
+            tools_definitions = self._prepare_tool_definitions()
+            system = self._build_system_prompt(state)
+            all_tool_results: List[Any] = []
+
+            # 多轮工具调用循环，最后一轮禁止继续调用工具
+            # Multi-round tool loop; the last round is not allowed to call tools again
+            for round_index in range(self.max_tool_rounds + 1):
+                allow_tools = round_index < self.max_tool_rounds
+                final_message = None
+                round_start = len(text_parts)
+                async for event in self._stream_round(messages, tools_definitions, system, text_parts, allow_tools):
+                    if event["type"] == "round_complete":
+                        final_message = event["message"]
+                    else:
+                        yield event
+                self._accumulate_usage(usage, final_message)
+                # 最后一轮有文本的输出作为最终回答 / The last round that produced text is the final answer
+                if len(text_parts) > round_start:
+                    final_text = "".join(text_parts[round_start:])
+
+                tool_calls = [block for block in final_message.content if block.type == "tool_use"]
+                if not tool_calls:
+                    break
+
+                tool_results = await self._execute_tools(tool_calls)
+                all_tool_results.extend(tool_results)
+
+                for tool_call, result in zip(tool_calls, tool_results):
+                    executed_tools.append({
+                        "tool_name": tool_call.name,
+                        "tool_use_id": tool_call.id,
+                        "round": round_index + 1
+                    })
+                    yield {
+                        "type": "tool_result",
+                        "agent": self.name,
+                        "tool_name": tool_call.name,
+                        "tool_use_id": tool_call.id,
+                        "result": str(result)[:2000]
+                    }
+
+                messages.append({"role": "assistant", "content": final_message.content})
+                messages.append({"role": "user", "content": self._build_tool_result_content(tool_calls, tool_results)})
+
+            if all_tool_results:
+                updated_state["tool_results"] = all_tool_results
+
+            updated_state["messages"] = state.get("messages", []) + (
+                [AIMessage(content=final_text)] if final_text else []
+            )
+            updated_state["last_response"] = final_text or "工具调用完成"
+
+            yield {
+                "type": "message_complete",
+                "agent": self.name,
+                "content": final_text,
+                "tool_calls": executed_tools,
+                "usage": usage,
+                "model": self.model_name,
+                "response_time_ms": int((datetime.now() - started_at).total_seconds() * 1000),
+                "state": updated_state
+            }
+
+        except Exception as e:
+            self.logger.error(f"Agent {self.name} 流式执行失败: {e}")
+            yield {
+                "type": "agent_error",
+                "agent": self.name,
+                "error": str(e),
+                "partial_content": "".join(text_parts)
+            }
+
+    async def _stream_round(
+        self,
+        messages: List[Dict[str, Any]],
+        tools_definitions: Optional[List[Dict[str, Any]]],
+        system: Optional[List[Dict[str, Any]]],
+        text_parts: List[str],
+        allow_tools: bool = True
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        流式执行单轮模型调用，最后产出 round_complete 事件携带完整消息
+        Stream a single model round; the final round_complete event carries the full message
+        """
+        request_kwargs = self._build_request_kwargs(messages, tools_definitions, allow_tools, system)
+        async with self.llm_gateway.stream_message(self.name, **request_kwargs) as stream:
+            async for event in stream:
+                if event.type == "text":
+                    text_parts.append(event.text)
+                    yield {"type": "text_delta", "agent": self.name, "text": event.text}
+                elif event.type == "content_block_start" and event.content_block.type == "tool_use":
+                    yield {
+                        "type": "tool_use_start",
+                        "agent": self.name,
+                        "tool_name": event.content_block.name,
+                        "tool_use_id": event.content_block.id
+                    }
+            final_message = await stream.get_final_message()
+        yield {"type": "round_complete", "message": final_message}
+
+    def _build_request_kwargs(
+        self,
+        messages: List[Dict[str, Any]],
+        tools_definitions: Optional[List[Dict[str, Any]]] = None,
+        allow_tools: bool = True,
+        system: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """
+        构建Messages API请求参数
+        Build Messages API request parameters
+
+        allow_tools=False 时仍发送工具定义（历史消息中可能含tool_use），但禁止再次调用
+        With allow_tools=False the tool definitions are still sent (history may contain tool_use) but no new calls are allowed
+        """
+        request_kwargs = {
+            "model": self.model_name,
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature,
+            "messages": messages
+        }
+        if system:
+            request_kwargs["system"] = system
+        if tools_definitions:
+            request_kwargs["tools"] = tools_definitions
+            request_kwargs["tool_choice"] = {"type": "auto" if allow_tools else "none"}
+        return request_kwargs
+
+    @staticmethod
+    def _accumulate_usage(usage: Dict[str, int], message) -> None:
+        """
+        累加token用量（含提示缓存命中），指标由LLM网关记录
+        Accumulate token usage (including prompt-cache hits); metrics are recorded by the LLM gateway
+        """
+        if message is not None and getattr(message, "usage", None):
+            for field in usage:
+                usage[field] += getattr(message.usage, field, 0) or 0
+
+    def _build_system_prompt(self, state: AgentState) -> List[Dict[str, Any]]:
+        """
+        构建系统提示词内容块 - 稳定的提示词带缓存断点，动态上下文放在断点之后
+        Build system prompt blocks - the stable prompt carries a cache breakpoint, dynamic context follows it
+        """
+        system = [{
+            "type": "text",
+            "text": self.get_system_prompt(),
+            "cache_control": CACHE_CONTROL_EPHEMERAL
+        }]
+        
+        # 添加上下文信息 / Add context information
+        if state.get("workflow_context"):
+            system.append({
+                "type": "text",
+                "text": f"**上下文信息**：{state['workflow_context']}"
+            })
+        
+        return system
+
     def _build_messages(self, state: AgentState) -> List[Dict[str, Any]]:
         """
         构建符合Anthropic API格式的消息
@@ -141,12 +351,8 @@ class BaseAgent(ABC):
         """
         messages = []
         
-        # 系统消息单独处理 / Handle system message separately
-        system_prompt = self.get_system_prompt()
-        
-        # 添加上下文信息 / Add context information
-        if state.get("workflow_context"):
-            system_prompt += f"\n\n**上下文信息**：{state['workflow_context']}"
+        # 系统提示词通过 _build_system_prompt 单独传递
+        # The system prompt is passed separately via _build_system_prompt
         
         # 转换状态中的消息 / Convert messages from state
         for msg in state.get("messages", []):
@@ -204,102 +410,129 @@ class BaseAgent(ABC):
             
             tool_definitions.append(tool_def)
         
+        # 最后一个工具定义上设置缓存断点，工具列表作为稳定前缀被缓存
+        # Put a cache breakpoint on the last tool so the tool list is cached as a stable prefix
+        if tool_definitions:
+            tool_definitions[-1]["cache_control"] = CACHE_CONTROL_EPHEMERAL
+        
         return tool_definitions
 
     async def _process_response(self, response, state: AgentState) -> Dict[str, Any]:
         """
-        处理Claude 4响应 - 支持工具调用
-        Process Claude 4 response - supports tool calling
+        处理Claude 4响应 - 有界多轮工具调用循环
+        Process Claude 4 response - bounded multi-round tool-calling loop
         """
         new_messages = []
         updated_state = dict(state)
         
-        # 处理响应内容 / Process response content
-        response_content = ""
-        tool_calls = []
-        
-        for content_block in response.content:
-            if content_block.type == "text":
-                response_content += content_block.text
-            elif content_block.type == "tool_use":
-                tool_calls.append(content_block)
-        
-        # 添加Assistant消息 / Add assistant message
-        if response_content:
-            new_messages.append(AIMessage(content=response_content))
+        messages = self._build_messages(state)
+        tools_definitions = self._prepare_tool_definitions()
+        system = self._build_system_prompt(state)
+        final_response_content = ""
+        all_tool_results: List[Any] = []
         
-        # 处理工具调用 / Process tool calls
-        if tool_calls:
+        for round_index in range(self.max_tool_rounds + 1):
+            # 处理响应内容 / Process response content
+            response_content = ""
+            tool_calls = []
+            
+            for content_block in response.content:
+                if content_block.type == "text":
+                    response_content += content_block.text
+                elif content_block.type == "tool_use":
+                    tool_calls.append(content_block)
+            
+            # 添加Assistant消息 / Add assistant message
+            # 最后一轮（工具结果之后）的文本作为最终回答 / The last round's text (after the tool results) is the final answer
+            if response_content:
+                new_messages.append(AIMessage(content=response_content))
+                final_response_content = response_content
+            
+            if not tool_calls:
+                break
+            
+            # 并行执行本轮所有工具调用 / Execute all tool calls of this round concurrently
             tool_results = await self._execute_tools(tool_calls)
-            updated_state["tool_results"] = tool_results
+            all_tool_results.extend(tool_results)
             
-            # 如果有工具结果，可能需要续接对话 / Continue conversation with tool results
-            if tool_results:
-                # 构建工具结果消息 / Build tool result messages
-                tool_result_content = []
-                for tool_call, result in zip(tool_calls, tool_results):
-                    tool_result_content.append({
-                        "type": "tool_result",
-                        "tool_use_id": tool_call.id,
-                        "content": str(result)
-                    })
-                
-                # 继续对话获取最终响应 / Continue conversation for final response
-                messages = self._build_messages(state)
-                messages.append({"role": "assistant", "content": response.content})
-                messages.append({"role": "user", "content": tool_result_content})
-                
-                final_response = await self.anthropic_client.messages.create(
-                    model=self.model_name,
-                    max_tokens=self.max_tokens,
-                    temperature=self.temperature,
-                    messages=messages
-                )
-                
-                # 提取最终文本响应 / Extract final text response
-                final_text = ""
-                for block in final_response.content:
-                    if block.type == "text":
-                        final_text += block.text
-                
-                if final_text:
-                    new_messages.append(AIMessage(content=final_text))
+            # 续接对话，最后一轮不再允许调用工具
+            # Continue the conversation; the last round may not call tools again
+            messages.append({"role": "assistant", "content": response.content})
+            messages.append({"role": "user", "content": self._build_tool_result_content(tool_calls, tool_results)})
+            
+            allow_tools = round_index + 1 < self.max_tool_rounds
+            response = await self.llm_gateway.create_message(
+                self.name,
+                **self._build_request_kwargs(messages, tools_definitions, allow_tools, system)
+            )
+        
+        if all_tool_results:
+            updated_state["tool_results"] = all_tool_results
         
         # 更新状态 / Update state
         updated_state["messages"] = state.get("messages", []) + new_messages
-        updated_state["last_response"] = response_content or "工具调用完成"
+        updated_state["last_response"] = final_response_content or "工具调用完成"
         
         return updated_state
 
+    @staticmethod
+    def _build_tool_result_content(tool_calls, tool_results: List[Any]) -> List[Dict[str, Any]]:
+        """
+        构建tool_result内容块
+        Build tool_result content blocks
+        """
+        return [
+            {
+                "type": "tool_result",
+                "tool_use_id": tool_call.id,
+                "content": str(result)
+            }
+            for tool_call, result in zip(tool_calls, tool_results)
+        ]
+
     async def _execute_tools(self, tool_calls) -> List[Any]:
         """
-        执行工具调用 - 并行处理提高效率
-        Execute tool calls - parallel processing for efficiency
+        执行工具调用 - 同一轮的工具通过asyncio.gather并发执行
+        Execute tool calls - all tools of a round run concurrently via asyncio.gather
+        """
+        return await asyncio.gather(*(self._execute_tool(tool_call) for tool_call in tool_calls))
+
+    async def _execute_tool(self, tool_call) -> Any:
+        """
+        执行单个工具 - 同步工具放入线程池，并施加超时
+        Execute a single tool - sync tools are offloaded to the thread pool, with a timeout
         """
-        results = []
+        tool_name = tool_call.name
+        tool_input = tool_call.input
         
-        for tool_call in tool_calls:
-            tool_name = tool_call.name
-            tool_input = tool_call.input
-            
-            # 查找对应工具 / Find corresponding tool
-            tool = next((t for t in self.tools if t.name == tool_name), None)
-            
-            if tool:
-                try:
-                    # 异步执行工具 / Execute tool asynchronously
-                    if hasattr(tool, '_arun'):
-                        result = await tool._arun(**tool_input)
-                    else:
-                        result = tool._run(**tool_input)
-                    results.append(result)
-                except Exception as e:
-                    self.logger.error(f"工具 {tool_name} 执行失败: {e}")
-                    results.append(f"工具执行错误: {str(e)}")
-            else:
-                results.append(f"未找到工具: {tool_name}")
+        # 查找对应工具 / Find corresponding tool
+        tool = next((t for t in self.tools if t.name == tool_name), None)
+        if not tool:
+            return f"未找到工具: {tool_name}"
         
-        return results
+        try:
+            if self._is_async_tool(tool):
+                coroutine = tool.ainvoke(tool_input)
+            else:
+                loop = asyncio.get_running_loop()
+                coroutine = loop.run_in_executor(_tool_executor, tool.invoke, tool_input)
+            return await asyncio.wait_for(coroutine, timeout=self.tool_timeout)
+        except asyncio.TimeoutError:
+            self.logger.error(f"工具 {tool_name} 执行超时 ({self.tool_timeout}s)")
+            return f"工具执行超时: {tool_name} 超过 {self.tool_timeout} 秒"
+        except Exception as e:
+            self.logger.error(f"工具 {tool_name} 执行失败: {e}")
+            return f"工具执行错误: {str(e)}"
+
+    @staticmethod
+    def _is_async_tool(tool: BaseTool) -> bool:
+        """
+        判断工具是否有原生异步实现
+        Check whether a tool has a native async implementation
+        """
+        if isinstance(tool, StructuredTool):
+            return tool.coroutine is not None
+        return type(tool)._arun is not BaseTool._arun
 
     def get_agent_info(self) -> Dict[str, Any]:
         """
@@ -315,6 +548,8 @@ class BaseAgent(ABC):
             "tools_count": len(self.tools),
             "capabilities": [
                 "Claude 4 原生工具调用",
+                "流式响应输出",
+                "多轮工具调用",
                 "并行工具执行", 
                 "文档处理支持",
                 "高级推理能力",
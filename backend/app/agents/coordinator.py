@@ -3,17 +3,24 @@ Agent协调器
 Agent Coordinator for managing and orchestrating multi-agent workflows
 """
 
-import logging
 import asyncio
-from typing import Dict, List, Any, Optional, Callable
-from datetime import datetime
+import json
+import logging
+from typing import Dict, List, Any, Optional, Callable, Awaitable
+from datetime import datetime, timezone
 from enum import Enum
 
+from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, START, END
-from langgraph.types import Command
 from pydantic import BaseModel, Field
+from sqlalchemy import select, update
 
 from app.agents.base import BaseAgent, AgentState
+from app.core.database import AsyncSessionLocal
+from app.models.workflow import WorkflowRun, WorkflowRunStatus, ACTIVE_STATUSES, RESUMABLE_STATUSES
+from app.services.workflow_checkpointer import SQLAlchemyCheckpointSaver
+from app.services.workflow_leases import claim_workflow_run, expire_stale_runs, keep_workflow_lease
 from app.agents.job_search_agent import JobSearchAgent
 from app.agents.resume_critic_agent import ResumeCriticAgent
 from app.agents.skill_heatmap_agent import SkillHeatmapAgent
@@ -32,6 +39,54 @@ class WorkflowType(str, Enum):
     COMPREHENSIVE = "comprehensive"
 
 
+# 各工作流的Agent依赖关系：Agent -> 上游依赖Agent列表
+# Agent dependencies per workflow: agent -> list of upstream agents it depends on
+# 综合工作流中简历分析和技能热点图只依赖职位结果，可并行执行；简历改写等待两者完成
+# In the comprehensive workflow, resume critique and skill heatmap only depend on job results and run
+# concurrently; the resume rewrite waits for both
+WORKFLOW_DEPENDENCIES: Dict[WorkflowType, Dict[str, List[str]]] = {
+    WorkflowType.JOB_SEARCH: {"job_search_agent": []},
+    WorkflowType.RESUME_ANALYSIS: {"resume_critic_agent": []},
+    WorkflowType.SKILL_ANALYSIS: {"skill_heatmap_agent": []},
+    WorkflowType.RESUME_OPTIMIZATION: {"resume_rewrite_agent": []},
+    WorkflowType.COMPREHENSIVE: {
+        "job_search_agent": [],
+        "resume_critic_agent": ["job_search_agent"],
+        "skill_heatmap_agent": ["job_search_agent"],
+        "resume_rewrite_agent": ["resume_critic_agent", "skill_heatmap_agent"]
+    }
+}
+
+# Agent可写回共享状态的字段 / Shared state fields an agent may write back
+AGENT_OUTPUT_FIELDS = ("job_results", "skill_analysis", "current_resume_data", "search_query")
+
+# 传给下游Agent的上游结果最大字符数 / Max characters of an upstream result passed downstream
+UPSTREAM_RESULT_MAX_CHARS = 4000
+
+
+# 运行结束或中断时释放租约 / Release the lease when a run finishes or is interrupted
+RELEASED_LEASE = {"owner_id": None, "lease_expires_at": None}
+
+
+def _same_input(stored: Optional[Dict[str, Any]], requested: Optional[Dict[str, Any]]) -> bool:
+    """
+    比较持久化的用户输入与新请求的输入（按JSON规范化）
+    Compare the persisted user input with a new request's input (JSON-normalized)
+    """
+    return (
+        json.dumps(stored or {}, sort_keys=True, ensure_ascii=False, default=str)
+        == json.dumps(requested or {}, sort_keys=True, ensure_ascii=False, default=str)
+    )
+
+
+class WorkflowCancelledError(Exception):
+    """
+    工作流已被取消
+    Raised when a workflow has been cancelled
+    """
+    pass
+
+
 class WorkflowStep(BaseModel):
     """
     工作流步骤模型
@@ -67,93 +122,148 @@ class AgentCoordinator:
             "resume_rewrite_agent": ResumeRewriteAgent()
         }
         
-        # 工作流图
-        # Workflow graph
-        self.workflow_graph = None
+        # 持久化检查点 - 崩溃或重新部署后从最后完成的Agent恢复
+        # Durable checkpoints - resume from the last completed agent after a crash or redeploy
+        self.checkpointer = SQLAlchemyCheckpointSaver()
+        
+        # 本进程内正在执行的工作流任务，用于取消
+        # Workflow tasks running in this process, used for cancellation
+        self._running_tasks: Dict[str, asyncio.Task] = {}
+        
+        # 工作流图 - 每种工作流类型一个
+        # Workflow graphs - one per workflow type
+        self.workflow_graphs = {}
         self._build_workflow_graph()
         
         self.logger = logging.getLogger("agent.coordinator")
     
     def _build_workflow_graph(self) -> None:
         """
-        构建工作流图
-        Build workflow graph
+        构建工作流图 - 每种工作流类型按依赖关系编译为一个DAG
+        Build workflow graphs - each workflow type is compiled into a DAG from its dependencies
+        """
+        self.workflow_graphs = {
+            workflow_type: self._build_dag(dependencies)
+            for workflow_type, dependencies in WORKFLOW_DEPENDENCIES.items()
+        }
+    
+    def _build_dag(self, dependencies: Dict[str, List[str]]):
+        """
+        将依赖关系编译为LangGraph图 - 无依赖的节点从START扇出，多依赖节点在所有上游完成后扇入
+        Compile dependencies into a LangGraph graph - dependency-free nodes fan out from START,
+        nodes with several dependencies fan in once every upstream node has finished
         """
-        # 创建状态图
-        # Create state graph
         workflow = StateGraph(AgentState)
         
-        # 添加节点
-        # Add nodes
-        workflow.add_node("job_search_agent", self._job_search_node)
-        workflow.add_node("resume_critic_agent", self._resume_critic_node)
-        workflow.add_node("skill_heatmap_agent", self._skill_heatmap_node)
-        workflow.add_node("resume_rewrite_agent", self._resume_rewrite_node)
-        workflow.add_node("coordinator", self._coordinator_node)
-        
-        # 添加边和条件路由
-        # Add edges and conditional routing
-        workflow.add_edge(START, "coordinator")
-        
-        # 从协调器到各个Agent的路由
-        workflow.add_conditional_edges(
-            "coordinator",
-            self._route_to_agent,
-            {
-                "job_search_agent": "job_search_agent",
-                "resume_critic_agent": "resume_critic_agent", 
-                "skill_heatmap_agent": "skill_heatmap_agent",
-                "resume_rewrite_agent": "resume_rewrite_agent",
-                "end": END
-            }
-        )
+        for agent_name, upstream in dependencies.items():
+            workflow.add_node(agent_name, self._make_agent_node(agent_name, upstream))
         
-        # Agent间的相互转移
-        # Inter-agent transfers
-        for agent_name in self.agents.keys():
-            workflow.add_conditional_edges(
-                agent_name,
-                self._determine_next_agent,
-                {
-                    "job_search_agent": "job_search_agent",
-                    "resume_critic_agent": "resume_critic_agent",
-                    "skill_heatmap_agent": "skill_heatmap_agent", 
-                    "resume_rewrite_agent": "resume_rewrite_agent",
-                    "coordinator": "coordinator",
-                    "end": END
-                }
-            )
+        has_downstream = {dependency for upstream in dependencies.values() for dependency in upstream}
+        for agent_name, upstream in dependencies.items():
+            if not upstream:
+                workflow.add_edge(START, agent_name)
+            elif len(upstream) == 1:
+                workflow.add_edge(upstream[0], agent_name)
+            else:
+                workflow.add_edge(upstream, agent_name)
+            
+            if agent_name not in has_downstream:
+                workflow.add_edge(agent_name, END)
         
-        self.workflow_graph = workflow.compile()
+        return workflow.compile(checkpointer=self.checkpointer)
     
     async def execute_workflow(
         self,
         workflow_type: WorkflowType,
         user_input: Dict[str, Any],
         user_id: int,
-        session_id: str = None
+        session_id: str = None,
+        run_id: Optional[str] = None,
+        progress_callback: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+        claimed: bool = False
     ) -> Dict[str, Any]:
         """
-        执行工作流
-        Execute workflow
+        执行工作流 - 指定 run_id，或同一会话中有输入相同的已中断同类型运行时，从最后的检查点恢复
+        Execute workflow - resumes from the last checkpoint when run_id is given, or when an interrupted run of the
+        same type in the session has the same input
+        progress_callback 在每个Agent开始和结束时收到进度事件
+        progress_callback receives a progress event when each agent starts and finishes
+        claimed 表示调用方（如工作流队列）已认领该运行
+        claimed means the caller (e.g. the workflow queue) has already claimed the run
         """
         try:
             self.logger.info(f"开始执行工作流 / Starting workflow: {workflow_type}")
+            workflow_type = WorkflowType(workflow_type)
+            session_id = session_id or f"session_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+            graph = self.workflow_graphs[workflow_type]
             
-            # 初始化状态
-            # Initialize state
-            initial_state = AgentState(
-                messages=[],
-                user_id=user_id,
-                session_id=session_id or f"session_{datetime.now().strftime('%Y%m%d%H%M%S')}",
-                session_start_time=datetime.now(),
-                workflow_type=workflow_type,
-                user_input=user_input
-            )
+            run = await self._get_or_create_run(workflow_type, user_input, user_id, session_id, run_id)
+            
+            # 认领运行：条件UPDATE保证同一运行只在一个进程中执行
+            # Claim the run: a conditional UPDATE ensures a run executes in only one process
+            if run.id in self._running_tasks or not (claimed or await claim_workflow_run(run.id)):
+                return {
+                    "success": False,
+                    "error": "工作流正在执行中 / Workflow run is already executing",
+                    "workflow_type": workflow_type,
+                    "session_id": session_id,
+                    "run_id": run.id
+                }
+            config = {"configurable": {"thread_id": run.id, "progress_callback": progress_callback}}
+            
+            # 已有检查点且仍有待执行节点时从检查点继续，否则从头开始
+            # Continue from the checkpoint when it still has pending nodes, otherwise start fresh
+            snapshot = await graph.aget_state(config)
+            if snapshot.next:
+                self.logger.info(f"从检查点恢复工作流 / Resuming workflow from checkpoint: {run.id} -> {list(snapshot.next)}")
+                graph_input = None
+            else:
+                graph_input = AgentState(
+                    messages=[],
+                    user_id=user_id,
+                    session_id=session_id,
+                    session_start_time=datetime.now(),
+                    workflow_type=workflow_type,
+                    user_input=user_input,
+                    completed_agents=[],
+                    agent_results={},
+                    error_count=0
+                )
             
-            # 执行工作流图
-            # Execute workflow graph
-            final_state = await self.workflow_graph.ainvoke(initial_state)
+            # 执行工作流图，执行期间续约
+            # Execute workflow graph, renewing the lease meanwhile
+            task = asyncio.create_task(graph.ainvoke(graph_input, config))
+            self._running_tasks[run.id] = task
+            lease = asyncio.create_task(keep_workflow_lease(run.id))
+            try:
+                final_state = await task
+            except (asyncio.CancelledError, WorkflowCancelledError):
+                # 被 cancel_workflow 取消时状态已是 cancelled；否则视为进程中断，保留可恢复状态
+                # When cancelled via cancel_workflow the status is already cancelled; otherwise treat it as an interruption
+                if await self._get_run_status(run.id) != WorkflowRunStatus.CANCELLED:
+                    await self._update_run(run.id, status=WorkflowRunStatus.INTERRUPTED, **RELEASED_LEASE)
+                    raise
+                return {
+                    "success": False,
+                    "error": "工作流已取消 / Workflow cancelled",
+                    "workflow_type": workflow_type,
+                    "session_id": session_id,
+                    "run_id": run.id
+                }
+            except Exception as e:
+                await self._update_run(run.id, status=WorkflowRunStatus.FAILED, error_message=str(e), **RELEASED_LEASE)
+                raise
+            finally:
+                lease.cancel()
+                self._running_tasks.pop(run.id, None)
+            
+            all_failed = final_state.get("error_count", 0) and not final_state.get("completed_agents")
+            await self._update_run(
+                run.id,
+                status=WorkflowRunStatus.FAILED if all_failed else WorkflowRunStatus.COMPLETED,
+                completed_at=datetime.now(timezone.utc),
+                **RELEASED_LEASE
+            )
             
             # 生成执行报告
             # Generate execution report
@@ -164,7 +274,8 @@ class AgentCoordinator:
                 "workflow_type": workflow_type,
                 "execution_report": execution_report,
                 "final_state": final_state,
-                "session_id": session_id
+                "session_id": session_id,
+                "run_id": run.id
             }
             
         except Exception as e:
@@ -175,195 +286,234 @@ class AgentCoordinator:
                 "workflow_type": workflow_type
             }
     
-    async def _job_search_node(self, state: AgentState) -> AgentState:
-        """
-        职位搜索节点
-        Job search node
-        """
-        try:
-            agent = self.agents["job_search_agent"]
-            result = await agent.invoke(state)
-            
-            # 更新状态
-            updated_state = state.copy()
-            updated_state.update(result)
-            
-            return updated_state
-            
-        except Exception as e:
-            self.logger.error(f"职位搜索节点执行失败 / Job search node failed: {e}")
-            return state
+    def build_agent_state(
+        self,
+        agent_name: str,
+        workflow_type: WorkflowType,
+        user_input: Dict[str, Any],
+        user_id: int,
+        session_id: Optional[str] = None
+    ) -> AgentState:
+        """
+        为直接调用单个Agent（如流式请求）构建初始状态，任务消息与工作流节点相同，保留完整的用户输入
+        Build the initial state for calling a single agent directly (e.g. a streamed request); the task message matches
+        a workflow node's and the full user input is kept
+        """
+        state = AgentState(
+            messages=[],
+            user_id=user_id,
+            session_id=session_id,
+            session_start_time=datetime.now(),
+            workflow_type=WorkflowType(workflow_type),
+            user_input=user_input,
+            workflow_context=user_input.get("workflow_context"),
+            completed_agents=[],
+            agent_results={},
+            error_count=0
+        )
+        state["messages"] = [HumanMessage(content=self._build_agent_task(agent_name, [], state))]
+        return state
     
-    async def _resume_critic_node(self, state: AgentState) -> AgentState:
+    async def resume_workflow(self, run_id: str) -> Dict[str, Any]:
         """
-        简历分析节点
-        Resume critic node
+        从检查点恢复指定的工作流运行
+        Resume a workflow run from its checkpoint
         """
-        try:
-            agent = self.agents["resume_critic_agent"]
-            result = await agent.invoke(state)
-            
-            # 更新状态
-            updated_state = state.copy()
-            updated_state.update(result)
+        async with AsyncSessionLocal() as db:
+            run = await db.get(WorkflowRun, run_id)
+        if run is None:
+            return {"success": False, "error": f"工作流运行不存在 / Workflow run not found: {run_id}"}
+        
+        return await self.execute_workflow(
+            workflow_type=run.workflow_type,
+            user_input=run.user_input or {},
+            user_id=run.user_id,
+            session_id=run.session_id,
+            run_id=run.id
+        )
+    
+    async def _get_or_create_run(
+        self,
+        workflow_type: WorkflowType,
+        user_input: Dict[str, Any],
+        user_id: int,
+        session_id: str,
+        run_id: Optional[str] = None
+    ) -> WorkflowRun:
+        """
+        查找要恢复的运行：指定 run_id 时即为该运行，否则只复用输入相同的已中断运行；都没有则创建新运行
+        Find the run to resume: the given run_id, otherwise only an interrupted run with the same input;
+        create a new run when there is none
+        """
+        async with AsyncSessionLocal() as db:
+            if run_id:
+                run = await db.get(WorkflowRun, run_id)
+            else:
+                result = await db.execute(
+                    select(WorkflowRun)
+                    .where(
+                        WorkflowRun.session_id == session_id,
+                        WorkflowRun.workflow_type == workflow_type.value,
+                        WorkflowRun.status.in_([status.value for status in RESUMABLE_STATUSES])
+                    )
+                    .order_by(WorkflowRun.created_at.desc())
+                )
+                # 新请求的输入不同时开始新运行，而不是接着旧的 / A request with different input starts a new run instead of continuing an old one
+                run = next(
+                    (
+                        candidate for candidate in result.scalars()
+                        if _same_input(candidate.user_input, user_input) and candidate.id not in self._running_tasks
+                    ),
+                    None
+                )
             
-            return updated_state
+            if run is None:
+                run = WorkflowRun(
+                    user_id=user_id,
+                    session_id=session_id,
+                    workflow_type=workflow_type.value,
+                    status=WorkflowRunStatus.PENDING,
+                    user_input=user_input
+                )
+                db.add(run)
+                await db.commit()
             
-        except Exception as e:
-            self.logger.error(f"简历分析节点执行失败 / Resume critic node failed: {e}")
-            return state
+            return run
     
-    async def _skill_heatmap_node(self, state: AgentState) -> AgentState:
+    async def _update_run(self, run_id: str, **values: Any) -> None:
         """
-        技能热点图节点
-        Skill heatmap node
+        更新工作流运行记录
+        Update a workflow run record
         """
-        try:
-            agent = self.agents["skill_heatmap_agent"]
-            result = await agent.invoke(state)
-            
-            # 更新状态
-            updated_state = state.copy()
-            updated_state.update(result)
-            
-            return updated_state
-            
-        except Exception as e:
-            self.logger.error(f"技能热点图节点执行失败 / Skill heatmap node failed: {e}")
-            return state
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(WorkflowRun).where(WorkflowRun.id == run_id).values(**values))
+            await db.commit()
     
-    async def _resume_rewrite_node(self, state: AgentState) -> AgentState:
+    async def _get_run_status(self, run_id: str) -> Optional[str]:
         """
-        简历改写节点
-        Resume rewrite node
+        读取持久化的运行状态
+        Read the persisted run status
         """
-        try:
-            agent = self.agents["resume_rewrite_agent"]
-            result = await agent.invoke(state)
-            
-            # 更新状态
-            updated_state = state.copy()
-            updated_state.update(result)
-            
-            return updated_state
-            
-        except Exception as e:
-            self.logger.error(f"简历改写节点执行失败 / Resume rewrite node failed: {e}")
-            return state
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(WorkflowRun.status).where(WorkflowRun.id == run_id))
+            return result.scalar_one_or_none()
     
-    async def _coordinator_node(self, state: AgentState) -> AgentState:
+    def _make_agent_node(self, agent_name: str, upstream: List[str]) -> Callable:
         """
-        协调器节点
-        Coordinator node
+        创建Agent节点函数
+        Create an agent node function
         """
-        # 分析用户输入和当前状态，决定下一步行动
-        # Analyze user input and current state to decide next action
-        workflow_type = state.get("workflow_type")
-        user_input = state.get("user_input", {})
-        
-        # 设置下一个要执行的Agent
-        # Set next agent to execute
-        if workflow_type == WorkflowType.JOB_SEARCH:
-            state["next_agent"] = "job_search_agent"
-        elif workflow_type == WorkflowType.RESUME_ANALYSIS:
-            state["next_agent"] = "resume_critic_agent"
-        elif workflow_type == WorkflowType.SKILL_ANALYSIS:
-            state["next_agent"] = "skill_heatmap_agent"
-        elif workflow_type == WorkflowType.RESUME_OPTIMIZATION:
-            state["next_agent"] = "resume_rewrite_agent"
-        elif workflow_type == WorkflowType.COMPREHENSIVE:
-            # 综合工作流的复杂逻辑
-            state["next_agent"] = self._determine_comprehensive_flow(state)
-        else:
-            state["next_agent"] = "end"
+        async def agent_node(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
+            # 每个Agent开始前检查持久化状态，支持跨进程取消
+            # Check the persisted status before each agent so cancellation works across processes
+            run_id = config["configurable"]["thread_id"]
+            if await self._get_run_status(run_id) == WorkflowRunStatus.CANCELLED:
+                raise WorkflowCancelledError(run_id)
+            
+            progress_callback = config["configurable"].get("progress_callback")
+            await self._report_progress(progress_callback, {"type": "agent_started", "agent": agent_name})
+            delta = await self._run_agent_node(agent_name, upstream, state)
+            agent_result = delta["agent_results"][agent_name]
+            await self._report_progress(progress_callback, {
+                "type": "agent_finished",
+                "agent": agent_name,
+                "status": agent_result["status"],
+                "error": agent_result["error"],
+                "duration_seconds": agent_result["duration_seconds"]
+            })
+            return delta
         
-        return state
+        return agent_node
     
-    def _route_to_agent(self, state: AgentState) -> str:
+    async def _report_progress(
+        self,
+        progress_callback: Optional[Callable[[Dict[str, Any]], Awaitable[None]]],
+        event: Dict[str, Any]
+    ) -> None:
         """
-        路由到下一个Agent
-        Route to next agent
+        推送进度事件 - 推送失败不影响工作流执行
+        Push a progress event - delivery failures never affect workflow execution
         """
-        next_agent = state.get("next_agent", "end")
-        return next_agent
+        if progress_callback is None:
+            return
+        try:
+            await progress_callback(event)
+        except Exception as e:
+            self.logger.warning(f"进度事件推送失败 / Failed to push progress event: {e}")
     
-    def _determine_next_agent(self, state: AgentState) -> str:
+    async def _run_agent_node(
+        self,
+        agent_name: str,
+        upstream: List[str],
+        state: AgentState
+    ) -> Dict[str, Any]:
         """
-        确定下一个Agent
-        Determine next agent
+        执行单个Agent节点，只返回状态增量以便并行分支通过reducer合并
+        Run a single agent node and return only a state delta so parallel branches merge via reducers
         """
-        # 检查是否有Agent移交命令
-        # Check for agent handoff commands
-        last_message = state.get("messages", [])[-1] if state.get("messages") else None
+        agent = self.agents[agent_name]
+        started_at = datetime.now()
+        previous_messages = list(state.get("messages", []))
         
-        if last_message and hasattr(last_message, 'tool_calls') and last_message.tool_calls:
-            for tool_call in last_message.tool_calls:
-                if tool_call["name"].startswith("transfer_to_"):
-                    target_agent = tool_call["name"].replace("transfer_to_", "")
-                    return target_agent
+        # 为Agent构建本步骤任务，附带上游Agent的结果
+        # Build this step's task for the agent, including upstream agents' results
+        agent_state = dict(state)
+        agent_state["messages"] = previous_messages + [
+            HumanMessage(content=self._build_agent_task(agent_name, upstream, state))
+        ]
         
-        # 检查工作流是否完成
-        # Check if workflow is complete
-        current_agent = state.get("current_agent")
-        workflow_type = state.get("workflow_type")
+        try:
+            result = await agent.invoke(agent_state)
+        except Exception as e:
+            result = {"messages": agent_state["messages"], "error": str(e)}
         
-        if self._is_workflow_complete(state):
-            return "end"
+        finished_at = datetime.now()
+        error = result.get("error")
+        if error:
+            self.logger.error(f"Agent节点执行失败 / Agent node failed: {agent_name}: {error}")
         
-        # 返回协调器进行下一步决策
-        # Return to coordinator for next decision
-        return "coordinator"
-    
-    def _determine_comprehensive_flow(self, state: AgentState) -> str:
-        """
-        确定综合工作流的下一步
-        Determine next step in comprehensive workflow
-        """
-        # 综合工作流的执行顺序：
-        # 1. 职位搜索 -> 2. 简历分析 -> 3. 技能分析 -> 4. 简历优化
+        delta: Dict[str, Any] = {
+            "messages": result.get("messages", agent_state["messages"])[len(previous_messages):],
+            "agent_results": {
+                agent_name: {
+                    "status": "failed" if error else "completed",
+                    "response": result.get("last_response"),
+                    "error": error,
+                    "start_time": started_at,
+                    "end_time": finished_at,
+                    "duration_seconds": (finished_at - started_at).total_seconds()
+                }
+            },
+            "completed_agents": [] if error else [agent_name],
+            "error_count": 1 if error else 0
+        }
         
-        completed_agents = state.get("completed_agents", [])
+        # 只写回本节点实际修改的共享字段，避免并行分支写入冲突
+        # Only write back shared fields this node actually changed, avoiding conflicting parallel writes
+        for field in AGENT_OUTPUT_FIELDS:
+            if field in result and result[field] is not state.get(field):
+                delta[field] = result[field]
         
-        if "job_search_agent" not in completed_agents:
-            return "job_search_agent"
-        elif "resume_critic_agent" not in completed_agents:
-            return "resume_critic_agent"
-        elif "skill_heatmap_agent" not in completed_agents:
-            return "skill_heatmap_agent"
-        elif "resume_rewrite_agent" not in completed_agents:
-            return "resume_rewrite_agent"
-        else:
-            return "end"
+        return delta
     
-    def _is_workflow_complete(self, state: AgentState) -> bool:
+    def _build_agent_task(self, agent_name: str, upstream: List[str], state: AgentState) -> str:
         """
-        检查工作流是否完成
-        Check if workflow is complete
+        构建Agent的任务描述
+        Build the task description for an agent
         """
-        workflow_type = state.get("workflow_type")
-        completed_agents = state.get("completed_agents", [])
-        error_count = state.get("error_count", 0)
+        user_input = state.get("user_input") or {}
+        agent_results = state.get("agent_results") or {}
         
-        # 如果错误过多，终止工作流
-        # Terminate workflow if too many errors
-        if error_count > 5:
-            return True
-        
-        # 根据工作流类型检查完成条件
-        # Check completion condition based on workflow type
-        if workflow_type == WorkflowType.JOB_SEARCH:
-            return "job_search_agent" in completed_agents
-        elif workflow_type == WorkflowType.RESUME_ANALYSIS:
-            return "resume_critic_agent" in completed_agents
-        elif workflow_type == WorkflowType.SKILL_ANALYSIS:
-            return "skill_heatmap_agent" in completed_agents
-        elif workflow_type == WorkflowType.RESUME_OPTIMIZATION:
-            return "resume_rewrite_agent" in completed_agents
-        elif workflow_type == WorkflowType.COMPREHENSIVE:
-            required_agents = ["job_search_agent", "resume_critic_agent", "skill_heatmap_agent", "resume_rewrite_agent"]
-            return all(agent in completed_agents for agent in required_agents)
+        sections = [
+            f"工作流任务 / Workflow task: {agent_name}",
+            f"用户输入 / User input:\n{json.dumps(user_input, ensure_ascii=False, default=str)}"
+        ]
+        for dependency in upstream:
+            response = (agent_results.get(dependency) or {}).get("response")
+            if response:
+                sections.append(f"{dependency} 结果 / result:\n{response[:UPSTREAM_RESULT_MAX_CHARS]}")
         
-        return False
+        return "\n\n".join(sections)
     
     def _generate_execution_report(self, final_state: AgentState) -> Dict[str, Any]:
         """
@@ -387,44 +537,112 @@ class AgentCoordinator:
             duration = report["end_time"] - report["start_time"]
             report["execution_duration_seconds"] = duration.total_seconds()
         
-        # 提取各Agent的结果
-        # Extract results from each agent
-        completed_agents = final_state.get("completed_agents", [])
-        for agent_name in completed_agents:
-            agent_result = final_state.get(f"{agent_name}_result")
-            if agent_result:
-                report["final_results"][agent_name] = agent_result
+        # 提取各Agent的执行步骤和结果
+        # Extract execution steps and results from each agent
+        agent_results = final_state.get("agent_results", {})
+        for agent_name, agent_result in sorted(agent_results.items(), key=lambda item: item[1]["start_time"]):
+            report["execution_steps"].append({
+                "agent_name": agent_name,
+                "status": agent_result["status"],
+                "start_time": agent_result["start_time"],
+                "end_time": agent_result["end_time"],
+                "duration_seconds": agent_result["duration_seconds"],
+                "error_message": agent_result["error"]
+            })
+            if agent_result["status"] == "completed":
+                report["final_results"][agent_name] = agent_result["response"]
         
         return report
     
     async def get_workflow_status(self, session_id: str) -> Dict[str, Any]:
         """
-        获取工作流状态
-        Get workflow status
+        获取工作流状态 - 基于运行记录和持久化检查点
+        Get workflow status - based on the run record and the persisted checkpoint
         """
-        # 这里可以实现会话状态的持久化存储和查询
-        # Here can implement persistent storage and querying of session states
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(WorkflowRun)
+                .where(WorkflowRun.session_id == session_id)
+                .order_by(WorkflowRun.created_at.desc())
+                .limit(1)
+            )
+            run = result.scalars().first()
+        
+        if run is None:
+            return {
+                "session_id": session_id,
+                "status": "not_found",
+                "current_agent": None,
+                "progress": 0,
+                "last_updated": None
+            }
+        
+        workflow_type = WorkflowType(run.workflow_type)
+        snapshot = await self.workflow_graphs[workflow_type].aget_state({"configurable": {"thread_id": run.id}})
+        values = snapshot.values or {}
+        agent_results = values.get("agent_results", {})
+        total_agents = len(WORKFLOW_DEPENDENCIES[workflow_type])
+        
+        if run.status == WorkflowRunStatus.COMPLETED:
+            progress = 100
+        else:
+            progress = int(len(agent_results) * 100 / total_agents)
+        
+        current_agents = list(snapshot.next) if run.status == WorkflowRunStatus.RUNNING else []
+        
         return {
-            "session_id": session_id,
-            "status": "completed",  # running, completed, failed
-            "current_agent": None,
-            "progress": 100,
-            "last_updated": datetime.now().isoformat()
+            **run.to_dict(),
+            "current_agent": current_agents[0] if current_agents else None,
+            "current_agents": current_agents,
+            "completed_agents": values.get("completed_agents", []),
+            "failed_agents": [
+                agent_name for agent_name, agent_result in agent_results.items()
+                if agent_result.get("status") == "failed"
+            ],
+            "progress": progress
         }
     
     async def cancel_workflow(self, session_id: str) -> Dict[str, Any]:
         """
-        取消工作流
-        Cancel workflow
+        取消工作流 - 持久化取消状态，并中止本进程内正在执行的任务
+        Cancel workflow - persist the cancelled status and stop the task if it runs in this process
         """
         try:
-            # 实现工作流取消逻辑
-            # Implement workflow cancellation logic
             self.logger.info(f"取消工作流 / Canceling workflow: {session_id}")
             
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    select(WorkflowRun.id).where(
+                        WorkflowRun.session_id == session_id,
+                        WorkflowRun.status.in_([status.value for status in ACTIVE_STATUSES])
+                    )
+                )
+                run_ids = list(result.scalars())
+                if not run_ids:
+                    return {
+                        "success": False,
+                        "session_id": session_id,
+                        "error": "没有正在执行的工作流 / No active workflow"
+                    }
+                
+                await db.execute(
+                    update(WorkflowRun)
+                    .where(WorkflowRun.id.in_(run_ids))
+                    .values(status=WorkflowRunStatus.CANCELLED, completed_at=datetime.now(timezone.utc))
+                )
+                await db.commit()
+            
+            # 其他进程中的运行会在下一个Agent开始前检测到取消状态
+            # Runs in other processes notice the cancelled status before their next agent starts
+            for run_id in run_ids:
+                task = self._running_tasks.get(run_id)
+                if task is not None:
+                    task.cancel()
+            
             return {
                 "success": True,
                 "session_id": session_id,
+                "cancelled_runs": run_ids,
                 "message": "工作流已取消 / Workflow cancelled"
             }
             
@@ -472,8 +690,8 @@ class AgentCoordinator:
             {
                 "type": WorkflowType.COMPREHENSIVE,
                 "name": "综合分析 / Comprehensive Analysis",
-                "description": "完整的求职辅助流程，包含所有功能 / Complete job hunting assistance process with all features",
-                "estimated_duration": "15-30分钟 / 15-30 minutes",
+                "description": "完整的求职辅助流程，包含所有功能；简历分析与技能分析并行执行 / Complete job hunting assistance process with all features; resume and skill analysis run in parallel",
+                "estimated_duration": "11-23分钟 / 11-23 minutes",
                 "agents_involved": ["job_search_agent", "resume_critic_agent", "skill_heatmap_agent", "resume_rewrite_agent"]
             }
         ]
@@ -488,4 +706,13 @@ class AgentCoordinator:
         for agent_name, agent in self.agents.items():
             capabilities[agent_name] = agent.get_agent_info()
         
-        return capabilities 
\ No newline at end of file
+        return capabilities 
+
+
+async def recover_interrupted_workflows() -> int:
+    """
+    启动时将租约已过期的运行中工作流（持有进程已退出）标记为中断，以便之后从检查点恢复；其他存活进程的运行不受影响
+    On startup, mark running workflows whose lease has expired (their process is gone) as interrupted so they can resume
+    from checkpoints; runs owned by other live processes are left alone
+    """
+    return await expire_stale_runs()
@@ -8,16 +8,20 @@ Implementing multi-source job search and aggregation as per section 5 of develop
 import logging
 import json
 import asyncio
-from typing import Dict, List, Any, Optional
+from typing import AsyncIterator, Dict, List, Any, Optional
 from datetime import datetime, timezone
 
-import httpx
 from langchain_core.tools import BaseTool
 from langchain_core.messages import HumanMessage, AIMessage
 from pydantic import BaseModel, Field
 
 from app.agents.base import BaseAgent, AgentState
 from app.services.azure_search import get_search_service, JobDocument
+from app.services.http_clients import get_http_client
+from app.services.search_result_cache import cached_job_search
+from app.services.job_search_stream import SourceSearch, stream_job_search
+from app.services.job_dedup import deduplicate_jobs
+from app.services.skill_taxonomy import get_skill_matcher
 from app.core.config import settings
 
 
@@ -65,34 +69,22 @@ class WebSearchTool(BaseTool):
         Asynchronous external API search - parallel calls for efficiency
         """
         results = []
+        searches = self._source_searches(query, location, limit)
         
-        # 并行调用多个数据源 / Parallel calls to multiple data sources
-        tasks = []
-        
-        # 1. StepStone via Apify
-        if settings.APIFY_TOKEN:
-            tasks.append(self._search_stepstone(query, location, limit // 2))
-        
-        # 2. Google Jobs via SerpAPI
-        if settings.SERPAPI_KEY:
-            tasks.append(self._search_google_jobs(query, location, limit // 2))
-        
-        if not tasks:
+        if not searches:
             return json.dumps({
                 "status": "error",
                 "message": "未配置外部API密钥，无法搜索外部职位数据",
                 "jobs": []
             }, ensure_ascii=False)
         
-        # 并行执行所有搜索任务 / Execute all search tasks in parallel
-        search_results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # 合并结果 / Merge results
-        for result in search_results:
-            if isinstance(result, list):
-                results.extend(result)
-            elif isinstance(result, Exception):
-                logging.error(f"搜索任务失败: {result}")
+        # 汇总流式批次，截止时间后先返回已完成的数据源，迟到的继续在后台写入缓存
+        # Collect the streamed batches; after the deadline finished sources are returned while late ones keep filling the cache
+        async for event in stream_job_search(searches, settings.SEARCH_DEADLINE_SECONDS):
+            if event["type"] == "batch":
+                results.extend(event["jobs"])
+            elif event["type"] == "source_error":
+                logging.error(f"搜索任务失败: {event['source']}: {event['error']}")
         
         # 去重和排序 / Deduplicate and sort
         unique_results = self._deduplicate_jobs(results)
@@ -100,136 +92,174 @@ class WebSearchTool(BaseTool):
         return json.dumps({
             "status": "success",
             "total": len(unique_results),
-            "sources": ["stepstone", "google"] if len(tasks) > 1 else ["stepstone" if settings.APIFY_TOKEN else "google"],
+            "sources": ["stepstone", "google"] if len(searches) > 1 else ["stepstone" if settings.APIFY_TOKEN else "google"],
             "jobs": unique_results[:limit]
         }, ensure_ascii=False, indent=2)
     
+    async def astream_jobs(self, query: str, location: str = "Berlin", limit: int = 20) -> AsyncIterator[Dict[str, Any]]:
+        """
+        流式搜索 - 每个数据源完成即产出一批去重后的职位
+        Streaming search - yields a batch of deduplicated jobs as each source completes
+        """
+        async for event in stream_job_search(
+            self._source_searches(query, location, limit),
+            settings.SEARCH_DEADLINE_SECONDS
+        ):
+            yield event
+    
+    def _source_searches(self, query: str, location: str, limit: int) -> Dict[str, SourceSearch]:
+        """
+        已配置密钥的数据源搜索函数
+        Search functions of the sources whose API keys are configured
+        """
+        searches = {}
+        
+        # 1. StepStone via Apify
+        if settings.APIFY_TOKEN:
+            searches["stepstone"] = lambda: self._search_stepstone(query, location, limit // 2)
+        
+        # 2. Google Jobs via SerpAPI
+        if settings.SERPAPI_KEY:
+            searches["google_jobs"] = lambda: self._search_google_jobs(query, location, limit // 2)
+        
+        return searches
+    
     async def _search_stepstone(self, query: str, location: str, limit: int) -> List[Dict[str, Any]]:
         """
         搜索StepStone职位 - 德国主要求职平台
         Search StepStone jobs - major German job platform
         """
         try:
-            async with httpx.AsyncClient(timeout=30) as client:
-                # 根据开发文档使用Apify StepStone Scraper
-                url = "https://api.apify.com/v2/acts/apify~stepstone-scraper/run-sync-get-dataset-items"
-                params = {"token": settings.APIFY_TOKEN}
-                data = {
-                    "search": query,
-                    "location": location,
-                    "maxItems": limit,
-                    "extendOutputFunction": "",
-                    "customMapFunction": ""
-                }
-                
-                response = await client.post(url, params=params, json=data)
-                response.raise_for_status()
-                
-                jobs_data = response.json()
-                jobs = []
-                
-                for item in jobs_data[:limit]:
-                    job = {
-                        "id": f"stepstone_{item.get('id', hash(item.get('url', '')))}",
-                        "title": item.get("positionName", "").strip(),
-                        "company": item.get("companyName", "").strip(),
-                        "location": item.get("location", location).strip(),
-                        "salary": item.get("salary", "").strip(),
-                        "description": self._clean_description(item.get("description", "")),
-                        "url": item.get("url", ""),
-                        "source": "stepstone",
-                        "skills": item.get("skills", []) or self._extract_skills_from_text(item.get("description", "")),
-                        "posted_date": item.get("postedTime", ""),
-                        "job_type": item.get("jobType", ""),
-                        "experience_level": item.get("experienceLevel", "")
-                    }
-                    
-                    # 过滤无效职位 / Filter invalid jobs
-                    if job["title"] and job["company"]:
-                        jobs.append(job)
-                
-                logging.info(f"StepStone搜索 '{query}' 在 '{location}' 返回 {len(jobs)} 个职位")
-                return jobs
-                
+            return await cached_job_search(
+                "stepstone", query, location, limit,
+                lambda: self._fetch_stepstone(query, location, limit)
+            )
         except Exception as e:
             logging.error(f"StepStone搜索失败: {e}")
             return []
     
+    async def _fetch_stepstone(self, query: str, location: str, limit: int) -> List[Dict[str, Any]]:
+        """
+        调用Apify StepStone爬虫，失败时抛出异常（不写入缓存）
+        Call the Apify StepStone scraper; raises on failure (nothing is cached)
+        """
+        client = get_http_client("apify")
+        # 根据开发文档使用Apify StepStone Scraper
+        url = "https://api.apify.com/v2/acts/apify~stepstone-scraper/run-sync-get-dataset-items"
+        params = {"token": settings.APIFY_TOKEN}
+        data = {
+            "search": query,
+            "location": location,
+            "maxItems": limit,
+            "extendOutputFunction": "",
+            "customMapFunction": ""
+        }
+        
+        response = await client.post(url, params=params, json=data)
+        response.raise_for_status()
+        
+        jobs_data = response.json()
+        jobs = []
+        
+        for item in jobs_data[:limit]:
+            job = {
+                "id": f"stepstone_{item.get('id', hash(item.get('url', '')))}",
+                "title": item.get("positionName", "").strip(),
+                "company": item.get("companyName", "").strip(),
+                "location": item.get("location", location).strip(),
+                "salary": item.get("salary", "").strip(),
+                "description": self._clean_description(item.get("description", "")),
+                "url": item.get("url", ""),
+                "source": "stepstone",
+                "skills": item.get("skills", []) or self._extract_skills_from_text(item.get("description", "")),
+                "posted_date": item.get("postedTime", ""),
+                "job_type": item.get("jobType", ""),
+                "experience_level": item.get("experienceLevel", "")
+            }
+            
+            # 过滤无效职位 / Filter invalid jobs
+            if job["title"] and job["company"]:
+                jobs.append(job)
+        
+        logging.info(f"StepStone搜索 '{query}' 在 '{location}' 返回 {len(jobs)} 个职位")
+        return jobs
+    
     async def _search_google_jobs(self, query: str, location: str, limit: int) -> List[Dict[str, Any]]:
         """
         搜索Google Jobs - 整合LinkedIn和Indeed
         Search Google Jobs - integrates LinkedIn and Indeed
         """
         try:
-            async with httpx.AsyncClient(timeout=30) as client:
-                # 根据开发文档使用SerpAPI Google Jobs
-                url = "https://serpapi.com/search.json"
-                params = {
-                    "q": f"{query} jobs",
-                    "location": location,
-                    "engine": "google_jobs",
-                    "api_key": settings.SERPAPI_KEY,
-                    "num": limit,
-                    "hl": "en",  # 英文结果
-                    "gl": "de"   # 德国地区
-                }
-                
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-                
-                data = response.json()
-                jobs = []
-                
-                for item in data.get("jobs_results", [])[:limit]:
-                    # 提取薪资信息 / Extract salary information
-                    salary_info = ""
-                    if "salary" in item:
-                        salary_info = item["salary"]
-                    elif "extensions" in item:
-                        salary_extensions = [ext for ext in item["extensions"] if any(char.isdigit() for char in ext)]
-                        if salary_extensions:
-                            salary_info = salary_extensions[0]
-                    
-                    job = {
-                        "id": f"google_{item.get('job_id', hash(item.get('link', '')))}",
-                        "title": item.get("title", "").strip(),
-                        "company": item.get("company_name", "").strip(),
-                        "location": item.get("location", location).strip(),
-                        "salary": salary_info,
-                        "description": self._clean_description(item.get("description", "")),
-                        "url": item.get("link", item.get("share_link", "")),
-                        "source": "google_jobs",
-                        "skills": self._extract_skills_from_text(item.get("description", "")),
-                        "posted_date": item.get("detected_extensions", {}).get("posted_at", ""),
-                        "job_type": item.get("schedule_type", ""),
-                        "via": item.get("via", "")
-                    }
-                    
-                    # 过滤无效职位 / Filter invalid jobs
-                    if job["title"] and job["company"]:
-                        jobs.append(job)
-                
-                logging.info(f"Google Jobs搜索 '{query}' 在 '{location}' 返回 {len(jobs)} 个职位")
-                return jobs
-                
+            return await cached_job_search(
+                "google_jobs", query, location, limit,
+                lambda: self._fetch_google_jobs(query, location, limit)
+            )
         except Exception as e:
             logging.error(f"Google Jobs搜索失败: {e}")
             return []
     
-    def _deduplicate_jobs(self, jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    async def _fetch_google_jobs(self, query: str, location: str, limit: int) -> List[Dict[str, Any]]:
         """
-        职位去重 - 基于标题和公司名
-        Job deduplication - based on title and company
+        调用SerpAPI Google Jobs，失败时抛出异常（不写入缓存）
+        Call SerpAPI Google Jobs; raises on failure (nothing is cached)
         """
-        seen = set()
-        unique_jobs = []
+        client = get_http_client("serpapi")
+        # 根据开发文档使用SerpAPI Google Jobs
+        url = "https://serpapi.com/search.json"
+        params = {
+            "q": f"{query} jobs",
+            "location": location,
+            "engine": "google_jobs",
+            "api_key": settings.SERPAPI_KEY,
+            "num": limit,
+            "hl": "en",  # 英文结果
+            "gl": "de"   # 德国地区
+        }
+        
+        response = await client.get(url, params=params)
+        response.raise_for_status()
         
-        for job in jobs:
-            # 创建去重键 / Create deduplication key
-            key = f"{job.get('title', '').lower()}_{job.get('company', '').lower()}"
-            if key not in seen and key != "_":
-                seen.add(key)
-                unique_jobs.append(job)
+        data = response.json()
+        jobs = []
+        
+        for item in data.get("jobs_results", [])[:limit]:
+            # 提取薪资信息 / Extract salary information
+            salary_info = ""
+            if "salary" in item:
+                salary_info = item["salary"]
+            elif "extensions" in item:
+                salary_extensions = [ext for ext in item["extensions"] if any(char.isdigit() for char in ext)]
+                if salary_extensions:
+                    salary_info = salary_extensions[0]
+            
+            job = {
+                "id": f"google_{item.get('job_id', hash(item.get('link', '')))}",
+                "title": item.get("title", "").strip(),
+                "company": item.get("company_name", "").strip(),
+                "location": item.get("location", location).strip(),
+                "salary": salary_info,
+                "description": self._clean_description(item.get("description", "")),
+                "url": item.get("link", item.get("share_link", "")),
+                "source": "google_jobs",
+                "skills": self._extract_skills_from_text(item.get("description", "")),
+                "posted_date": item.get("detected_extensions", {}).get("posted_at", ""),
+                "job_type": item.get("schedule_type", ""),
+                "via": item.get("via", "")
+            }
+            
+            # 过滤无效职位 / Filter invalid jobs
+            if job["title"] and job["company"]:
+                jobs.append(job)
+        
+        logging.info(f"Google Jobs搜索 '{query}' 在 '{location}' 返回 {len(jobs)} 个职位")
+        return jobs
+    
+    def _deduplicate_jobs(self, jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        职位去重 - 规范化的标题和公司名，以及标题、公司和描述的MinHash近似匹配
+        Job deduplication - canonical title and company, plus MinHash near-matching over title, company and description
+        """
+        unique_jobs = deduplicate_jobs(jobs)
         
         # 按照来源和发布时间排序 / Sort by source and posting time
         return sorted(unique_jobs, key=lambda x: (x.get('source') == 'stepstone', x.get('posted_date', '')), reverse=True)
@@ -252,22 +282,7 @@ class WebSearchTool(BaseTool):
     
     def _extract_skills_from_text(self, text: str) -> List[str]:
         """从文本中提取技能关键词"""
-        if not text:
-            return []
-        
-        # 常见技能关键词 / Common skill keywords
-        common_skills = [
-            "python", "java", "javascript", "react", "node.js", "typescript",
-            "sql", "postgresql", "mysql", "mongodb", "redis",
-            "aws", "azure", "docker", "kubernetes", "terraform",
-            "git", "ci/cd", "jenkins", "jira", "agile", "scrum",
-            "machine learning", "data science", "ai", "tensorflow", "pytorch"
-        ]
-        
-        text_lower = text.lower()
-        found_skills = [skill for skill in common_skills if skill in text_lower]
-        
-        return found_skills[:10]  # 限制数量
+        return get_skill_matcher().extract(text)[:10]  # 限制数量
 
 
 class LocalJobSearchTool(BaseTool):
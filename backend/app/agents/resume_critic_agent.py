@@ -18,7 +18,8 @@ from pydantic import BaseModel, Field
 
 from app.agents.base import BaseAgent, AgentState
 from app.services.azure_search import get_search_service
-from app.core.config import settings
+from app.services.llm_gateway import get_llm_gateway
+from app.services.skill_taxonomy import get_skill_matcher
 
 
 class ResumeParseInput(BaseModel):
@@ -92,14 +93,6 @@ class ResumeParsingTool(BaseTool):
         Asynchronous resume parsing using Claude 4 document processing
         """
         try:
-            import anthropic
-            
-            # 创建Anthropic客户端 / Create Anthropic client
-            client = anthropic.AsyncAnthropic(
-                api_key=settings.ANTHROPIC_API_KEY,
-                base_url=settings.ANTHROPIC_BASE_URL
-            )
-            
             # 确定媒体类型 / Determine media type
             media_type_map = {
                 "pdf": "application/pdf",
@@ -109,10 +102,13 @@ class ResumeParsingTool(BaseTool):
             media_type = media_type_map.get(file_type.lower(), "application/pdf")
             
             # 使用Claude 4文档处理API / Use Claude 4 document processing API
-            response = await client.messages.create(
+            response = await get_llm_gateway().create_message(
+                "resume_critic.resume_parsing",
                 model="claude-sonnet-4-20250514",  # 使用rules指定的模型
                 max_tokens=4000,
-                temperature=settings.CLAUDE_TEMPERATURE,  # 使用统一的温度设置
+                # 解析是抽取任务，使用确定性输出，相同简历可直接命中响应缓存
+                # Parsing is extraction, so output is deterministic and the same resume can hit the response cache
+                temperature=0.0,
                 messages=[{
                     "role": "user",
                     "content": [
@@ -122,7 +118,10 @@ class ResumeParsingTool(BaseTool):
                                 "type": "base64",
                                 "media_type": media_type,
                                 "data": file_content
-                            }
+                            },
+                            # 简历文档是最大的稳定前缀，重复解析时命中提示缓存
+                            # The resume document is the largest stable prefix; re-parses hit the prompt cache
+                            "cache_control": {"type": "ephemeral"}
                         },
                         {
                             "type": "text",
@@ -321,31 +320,18 @@ class SkillAnalysisTool(BaseTool):
             all_skills = {}
             job_count = len(jobs)
             
+            matcher = get_skill_matcher()
+            
             for job in jobs:
-                job_skills = job.get("skills", [])
-                
-                # 从职位描述中提取技能（增强版）
-                # Extract skills from job description (enhanced version)
-                description = job.get("description", "").lower()
-                common_skills = [
-                    "python", "java", "javascript", "react", "vue", "angular", "django", "fastapi",
-                    "sql", "postgresql", "mysql", "mongodb", "redis", "docker", "kubernetes",
-                    "aws", "azure", "gcp", "git", "linux", "nodejs", "typescript", "html", "css",
-                    "machine learning", "ai", "data science", "pandas", "numpy", "tensorflow",
-                    "pytorch", "flask", "spring", "microservices", "restful", "graphql",
-                    "ci/cd", "jenkins", "gitlab", "terraform", "ansible", "prometheus"
-                ]
-                
-                for skill in common_skills:
-                    if skill in description:
-                        job_skills.append(skill)
+                # 职位自带技能和描述中提取的技能，统一为规范名（如 k8s -> kubernetes）
+                # Skills listed on the job plus skills found in the description, as canonical names (e.g. k8s -> kubernetes)
+                job_skills = matcher.canonicalize_all(job.get("skills", []) or [])
+                job_skills.extend(matcher.extract(job.get("description", "")))
                 
                 # 统计技能出现频率
                 # Count skill frequency
                 for skill in set(job_skills):  # 去重
-                    skill_lower = skill.lower().strip()
-                    if skill_lower:
-                        all_skills[skill_lower] = all_skills.get(skill_lower, 0) + 1
+                    all_skills[skill] = all_skills.get(skill, 0) + 1
             
             # 生成技能分析报告
             # Generate skill analysis report
@@ -373,7 +359,7 @@ class SkillAnalysisTool(BaseTool):
             
             # 分析技能匹配和差距
             # Analyze skill matching and gaps
-            resume_skills_lower = [skill.lower() for skill in resume_skills]
+            resume_skills_lower = matcher.canonicalize_all(resume_skills)
             
             for skill_data in analysis["market_demand_skills"]:
                 skill = skill_data["skill"]
@@ -500,32 +486,21 @@ class JobMatchScoreTool(BaseTool):
             skills.extend(skills_data)
         
         # 从工作经验中提取技能
+        matcher = get_skill_matcher()
         for exp in resume_data.get("work_experience", []):
-            description = exp.get("description", "").lower()
-            # 简单关键词提取
-            tech_keywords = ["python", "javascript", "java", "sql", "aws", "docker"]
-            for keyword in tech_keywords:
-                if keyword in description and keyword not in skills:
-                    skills.append(keyword)
+            skills.extend(matcher.extract(exp.get("description", "")))
         
-        return [skill.lower().strip() for skill in skills if skill]
+        return matcher.canonicalize_all(skills)
     
     def _extract_job_skills(self, job_data: Dict[str, Any]) -> List[str]:
         """提取职位技能要求"""
-        skills = job_data.get("skills", [])
+        skills = list(job_data.get("skills", []) or [])
         
         # 从描述中提取技能
-        description = job_data.get("description", "").lower()
-        tech_keywords = [
-            "python", "javascript", "java", "react", "vue", "angular",
-            "sql", "postgresql", "mongodb", "aws", "azure", "docker", "kubernetes"
-        ]
-        
-        for keyword in tech_keywords:
-            if keyword in description and keyword not in skills:
-                skills.append(keyword)
+        matcher = get_skill_matcher()
+        skills.extend(matcher.extract(job_data.get("description", "")))
         
-        return [skill.lower().strip() for skill in skills if skill]
+        return matcher.canonicalize_all(skills)
     
     def _calculate_technical_match(self, resume_skills: List[str], job_skills: List[str]) -> float:
         """计算技术技能匹配分数"""
@@ -4,17 +4,15 @@ Resume Rewrite Agent for optimizing and rewriting resume content based on analys
 """
 
 import logging
-import asyncio
 import json
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 
 from langchain_core.tools import tool
 from pydantic import BaseModel, Field
-import anthropic
-
-from app.agents.base import BaseAgent, AgentState
+from app.agents.base import BaseAgent, AgentState, CACHE_CONTROL_EPHEMERAL
 from app.services.pdf_generator import PDFGeneratorService
+from app.services.skill_taxonomy import get_skill_matcher
 from app.core.config import settings
 
 
@@ -57,13 +55,6 @@ class ResumeRewriteAgent(BaseAgent):
         # Initialize services
         self.pdf_generator_service = PDFGeneratorService()
         
-        # 初始化Claude 4客户端用于高级个性化功能
-        # Initialize Claude 4 client for advanced personalization features
-        self.anthropic_client = anthropic.AsyncAnthropic(
-            api_key=settings.ANTHROPIC_API_KEY,
-            base_url=settings.ANTHROPIC_BASE_URL
-        )
-        
         self.logger = logging.getLogger("agent.resume_rewrite")
     
     def _setup_tools(self) -> None:
@@ -292,7 +283,7 @@ class ResumeRewriteAgent(BaseAgent):
                 }
         
         @tool("generate_pdf_resume")
-        def generate_pdf(
+        async def generate_pdf(
             resume_data: Dict[str, Any],
             template_style: str = "modern",
             output_format: str = "pdf"
@@ -303,11 +294,9 @@ class ResumeRewriteAgent(BaseAgent):
             """
             try:
                 # 使用PDF生成服务
-                pdf_result = asyncio.run(
-                    self.pdf_generator_service.generate_resume_pdf(
-                        resume_data=resume_data,
-                        template_style=template_style
-                    )
+                pdf_result = await self.pdf_generator_service.generate_resume_pdf(
+                    resume_data=resume_data,
+                    template_style=template_style
                 )
                 
                 return {
@@ -370,7 +359,7 @@ class ResumeRewriteAgent(BaseAgent):
                 }
         
         @tool("generate_personalized_resume")
-        def generate_personalized_resume(
+        async def generate_personalized_resume(
             resume_data: Dict[str, Any],
             target_job: Dict[str, Any],
             personalization_style: str = "adaptive"
@@ -382,10 +371,8 @@ class ResumeRewriteAgent(BaseAgent):
             try:
                 # 调用Claude 4进行深度个性化分析和改写
                 # Call Claude 4 for deep personalization analysis and rewriting
-                personalized_result = asyncio.run(
-                    self._claude4_personalized_rewrite(
-                        resume_data, target_job, personalization_style
-                    )
+                personalized_result = await self._claude4_personalized_rewrite(
+                    resume_data, target_job, personalization_style
                 )
                 
                 return {
@@ -407,7 +394,7 @@ class ResumeRewriteAgent(BaseAgent):
                 }
         
         @tool("claude4_resume_optimization")
-        def claude4_optimize(
+        async def claude4_optimize(
             resume_content: str,
             job_description: str,
             optimization_goals: List[str] = None
@@ -422,10 +409,8 @@ class ResumeRewriteAgent(BaseAgent):
                 
                 # 调用Claude 4进行高级优化
                 # Call Claude 4 for advanced optimization
-                optimization_result = asyncio.run(
-                    self._claude4_advanced_optimization(
-                        resume_content, job_description, optimization_goals
-                    )
+                optimization_result = await self._claude4_advanced_optimization(
+                    resume_content, job_description, optimization_goals
                 )
                 
                 return {
@@ -447,7 +432,7 @@ class ResumeRewriteAgent(BaseAgent):
                 }
         
         @tool("generate_cover_letter")
-        def generate_cover_letter(
+        async def generate_cover_letter(
             resume_data: Dict[str, Any],
             target_job: Dict[str, Any],
             cover_letter_style: str = "professional"
@@ -459,10 +444,8 @@ class ResumeRewriteAgent(BaseAgent):
             try:
                 # 使用Claude 4生成求职信
                 # Generate cover letter using Claude 4
-                cover_letter_result = asyncio.run(
-                    self._claude4_generate_cover_letter(
-                        resume_data, target_job, cover_letter_style
-                    )
+                cover_letter_result = await self._claude4_generate_cover_letter(
+                    resume_data, target_job, cover_letter_style
                 )
                 
                 return {
@@ -644,20 +627,12 @@ Always ensure optimized resumes can pass ATS systems while attracting HR profess
         if not job_data:
             return []
         
-        keywords = []
         text = f"{job_data.get('title', '')} {job_data.get('description', '')} {job_data.get('requirements', '')}"
         
-        # 简单的关键词提取逻辑
-        tech_keywords = [
-            "Python", "JavaScript", "React", "Vue", "Django", "FastAPI",
-            "PostgreSQL", "MongoDB", "AWS", "Docker", "Kubernetes"
-        ]
-        
-        for keyword in tech_keywords:
-            if keyword.lower() in text.lower():
-                keywords.append(keyword)
-        
-        return keywords
+        # 共享技能词表匹配，返回展示名（如 "PostgreSQL"）
+        # Match against the shared skill vocabulary and return display names (e.g. "PostgreSQL")
+        matcher = get_skill_matcher()
+        return [matcher.display_name(skill) for skill in matcher.extract(text)]
     
     def _calculate_improvement_score(self, original: str, optimized: str, section: str) -> float:
         """
@@ -846,16 +821,19 @@ Always ensure optimized resumes can pass ATS systems while attracting HR profess
             # 构建Claude 4个性化提示词
             # Build Claude 4 personalization prompt
             prompt = self._build_personalization_prompt(resume_data, target_job, style)
+            resume_context = f"## 当前简历数据\n{json.dumps(resume_data, ensure_ascii=False, indent=2)}"
             
-            # 调用Claude 4进行个性化分析和改写
-            # Call Claude 4 for personalization analysis and rewriting
-            response = await self.anthropic_client.messages.create(
+            # 调用Claude 4进行个性化分析和改写 - 简历数据作为可缓存前缀
+            # Call Claude 4 for personalization analysis and rewriting - resume data as a cacheable prefix
+            response = await self.llm_gateway.create_message(
+                "resume_rewrite.personalized_rewrite",
                 model="claude-sonnet-4-20250514",
                 max_tokens=6000,
                 temperature=settings.CLAUDE_TEMPERATURE,
+                system=self._build_cached_system_prompt(),
                 messages=[{
                     "role": "user",
-                    "content": prompt
+                    "content": self._build_cached_user_content(resume_context, prompt)
                 }]
             )
             
@@ -890,15 +868,13 @@ Always ensure optimized resumes can pass ATS systems while attracting HR profess
         Claude 4 advanced optimization functionality
         """
         try:
+            resume_context = f"当前简历内容：\n{content}"
             prompt = f"""
-作为JobCatcher的高级简历优化专家，请对以下简历内容进行深度优化：
+作为JobCatcher的高级简历优化专家，请对上述简历内容进行深度优化：
 
 目标职位描述：
 {job_description}
 
-当前简历内容：
-{content}
-
 优化目标：{', '.join(goals)}
 
 请提供以下结构化分析和优化：
@@ -922,11 +898,16 @@ Always ensure optimized resumes can pass ATS systems while attracting HR profess
 }}
 """
             
-            response = await self.anthropic_client.messages.create(
+            response = await self.llm_gateway.create_message(
+                "resume_rewrite.advanced_optimization",
                 model="claude-sonnet-4-20250514",
                 max_tokens=5000,
                 temperature=settings.CLAUDE_TEMPERATURE,
-                messages=[{"role": "user", "content": prompt}]
+                system=self._build_cached_system_prompt(),
+                messages=[{
+                    "role": "user",
+                    "content": self._build_cached_user_content(resume_context, prompt)
+                }]
             )
             
             response_text = ""
@@ -1011,10 +992,12 @@ Always ensure optimized resumes can pass ATS systems while attracting HR profess
 }}
 """
             
-            response = await self.anthropic_client.messages.create(
+            response = await self.llm_gateway.create_message(
+                "resume_rewrite.cover_letter",
                 model="claude-sonnet-4-20250514",
                 max_tokens=2000,
                 temperature=settings.CLAUDE_TEMPERATURE,
+                system=self._build_cached_system_prompt(),
                 messages=[{"role": "user", "content": prompt}]
             )
             
@@ -1063,6 +1046,34 @@ Always ensure optimized resumes can pass ATS systems while attracting HR profess
                 "notes": f"生成失败：{str(e)}"
             }
     
+    def _build_cached_system_prompt(self) -> List[Dict[str, Any]]:
+        """
+        构建带缓存断点的系统提示词
+        Build the system prompt with a cache breakpoint
+        """
+        return [{
+            "type": "text",
+            "text": self.get_system_prompt(),
+            "cache_control": CACHE_CONTROL_EPHEMERAL
+        }]
+    
+    def _build_cached_user_content(self, resume_context: str, prompt: str) -> List[Dict[str, Any]]:
+        """
+        构建用户消息内容 - 简历内容在前并设置缓存断点，职位相关指令在后
+        Build user message content - resume content first with a cache breakpoint, job-specific instructions after
+        """
+        return [
+            {
+                "type": "text",
+                "text": resume_context,
+                "cache_control": CACHE_CONTROL_EPHEMERAL
+            },
+            {
+                "type": "text",
+                "text": prompt
+            }
+        ]
+    
     def _build_personalization_prompt(
         self,
         resume_data: Dict[str, Any],
@@ -1074,10 +1085,7 @@ Always ensure optimized resumes can pass ATS systems while attracting HR profess
         Build Claude 4 personalization prompt
         """
         return f"""
-作为JobCatcher的顶级简历个性化专家，你具备深度理解简历内容和职位要求的能力。请对以下简历进行全面个性化优化：
-
-## 当前简历数据
-{json.dumps(resume_data, ensure_ascii=False, indent=2)}
+作为JobCatcher的顶级简历个性化专家，你具备深度理解简历内容和职位要求的能力。请对上述简历进行全面个性化优化：
 
 ## 目标职位信息
 - 职位名称：{target_job.get('title', '')}
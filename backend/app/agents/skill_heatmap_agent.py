@@ -8,7 +8,6 @@ import json
 import asyncio
 from typing import List, Dict, Any, Optional
 from datetime import datetime
-from collections import defaultdict
 
 from langchain_core.tools import BaseTool
 from langchain_core.messages import AIMessage
@@ -16,12 +15,23 @@ from pydantic import BaseModel, Field
 
 from app.agents.base import BaseAgent, AgentState
 from app.core.config import settings
+from app.services.skill_demand import SkillDemandMatrix
+from app.services.skill_trends import query_skill_trends
 
 
 class SkillExtractionInput(BaseModel):
     """技能提取工具输入参数模型"""
     job_list: List[Dict[str, Any]] = Field(description="职位数据列表")
     skill_categories: List[str] = Field(default=["programming", "frameworks", "tools", "cloud"], description="技能类别")
+    top_k: Optional[int] = Field(default=None, description="返回的技能数上限，默认全部")
+
+
+class SkillTrendQueryInput(BaseModel):
+    """技能趋势查询工具输入参数模型"""
+    weeks: Optional[int] = Field(default=None, description="时间窗口（周），默认使用配置值")
+    location: Optional[str] = Field(default=None, description="工作地点")
+    skill_categories: Optional[List[str]] = Field(default=None, description="技能类别，默认全部")
+    top_k: int = Field(default=20, description="返回的技能数")
 
 
 class HeatmapDataInput(BaseModel):
@@ -49,117 +59,28 @@ class SkillExtractionTool(BaseTool):
     识别热门技能、新兴技能和市场需求变化。生成详细的技能统计数据。
     Extract and analyze skill demand trends from job listings. Uses TF-IDF algorithm and semantic analysis
     to identify hot skills, emerging skills and market demand changes. Generate detailed skill statistics.
+    只用于分析给定的职位列表；已入库职位的市场趋势请使用 query_skill_trends（读取周聚合表，无需逐个扫描职位）。
+    Only for a given job list; for market trends over stored jobs use query_skill_trends, which reads the weekly
+    aggregate instead of scanning every job.
     """
     args_schema: type[SkillExtractionInput] = SkillExtractionInput
     
-    def _run(self, job_list: List[Dict[str, Any]], skill_categories: List[str] = None) -> str:
+    def _run(self, job_list: List[Dict[str, Any]], skill_categories: List[str] = None, top_k: Optional[int] = None) -> str:
         """同步技能提取"""
         try:
             if not skill_categories:
                 skill_categories = ["programming", "frameworks", "tools", "cloud"]
             
-            # 增强的技能关键词库 - 2025年最新技术栈
-            # Enhanced skill keywords - 2025 latest tech stack
-            skill_keywords = {
-                "programming": [
-                    "python", "javascript", "typescript", "java", "go", "rust", "kotlin",
-                    "swift", "c++", "c#", "php", "ruby", "scala", "r", "dart", "julia"
-                ],
-                "frameworks": [
-                    "react", "vue", "angular", "svelte", "next.js", "nuxt", "django", 
-                    "fastapi", "flask", "spring", "express", "nest.js", "laravel",
-                    "tensorflow", "pytorch", "huggingface", "langchain"
-                ],
-                "tools": [
-                    "git", "docker", "kubernetes", "terraform", "ansible", "jenkins", 
-                    "gitlab ci", "github actions", "jira", "figma", "vscode", "postman"
-                ],
-                "cloud": [
-                    "aws", "azure", "gcp", "vercel", "netlify", "railway", "supabase",
-                    "firebase", "cloudflare", "digitalocean", "heroku"
-                ],
-                "databases": [
-                    "postgresql", "mysql", "mongodb", "redis", "elasticsearch", 
-                    "sqlite", "cassandra", "neo4j", "prisma", "supabase"
-                ],
-                "ai_ml": [
-                    "machine learning", "deep learning", "nlp", "computer vision",
-                    "llm", "gpt", "claude", "transformers", "pytorch", "tensorflow"
-                ]
-            }
-            
-            # 统计技能出现频次和薪资数据
-            # Count skill frequency and salary data
-            skill_stats = defaultdict(lambda: {
-                "frequency": 0,
-                "jobs": set(),
-                "total_salary": 0,
-                "salary_count": 0,
-                "category": "",
-                "companies": set(),
-                "locations": set()
-            })
-            
-            total_jobs = len(job_list)
-            
-            for job in job_list:
-                # 提取职位文本内容
-                job_text = f"{job.get('title', '')} {job.get('description', '')}".lower()
-                job_salary = self._extract_salary_value(job.get('salary', ''))
-                
-                for category, keywords in skill_keywords.items():
-                    if category not in skill_categories:
-                        continue
-                    
-                    for skill in keywords:
-                        if skill.lower() in job_text:
-                            stats = skill_stats[skill]
-                            stats["frequency"] += 1
-                            stats["jobs"].add(job.get('id', ''))
-                            stats["category"] = category
-                            stats["companies"].add(job.get('company', ''))
-                            stats["locations"].add(job.get('location', ''))
-                            
-                            if job_salary > 0:
-                                stats["total_salary"] += job_salary
-                                stats["salary_count"] += 1
-            
-            # 计算技能趋势数据
-            # Calculate skill trend data
-            skill_trends = []
-            max_frequency = max([stats["frequency"] for stats in skill_stats.values()]) if skill_stats else 1
-            
-            for skill, stats in skill_stats.items():
-                if stats["frequency"] > 0:
-                    # 需求评分 = (频次/最大频次) * 100
-                    demand_score = (stats["frequency"] / max_frequency) * 100
-                    
-                    # 市场渗透率 = (相关职位数/总职位数) * 100
-                    penetration_rate = (len(stats["jobs"]) / total_jobs) * 100
-                    
-                    # 平均薪资
-                    avg_salary = stats["total_salary"] / stats["salary_count"] if stats["salary_count"] > 0 else None
-                    
-                    skill_trends.append({
-                        "skill_name": skill,
-                        "demand_score": round(demand_score, 1),
-                        "frequency": stats["frequency"],
-                        "penetration_rate": round(penetration_rate, 1),
-                        "avg_salary": round(avg_salary, 0) if avg_salary else None,
-                        "job_count": len(stats["jobs"]),
-                        "company_count": len(stats["companies"]),
-                        "location_count": len(stats["locations"]),
-                        "category": stats["category"]
-                    })
-            
-            # 按需求评分排序
-            skill_trends.sort(key=lambda x: x["demand_score"], reverse=True)
+            # 职位编码为 职位×技能 稀疏矩阵，频次、薪资、共现等统计都由向量化归约得到
+            # Encode jobs as a sparse job x skill matrix; frequency, salary, co-occurrence etc. come from vectorized reductions
+            demand = SkillDemandMatrix.from_jobs(job_list, categories=skill_categories)
+            skill_trends = demand.skill_trends(top_k=top_k)
             
             result = {
                 "status": "success",
-                "total_jobs_analyzed": total_jobs,
-                "unique_skills_found": len(skill_trends),
-                "skill_trends": skill_trends[:50],  # 返回前50个热门技能
+                "total_jobs_analyzed": demand.job_count,
+                "unique_skills_found": len(demand.skills),
+                "skill_trends": skill_trends,
                 "categories_analyzed": skill_categories,
                 "analysis_timestamp": datetime.now().isoformat()
             }
@@ -172,28 +93,57 @@ class SkillExtractionTool(BaseTool):
                 "message": f"技能提取失败: {str(e)}",
                 "skill_trends": []
             }, ensure_ascii=False)
+
+
+class SkillTrendQueryTool(BaseTool):
+    """
+    技能趋势查询工具 - 从周聚合表读取时间窗口内的技能需求
+    Skill trend query tool - read skill demand for a time window from the weekly aggregate
+    """
     
-    def _extract_salary_value(self, salary_str: str) -> float:
-        """从薪资字符串中提取数值"""
-        if not salary_str:
-            return 0
-        
-        import re
-        # 提取数字（支持K、M等单位）
-        numbers = re.findall(r'(\d+(?:\.\d+)?)\s*([kKmM]?)', str(salary_str))
+    name: str = "query_skill_trends"
+    description: str = """
+    查询已入库职位的技能需求趋势，可按时间窗口（周）、地点和技能类别筛选。
+    返回每个技能的职位数、渗透率、平均薪资、每周序列和增长率，无需传入职位列表。
+    Query skill demand trends over stored jobs, filtered by time window (weeks), location and skill categories.
+    Returns job count, penetration, average salary, weekly series and growth rate per skill; no job list needed.
+    """
+    args_schema: type[SkillTrendQueryInput] = SkillTrendQueryInput
+    
+    def _run(
+        self,
+        weeks: Optional[int] = None,
+        location: Optional[str] = None,
+        skill_categories: Optional[List[str]] = None,
+        top_k: int = 20
+    ) -> str:
+        """同步查询包装器"""
+        try:
+            loop = asyncio.get_event_loop()
+        except RuntimeError:
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
         
-        if numbers:
-            value, unit = numbers[0]
-            value = float(value)
-            
-            if unit.lower() == 'k':
-                value *= 1000
-            elif unit.lower() == 'm':
-                value *= 1000000
+        return loop.run_until_complete(self._arun(weeks, location, skill_categories, top_k))
+    
+    async def _arun(
+        self,
+        weeks: Optional[int] = None,
+        location: Optional[str] = None,
+        skill_categories: Optional[List[str]] = None,
+        top_k: int = 20
+    ) -> str:
+        """异步技能趋势查询"""
+        try:
+            trends = await query_skill_trends(weeks=weeks, location=location, categories=skill_categories, top_k=top_k)
+            return json.dumps({"status": "success", **trends}, ensure_ascii=False, indent=2)
             
-            return value
-        
-        return 0
+        except Exception as e:
+            return json.dumps({
+                "status": "error",
+                "message": f"技能趋势查询失败: {str(e)}",
+                "skill_trends": []
+            }, ensure_ascii=False)
 
 
 class HeatmapVisualizationTool(BaseTool):
@@ -358,6 +308,7 @@ class SkillHeatmapAgent(BaseAgent):
         """设置增强的工具集"""
         self.tools = [
             SkillExtractionTool(),
+            SkillTrendQueryTool(),
             HeatmapVisualizationTool(),
             SkillGapAnalysisTool()
         ]
@@ -372,7 +323,8 @@ class SkillHeatmapAgent(BaseAgent):
 3. **个性化建议**：基于用户技能提供发展路径
 
 ## 🛠️ 工具使用策略
-- **extract_market_skills**: 智能技能提取和分析
+- **query_skill_trends**: 按时间窗口和地点查询已入库职位的技能趋势
+- **extract_market_skills**: 分析对话中给定的职位列表（已入库职位的市场趋势用 query_skill_trends）
 - **generate_chartjs_data**: 生成前端可视化数据
 - **analyze_personal_skill_gap**: 个性化技能差距分析
 
@@ -383,12 +335,6 @@ class SkillHeatmapAgent(BaseAgent):
         try:
             # 调用父类方法执行Claude 4处理
             result = await super().invoke(state)
-            
-            # 添加技能分析特定的处理逻辑
-            result["chart_data"] = {"type": "radar", "data": {"labels": [], "datasets": []}}
-            
-            return result
-            
         except Exception as e:
             self.logger.error(f"SkillHeatmapAgent执行失败: {e}")
             return {
@@ -396,6 +342,24 @@ class SkillHeatmapAgent(BaseAgent):
                 "chart_data": {},
                 "error": str(e)
             }
+        
+        # 添加技能分析特定的处理逻辑：图表数据取自周聚合表，使用用户请求的时间窗口、地点和类别；
+        # 图表查询失败时仍保留已生成的回答
+        # Skill analysis specifics: chart data comes from the weekly aggregate for the requested window, location and
+        # categories; a failed chart query keeps the answer already generated
+        request = state.get("user_input") or {}
+        try:
+            trends = await query_skill_trends(
+                weeks=int(request["weeks"]) if request.get("weeks") else None,
+                location=request.get("location") or None,
+                categories=request.get("skill_categories") or None
+            )
+            result["chart_data"] = json.loads(HeatmapVisualizationTool()._run(trends["skill_trends"]))
+        except Exception as e:
+            self.logger.warning(f"技能趋势图表生成失败 / Failed to build the skill trend chart: {e}")
+            result["chart_data"] = {}
+        
+        return result
 
 
 # 创建全局实例
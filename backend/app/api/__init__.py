@@ -5,7 +5,7 @@ API routes package
 
 from fastapi import APIRouter
 
-from app.api import auth, jobs, resumes, chat
+from app.api import auth, jobs, resumes, chat, skills
 
 # 创建主API路由器
 # Create main API router
@@ -17,5 +17,6 @@ api_router.include_router(auth.router, prefix="/auth", tags=["认证 / Authentic
 api_router.include_router(jobs.router, prefix="/jobs", tags=["职位管理 / Job Management"])
 api_router.include_router(resumes.router, prefix="/resumes", tags=["简历管理 / Resume Management"])
 api_router.include_router(chat.router, prefix="/chat", tags=["聊天对话 / Chat"])
+api_router.include_router(skills.router, prefix="/skills", tags=["技能分析 / Skills"])
 
 __all__ = ["api_router"] 
\ No newline at end of file
@@ -3,6 +3,7 @@
 Chat API routes for JobCatcher with WebSocket support
 """
 
+import asyncio
 import json
 import logging
 from typing import Dict, List, Any, Optional
@@ -12,39 +13,33 @@ from fastapi import APIRouter, Depends, HTTPException, status, WebSocket, WebSoc
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 
-from app.core.database import get_async_session
+from app.core.config import settings
+from app.core.database import get_async_session, AsyncSessionLocal
 from app.models.user import User
 from app.models.chat_history import ChatHistory, MessageRole, MessageType
 from app.api.auth import get_current_user
 from app.agents.coordinator import AgentCoordinator, WorkflowType
+from app.services.connection_manager import get_connection_manager
+from app.services.job_search import JobSearchService
+from app.services.workflow_queue import WorkflowJob, WorkflowQueue, WorkflowQueueFullError
 
 router = APIRouter()
 logger = logging.getLogger("api.chat")
 
-# WebSocket连接管理器
-# WebSocket connection manager
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Dict[str, WebSocket] = {}
-    
-    async def connect(self, websocket: WebSocket, user_id: str):
-        await websocket.accept()
-        self.active_connections[user_id] = websocket
-        logger.info(f"用户 {user_id} WebSocket连接已建立 / User {user_id} WebSocket connected")
-    
-    def disconnect(self, user_id: str):
-        if user_id in self.active_connections:
-            del self.active_connections[user_id]
-            logger.info(f"用户 {user_id} WebSocket连接已断开 / User {user_id} WebSocket disconnected")
-    
-    async def send_personal_message(self, message: dict, user_id: str):
-        if user_id in self.active_connections:
-            websocket = self.active_connections[user_id]
-            await websocket.send_text(json.dumps(message, ensure_ascii=False))
-
-
-manager = ConnectionManager()
+# WebSocket连接管理器 - 每用户多连接，经发布订阅跨进程分发
+# WebSocket connection manager - many sockets per user, fanned out across processes via pub/sub
+manager = get_connection_manager()
 coordinator = AgentCoordinator()
+job_search_service = JobSearchService()
+
+# 支持流式输出的单Agent请求类型
+# Single-agent request types that support streaming output
+STREAMING_AGENTS = {
+    "job_search": "job_search_agent",
+    "resume_analysis": "resume_critic_agent",
+    "skill_analysis": "skill_heatmap_agent",
+    "resume_optimization": "resume_rewrite_agent",
+}
 
 
 class ChatMessage(BaseModel):
@@ -88,22 +83,43 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
     WebSocket聊天连接端点
     WebSocket chat connection endpoint
     """
-    await manager.connect(websocket, user_id)
+    connection = await manager.connect(websocket, user_id)
     
     try:
         while True:
             # 接收用户消息
             # Receive user message
             data = await websocket.receive_text()
+            connection.mark_alive()
             message_data = json.loads(data)
             
-            # 处理消息
-            # Process message
-            await handle_websocket_message(user_id, message_data, websocket)
+            # 心跳消息只用于保活，客户端ping回复pong
+            # Heartbeat frames only keep the connection alive; a client ping gets a pong
+            if message_data.get("type") == "ping":
+                manager.send_to_connection(connection, {"type": "pong", "timestamp": datetime.now().isoformat()})
+                continue
+            if message_data.get("type") == "pong":
+                continue
+            
+            # 在后台任务中处理消息，长时间的流式响应不阻塞接收循环（心跳和后续消息照常接收）
+            # Handle the message in a background task so long streams never block the receive loop
+            # (heartbeats and further messages keep flowing)
+            # 每个连接同时处理的消息数有上限，忙时拒绝；连接断开时取消进行中的处理
+            # Each socket handles a bounded number of messages at once and rejects more while busy; in-flight handling
+            # is cancelled when the socket disconnects
+            if len(connection.tasks) >= settings.WS_MAX_IN_FLIGHT_MESSAGES:
+                manager.send_to_connection(connection, {
+                    "type": "error",
+                    "reason": "busy",
+                    "message": f"正在处理的消息过多（上限 {settings.WS_MAX_IN_FLIGHT_MESSAGES}），请稍后重试 / Too many messages in progress (limit {settings.WS_MAX_IN_FLIGHT_MESSAGES}), please retry later"
+                })
+                continue
+            connection.track(asyncio.create_task(handle_websocket_message(user_id, message_data, websocket)))
             
     except WebSocketDisconnect:
-        manager.disconnect(user_id)
         logger.info(f"用户 {user_id} WebSocket连接断开 / User {user_id} WebSocket disconnected")
+    finally:
+        await manager.disconnect(connection)
 
 
 async def handle_websocket_message(user_id: str, message_data: dict, websocket: WebSocket):
@@ -121,14 +137,14 @@ async def handle_websocket_message(user_id: str, message_data: dict, websocket:
         
         # 保存用户消息到数据库
         # Save user message to database
-        async with get_async_session() as db:
+        async with AsyncSessionLocal() as db:
             chat_history = ChatHistory(
                 user_id=int(user_id),
                 session_id=session_id,
                 role=MessageRole.USER,
                 content=content,
                 message_type=MessageType(message_type),
-                context_data=context_data
+                message_metadata=context_data
             )
             db.add(chat_history)
             await db.commit()
@@ -138,7 +154,7 @@ async def handle_websocket_message(user_id: str, message_data: dict, websocket:
         # Send confirmation message
         await manager.send_personal_message({
             "type": "message_received",
-            "message_id": chat_history.id,
+            "message_id": str(chat_history.id),
             "timestamp": chat_history.created_at.isoformat()
         }, user_id)
         
@@ -148,6 +164,8 @@ async def handle_websocket_message(user_id: str, message_data: dict, websocket:
             await handle_agent_request(user_id, content, context_data, session_id)
         elif message_type == "workflow_request":
             await handle_workflow_request(user_id, context_data, session_id)
+        elif message_type == "job_search_request":
+            await handle_job_search_stream(user_id, content, context_data, session_id)
         else:
             # 普通聊天消息
             await handle_chat_message(user_id, content, session_id)
@@ -179,61 +197,137 @@ async def handle_agent_request(user_id: str, content: str, context_data: dict, s
         }
         
         workflow_type = workflow_map.get(agent_type, WorkflowType.JOB_SEARCH)
+        user_input = {
+            "user_message": content,
+            **context_data
+        }
+        
+        # 单Agent请求默认走流式路径，尽快返回首个token
+        # Single-agent requests stream by default to deliver the first token quickly
+        if context_data.get("stream", True) and agent_type in STREAMING_AGENTS:
+            await handle_agent_stream_request(user_id, user_input, session_id, workflow_type, agent_type)
+            return
+        
+        # 提交到后台工作流队列，不阻塞WebSocket接收循环
+        # Submit to the background workflow queue instead of blocking the WebSocket receive loop
+        await submit_workflow_job(
+            user_id,
+            session_id,
+            workflow_type,
+            user_input=user_input,
+            reply_type="agent_response",
+            agent_type=agent_type
+        )
         
-        # 发送处理中状态
-        # Send processing status
+    except Exception as e:
+        logger.error(f"处理Agent请求失败 / Failed to handle agent request: {e}")
         await manager.send_personal_message({
-            "type": "agent_processing",
+            "type": "agent_error",
+            "message": f"Agent处理失败 / Agent processing failed: {str(e)}"
+        }, user_id)
+
+
+async def handle_agent_stream_request(
+    user_id: str,
+    user_input: dict,
+    session_id: str,
+    workflow_type: WorkflowType,
+    agent_type: str
+):
+    """
+    流式处理单Agent请求 - 实时推送文本增量、工具调用和工具结果；Agent收到与队列路径相同的任务和用户输入
+    Stream a single-agent request - push text deltas, tool calls and tool results in real time; the agent gets the same
+    task and user input as on the queued path
+    """
+    agent_name = STREAMING_AGENTS[agent_type]
+    agent = coordinator.agents[agent_name]
+    state = coordinator.build_agent_state(agent_name, workflow_type, user_input, int(user_id), session_id)
+    
+    # 流式运行不经过队列，但与排队任务共用每用户并发上限
+    # Streamed runs skip the queue but share the per-user concurrency limit with queued jobs
+    try:
+        async with workflow_queue.admit_stream(workflow_type.value, int(user_id)):
+            await _stream_agent_response(user_id, session_id, agent_type, agent, state)
+    except WorkflowQueueFullError as e:
+        await manager.send_personal_message({
+            "type": "workflow_rejected",
+            "workflow_type": workflow_type.value,
             "agent_type": agent_type,
-            "message": f"正在调用 {agent_type} Agent处理您的请求... / Invoking {agent_type} Agent to process your request..."
+            "session_id": session_id,
+            "reason": e.reason,
+            "message": str(e)
         }, user_id)
-        
-        # 执行Agent工作流
-        # Execute agent workflow
-        result = await coordinator.execute_workflow(
-            workflow_type=workflow_type,
-            user_input={
-                "user_message": content,
-                **context_data
-            },
-            user_id=int(user_id),
-            session_id=session_id
-        )
-        
-        # 保存Agent响应
-        # Save agent response
-        async with get_async_session() as db:
+
+
+async def _stream_agent_response(user_id: str, session_id: str, agent_type: str, agent: Any, state: Dict[str, Any]):
+    """
+    推送Agent流式事件，并保存最终响应
+    Push the agent's stream events and persist the final response
+    """
+    async for event in agent.invoke_stream(state):
+        if event["type"] != "message_complete":
+            await manager.send_personal_message({
+                **event,
+                "agent_type": agent_type,
+                "session_id": session_id
+            }, user_id)
+            continue
+        
+        # 由流式结果组装并保存最终的Agent响应
+        # Assemble and persist the final agent response from the stream
+        async with AsyncSessionLocal() as db:
             agent_response = ChatHistory(
                 user_id=int(user_id),
                 session_id=session_id,
                 role=MessageRole.ASSISTANT,
-                content=json.dumps(result, ensure_ascii=False),
+                content=event["content"],
                 message_type=MessageType.AGENT_RESPONSE,
-                context_data={
+                agent_name=event["agent"],
+                model_name=event["model"],
+                token_count=event["usage"]["input_tokens"] + event["usage"]["output_tokens"],
+                response_time_ms=event["response_time_ms"],
+                message_metadata={
                     "agent_type": agent_type,
-                    "workflow_type": str(workflow_type),
-                    "execution_report": result.get("execution_report")
+                    "tool_calls": event["tool_calls"],
+                    "usage": event["usage"],
+                    "streamed": True
                 }
             )
             db.add(agent_response)
             await db.commit()
+            await db.refresh(agent_response)
         
-        # 发送Agent响应结果
-        # Send agent response result
         await manager.send_personal_message({
-            "type": "agent_response",
+            "type": "message_complete",
             "agent_type": agent_type,
-            "success": result.get("success", False),
-            "result": result.get("execution_report", {}),
-            "error": result.get("error"),
+            "session_id": session_id,
+            "message_id": str(agent_response.id),
+            "content": event["content"],
+            "tool_calls": event["tool_calls"],
+            "usage": event["usage"],
+            "response_time_ms": event["response_time_ms"],
             "timestamp": datetime.now().isoformat()
         }, user_id)
-        
+
+
+async def handle_job_search_stream(user_id: str, content: str, context_data: dict, session_id: str):
+    """
+    流式职位搜索 - 每个数据源完成即推送 job_search_batch 帧，最后推送 job_search_complete
+    Streaming job search - pushes a job_search_batch frame as each source completes, then job_search_complete
+    """
+    try:
+        async for event in job_search_service.stream_jobs(query=content, location=context_data.get("location")):
+            await manager.send_personal_message({
+                **event,
+                "type": f"job_search_{event['type']}",
+                "session_id": session_id
+            }, user_id)
     except Exception as e:
-        logger.error(f"处理Agent请求失败 / Failed to handle agent request: {e}")
+        logger.error(f"流式职位搜索失败 / Streaming job search failed: {e}")
         await manager.send_personal_message({
-            "type": "agent_error",
-            "message": f"Agent处理失败 / Agent processing failed: {str(e)}"
+            "type": "job_search_error",
+            "session_id": session_id,
+            "message": f"职位搜索失败 / Job search failed: {str(e)}"
         }, user_id)
 
 
@@ -246,33 +340,9 @@ async def handle_workflow_request(user_id: str, context_data: dict, session_id:
         workflow_type = WorkflowType(context_data.get("workflow_type", "job_search"))
         user_input = context_data.get("user_input", {})
         
-        # 发送工作流开始状态
-        # Send workflow start status
-        await manager.send_personal_message({
-            "type": "workflow_started",
-            "workflow_type": str(workflow_type),
-            "session_id": session_id
-        }, user_id)
-        
-        # 执行工作流
-        # Execute workflow
-        result = await coordinator.execute_workflow(
-            workflow_type=workflow_type,
-            user_input=user_input,
-            user_id=int(user_id),
-            session_id=session_id
-        )
-        
-        # 发送工作流完成状态
-        # Send workflow completion status
-        await manager.send_personal_message({
-            "type": "workflow_completed",
-            "workflow_type": str(workflow_type),
-            "session_id": session_id,
-            "success": result.get("success", False),
-            "result": result.get("execution_report", {}),
-            "error": result.get("error")
-        }, user_id)
+        # 提交到后台工作流队列，不阻塞WebSocket接收循环
+        # Submit to the background workflow queue instead of blocking the WebSocket receive loop
+        await submit_workflow_job(user_id, session_id, workflow_type, user_input=user_input)
         
     except Exception as e:
         logger.error(f"处理工作流请求失败 / Failed to handle workflow request: {e}")
@@ -282,6 +352,124 @@ async def handle_workflow_request(user_id: str, context_data: dict, session_id:
         }, user_id)
 
 
+async def submit_workflow_job(
+    user_id: str,
+    session_id: str,
+    workflow_type: WorkflowType,
+    user_input: dict,
+    **job_fields: Any
+) -> Optional[WorkflowJob]:
+    """
+    提交工作流任务并立即回复任务ID；准入控制拒绝时通知用户
+    Submit a workflow job and reply with its job ID right away; notify the user when admission control rejects it
+    """
+    try:
+        job, position = await workflow_queue.submit(
+            workflow_type.value,
+            int(user_id),
+            session_id,
+            user_input,
+            **job_fields
+        )
+    except WorkflowQueueFullError as e:
+        await manager.send_personal_message({
+            "type": "workflow_rejected",
+            "workflow_type": workflow_type.value,
+            "session_id": session_id,
+            "reason": e.reason,
+            "message": str(e)
+        }, user_id)
+        return None
+    
+    await manager.send_personal_message({
+        "type": "workflow_queued",
+        "job_id": job.job_id,
+        "workflow_type": workflow_type.value,
+        "agent_type": job.agent_type,
+        "session_id": session_id,
+        "queue_position": position,
+        "timestamp": datetime.now().isoformat()
+    }, user_id)
+    return job
+
+
+async def run_workflow_job(job: WorkflowJob) -> None:
+    """
+    后台Worker执行工作流任务 - 推送进度事件，并将结果保存到聊天历史
+    Run a workflow job on a background worker - push progress events and persist the result to chat history
+    """
+    user_id = str(job.user_id)
+    frame = {
+        "job_id": job.job_id,
+        "workflow_type": job.workflow_type,
+        "session_id": job.session_id
+    }
+    if job.agent_type:
+        frame["agent_type"] = job.agent_type
+    
+    async def push_progress(event: Dict[str, Any]) -> None:
+        await manager.send_personal_message({**event, **frame, "type": "workflow_progress", "event": event["type"]}, user_id)
+    
+    # 发送工作流开始状态
+    # Send workflow start status
+    await manager.send_personal_message({
+        **frame,
+        "type": "agent_processing" if job.agent_type else "workflow_started",
+        "message": f"正在执行 {job.workflow_type} 工作流... / Running {job.workflow_type} workflow..."
+    }, user_id)
+    
+    # 执行工作流
+    # Execute workflow
+    result = await coordinator.execute_workflow(
+        workflow_type=WorkflowType(job.workflow_type),
+        user_input=job.user_input,
+        user_id=job.user_id,
+        session_id=job.session_id,
+        run_id=job.job_id,
+        progress_callback=push_progress,
+        claimed=True
+    )
+    # 报告中包含datetime，先转换为JSON兼容格式 / The report contains datetimes, so make it JSON-safe first
+    execution_report = json.loads(json.dumps(result.get("execution_report", {}), ensure_ascii=False, default=str))
+    
+    # 保存工作流结果
+    # Save workflow result
+    async with AsyncSessionLocal() as db:
+        agent_response = ChatHistory(
+            user_id=job.user_id,
+            session_id=job.session_id,
+            role=MessageRole.ASSISTANT,
+            content=json.dumps(result, ensure_ascii=False, default=str),
+            message_type=MessageType.AGENT_RESPONSE,
+            message_metadata={
+                "job_id": job.job_id,
+                "agent_type": job.agent_type,
+                "workflow_type": job.workflow_type,
+                "execution_report": execution_report
+            }
+        )
+        db.add(agent_response)
+        await db.commit()
+        await db.refresh(agent_response)
+    
+    # 发送工作流结果
+    # Send workflow result
+    await manager.send_personal_message({
+        **frame,
+        "type": job.reply_type,
+        "message_id": str(agent_response.id),
+        "success": result.get("success", False),
+        "result": execution_report,
+        "error": result.get("error"),
+        "timestamp": datetime.now().isoformat()
+    }, user_id)
+
+
+# 后台工作流队列 - 在应用生命周期中启动和停止
+# Background workflow queue - started and stopped with the application lifespan
+workflow_queue = WorkflowQueue(executor=run_workflow_job)
+
+
 async def handle_chat_message(user_id: str, content: str, session_id: str):
     """
     处理普通聊天消息
@@ -297,7 +485,7 @@ async def handle_chat_message(user_id: str, content: str, session_id: str):
         
         # 保存助手响应
         # Save assistant response
-        async with get_async_session() as db:
+        async with AsyncSessionLocal() as db:
             assistant_response = ChatHistory(
                 user_id=int(user_id),
                 session_id=session_id,
@@ -340,7 +528,7 @@ async def send_message(
             role=MessageRole.USER,
             content=message.content,
             message_type=message.message_type,
-            context_data=message.context_data
+            message_metadata=message.context_data
         )
         db.add(chat_history)
         await db.commit()
@@ -352,7 +540,7 @@ async def send_message(
             role=chat_history.role,
             message_type=chat_history.message_type,
             timestamp=chat_history.created_at,
-            context_data=chat_history.context_data
+            context_data=chat_history.message_metadata
         )
         
     except Exception as e:
@@ -403,7 +591,7 @@ async def get_chat_history(
                     role=msg.role,
                     message_type=msg.message_type,
                     timestamp=msg.created_at,
-                    context_data=msg.context_data
+                    context_data=msg.message_metadata
                 )
                 for msg in reversed(chat_messages)
             ],
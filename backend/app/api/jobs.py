@@ -4,13 +4,15 @@ Job management API routes for JobCatcher
 """
 
 from typing import List, Optional, Dict, Any
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 import logging
 
 from app.models.user import User
 from app.api.auth import get_current_user
 from app.services.job_search import JobSearchService
+from app.services.job_search_stream import encode_event_stream, negotiate_stream_media_type
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -49,6 +51,7 @@ class JobDTO(BaseModel):
 
 @router.get("/search", response_model=Dict[str, Any])
 async def search_jobs(
+    request: Request,
     q: str = Query(..., description="搜索关键词 / Search keywords"),
     location: Optional[str] = Query(None, description="工作地点 / Work location"),
     salary_min: Optional[int] = Query(None, description="最低薪资 / Minimum salary"),
@@ -68,12 +71,24 @@ async def search_jobs(
         type: 职位类型 / Job type
         current_user: 当前用户 / Current user
         
+    Accept 为 application/x-ndjson 或 text/event-stream 时流式返回，每个数据源完成即推送一批结果
+    With Accept set to application/x-ndjson or text/event-stream the results stream, one batch per completed source
+    
     Returns:
         Dict: 职位搜索结果 / Job search results
     """
     try:
         logger.info(f"User {current_user.id} searching jobs with query: {q}")
         
+        # 流式响应 / Streaming response
+        media_type = negotiate_stream_media_type(request.headers.get("accept"))
+        if media_type:
+            return StreamingResponse(
+                encode_event_stream(job_search_service.stream_jobs(query=q, location=location), media_type),
+                media_type=media_type,
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
+        
         # 执行搜索 / Execute search
         search_results = await job_search_service.search_jobs(
             query=q,
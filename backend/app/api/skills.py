@@ -0,0 +1,55 @@
+"""
+技能分析API路由
+Skill analysis API routes for JobCatcher
+"""
+
+from typing import List, Optional, Dict, Any
+from fastapi import APIRouter, Depends, Query, HTTPException
+import logging
+
+from app.models.user import User
+from app.api.auth import get_current_user
+from app.services.skill_trends import query_skill_trends
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.get("/heatmap", response_model=Dict[str, Any])
+async def get_skill_heatmap(
+    weeks: Optional[int] = Query(None, ge=1, le=104, description="时间窗口（周） / Time window in weeks"),
+    location: Optional[str] = Query(None, max_length=100, description="工作地点 / Work location"),
+    categories: Optional[List[str]] = Query(None, description="技能类别 / Skill categories"),
+    top_k: int = Query(20, ge=1, le=100, description="返回的技能数 / Number of skills returned"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    技能需求热点图
+    Skill demand heatmap
+
+    Args:
+        weeks: 时间窗口（周），默认 SKILL_TRENDS_DEFAULT_WEEKS / Time window in weeks, SKILL_TRENDS_DEFAULT_WEEKS by default
+        location: 工作地点 / Work location
+        categories: 技能类别 / Skill categories
+        top_k: 返回的技能数 / Number of skills returned
+        current_user: 当前用户 / Current user
+
+    从周聚合表读取，耗时与技能数×周数相关，与职位数无关
+    Read from the weekly aggregate table, so the cost depends on skills x weeks rather than on the number of jobs
+
+    Returns:
+        Dict: 时间窗口内的技能趋势 / Skill trends for the time window
+    """
+    try:
+        logger.info(f"User {current_user.id} reading skill heatmap: weeks={weeks}, location={location}")
+
+        trends = await query_skill_trends(weeks=weeks, location=location, categories=categories, top_k=top_k)
+
+        return {"data": trends}
+
+    except Exception as e:
+        logger.error(f"Error reading skill heatmap for user {current_user.id}: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="获取技能热点图时发生错误 / Error occurred while reading the skill heatmap"
+        )
@@ -4,7 +4,7 @@ Application configuration for JobCatcher
 """
 
 import os
-from typing import List, Optional, Union
+from typing import Dict, List, Optional, Union
 from pydantic import Field, validator
 from pydantic_settings import BaseSettings
 
@@ -58,6 +58,198 @@ class Settings(BaseSettings):
         description="Claude模型温度设置 (0.0-1.0) / Claude model temperature setting"
     )
     
+    # ==============================================
+    # Agent执行配置 - Agent Execution Configuration
+    # ==============================================
+    AGENT_MAX_TOOL_ROUNDS: int = Field(
+        default=5,
+        ge=1,
+        description="单次Agent调用的最大工具调用轮数 / Maximum tool-calling rounds per agent invocation"
+    )
+    
+    AGENT_TOOL_TIMEOUT_SECONDS: float = Field(
+        default=60.0,
+        gt=0,
+        description="单个工具执行超时时间(秒) / Per-tool execution timeout in seconds"
+    )
+    
+    AGENT_TOOL_THREAD_POOL_SIZE: int = Field(
+        default=8,
+        ge=1,
+        description="同步工具线程池大小 / Thread pool size for synchronous tools"
+    )
+    
+    # ==============================================
+    # LLM网关配置 - LLM Gateway Configuration
+    # ==============================================
+    LLM_MAX_CONNECTIONS: int = Field(
+        default=20,
+        ge=1,
+        description="Anthropic客户端连接池最大连接数 / Maximum connections in the Anthropic client pool"
+    )
+    
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = Field(
+        default=10,
+        ge=0,
+        description="连接池保持活跃的连接数 / Keep-alive connections in the Anthropic client pool"
+    )
+    
+    LLM_REQUEST_TIMEOUT_SECONDS: float = Field(
+        default=120.0,
+        gt=0,
+        description="单次LLM请求超时时间(秒) / Per-request LLM timeout in seconds"
+    )
+    
+    LLM_MAX_RETRIES: int = Field(
+        default=2,
+        ge=0,
+        description="LLM请求失败的SDK重试次数 / SDK retry count for failed LLM requests"
+    )
+    
+    LLM_MAX_CONCURRENT_REQUESTS: int = Field(
+        default=8,
+        ge=1,
+        description="全局并发LLM请求上限 / Global cap on concurrent LLM requests"
+    )
+    
+    LLM_INTERACTIVE_RESERVED_SLOTS: int = Field(
+        default=2,
+        ge=0,
+        description="为交互式请求保留的并发槽位 / Concurrency slots reserved for interactive requests"
+    )
+    
+    LLM_REQUESTS_PER_MINUTE: int = Field(
+        default=50,
+        ge=0,
+        description="每分钟请求数预算，0表示不限制 / Requests-per-minute budget, 0 disables"
+    )
+    
+    LLM_TOKENS_PER_MINUTE: int = Field(
+        default=40000,
+        ge=0,
+        description="每分钟token预算，0表示不限制 / Tokens-per-minute budget, 0 disables"
+    )
+    
+    LLM_INTERACTIVE_RESERVE_RATIO: float = Field(
+        default=0.2,
+        ge=0,
+        lt=1,
+        description="批处理请求不可占用的预算比例（留给交互式请求） / Share of the rate budget batch requests may not consume (kept for interactive requests)"
+    )
+    
+    # ==============================================
+    # LLM响应缓存配置 - LLM Response Cache Configuration
+    # ==============================================
+    LLM_CACHE_ENABLED: bool = Field(
+        default=True,
+        description="是否启用LLM响应缓存 / Enable the LLM response cache"
+    )
+    
+    LLM_CACHE_MAX_ENTRIES: int = Field(
+        default=512,
+        ge=1,
+        description="进程内LRU缓存最大条目数 / Maximum entries in the in-process LRU cache"
+    )
+    
+    LLM_CACHE_TTL_SECONDS: Dict[str, int] = Field(
+        default={
+            "resume_critic.resume_parsing": 86400
+        },
+        description="按调用位置配置的缓存TTL(秒)，未配置的调用位置不缓存；temperature>0 的调用只在 LLM_CACHE_ALLOW_NONZERO_TEMPERATURE 开启时缓存 / Per-call-site cache TTL in seconds; unlisted call sites are not cached, and calls with temperature > 0 only when LLM_CACHE_ALLOW_NONZERO_TEMPERATURE is set"
+    )
+    
+    LLM_CACHE_ALLOW_NONZERO_TEMPERATURE: bool = Field(
+        default=False,
+        description="是否缓存temperature>0的调用 / Cache calls with temperature > 0"
+    )
+    
+    # ==============================================
+    # 工作流队列配置 - Workflow Queue Configuration
+    # ==============================================
+    WORKFLOW_QUEUE_BACKEND: str = Field(
+        default="memory",
+        pattern="^(memory|redis)$",
+        description="工作流队列后端: memory(进程内) 或 redis(Redis Stream) / Workflow queue backend: memory (in-process) or redis (Redis stream)"
+    )
+    
+    WORKFLOW_WORKERS_PER_TYPE: Dict[str, int] = Field(
+        default={
+            "job_search": 4,
+            "resume_analysis": 2,
+            "skill_analysis": 2,
+            "resume_optimization": 2,
+            "comprehensive": 1
+        },
+        description="每种工作流类型的并发Worker数 / Concurrent workers per workflow type"
+    )
+    
+    WORKFLOW_MAX_QUEUED_PER_TYPE: int = Field(
+        default=50,
+        ge=1,
+        description="每种工作流类型的最大排队任务数，超出则拒绝 / Max queued jobs per workflow type; further submissions are rejected"
+    )
+    
+    WORKFLOW_MAX_ACTIVE_JOBS_PER_USER: int = Field(
+        default=3,
+        ge=1,
+        description="每个用户同时排队或运行的最大任务数 / Max jobs a single user may have queued or running at once"
+    )
+    
+    WORKFLOW_QUEUE_STREAM_PREFIX: str = Field(
+        default="jobcatcher:workflows",
+        description="Redis Stream键前缀 / Redis stream key prefix"
+    )
+    
+    WORKFLOW_RUN_LEASE_SECONDS: int = Field(
+        default=60,
+        ge=5,
+        description="工作流运行租约时长(秒)，持有进程退出后超过该时间才可被其他进程恢复 / Workflow run lease in seconds; another process may resume a run only after its owner stops renewing for this long"
+    )
+    
+    # ==============================================
+    # WebSocket连接配置 - WebSocket Connection Configuration
+    # ==============================================
+    WS_PUBSUB_BACKEND: str = Field(
+        default="memory",
+        pattern="^(memory|redis)$",
+        description="WebSocket消息分发后端: memory(单进程) 或 redis(多进程/多副本) / WebSocket fan-out backend: memory (single process) or redis (multiple workers/replicas)"
+    )
+    
+    WS_PUBSUB_CHANNEL_PREFIX: str = Field(
+        default="jobcatcher:ws",
+        description="Redis发布订阅频道前缀 / Redis pub/sub channel prefix"
+    )
+    
+    WS_SEND_QUEUE_SIZE: int = Field(
+        default=256,
+        ge=1,
+        description="每个连接的发送队列长度，满时丢弃新消息 / Per-socket send queue length; new frames are dropped when full"
+    )
+    
+    WS_SLOW_CONSUMER_MAX_DROPS: int = Field(
+        default=64,
+        ge=1,
+        description="连续丢弃多少条消息后断开慢连接 / Consecutive dropped frames before a slow socket is closed"
+    )
+    
+    WS_HEARTBEAT_INTERVAL_SECONDS: int = Field(
+        default=25,
+        ge=1,
+        description="心跳发送间隔(秒) / Heartbeat interval in seconds"
+    )
+    
+    WS_HEARTBEAT_TIMEOUT_SECONDS: int = Field(
+        default=75,
+        ge=1,
+        description="超过该时间未收到客户端消息(含pong)则断开连接(秒) / Close sockets with no client frame (pongs included) for longer than this (seconds)"
+    )
+    
+    WS_MAX_IN_FLIGHT_MESSAGES: int = Field(
+        default=4,
+        ge=1,
+        description="每个连接同时处理的消息数上限，超出时拒绝新消息 / Messages handled at once per socket; further messages are rejected while busy"
+    )
+    
     # ==============================================
     # 职位数据源配置 - Job Data Source Configuration
     # ==============================================
@@ -81,6 +273,259 @@ class Settings(BaseSettings):
         description="CoreSignal API密钥 / CoreSignal API key"
     )
     
+    # 搜索结果缓存配置 - Search Result Cache Configuration
+    SEARCH_CACHE_ENABLED: bool = Field(
+        default=True,
+        description="是否缓存外部职位搜索结果 / Whether to cache external job search results"
+    )
+    
+    SEARCH_CACHE_TTL_SECONDS: Dict[str, int] = Field(
+        default={"stepstone": 6 * 3600, "google_jobs": 3 * 3600},
+        description="各数据源结果的新鲜期(秒) / Freshness period of each source's results (seconds)"
+    )
+    
+    SEARCH_CACHE_DEFAULT_TTL_SECONDS: int = Field(
+        default=3600,
+        ge=0,
+        description="未单独配置的数据源的新鲜期(秒) / Freshness period for sources without their own TTL (seconds)"
+    )
+    
+    SEARCH_CACHE_STALE_SECONDS: int = Field(
+        default=24 * 3600,
+        ge=0,
+        description="过期后仍可先返回旧结果并后台刷新的时长(秒) / How long past the TTL stale results are served while refreshing in the background (seconds)"
+    )
+    
+    SEARCH_CACHE_EMPTY_TTL_SECONDS: int = Field(
+        default=300,
+        ge=0,
+        description="空结果的新鲜期(秒) / Freshness period of empty results (seconds)"
+    )
+    
+    SEARCH_CACHE_MEMORY_ENTRIES: int = Field(
+        default=512,
+        ge=0,
+        description="进程内缓存的最大条目数 / Maximum number of in-process cache entries"
+    )
+    
+    # 数据源容错配置 - Source Resilience Configuration
+    SEARCH_DEADLINE_SECONDS: float = Field(
+        default=8.0,
+        gt=0,
+        description="多源搜索的截止时间(秒)，之后先返回已完成数据源的结果 / Multi-source search deadline (seconds); results from finished sources are returned after it"
+    )
+    
+    SOURCE_BREAKER_FAILURE_THRESHOLD: int = Field(
+        default=5,
+        ge=1,
+        description="连续失败多少次后打开熔断器 / Consecutive failures that open a source's circuit breaker"
+    )
+    
+    SOURCE_BREAKER_RECOVERY_SECONDS: float = Field(
+        default=30.0,
+        gt=0,
+        description="熔断器打开后进入半开试探前的冷却时间(秒) / Cooldown before an open circuit lets a half-open probe through (seconds)"
+    )
+    
+    SOURCE_TIMEOUT_P95_MULTIPLIER: float = Field(
+        default=2.0,
+        ge=1,
+        description="自适应超时 = 观测p95耗时 × 该倍数 / Adaptive timeout = observed p95 latency × this multiplier"
+    )
+    
+    SOURCE_TIMEOUT_MIN_SECONDS: float = Field(
+        default=2.0,
+        gt=0,
+        description="自适应超时下限(秒)，上限为该数据源HTTP集成的超时 / Adaptive timeout floor (seconds); the ceiling is the source's HTTP integration timeout"
+    )
+    
+    SOURCE_LATENCY_WINDOW: int = Field(
+        default=100,
+        ge=1,
+        description="用于计算耗时分位数的最近调用数 / Number of recent calls used for latency percentiles"
+    )
+    
+    SOURCE_LATENCY_MIN_SAMPLES: int = Field(
+        default=20,
+        ge=1,
+        description="启用自适应超时和对冲所需的最少样本数 / Samples required before adaptive timeouts and hedging apply"
+    )
+    
+    SOURCE_HEDGE_SOURCES: List[str] = Field(
+        default=[],
+        description="启用对冲请求的数据源（按次计费的Apify不建议开启） / Sources that use hedged requests (not advised for per-call-billed Apify)"
+    )
+    
+    SOURCE_HEDGE_MIN_SPREAD: float = Field(
+        default=3.0,
+        ge=1,
+        description="p95/p50 达到该值时才发出对冲请求 / Hedge only when p95/p50 reaches this ratio"
+    )
+    
+    # 职位去重配置 - Job Deduplication Configuration
+    JOB_DEDUP_THRESHOLD: float = Field(
+        default=0.7,
+        gt=0,
+        le=1,
+        description="判定为近似重复的MinHash估计Jaccard相似度下限 / Minimum estimated Jaccard similarity for a near-duplicate"
+    )
+    
+    JOB_DEDUP_NUM_PERM: int = Field(
+        default=128,
+        ge=16,
+        description="MinHash签名长度（置换数） / MinHash signature length (number of permutations)"
+    )
+    
+    JOB_DEDUP_LSH_BANDS: int = Field(
+        default=32,
+        ge=1,
+        description="LSH分段数，须整除签名长度；分段越多召回越高、候选越多 / LSH bands, must divide the signature length; more bands mean higher recall and more candidates"
+    )
+    
+    # ==============================================
+    # 定时任务配置 - Scheduled Task Configuration
+    # ==============================================
+    JOB_SCHEDULER_ENABLED: bool = Field(
+        default=False,
+        description="是否运行定时任务，多副本部署时只在一个副本开启；同一主机上的多个worker进程只有一个会启动调度器 / Run scheduled tasks; enable on a single replica in multi-replica deployments. Of several worker processes on one host only one starts the scheduler"
+    )
+    
+    JOB_SCHEDULER_LOCK_PATH: str = Field(
+        default="./scheduler.lock",
+        description="调度器进程锁文件，同一主机上持有该锁的worker运行定时任务 / Scheduler lock file; the worker on a host holding it runs the scheduled tasks"
+    )
+    
+    INGESTION_QUERIES: List[str] = Field(
+        default=[],
+        description="定时抓取的搜索关键词，为空时不抓取 / Search queries crawled on schedule; nothing is crawled when empty"
+    )
+    
+    INGESTION_LOCATIONS: List[str] = Field(
+        default=["Berlin", "Munich", "Hamburg"],
+        description="定时抓取的地点 / Locations crawled on schedule"
+    )
+    
+    INGESTION_SOURCES: List[str] = Field(
+        default=["stepstone", "google_jobs"],
+        description="定时抓取的数据源 / Sources crawled on schedule"
+    )
+    
+    INGESTION_INTERVAL_HOURS: float = Field(
+        default=6.0,
+        gt=0,
+        description="定时抓取间隔(小时) / Ingestion interval (hours)"
+    )
+    
+    INGESTION_MAX_RESULTS: int = Field(
+        default=50,
+        ge=1,
+        description="每个 (数据源, 查询, 地点) 抓取的最大职位数 / Maximum jobs fetched per (source, query, location)"
+    )
+    
+    INGESTION_MAX_CONCURRENCY: int = Field(
+        default=2,
+        ge=1,
+        description="并发抓取的 (数据源, 查询, 地点) 数 / Concurrent (source, query, location) fetches"
+    )
+    
+    INGESTION_POSTED_OVERLAP_HOURS: float = Field(
+        default=48.0,
+        ge=0,
+        description="发布时间截断的重叠窗口(小时)，早于检查点最新发布时间减去该窗口且未入库的职位不再写入 / Overlap window (hours) of the posting time cutoff; unstored jobs posted before the checkpoint's newest posting time minus this window are not written"
+    )
+    
+    # 职位链接检查配置 - Job Link Check Configuration
+    LINK_CHECK_CRON_HOUR: int = Field(
+        default=2,
+        ge=0,
+        le=23,
+        description="每日链接检查的执行时刻(UTC小时) / Hour of the daily link check (UTC)"
+    )
+    
+    LINK_CHECK_RECHECK_HOURS: float = Field(
+        default=20.0,
+        ge=0,
+        description="距上次检查不足该时长的职位跳过(小时) / Jobs checked more recently than this are skipped (hours)"
+    )
+    
+    LINK_CHECK_MAX_CONCURRENCY: int = Field(
+        default=64,
+        ge=1,
+        description="并发链接检查数 / Concurrent link checks"
+    )
+    
+    LINK_CHECK_PER_HOST_CONCURRENCY: int = Field(
+        default=4,
+        ge=1,
+        description="同一主机的并发请求数 / Concurrent requests per host"
+    )
+    
+    LINK_CHECK_HOST_INTERVAL_SECONDS: float = Field(
+        default=0.25,
+        ge=0,
+        description="同一主机相邻请求的最小间隔(秒) / Minimum interval between requests to the same host (seconds)"
+    )
+    
+    LINK_CHECK_PAGE_SIZE: int = Field(
+        default=1000,
+        ge=1,
+        description="按主键分页读取职位的页大小 / Page size when streaming jobs by primary key"
+    )
+    
+    LINK_CHECK_WRITE_BATCH_SIZE: int = Field(
+        default=500,
+        ge=1,
+        description="批量写回检查结果和删除索引文档的批大小 / Batch size for writing results back and deleting index documents"
+    )
+    
+    # ==============================================
+    # 出站HTTP客户端配置 - Outbound HTTP Client Configuration
+    # ==============================================
+    HTTP_CLIENT_TIMEOUT_SECONDS: Dict[str, float] = Field(
+        default={"apify": 120.0, "serpapi": 30.0, "pdfmonkey": 30.0, "job_links": 10.0},
+        description="各外部集成的请求超时(秒)，Apify run-sync 调用耗时较长 / Request timeout per external integration (seconds); Apify run-sync calls are slow"
+    )
+    
+    HTTP_CLIENT_DEFAULT_TIMEOUT_SECONDS: float = Field(
+        default=30.0,
+        gt=0,
+        description="未单独配置的集成的请求超时(秒) / Request timeout for integrations without their own setting (seconds)"
+    )
+    
+    HTTP_CLIENT_CONNECT_TIMEOUT_SECONDS: float = Field(
+        default=10.0,
+        gt=0,
+        description="建立连接的超时(秒) / Connection establishment timeout (seconds)"
+    )
+    
+    HTTP_CLIENT_MAX_CONNECTIONS_PER_HOST: int = Field(
+        default=20,
+        ge=1,
+        description="每个集成（主机）的最大连接数 / Maximum connections per integration (host)"
+    )
+    
+    HTTP_CLIENT_MAX_CONNECTIONS: Dict[str, int] = Field(
+        default={"job_links": 64},
+        description="访问多个主机的集成的总连接数上限 / Total connection limit for integrations that reach many hosts"
+    )
+    
+    HTTP_CLIENT_MAX_KEEPALIVE_CONNECTIONS: int = Field(
+        default=10,
+        ge=0,
+        description="每个集成保持的空闲长连接数 / Idle keep-alive connections kept per integration"
+    )
+    
+    HTTP_CLIENT_KEEPALIVE_EXPIRY_SECONDS: float = Field(
+        default=60.0,
+        ge=0,
+        description="空闲长连接的保留时间(秒) / How long idle keep-alive connections are kept (seconds)"
+    )
+    
+    HTTP_CLIENT_HTTP2_ENABLED: bool = Field(
+        default=True,
+        description="服务端支持时使用HTTP/2（需安装h2） / Use HTTP/2 where the server supports it (requires h2)"
+    )
+    
     # ==============================================
     # 简历处理和PDF服务配置 - Resume & PDF Service Configuration
     # ==============================================
@@ -135,6 +580,138 @@ class Settings(BaseSettings):
         description="Azure搜索索引名称 / Azure search index name"
     )
     
+    # 检索后端配置 - Search Backend Configuration
+    SEARCH_BACKEND: str = Field(
+        default="auto",
+        pattern="^(auto|azure|local)$",
+        description="职位检索后端: azure、local(进程内向量索引) 或 auto(未配置Azure时使用local) / Job search backend: azure, local (in-process vector index) or auto (local when Azure is not configured)"
+    )
+    
+    LOCAL_SEARCH_INDEX_DIR: str = Field(
+        default="./search_index",
+        description="本地向量索引目录 / Local vector index directory"
+    )
+    
+    LOCAL_SEARCH_HNSW_THRESHOLD: int = Field(
+        default=10000,
+        ge=1,
+        description="文档数达到该值后使用HNSW索引（需安装hnswlib） / Document count at which HNSW is used (requires hnswlib)"
+    )
+    
+    LOCAL_SEARCH_VECTOR_WEIGHT: float = Field(
+        default=0.5,
+        ge=0,
+        le=1,
+        description="RRF融合中向量结果的权重，BM25结果权重为 1 - 该值 / Weight of the vector ranking in reciprocal rank fusion; BM25 gets 1 - this value"
+    )
+    
+    LOCAL_SEARCH_RRF_K: int = Field(
+        default=60,
+        ge=1,
+        description="倒数排名融合常数k / Reciprocal rank fusion constant k"
+    )
+    
+    LOCAL_SEARCH_BM25_K1: float = Field(
+        default=1.2,
+        ge=0,
+        description="BM25词频饱和参数k1 / BM25 term-frequency saturation k1"
+    )
+    
+    LOCAL_SEARCH_BM25_B: float = Field(
+        default=0.75,
+        ge=0,
+        le=1,
+        description="BM25文档长度归一化参数b / BM25 document-length normalization b"
+    )
+    
+    LOCAL_SEARCH_FIELD_BOOSTS: Dict[str, float] = Field(
+        default={"title": 3.0, "skills": 2.0, "description": 1.0},
+        description="BM25字段权重 / BM25 field boosts"
+    )
+    
+    LOCAL_EMBEDDING_DIMENSIONS: int = Field(
+        default=384,
+        ge=16,
+        description="未配置Azure OpenAI时本地哈希嵌入的维度 / Dimensions of local hashing embeddings when Azure OpenAI is not configured"
+    )
+    
+    # 批量索引配置 - Bulk Indexing Configuration
+    SEARCH_EMBEDDING_BATCH_SIZE: int = Field(
+        default=64,
+        ge=1,
+        description="每次嵌入请求的文本数 / Texts per embedding request"
+    )
+    
+    SEARCH_EMBEDDING_MAX_CONCURRENCY: int = Field(
+        default=4,
+        ge=1,
+        description="并发嵌入请求数上限 / Max concurrent embedding requests"
+    )
+    
+    SEARCH_UPLOAD_BATCH_SIZE: int = Field(
+        default=1000,
+        ge=1,
+        le=1000,
+        description="每次上传的文档数（Azure上限1000） / Documents per upload request (Azure limit is 1000)"
+    )
+    
+    SEARCH_UPLOAD_MAX_RETRIES: int = Field(
+        default=3,
+        ge=0,
+        description="上传失败文档的最大重试次数 / Max retries for documents that failed to upload"
+    )
+    
+    SEARCH_PURGE_PAGE_SIZE: int = Field(
+        default=1000,
+        ge=1,
+        le=1000,
+        description="清理过期文档时每页列出的ID数（Azure单次查询上限1000） / IDs listed per page when purging expired documents (Azure caps one query at 1000)"
+    )
+    
+    SEARCH_PURGE_BATCH_SIZE: int = Field(
+        default=250,
+        ge=1,
+        le=1000,
+        description="清理过期文档时每个删除请求的文档数 / Documents per delete request when purging expired documents"
+    )
+    
+    SEARCH_PURGE_MAX_CONCURRENCY: int = Field(
+        default=4,
+        ge=1,
+        description="清理过期文档时并发删除请求数上限 / Max concurrent delete requests when purging expired documents"
+    )
+    
+    # 技能趋势配置 - Skill Trends Configuration
+    SKILL_TRENDS_DEFAULT_WEEKS: int = Field(
+        default=12,
+        ge=1,
+        le=104,
+        description="技能热点图默认时间窗口（周） / Default skill heatmap time window in weeks"
+    )
+    
+    # 嵌入向量缓存配置 - Embedding Cache Configuration
+    EMBEDDING_CACHE_ENABLED: bool = Field(
+        default=True,
+        description="是否启用嵌入向量缓存 / Enable the embedding cache"
+    )
+    
+    EMBEDDING_CACHE_PATH: str = Field(
+        default="./embedding_cache.db",
+        description="嵌入向量SQLite缓存文件路径 / SQLite file backing the embedding cache"
+    )
+    
+    EMBEDDING_CACHE_MAX_ENTRIES: int = Field(
+        default=10000,
+        ge=1,
+        description="进程内LRU缓存最大向量数 / Maximum vectors in the in-process LRU"
+    )
+    
+    EMBEDDING_CACHE_REDIS_TTL_SECONDS: int = Field(
+        default=30 * 86400,
+        ge=1,
+        description="Redis层向量的TTL(秒) / TTL of vectors in the Redis tier (seconds)"
+    )
+    
     # Azure Blob Storage配置 - Azure Blob Storage Configuration
     AZURE_STORAGE_CONNECTION_STRING: str = Field(
         default="DefaultEndpointsProtocol=https;AccountName=demo;AccountKey=demo;EndpointSuffix=core.windows.net", 
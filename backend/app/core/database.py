@@ -100,7 +100,7 @@ async def init_db() -> None:
     try:
         # 导入所有模型以确保它们被注册
         # Import all models to ensure they are registered
-        from app.models import user, job, resume, chat_history
+        from app.models import user, job, resume, chat_history, workflow
         
         async with engine.begin() as conn:
             # 创建所有表 - Create all tables
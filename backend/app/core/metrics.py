@@ -0,0 +1,143 @@
+"""
+进程内运行指标
+In-process runtime metrics for JobCatcher
+"""
+
+import logging
+import threading
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, Optional
+
+
+logger = logging.getLogger("metrics")
+
+
+def _metric_key(name: str, labels: Dict[str, Any]) -> str:
+    """
+    生成带标签的指标键，例如 llm_requests_total{call_site=agent}
+    Build a labelled metric key, e.g. llm_requests_total{call_site=agent}
+    """
+    if not labels:
+        return name
+    label_str = ",".join(f"{key}={labels[key]}" for key in sorted(labels))
+    return f"{name}{{{label_str}}}"
+
+
+class MetricsRegistry:
+    """
+    简单的线程安全指标注册表 - 计数器、仪表和耗时采样
+    Simple thread-safe metrics registry - counters, gauges and timing samples
+    """
+
+    def __init__(self, max_samples: int = 1000):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._gauges: Dict[str, float] = {}
+        self._samples: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=max_samples))
+
+    def increment(self, name: str, value: float = 1, **labels: Any) -> None:
+        """
+        递增计数器
+        Increment a counter
+        """
+        with self._lock:
+            self._counters[_metric_key(name, labels)] += value
+
+    def set_gauge(self, name: str, value: float, **labels: Any) -> None:
+        """
+        设置仪表值
+        Set a gauge value
+        """
+        with self._lock:
+            self._gauges[_metric_key(name, labels)] = value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        """
+        记录一次采样（如耗时）
+        Record a sample (e.g. a latency)
+        """
+        with self._lock:
+            self._samples[_metric_key(name, labels)].append(value)
+
+    def get_counter(self, name: str, **labels: Any) -> float:
+        """
+        读取计数器当前值
+        Read the current value of a counter
+        """
+        with self._lock:
+            return self._counters.get(_metric_key(name, labels), 0)
+
+    def percentile(self, name: str, percentile: float, **labels: Any) -> Optional[float]:
+        """
+        计算采样的百分位数
+        Compute a percentile over the recorded samples
+        """
+        with self._lock:
+            samples = sorted(self._samples.get(_metric_key(name, labels), ()))
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(percentile / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        导出所有指标的快照
+        Export a snapshot of all metrics
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            samples = {key: sorted(values) for key, values in self._samples.items()}
+
+        summaries = {}
+        for key, values in samples.items():
+            if not values:
+                continue
+            summaries[key] = {
+                "count": len(values),
+                "avg": round(sum(values) / len(values), 4),
+                "p50": values[int(0.50 * (len(values) - 1))],
+                "p95": values[int(0.95 * (len(values) - 1))],
+                "max": values[-1],
+            }
+
+        return {"counters": counters, "gauges": gauges, "summaries": summaries}
+
+
+# 全局指标实例
+# Global metrics instance
+metrics = MetricsRegistry()
+
+
+def record_llm_usage(call_site: str, usage: Any) -> Dict[str, int]:
+    """
+    记录一次LLM调用的token用量和提示缓存命中情况
+    Record token usage and prompt-cache hit/miss for one LLM call
+
+    Args:
+        call_site: 调用位置标识 / Call site identifier
+        usage: Anthropic响应中的usage对象 / Usage object from an Anthropic response
+
+    Returns:
+        Dict: 归一化后的用量 / Normalised usage counts
+    """
+    counts = {
+        "input_tokens": getattr(usage, "input_tokens", 0) or 0,
+        "output_tokens": getattr(usage, "output_tokens", 0) or 0,
+        "cache_creation_input_tokens": getattr(usage, "cache_creation_input_tokens", 0) or 0,
+        "cache_read_input_tokens": getattr(usage, "cache_read_input_tokens", 0) or 0,
+    }
+
+    metrics.increment("llm_requests_total", call_site=call_site)
+    for field, value in counts.items():
+        metrics.increment(f"llm_{field}_total", value, call_site=call_site)
+
+    cache_status = "hit" if counts["cache_read_input_tokens"] else "miss"
+    metrics.increment(f"llm_prompt_cache_{cache_status}_total", call_site=call_site)
+
+    logger.debug(
+        f"LLM调用 / LLM call [{call_site}] prompt_cache={cache_status} "
+        f"input={counts['input_tokens']} cached_read={counts['cache_read_input_tokens']} "
+        f"cache_write={counts['cache_creation_input_tokens']} output={counts['output_tokens']}"
+    )
+    return counts
@@ -0,0 +1,89 @@
+"""
+单飞请求合并
+Single-flight request coalescing for JobCatcher
+同一指纹的并发调用只执行一次上游请求，其余调用方共享结果（或异常）
+Concurrent calls with the same fingerprint run one upstream request; the other callers share its result (or exception)
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+
+from app.core.metrics import metrics
+
+
+logger = logging.getLogger("core.single_flight")
+
+T = TypeVar("T")
+
+
+def request_fingerprint(*parts: Any) -> str:
+    """
+    计算请求指纹 - 对参数做稳定的JSON序列化后取SHA-256
+    Compute a request fingerprint - SHA-256 of a stable JSON serialization of the arguments
+    """
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """
+    单飞分组 - 每个分组独立统计合并率（single_flight_coalesce_ratio{group}）
+    Single-flight group - each group reports its own coalesce ratio (single_flight_coalesce_ratio{group})
+    """
+
+    def __init__(self, group: str):
+        self.group = group
+        self._calls: Dict[str, asyncio.Task] = {}
+        self._total = 0
+        self._coalesced = 0
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def start(self, key: str, fn: Callable[[], Awaitable[T]]) -> "asyncio.Task[T]":
+        """
+        启动或加入该键的调用，返回共享任务（不等待）
+        Start or join the call for this key, returning the shared task without awaiting it
+        """
+        self._total += 1
+        metrics.increment("single_flight_calls_total", group=self.group)
+        task = self._calls.get(key)
+        if task is not None:
+            self._coalesced += 1
+            metrics.increment("single_flight_coalesced_total", group=self.group)
+        else:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda finished: self._finish(key, finished))
+        metrics.set_gauge("single_flight_coalesce_ratio", self._coalesced / self._total, group=self.group)
+        return task
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        执行或加入该键的调用并等待结果；单个调用方被取消不会取消共享调用
+        Run or join the call for this key and await its result; cancelling one caller does not cancel the shared call
+        """
+        return await asyncio.shield(self.start(key, fn))
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # 读取异常，避免所有调用方都已离开时出现 "exception was never retrieved"
+        # Retrieve the exception so nothing logs "exception was never retrieved" once every caller has left
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"单飞调用失败 / Single-flight call failed ({self.group}): {task.exception()}")
+
+    async def cancel_all(self) -> None:
+        """
+        取消所有进行中的调用
+        Cancel every in-flight call
+        """
+        tasks = list(self._calls.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._calls.clear()
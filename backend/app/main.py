@@ -19,6 +19,14 @@ from starlette.exceptions import HTTPException as StarletteHTTPException
 # Import core configuration
 from app.core.config import settings
 from app.core.database import init_db
+from app.agents.coordinator import recover_interrupted_workflows
+from app.core.metrics import metrics
+from app.services.llm_gateway import get_llm_gateway
+from app.services.llm_cache import get_llm_response_cache
+from app.services.search_result_cache import get_search_result_cache
+from app.services.http_clients import close_http_clients, get_http_client_registry
+from app.services.scheduler import get_job_scheduler
+from app.services.skill_trends import ensure_skill_demand_backfilled
 from app.core.exceptions import (
     http_exception_handler,
     validation_exception_handler,
@@ -28,6 +36,7 @@ from app.core.exceptions import (
 # 导入API路由
 # Import API routes
 from app.api import api_router
+from app.api.chat import manager, workflow_queue
 
 
 # 应用生命周期管理
@@ -50,12 +59,66 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
         logging.error(f"❌ 数据库初始化失败 / Database initialization failed: {e}")
         raise
     
+    # 技能需求聚合表为空时（首次升级）从 jobs 表回填
+    # Backfill the skill demand aggregate from the jobs table when it is empty (first run after upgrading)
+    try:
+        backfilled = await ensure_skill_demand_backfilled()
+        if backfilled:
+            logging.info(f"📊 已回填技能需求聚合 / Backfilled the skill demand aggregate: {backfilled} jobs")
+    except Exception as e:
+        logging.error(f"❌ 技能需求聚合回填失败 / Skill demand backfill failed: {e}")
+    
+    # 将上次进程遗留的运行中工作流标记为中断，之后可从检查点恢复
+    # Mark workflows left running by the previous process as interrupted; they resume from checkpoints
+    interrupted_count = await recover_interrupted_workflows()
+    if interrupted_count:
+        logging.info(f"⏸️ {interrupted_count} 个工作流可从检查点恢复 / workflows can resume from checkpoints")
+    
+    # 创建出站HTTP客户端注册表（各外部集成的长连接池）
+    # Create the outbound HTTP client registry (long-lived pools per external integration)
+    get_http_client_registry()
+    
+    # 启动WebSocket连接管理器（发布订阅分发和心跳）
+    # Start the WebSocket connection manager (pub/sub fan-out and heartbeats)
+    await manager.start()
+    
+    # 启动后台工作流队列，遗留的待执行和已中断运行会重新入队
+    # Start the background workflow queue; leftover pending and interrupted runs are re-enqueued
+    await workflow_queue.start()
+    
+    # 启动定时任务（职位定时抓取、过期职位清理）
+    # Start scheduled tasks (periodic job ingestion, expired job cleanup)
+    get_job_scheduler().start()
+    
     logging.info("🎉 JobCatcher 应用启动完成! / JobCatcher application started successfully!")
     
     yield
     
     # 关闭时执行 - Shutdown tasks
     logging.info("⏹️ JobCatcher 应用关闭中... / Shutting down JobCatcher application...")
+    
+    # 停止定时任务，未完成的抓取下次启动时按检查点继续
+    # Stop scheduled tasks; unfinished ingestion continues from checkpoints on next startup
+    await get_job_scheduler().stop()
+    
+    # 停止工作流队列，执行中的运行下次启动时恢复
+    # Stop the workflow queue; in-flight runs resume on next startup
+    await workflow_queue.stop()
+    await manager.stop()
+    
+    # 关闭共享LLM客户端连接池和响应缓存
+    # Close the shared LLM client connection pool and response cache
+    await get_llm_gateway().aclose()
+    await get_llm_response_cache().aclose()
+    
+    # 取消进行中的搜索结果后台刷新
+    # Cancel in-flight background search result refreshes
+    await get_search_result_cache().aclose()
+    
+    # 关闭出站HTTP连接池
+    # Close the outbound HTTP connection pools
+    await close_http_clients()
+    
     logging.info("👋 JobCatcher 应用已关闭 / JobCatcher application shutdown complete")
 
 
@@ -115,6 +178,17 @@ async def health_check():
     }
 
 
+# 运行指标端点
+# Runtime metrics endpoint
+@app.get("/metrics", tags=["系统 / System"])
+async def get_metrics():
+    """
+    导出进程内运行指标（LLM用量、提示缓存命中等）
+    Export in-process runtime metrics (LLM usage, prompt-cache hits, etc.)
+    """
+    return metrics.snapshot()
+
+
 # 根路径处理 (SPA支持)
 # Root path handler (SPA support)
 @app.get("/", response_class=HTMLResponse, include_in_schema=False)
@@ -4,9 +4,10 @@ Data models package
 """
 
 from app.models.user import User
-from app.models.job import Job, JobSource, JobType
+from app.models.job import Job, JobIngestionCheckpoint, JobSearchCacheEntry, JobSource, JobType, SkillDemandWeekly
 from app.models.resume import Resume
 from app.models.chat_history import ChatHistory, MessageRole, MessageType
+from app.models.workflow import WorkflowRun, WorkflowRunStatus, WorkflowCheckpoint, WorkflowCheckpointWrite
 
 # 导出所有模型类和枚举
 # Export all model classes and enums
@@ -14,12 +15,19 @@ __all__ = [
     # 模型类 / Model classes
     "User",
     "Job", 
+    "JobSearchCacheEntry",
+    "JobIngestionCheckpoint",
+    "SkillDemandWeekly",
     "Resume",
     "ChatHistory",
+    "WorkflowRun",
+    "WorkflowCheckpoint",
+    "WorkflowCheckpointWrite",
     
     # 枚举类 / Enum classes
     "JobSource",
     "JobType", 
     "MessageRole",
     "MessageType",
+    "WorkflowRunStatus",
 ] 
\ No newline at end of file
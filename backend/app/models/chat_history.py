@@ -41,6 +41,10 @@ class MessageType(str, Enum):
     SKILL_HEATMAP = "skill_heatmap"
     PDF_GENERATION = "pdf_generation"
     SYSTEM_NOTIFICATION = "system_notification"
+    AGENT_REQUEST = "agent_request"
+    AGENT_RESPONSE = "agent_response"
+    WORKFLOW_REQUEST = "workflow_request"
+    JOB_SEARCH_REQUEST = "job_search_request"
 
 
 class ChatHistory(Base):
@@ -3,11 +3,11 @@
 Job data model for JobCatcher
 """
 
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional, List
 from enum import Enum
 
-from sqlalchemy import String, DateTime, Boolean, Text, Integer, Float, JSON
+from sqlalchemy import String, Date, DateTime, Boolean, Text, Integer, Float, JSON
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.sql import func
 from pydantic import BaseModel, Field
@@ -190,6 +190,76 @@ class Job(Base):
         location_lower = (self.location or "").lower()
         return any(keyword in location_lower for keyword in remote_keywords) or self.job_type == JobType.REMOTE
 
+class JobSearchCacheEntry(Base):
+    """
+    外部职位搜索结果缓存条目 - 按 (来源, 归一化查询, 地点, 数量) 记录结果职位ID，职位内容存放在 jobs 表
+    External job search result cache entry - records result job IDs per (source, normalized query, location, limit); job content lives in the jobs table
+    """
+    __tablename__ = "job_search_cache"
+
+    # 缓存键为各字段的SHA-256 / The cache key is the SHA-256 of the fields
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    source: Mapped[str] = mapped_column(String(20), nullable=False, index=True)
+    query: Mapped[str] = mapped_column(String(500), nullable=False)
+    location: Mapped[str] = mapped_column(String(200), nullable=True)
+    limit: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    # 按上游返回顺序排列的职位ID / Job IDs in upstream order
+    job_ids: Mapped[list] = mapped_column(JSON, nullable=False, default=list)
+    fetched_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
+
+    def __repr__(self) -> str:
+        return f"<JobSearchCacheEntry(source='{self.source}', query='{self.query}', location='{self.location}')>"
+
+class JobIngestionCheckpoint(Base):
+    """
+    定时职位抓取检查点 - 每个 (来源, 查询, 地点) 一行，记录上次完成时间和运行统计，重启后跳过已完成的组合
+    Scheduled job ingestion checkpoint - one row per (source, query, location) recording the last completion and run
+    statistics; combinations already done are skipped after a restart
+    """
+    __tablename__ = "job_ingestion_checkpoints"
+
+    # 检查点键为各字段的SHA-256 / The checkpoint key is the SHA-256 of the fields
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    source: Mapped[str] = mapped_column(String(20), nullable=False, index=True)
+    query: Mapped[str] = mapped_column(String(500), nullable=False)
+    location: Mapped[str] = mapped_column(String(200), nullable=True)
+
+    last_status: Mapped[str] = mapped_column(String(20), nullable=True)
+    last_error: Mapped[str] = mapped_column(Text, nullable=True)
+    last_report: Mapped[dict] = mapped_column(JSON, nullable=True)
+    # 目前见过的最新发布时间 / Newest posting time seen so far
+    last_posted_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
+    last_started_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
+    last_completed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True, index=True)
+
+    def __repr__(self) -> str:
+        return f"<JobIngestionCheckpoint(source='{self.source}', query='{self.query}', location='{self.location}')>"
+
+class SkillDemandWeekly(Base):
+    """
+    技能需求周聚合（物化视图）- 每个 (技能, 地点, 周) 一行，职位入库和过期时增量维护，热点图按时间窗口直接读取；
+    技能为 "*" 的行记录该地点该周的职位总数
+    Weekly skill demand aggregate (materialized view) - one row per (skill, location, week), maintained incrementally
+    as jobs are stored and expire, read directly by the heatmap for time windows; rows with skill "*" hold the total
+    job count for that location and week
+    """
+    __tablename__ = "skill_demand_weekly"
+
+    skill: Mapped[str] = mapped_column(String(100), primary_key=True)
+    # 未知地点为空字符串 / Unknown locations are stored as an empty string
+    location: Mapped[str] = mapped_column(String(200), primary_key=True)
+    # 周一日期（UTC） / Monday of the week (UTC)
+    week_start: Mapped[date] = mapped_column(Date, primary_key=True, index=True)
+    category: Mapped[str] = mapped_column(String(30), nullable=True)
+
+    job_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    salary_sum: Mapped[float] = mapped_column(Float, default=0.0, nullable=False)
+    salary_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<SkillDemandWeekly(skill='{self.skill}', location='{self.location}', week_start='{self.week_start}')>"
+
 # ================== Pydantic响应模型 / Pydantic Response Models ==================
 
 class JobSearchFilters(BaseModel):
@@ -0,0 +1,140 @@
+"""
+工作流运行与检查点数据模型
+Workflow run and checkpoint data models for JobCatcher
+"""
+
+from datetime import datetime
+from enum import Enum
+from uuid import uuid4
+
+from sqlalchemy import String, DateTime, Text, Integer, JSON, LargeBinary
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class WorkflowRunStatus(str, Enum):
+    """
+    工作流运行状态枚举
+    Workflow run status enumeration
+    """
+    PENDING = "pending"
+    RUNNING = "running"
+    INTERRUPTED = "interrupted"  # 进程崩溃或重新部署时中断 / Interrupted by a crash or redeploy
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+# 可从检查点恢复的状态（运行中的运行由持有租约的进程负责，租约过期后才会被标记为中断）
+# Statuses that can be resumed from a checkpoint (a running run belongs to the process holding its lease and is only
+# marked interrupted once that lease expires)
+RESUMABLE_STATUSES = (WorkflowRunStatus.INTERRUPTED,)
+
+# 未结束的状态 / Statuses of runs that have not finished
+ACTIVE_STATUSES = (WorkflowRunStatus.PENDING, WorkflowRunStatus.RUNNING, WorkflowRunStatus.INTERRUPTED)
+
+# 终态 / Terminal statuses
+TERMINAL_STATUSES = (WorkflowRunStatus.COMPLETED, WorkflowRunStatus.FAILED, WorkflowRunStatus.CANCELLED)
+
+
+class WorkflowRun(Base):
+    """
+    工作流运行模型 - 一次工作流执行，对应一个检查点线程
+    Workflow run model - one workflow execution, mapped to one checkpoint thread
+    """
+    __tablename__ = "workflow_runs"
+
+    # 运行ID同时作为检查点的thread_id
+    # The run ID doubles as the checkpoint thread_id
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid4()))
+    user_id: Mapped[int] = mapped_column(Integer, nullable=True, index=True)
+    session_id: Mapped[str] = mapped_column(String(100), nullable=False, index=True)
+    workflow_type: Mapped[str] = mapped_column(String(50), nullable=False)
+
+    # 运行状态 - Agent级进度从检查点读取
+    # Run status - agent-level progress is read from the checkpoint
+    status: Mapped[str] = mapped_column(String(20), default=WorkflowRunStatus.PENDING, index=True)
+    user_input: Mapped[dict] = mapped_column(JSON, nullable=True)
+    error_message: Mapped[str] = mapped_column(Text, nullable=True)
+
+    # 执行租约 - 持有进程和到期时间，执行期间定期续约
+    # Execution lease - owning process and expiry, renewed while the run executes
+    owner_id: Mapped[str] = mapped_column(String(100), nullable=True)
+    lease_expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True, index=True)
+
+    # 时间戳
+    # Timestamps
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False
+    )
+    completed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    def to_dict(self) -> dict:
+        """
+        转换为字典格式
+        Convert to dictionary format
+        """
+        return {
+            "run_id": self.id,
+            "session_id": self.session_id,
+            "workflow_type": self.workflow_type,
+            "status": self.status,
+            "error_message": self.error_message,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "last_updated": self.updated_at.isoformat() if self.updated_at else None,
+            "completed_at": self.completed_at.isoformat() if self.completed_at else None
+        }
+
+
+class WorkflowCheckpoint(Base):
+    """
+    LangGraph检查点模型
+    LangGraph checkpoint model
+    """
+    __tablename__ = "workflow_checkpoints"
+
+    thread_id: Mapped[str] = mapped_column(String(100), primary_key=True)
+    checkpoint_ns: Mapped[str] = mapped_column(String(255), primary_key=True, default="")
+    checkpoint_id: Mapped[str] = mapped_column(String(100), primary_key=True)
+    parent_checkpoint_id: Mapped[str] = mapped_column(String(100), nullable=True)
+
+    # 序列化后的检查点和元数据
+    # Serialized checkpoint and metadata
+    checkpoint_type: Mapped[str] = mapped_column(String(50), nullable=False)
+    checkpoint: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    checkpoint_metadata: Mapped[bytes] = mapped_column(LargeBinary, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False
+    )
+
+
+class WorkflowCheckpointWrite(Base):
+    """
+    LangGraph检查点的挂起写入模型 - 记录已完成节点的输出，恢复时无需重跑
+    LangGraph pending-write model - records outputs of finished nodes so they are not re-run on resume
+    """
+    __tablename__ = "workflow_checkpoint_writes"
+
+    thread_id: Mapped[str] = mapped_column(String(100), primary_key=True)
+    checkpoint_ns: Mapped[str] = mapped_column(String(255), primary_key=True, default="")
+    checkpoint_id: Mapped[str] = mapped_column(String(100), primary_key=True)
+    task_id: Mapped[str] = mapped_column(String(100), primary_key=True)
+    idx: Mapped[int] = mapped_column(Integer, primary_key=True)
+
+    channel: Mapped[str] = mapped_column(String(255), nullable=False)
+    value_type: Mapped[str] = mapped_column(String(50), nullable=True)
+    value: Mapped[bytes] = mapped_column(LargeBinary, nullable=True)
+    task_path: Mapped[str] = mapped_column(String(255), default="")
@@ -1,34 +1,39 @@
 """
 Azure AI Search服务 - JobCatcher RAG检索系统
 Azure AI Search service - JobCatcher RAG retrieval system
-基于开发文档要求实现职位数据向量化和语义检索
-Implementing job data vectorization and semantic retrieval as per development documentation
+基于开发文档要求实现职位数据向量化和语义检索；检索存储可以是Azure AI Search或本地向量索引
+Implementing job data vectorization and semantic retrieval as per development documentation; storage is Azure AI Search or the local vector index
 """
 
+import asyncio
 import logging
 import json
-from typing import List, Dict, Any, Optional
+import time
+from typing import Callable, List, Dict, Any, Optional, Set, Tuple
 from datetime import datetime
 
-from azure.search.documents import SearchClient
-from azure.search.documents.indexes import SearchIndexClient
-from azure.search.documents.models import VectorizedQuery
-from azure.search.documents.indexes.models import (
-    SearchIndex,
-    SearchField,
-    SearchFieldDataType,
-    SimpleField,
-    SearchableField,
-    VectorSearch,
-    VectorSearchProfile,
-    HnswAlgorithmConfiguration,
-)
-from azure.core.credentials import AzureKeyCredential
 from langchain_core.tools import BaseTool
 from langchain_openai import AzureOpenAIEmbeddings
 from pydantic import BaseModel, Field
+from sqlalchemy import delete
 
 from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import metrics
+from app.models.job import Job
+from app.services.embedding_cache import CachedEmbeddings, SingleFlightEmbeddings, get_embedding_cache
+from app.services.search_backends import (
+    HashingEmbeddings,
+    SearchBackend,
+    azure_openai_configured,
+    create_search_backend,
+)
+from app.services.job_dedup import forget_jobs
+from app.services.skill_trends import subtract_live_jobs
+
+# 可重试的单文档上传状态码（冲突、限流、服务不可用）
+# Retriable per-document upload status codes (conflict, throttling, service unavailable)
+RETRIABLE_UPLOAD_STATUS_CODES = {409, 422, 429, 503}
 
 
 class JobDocument(BaseModel):
@@ -49,6 +54,36 @@ class JobDocument(BaseModel):
     expired: bool = Field(default=False, description="是否过期")
 
 
+class IndexingReport(BaseModel):
+    """
+    批量索引报告 - 吞吐量和各阶段耗时
+    Bulk indexing report - throughput and per-stage timing
+    """
+    total: int = Field(0, description="提交的文档数 / Documents submitted")
+    succeeded: int = Field(0, description="成功索引的文档数 / Documents indexed")
+    failed_ids: List[str] = Field(default_factory=list, description="失败的文档ID / IDs of failed documents")
+    embedding_seconds: float = Field(0.0, description="嵌入阶段耗时 / Embedding stage duration")
+    upload_seconds: float = Field(0.0, description="上传阶段耗时 / Upload stage duration")
+    total_seconds: float = Field(0.0, description="总耗时 / Total duration")
+    docs_per_second: float = Field(0.0, description="吞吐量 / Throughput")
+
+
+class ExpiredPurgeReport(BaseModel):
+    """
+    过期职位清理报告 - 进度和吞吐量
+    Expired job purge report - progress and throughput
+    """
+    pages: int = Field(0, description="已列出的页数 / Pages listed")
+    listed: int = Field(0, description="列出的过期文档数 / Expired documents listed")
+    deleted: int = Field(0, description="删除的索引文档数 / Index documents deleted")
+    failed: int = Field(0, description="索引文档或职位行删除失败的文档数 / Documents whose index document or job row failed to delete")
+    rows_deleted: int = Field(0, description="删除的职位行数 / Job rows deleted")
+    last_id: Optional[str] = Field(None, description="此ID及之前的文档均已成功处理，可作为 start_after 继续 / Every document up to this ID was processed successfully; pass it as start_after to continue")
+    completed: bool = Field(False, description="是否处理完所有页 / Whether every page was processed")
+    total_seconds: float = Field(0.0, description="总耗时 / Total duration")
+    docs_per_second: float = Field(0.0, description="吞吐量 / Throughput")
+
+
 class JobSearchTool(BaseTool):
     """
     职位搜索工具 - 供Claude 4使用的RAG检索工具
@@ -110,44 +145,62 @@ class JobSearchTool(BaseTool):
             return f"搜索时发生错误：{str(e)}"
 
 
+async def delete_job_rows(job_ids: List[str]) -> int:
+    """
+    删除 jobs 表中的对应行，返回删除行数；批量DELETE不触发映射事件，去重索引和技能需求聚合需要显式同步
+    Delete the matching jobs rows, returning how many were removed; bulk DELETEs fire no mapper events, so the dedup
+    index and the skill demand aggregate are synced explicitly
+    """
+    async with AsyncSessionLocal() as session:
+        await subtract_live_jobs(session, job_ids)
+        result = await session.execute(
+            delete(Job).where(Job.id.in_(job_ids)),
+            execution_options={"synchronize_session": False}
+        )
+        await session.commit()
+    forget_jobs(job_ids)
+    return result.rowcount or 0
+
+
 class AzureSearchService:
     """
     Azure AI Search服务类 - 实现RAG检索核心功能
     Azure AI Search service class - implementing core RAG retrieval functionality
     """
     
-    def __init__(self):
+    def __init__(self, backend: Optional[SearchBackend] = None):
         """
-        初始化Azure AI Search客户端
-        Initialize Azure AI Search client
+        初始化检索后端和嵌入模型
+        Initialize the search backend and embedding model
         """
         self.logger = logging.getLogger("azure_search")
         
-        # 验证配置 - Validate configuration
-        if not settings.AZURE_SEARCH_ENDPOINT or not settings.AZURE_SEARCH_KEY:
-            raise ValueError("Azure Search endpoint 和 key 必须在环境变量中配置")
-        
-        # 初始化客户端 - Initialize clients
-        credential = AzureKeyCredential(settings.AZURE_SEARCH_KEY)
-        self.search_client = SearchClient(
-            endpoint=settings.AZURE_SEARCH_ENDPOINT,
-            index_name="jobs-index",  # 根据开发文档配置
-            credential=credential
-        )
-        self.index_client = SearchIndexClient(
-            endpoint=settings.AZURE_SEARCH_ENDPOINT,
-            credential=credential
-        )
+        # 检索后端 - 未配置Azure时使用本地向量索引
+        # Search backend - the local vector index is used when Azure is not configured
+        self.backend = backend or create_search_backend()
         
         # 初始化嵌入模型 - Initialize embedding model
-        self.embeddings = AzureOpenAIEmbeddings(
-            model="text-embedding-ada-002",  # 使用Azure OpenAI嵌入模型
-            api_key=settings.AZURE_OPENAI_API_KEY,
-            azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
-            api_version="2024-02-01"
-        )
+        if azure_openai_configured():
+            embedding_model = "text-embedding-ada-002"  # 使用Azure OpenAI嵌入模型
+            self.embeddings = AzureOpenAIEmbeddings(
+                model=embedding_model,
+                api_key=settings.AZURE_OPENAI_API_KEY,
+                azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
+                api_version="2024-02-01"
+            )
+        else:
+            # 零网络模式 - Zero-network mode
+            embedding_model = f"local-hashing-{settings.LOCAL_EMBEDDING_DIMENSIONS}"
+            self.embeddings = HashingEmbeddings(settings.LOCAL_EMBEDDING_DIMENSIONS)
         
-        self.index_name = "jobs-index"
+        # 内容未变的职位和重复的查询直接命中向量缓存，不调用嵌入API
+        # Unchanged jobs and repeated queries hit the vector cache and skip the embedding API
+        if settings.EMBEDDING_CACHE_ENABLED:
+            self.embeddings = CachedEmbeddings(self.embeddings, embedding_model, get_embedding_cache())
+        
+        # 并发的相同查询（如多个用户同时搜索同一关键词）合并为一次缓存查找和嵌入调用
+        # Concurrent identical queries (e.g. several users searching the same keywords) share one cache lookup and embedding call
+        self.embeddings = SingleFlightEmbeddings(self.embeddings, embedding_model)
     
     async def ensure_index_exists(self) -> None:
         """
@@ -155,73 +208,40 @@ class AzureSearchService:
         Ensure search index exists, create if not exists
         """
         try:
-            # 检查索引是否存在 - Check if index exists
-            try:
-                await self.index_client.get_index(self.index_name)
-                self.logger.info(f"Azure Search索引 '{self.index_name}' 已存在")
-                return
-            except Exception:
-                self.logger.info(f"创建新的Azure Search索引: {self.index_name}")
-            
-            # 创建索引配置 - Create index configuration
-            fields = [
-                SimpleField(name="id", type=SearchFieldDataType.String, key=True),
-                SearchableField(name="title", type=SearchFieldDataType.String, analyzer_name="en.microsoft"),
-                SearchableField(name="company", type=SearchFieldDataType.String),
-                SearchableField(name="location", type=SearchFieldDataType.String),
-                SimpleField(name="salary", type=SearchFieldDataType.String, facetable=True),
-                SearchableField(name="description", type=SearchFieldDataType.String, analyzer_name="en.microsoft"),
-                SimpleField(name="skills", type=SearchFieldDataType.Collection(SearchFieldDataType.String), facetable=True),
-                SimpleField(name="source", type=SearchFieldDataType.String, facetable=True),
-                SimpleField(name="url", type=SearchFieldDataType.String),
-                SimpleField(name="indexed_at", type=SearchFieldDataType.DateTimeOffset),
-                SimpleField(name="expired", type=SearchFieldDataType.Boolean, facetable=True),
-                
-                # 向量字段 - Vector field for semantic search
-                SearchField(
-                    name="content_vector",
-                    type=SearchFieldDataType.Collection(SearchFieldDataType.Single),
-                    searchable=True,
-                    vector_search_dimensions=1536,  # 基于text-embedding-3-small模型维度
-                    vector_search_profile_name="jobs-profile"
-                )
-            ]
-            
-            # 向量搜索配置 - Vector search configuration
-            vector_search = VectorSearch(
-                profiles=[
-                    VectorSearchProfile(
-                        name="jobs-profile",
-                        algorithm_configuration_name="jobs-hnsw"
-                    )
-                ],
-                algorithms=[
-                    HnswAlgorithmConfiguration(
-                        name="jobs-hnsw",
-                        parameters={
-                            "m": 4,
-                            "efConstruction": 400,
-                            "efSearch": 500,
-                            "metric": "cosine"
-                        }
-                    )
-                ]
-            )
-            
-            # 创建索引 - Create index
-            index = SearchIndex(
-                name=self.index_name,
-                fields=fields,
-                vector_search=vector_search
-            )
-            
-            await self.index_client.create_index(index)
-            self.logger.info(f"成功创建Azure Search索引: {self.index_name}")
-            
+            await self.backend.ensure_index()
         except Exception as e:
-            self.logger.error(f"创建Azure Search索引失败: {e}")
+            self.logger.error(f"创建搜索索引失败: {e}")
             raise
     
+    @staticmethod
+    def _build_content_text(job: JobDocument) -> str:
+        """
+        构建用于生成向量的职位文本
+        Build the job text that is embedded
+        """
+        return f"{job.title} {job.company} {job.description} {' '.join(job.skills)}"
+    
+    @staticmethod
+    def _build_document(job: JobDocument, content_vector: List[float]) -> Dict[str, Any]:
+        """
+        构建索引文档
+        Build the index document
+        """
+        return {
+            "id": job.id,
+            "title": job.title,
+            "company": job.company,
+            "location": job.location,
+            "salary": job.salary,
+            "description": job.description,
+            "skills": job.skills,
+            "source": job.source,
+            "url": job.url,
+            "indexed_at": job.indexed_at.isoformat(),
+            "expired": job.expired,
+            "content_vector": content_vector
+        }
+    
     async def index_job(self, job: JobDocument) -> bool:
         """
         将单个职位文档索引到Azure AI Search
@@ -229,27 +249,10 @@ class AzureSearchService:
         """
         try:
             # 生成内容向量 - Generate content vector
-            content_text = f"{job.title} {job.company} {job.description} {' '.join(job.skills)}"
-            content_vector = await self.embeddings.aembed_query(content_text)
-            
-            # 构建文档 - Build document
-            doc = {
-                "id": job.id,
-                "title": job.title,
-                "company": job.company,
-                "location": job.location,
-                "salary": job.salary,
-                "description": job.description,
-                "skills": job.skills,
-                "source": job.source,
-                "url": job.url,
-                "indexed_at": job.indexed_at.isoformat(),
-                "expired": job.expired,
-                "content_vector": content_vector
-            }
+            content_vector = await self.embeddings.aembed_query(self._build_content_text(job))
             
             # 上传文档 - Upload document
-            result = await self.search_client.upload_documents([doc])
+            result = await self.backend.upload_documents([self._build_document(job, content_vector)])
             
             if result[0].succeeded:
                 self.logger.debug(f"成功索引职位: {job.id} - {job.title}")
@@ -264,16 +267,116 @@ class AzureSearchService:
     
     async def index_jobs_batch(self, jobs: List[JobDocument]) -> int:
         """
-        批量索引职位文档
-        Batch index job documents
+        批量索引职位文档，返回成功数量
+        Batch index job documents, returning the number indexed
+        """
+        report = await self.bulk_index_jobs(jobs)
+        return report.succeeded
+    
+    async def bulk_index_jobs(self, jobs: List[JobDocument]) -> IndexingReport:
+        """
+        批量索引 - 分块并发生成向量，按批上传并重试失败文档
+        Bulk index - embed in concurrent chunks, upload in batches and retry failed documents
         """
-        success_count = 0
-        for job in jobs:
-            if await self.index_job(job):
-                success_count += 1
+        report = IndexingReport(total=len(jobs))
+        if not jobs:
+            return report
+        started_at = time.perf_counter()
         
-        self.logger.info(f"批量索引完成: {success_count}/{len(jobs)} 成功")
-        return success_count
+        # 阶段一：分块生成向量 - Stage 1: embed in chunks
+        documents, embedding_failed = await self._embed_jobs(jobs)
+        report.embedding_seconds = time.perf_counter() - started_at
+        
+        # 阶段二：分批上传 - Stage 2: upload in batches
+        upload_started_at = time.perf_counter()
+        upload_failed: List[str] = []
+        batch_size = settings.SEARCH_UPLOAD_BATCH_SIZE
+        for offset in range(0, len(documents), batch_size):
+            upload_failed.extend(await self._upload_batch(documents[offset:offset + batch_size]))
+        report.upload_seconds = time.perf_counter() - upload_started_at
+        
+        report.failed_ids = embedding_failed + upload_failed
+        report.succeeded = report.total - len(report.failed_ids)
+        report.total_seconds = time.perf_counter() - started_at
+        report.docs_per_second = round(report.succeeded / report.total_seconds, 2) if report.total_seconds else 0.0
+        
+        metrics.observe("search_index_stage_ms", report.embedding_seconds * 1000, stage="embedding")
+        metrics.observe("search_index_stage_ms", report.upload_seconds * 1000, stage="upload")
+        metrics.increment("search_index_documents_total", report.succeeded, status="succeeded")
+        metrics.increment("search_index_documents_total", len(report.failed_ids), status="failed")
+        metrics.set_gauge("search_index_docs_per_second", report.docs_per_second)
+        
+        self.logger.info(
+            f"批量索引完成: {report.succeeded}/{report.total} 成功, "
+            f"{report.docs_per_second} docs/s (嵌入 {report.embedding_seconds:.2f}s, 上传 {report.upload_seconds:.2f}s)"
+        )
+        return report
+    
+    async def _embed_jobs(self, jobs: List[JobDocument]) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """
+        分块并发调用 aembed_documents，返回索引文档和嵌入失败的职位ID
+        Call aembed_documents in concurrent chunks; returns index documents and IDs whose embedding failed
+        """
+        batch_size = settings.SEARCH_EMBEDDING_BATCH_SIZE
+        semaphore = asyncio.Semaphore(settings.SEARCH_EMBEDDING_MAX_CONCURRENCY)
+        
+        async def embed_chunk(chunk: List[JobDocument]) -> Optional[List[List[float]]]:
+            async with semaphore:
+                try:
+                    return await self.embeddings.aembed_documents([self._build_content_text(job) for job in chunk])
+                except Exception as e:
+                    self.logger.error(f"批量生成向量失败 ({len(chunk)} 个职位): {e}")
+                    return None
+        
+        chunks = [jobs[offset:offset + batch_size] for offset in range(0, len(jobs), batch_size)]
+        vectors_per_chunk = await asyncio.gather(*(embed_chunk(chunk) for chunk in chunks))
+        
+        documents: List[Dict[str, Any]] = []
+        failed_ids: List[str] = []
+        for chunk, vectors in zip(chunks, vectors_per_chunk):
+            if vectors is None:
+                failed_ids.extend(job.id for job in chunk)
+                continue
+            documents.extend(self._build_document(job, vector) for job, vector in zip(chunk, vectors))
+        return documents, failed_ids
+    
+    async def _upload_batch(self, documents: List[Dict[str, Any]]) -> List[str]:
+        """
+        上传一批文档，只重试失败且可重试的文档；返回最终失败的文档ID
+        Upload a batch, retrying only documents that failed with a retriable status; returns IDs that still failed
+        """
+        pending = documents
+        failed_ids: List[str] = []
+        
+        for attempt in range(settings.SEARCH_UPLOAD_MAX_RETRIES + 1):
+            if attempt:
+                await asyncio.sleep(min(2 ** attempt, 30))
+            try:
+                results = await self.backend.upload_documents(pending)
+            except Exception as e:
+                # 整批失败（网络、限流等）时整批重试 / Retry the whole batch when it fails as a whole (network, throttling, ...)
+                self.logger.warning(f"上传批次失败 (第{attempt + 1}次, {len(pending)} 个文档): {e}")
+                continue
+            
+            results_by_key = {result.key: result for result in results}
+            retry: List[Dict[str, Any]] = []
+            for document in pending:
+                result = results_by_key.get(document["id"])
+                if result is not None and result.succeeded:
+                    continue
+                if result is not None and result.status_code not in RETRIABLE_UPLOAD_STATUS_CODES:
+                    self.logger.error(f"索引职位失败: {document['id']} - {result.error_message}")
+                    failed_ids.append(document["id"])
+                else:
+                    retry.append(document)
+            
+            pending = retry
+            if not pending:
+                return failed_ids
+        
+        failed_ids.extend(document["id"] for document in pending)
+        self.logger.error(f"重试后仍有 {len(pending)} 个文档上传失败")
+        return failed_ids
     
     async def search_jobs(
         self, 
@@ -290,13 +393,6 @@ class AzureSearchService:
             # 生成查询向量 - Generate query vector
             query_vector = await self.embeddings.aembed_query(query)
             
-            # 构建向量查询 - Build vector query
-            vector_query = VectorizedQuery(
-                vector=query_vector,
-                k_nearest_neighbors=top_k,
-                fields="content_vector"
-            )
-            
             # 构建过滤条件 - Build filter conditions
             filter_expression = "expired eq false" if not include_expired else None
             if filters:
@@ -305,19 +401,8 @@ class AzureSearchService:
                 else:
                     filter_expression = filters
             
-            # 执行搜索 - Execute search
-            results = await self.search_client.search(
-                search_text=query,
-                vector_queries=[vector_query],
-                filter=filter_expression,
-                top=top_k,
-                include_total_count=True
-            )
-            
-            # 处理结果 - Process results
-            jobs = []
-            async for result in results:
-                jobs.append(dict(result))
+            # 执行混合检索 - Execute hybrid search
+            jobs = await self.backend.search(query, query_vector, top_k, filter_expression)
             
             self.logger.info(f"搜索查询 '{query}' 返回 {len(jobs)} 个结果")
             return jobs
@@ -326,38 +411,112 @@ class AzureSearchService:
             self.logger.error(f"搜索查询 '{query}' 失败: {e}")
             return []
     
-    async def delete_expired_jobs(self) -> int:
+    async def delete_expired_jobs(
+        self,
+        start_after: Optional[str] = None,
+        on_progress: Optional[Callable[[ExpiredPurgeReport], None]] = None
+    ) -> ExpiredPurgeReport:
         """
-        删除过期的职位记录
-        Delete expired job records
+        流式清理过期职位 - 按ID范围分页列出过期文档，分批并发删除，并同步删除 jobs 表中的对应行；
+        已删除的文档不会再被列出，因此中断后重新运行即从剩余部分继续，也可用报告中的 last_id 作为 start_after 跳过已处理范围；
+        批次并发完成，last_id 只推进到从头开始连续成功的批次末尾，失败或未完成的批次之后的范围不会被跳过
+        Stream-purge expired jobs - page through expired documents by ID range, delete them in concurrent batches and delete
+        the matching jobs rows; deleted documents are never listed again, so rerunning after an interruption continues with
+        what is left, and the report's last_id can be passed as start_after to skip ranges already processed; batches finish
+        out of order, so last_id only advances to the end of the contiguous run of succeeded batches and never past a
+        failed or unfinished one
         """
+        report = ExpiredPurgeReport(last_id=start_after)
+        started_at = time.perf_counter()
+        semaphore = asyncio.Semaphore(settings.SEARCH_PURGE_MAX_CONCURRENCY)
+        batch_size = settings.SEARCH_PURGE_BATCH_SIZE
+        # 按调度顺序记录每个批次的最后一个ID，以及已成功的批次序号
+        # The last ID of each batch in scheduling order, and the sequence numbers of batches that succeeded
+        batch_last_ids: List[str] = []
+        succeeded: Set[int] = set()
+        watermark = 0
+        
+        def advance_last_id() -> None:
+            nonlocal watermark
+            while watermark in succeeded:
+                report.last_id = batch_last_ids[watermark]
+                watermark += 1
+        
+        async def purge_batch(sequence: int, batch: List[str]) -> None:
+            try:
+                # 先取得结果再累加，避免并发批次间 += 读到旧值
+                # Await before accumulating so concurrent batches never add onto a stale value
+                try:
+                    deleted = await self.backend.delete_documents(batch)
+                except Exception as e:
+                    self.logger.error(f"删除过期文档批次失败 ({len(batch)} 个): {e}")
+                    report.failed += len(batch)
+                    return
+                report.deleted += deleted
+                try:
+                    rows_deleted = await delete_job_rows(batch)
+                except Exception as e:
+                    self.logger.error(f"删除过期职位数据行失败 ({len(batch)} 个): {e}")
+                    report.failed += len(batch)
+                    return
+                report.rows_deleted += rows_deleted
+                succeeded.add(sequence)
+                advance_last_id()
+                if on_progress is not None:
+                    on_progress(report)
+            finally:
+                semaphore.release()
+        
+        tasks: List[asyncio.Task] = []
+        cursor = start_after
         try:
-            # 搜索过期职位 - Search for expired jobs
-            results = await self.search_client.search(
-                search_text="*",
-                filter="expired eq true",
-                select=["id"]
-            )
-            
-            # 收集要删除的ID - Collect IDs to delete
-            ids_to_delete = []
-            async for result in results:
-                ids_to_delete.append({"id": result["id"]})
-            
-            if not ids_to_delete:
-                return 0
-            
-            # 执行删除 - Execute deletion
-            delete_results = await self.search_client.delete_documents(ids_to_delete)
-            
-            success_count = sum(1 for result in delete_results if result.succeeded)
-            self.logger.info(f"删除过期职位: {success_count}/{len(ids_to_delete)} 成功")
-            
-            return success_count
-            
+            while True:
+                page = await self.backend.list_expired_ids(cursor, settings.SEARCH_PURGE_PAGE_SIZE)
+                if not page:
+                    break
+                report.pages += 1
+                report.listed += len(page)
+                # 先占用并发槽位再创建任务，列表翻页不会远远跑在删除前面
+                # Take a concurrency slot before creating each task so paging never runs far ahead of deletion
+                for offset in range(0, len(page), batch_size):
+                    batch = page[offset:offset + batch_size]
+                    await semaphore.acquire()
+                    batch_last_ids.append(batch[-1])
+                    tasks.append(asyncio.create_task(purge_batch(len(batch_last_ids) - 1, batch)))
+                cursor = page[-1]
+                if len(page) < settings.SEARCH_PURGE_PAGE_SIZE:
+                    break
+            await asyncio.gather(*tasks)
+            report.completed = True
         except Exception as e:
-            self.logger.error(f"删除过期职位失败: {e}")
-            return 0
+            self.logger.error(f"删除过期职位失败 (cursor={cursor}, last_id={report.last_id}): {e}")
+            await asyncio.gather(*tasks, return_exceptions=True)
+        
+        report.total_seconds = time.perf_counter() - started_at
+        report.docs_per_second = round(report.deleted / report.total_seconds, 2) if report.total_seconds else 0.0
+        metrics.increment("search_index_deleted_total", report.deleted)
+        metrics.increment("search_purge_failed_total", report.failed)
+        self.logger.info(
+            f"删除过期职位: {report.deleted}/{report.listed} 个索引文档, {report.rows_deleted} 行职位数据, "
+            f"{report.failed} 个失败, {report.docs_per_second} docs/s"
+        )
+        return report
+    
+    async def delete_jobs(self, job_ids: List[str]) -> int:
+        """
+        按ID批量删除索引文档（每批不超过上传批大小），返回删除数量
+        Delete index documents by ID in batches (no larger than the upload batch size), returning how many were removed
+        """
+        deleted = 0
+        batch_size = settings.SEARCH_UPLOAD_BATCH_SIZE
+        for offset in range(0, len(job_ids), batch_size):
+            batch = job_ids[offset:offset + batch_size]
+            try:
+                deleted += await self.backend.delete_documents(batch)
+            except Exception as e:
+                self.logger.error(f"批量删除索引文档失败 ({len(batch)} 个): {e}")
+        metrics.increment("search_index_deleted_total", deleted)
+        return deleted
     
     def get_search_tool(self) -> JobSearchTool:
         """
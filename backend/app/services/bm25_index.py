@@ -0,0 +1,437 @@
+"""
+BM25 倒排索引
+BM25 inverted index for JobCatcher
+对职位的 title、description、skills 字段建立带字段权重的倒排索引（BM25F简化版），
+随 Job 表的插入和过期增量更新，供本地检索与向量结果做RRF融合
+Field-boosted inverted index (simplified BM25F) over job title, description and skills,
+updated incrementally as Job rows are inserted and expire; fused with vector results by the local search backend
+"""
+
+import asyncio
+import hashlib
+import logging
+import math
+import re
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.job import Job
+from app.services.job_row_events import subscribe_job_rows
+
+
+logger = logging.getLogger("service.bm25_index")
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# 高频虚词不进入倒排表，避免超长倒排链拖慢查询
+# Very common function words stay out of the postings so no query walks a huge list
+STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it", "of", "on",
+    "or", "our", "the", "to", "we", "with", "you", "your", "will",
+    "der", "die", "das", "und", "mit", "für", "von", "im", "in", "zu", "ein", "eine", "wir", "sie", "du",
+})
+
+DESCRIPTION_PREVIEW_CHARS = 1000
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """
+    小写化分词并去除停用词
+    Lowercase tokenization with stopwords removed
+    """
+    if not text:
+        return []
+    return [token for token in _TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def skill_names(skills: Any) -> List[str]:
+    """
+    展开 skills JSON - 支持列表，或 {分类: [技能]} 形式的字典
+    Flatten the skills JSON - a list, or a {category: [skills]} dictionary
+    """
+    if not skills:
+        return []
+    if isinstance(skills, str):
+        return [skills]
+    if isinstance(skills, dict):
+        names: List[str] = []
+        for key, value in skills.items():
+            names.extend(skill_names(value) if isinstance(value, (list, dict)) else [key])
+        return names
+    return [str(skill) for skill in skills]
+
+
+class _Postings:
+    """
+    单个词项的倒排链 - 行号和加权词频存放在可追加的定长数组中，查询时零拷贝转成NumPy
+    Postings for one term - row numbers and weighted frequencies in appendable typed arrays, viewed as NumPy without copying at query time
+    """
+
+    __slots__ = ("rows", "weights")
+
+    def __init__(self):
+        self.rows = array("i")
+        self.weights = array("f")
+
+
+class BM25Index:
+    """
+    增量BM25索引 - 更新时旧行打墓碑，墓碑过多时整体压缩；在事件循环线程中使用
+    Incremental BM25 index - updates tombstone the old row and compaction runs once tombstones pile up; used from the event loop thread
+    """
+
+    def __init__(self, field_boosts: Dict[str, float], k1: float = 1.2, b: float = 0.75):
+        self.field_boosts = field_boosts
+        self.k1 = k1
+        self.b = b
+
+        self._postings: Dict[str, _Postings] = {}
+        self._ids: List[Optional[str]] = []
+        self._row_by_id: Dict[str, int] = {}
+        self._fingerprints: Dict[str, str] = {}
+        self._documents: Dict[str, Dict[str, Any]] = {}
+        self._lengths = np.zeros(0, dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._expired = np.zeros(0, dtype=bool)
+        self._total_length = 0.0
+        self._tombstones = 0
+        self._loaded_from_database = False
+        self._load_lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._row_by_id)
+
+    def __contains__(self, job_id: str) -> bool:
+        return job_id in self._row_by_id
+
+    def _ensure_capacity(self, rows: int) -> None:
+        if rows <= self._lengths.size:
+            return
+        capacity = max(rows, self._lengths.size * 2, 1024)
+        grow = capacity - self._lengths.size
+        self._lengths = np.concatenate([self._lengths, np.zeros(grow, dtype=np.float32)])
+        self._alive = np.concatenate([self._alive, np.zeros(grow, dtype=bool)])
+        self._expired = np.concatenate([self._expired, np.zeros(grow, dtype=bool)])
+
+    def upsert(
+        self,
+        job_id: str,
+        title: Optional[str],
+        description: Optional[str],
+        skills: Any,
+        document: Optional[Dict[str, Any]] = None,
+        expired: bool = False
+    ) -> None:
+        """
+        插入或更新职位；文本未变时只更新过期标记和展示文档
+        Insert or update a job; when the text is unchanged only the expired flag and display document are updated
+        """
+        skills = skill_names(skills)
+        fields = {"title": title or "", "description": description or "", "skills": " ".join(skills)}
+        fingerprint = hashlib.blake2b("\x00".join(fields.values()).encode("utf-8"), digest_size=16).hexdigest()
+
+        if document is not None:
+            self._documents[job_id] = document
+        row = self._row_by_id.get(job_id)
+        if row is not None and self._fingerprints.get(job_id) == fingerprint:
+            self._expired[row] = expired
+            return
+        if row is not None:
+            self._drop_row(row)
+
+        frequencies: Dict[str, float] = {}
+        length = 0.0
+        for field, text in fields.items():
+            boost = self.field_boosts.get(field, 1.0)
+            tokens = tokenize(text)
+            length += boost * len(tokens)
+            for token in tokens:
+                frequencies[token] = frequencies.get(token, 0.0) + boost
+
+        row = len(self._ids)
+        self._ensure_capacity(row + 1)
+        self._ids.append(job_id)
+        self._row_by_id[job_id] = row
+        self._fingerprints[job_id] = fingerprint
+        self._lengths[row] = length
+        self._alive[row] = True
+        self._expired[row] = expired
+        self._total_length += length
+
+        for token, frequency in frequencies.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = _Postings()
+            postings.rows.append(row)
+            postings.weights.append(frequency)
+        self._maybe_compact()
+
+    def set_expired(self, job_id: str, expired: bool = True) -> bool:
+        """
+        标记职位过期（仍保留在索引中，供 expired 过滤使用）
+        Mark a job expired (it stays indexed for expired filters)
+        """
+        row = self._row_by_id.get(job_id)
+        if row is None:
+            return False
+        self._expired[row] = expired
+        document = self._documents.get(job_id)
+        if document is not None:
+            document["expired"] = expired
+        return True
+
+    def remove(self, job_id: str) -> bool:
+        """
+        从索引移除职位
+        Remove a job from the index
+        """
+        row = self._row_by_id.get(job_id)
+        if row is None:
+            return False
+        self._drop_row(row)
+        self._documents.pop(job_id, None)
+        self._fingerprints.pop(job_id, None)
+        self._maybe_compact()
+        return True
+
+    def expired_ids(self) -> List[str]:
+        """
+        返回所有过期职位的ID
+        Return the IDs of every expired job
+        """
+        return [self._ids[row] for row in np.flatnonzero(self._alive & self._expired)]
+
+    def remove_expired(self) -> List[str]:
+        """
+        移除所有过期职位，返回被移除的ID
+        Remove every expired job, returning the removed IDs
+        """
+        removed = self.expired_ids()
+        for job_id in removed:
+            self.remove(job_id)
+        return removed
+
+    def _drop_row(self, row: int) -> None:
+        job_id = self._ids[row]
+        self._row_by_id.pop(job_id, None)
+        self._ids[row] = None
+        self._alive[row] = False
+        self._expired[row] = False
+        self._total_length -= float(self._lengths[row])
+        self._tombstones += 1
+
+    def _maybe_compact(self) -> None:
+        if self._tombstones >= max(1000, len(self._row_by_id)):
+            self.compact()
+
+    def compact(self) -> None:
+        """
+        清除墓碑行并重新编号倒排链
+        Drop tombstoned rows and renumber the postings
+        """
+        size = len(self._ids)
+        alive = self._alive[:size]
+        new_rows = np.cumsum(alive, dtype=np.int64) - 1
+
+        for token in list(self._postings):
+            postings = self._postings[token]
+            rows = np.frombuffer(postings.rows, dtype=np.int32)
+            keep = alive[rows]
+            if not keep.any():
+                del self._postings[token]
+                continue
+            compacted = _Postings()
+            compacted.rows.frombytes(new_rows[rows[keep]].astype(np.int32).tobytes())
+            compacted.weights.frombytes(np.frombuffer(postings.weights, dtype=np.float32)[keep].tobytes())
+            del rows
+            self._postings[token] = compacted
+
+        self._ids = [job_id for job_id in self._ids if job_id is not None]
+        self._row_by_id = {job_id: row for row, job_id in enumerate(self._ids)}
+        live = len(self._ids)
+        self._lengths = np.concatenate([self._lengths[:size][alive], np.zeros(live, dtype=np.float32)])
+        self._expired = np.concatenate([self._expired[:size][alive], np.zeros(live, dtype=bool)])
+        self._alive = np.concatenate([np.ones(live, dtype=bool), np.zeros(live, dtype=bool)])
+        self._tombstones = 0
+        logger.info(f"BM25索引已压缩 / BM25 index compacted: {live} documents, {len(self._postings)} terms")
+
+    def search(self, query: str, top_k: int, expired: Optional[bool] = False) -> List[Tuple[str, float]]:
+        """
+        BM25检索，返回按得分降序的 (job_id, score)；expired 为 None 时不过滤过期状态
+        BM25 search returning (job_id, score) by descending score; expired=None does not filter on expiry
+        """
+        live = len(self._row_by_id)
+        terms = set(tokenize(query))
+        if not live or not terms or top_k <= 0:
+            return []
+
+        size = len(self._ids)
+        average_length = max(self._total_length / live, 1e-6)
+        scores = np.zeros(size, dtype=np.float32)
+        matched = False
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            matched = True
+            rows = np.frombuffer(postings.rows, dtype=np.int32)
+            frequencies = np.frombuffer(postings.weights, dtype=np.float32)
+            # 文档频率包含尚未压缩的墓碑行，压缩阈值限制了这一偏差
+            # Document frequency includes not-yet-compacted tombstones; the compaction threshold bounds the skew
+            document_frequency = rows.size
+            idf = math.log(1.0 + (live - document_frequency + 0.5) / (document_frequency + 0.5))
+            norms = self.k1 * (1.0 - self.b + self.b * self._lengths[rows] / average_length)
+            # 同一词项的倒排链中行号唯一，可直接按索引累加
+            # Rows are unique within one term's postings, so fancy-index accumulation is safe
+            scores[rows] += idf * frequencies * (self.k1 + 1.0) / (frequencies + norms)
+            del rows, frequencies
+
+        if not matched:
+            return []
+        mask = self._alive[:size]
+        if expired is not None:
+            mask = mask & (self._expired[:size] == expired)
+        scores[~mask] = 0.0
+
+        candidates = np.flatnonzero(scores > 0)
+        if candidates.size > top_k:
+            candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(self._ids[row], float(scores[row])) for row in candidates]
+
+    def get_document(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取随职位行登记的展示文档
+        Get the display document registered with a Job row
+        """
+        return self._documents.get(job_id)
+
+    def index_job(self, job: Job) -> None:
+        """
+        按 Job 行的当前状态索引或移除
+        Index or remove a Job row according to its current state
+        """
+        self.apply_entry(job.id, job_index_entry(job))
+
+    def apply_entry(self, job_id: str, entry: Optional[Dict[str, Any]]) -> None:
+        """
+        应用 job_index_entry 生成的条目，None 表示移除
+        Apply an entry produced by job_index_entry; None removes the job
+        """
+        if entry is None:
+            self.remove(job_id)
+            return
+        self.upsert(job_id, **entry)
+
+    def index_jobs(self, jobs: Iterable[Job]) -> None:
+        for job in jobs:
+            self.index_job(job)
+
+    async def load_from_database(self, page_size: int = 5000) -> int:
+        """
+        从 Job 表加载所有在架职位（按主键分页），进程内只执行一次；并发调用者等待加载完成，不会检索到部分索引
+        Load every active job from the Job table (keyset-paged by primary key); runs once per process, and concurrent
+        callers wait for the load to finish rather than searching a partial index
+        """
+        if self._loaded_from_database:
+            return 0
+        async with self._load_lock:
+            if self._loaded_from_database:
+                return 0
+
+            loaded = 0
+            last_id = ""
+            async with AsyncSessionLocal() as session:
+                while True:
+                    result = await session.execute(
+                        select(Job)
+                        .where(Job.is_active.is_(True), Job.id > last_id)
+                        .order_by(Job.id)
+                        .limit(page_size)
+                    )
+                    jobs = result.scalars().all()
+                    if not jobs:
+                        break
+                    self.index_jobs(jobs)
+                    loaded += len(jobs)
+                    last_id = jobs[-1].id
+                    session.expunge_all()
+            self._loaded_from_database = True
+        logger.info(f"已从Job表加载BM25索引 / Loaded BM25 index from the Job table: {loaded} jobs")
+        return loaded
+
+
+def job_index_entry(job: Job) -> Optional[Dict[str, Any]]:
+    """
+    Job 行对应的索引条目（upsert 的参数），已下架的职位为 None
+    The index entry (upsert arguments) of a Job row; None for jobs taken down
+    """
+    if not job.is_active:
+        return None
+    return {
+        "title": job.title,
+        "description": job.description,
+        "skills": job.skills,
+        "document": job_search_document(job),
+        "expired": bool(job.is_expired),
+    }
+
+
+def job_search_document(job: Job) -> Dict[str, Any]:
+    """
+    将 Job 行转换为检索结果文档（与检索索引中的文档字段一致，描述截断）
+    Convert a Job row to a search result document (same fields as the search index documents, description truncated)
+    """
+    return {
+        "id": job.id,
+        "title": job.title,
+        "company": job.company,
+        "location": job.location,
+        "salary": job.get_salary_range(),
+        "description": (job.description or "")[:DESCRIPTION_PREVIEW_CHARS],
+        "skills": skill_names(job.skills),
+        "source": job.source,
+        "url": job.application_url or "",
+        "indexed_at": job.updated_at.isoformat() if job.updated_at else None,
+        "expired": bool(job.is_expired),
+    }
+
+
+# 全局索引实例 - Global index instance
+bm25_index: Optional[BM25Index] = None
+
+
+def get_bm25_index() -> BM25Index:
+    """
+    获取BM25索引实例
+    Get the BM25 index instance
+    """
+    global bm25_index
+    if bm25_index is None:
+        bm25_index = BM25Index(
+            field_boosts=settings.LOCAL_SEARCH_FIELD_BOOSTS,
+            k1=settings.LOCAL_SEARCH_BM25_K1,
+            b=settings.LOCAL_SEARCH_BM25_B
+        )
+    return bm25_index
+
+
+def _apply_committed_rows(entries: Dict[str, Optional[Dict[str, Any]]]) -> None:
+    for job_id, entry in entries.items():
+        bm25_index.apply_entry(job_id, entry)
+
+
+# Job 行插入、更新（含过期）和删除提交后增量维护索引；回滚的变更不会进入索引，索引尚未创建时不做任何事
+# Maintain the index incrementally once Job inserts, updates (including expiry) and deletes commit; rolled-back changes
+# never reach the index, and nothing happens until the index exists
+subscribe_job_rows(
+    "bm25_index",
+    active=lambda: bm25_index is not None,
+    snapshot=job_index_entry,
+    apply=_apply_committed_rows
+)
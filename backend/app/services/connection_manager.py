@@ -0,0 +1,426 @@
+"""
+WebSocket连接管理服务
+WebSocket connection management service for JobCatcher
+每个用户可持有多个连接；消息经发布订阅分发，任一进程产生的结果都能送达其他进程持有的连接
+Each user may hold many sockets; frames are fanned out via pub/sub so results produced on any worker reach sockets held by another
+"""
+
+import asyncio
+import json
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+from uuid import uuid4
+
+from fastapi import WebSocket
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:  # Redis为可选依赖 / Redis is an optional dependency
+    redis_asyncio = None
+
+
+logger = logging.getLogger("service.connection_manager")
+
+# 分发处理函数: (user_id, 已序列化的消息) / Delivery handler: (user_id, serialized frame)
+DeliveryHandler = Callable[[str, str], Awaitable[None]]
+
+# 慢连接关闭码 - "Try Again Later" / Close code for slow consumers - "Try Again Later"
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+# 心跳超时关闭码 / Close code for heartbeat timeouts
+HEARTBEAT_TIMEOUT_CLOSE_CODE = 1001
+
+
+class PubSubBackend(ABC):
+    """
+    发布订阅后端基类 - 按用户频道分发消息
+    Base class for pub/sub backends - frames are routed on per-user channels
+    """
+
+    @abstractmethod
+    async def start(self, handler: DeliveryHandler) -> None:
+        """
+        开始接收消息
+        Start receiving frames
+        """
+        pass
+
+    @abstractmethod
+    async def subscribe(self, user_id: str) -> None:
+        """
+        订阅用户频道（本进程持有该用户的第一个连接时）
+        Subscribe to a user's channel (when this process holds the user's first socket)
+        """
+        pass
+
+    @abstractmethod
+    async def unsubscribe(self, user_id: str) -> None:
+        """
+        取消订阅用户频道（本进程不再持有该用户的连接时）
+        Unsubscribe from a user's channel (when this process no longer holds any of the user's sockets)
+        """
+        pass
+
+    @abstractmethod
+    async def publish(self, user_id: str, payload: str) -> None:
+        """
+        发布消息到用户频道
+        Publish a frame to a user's channel
+        """
+        pass
+
+    async def aclose(self) -> None:
+        """
+        关闭后端
+        Close the backend
+        """
+        return None
+
+
+class InMemoryPubSub(PubSubBackend):
+    """
+    进程内发布订阅 - 单进程部署使用
+    In-process pub/sub - for single-process deployments
+    """
+
+    def __init__(self):
+        self._handler: Optional[DeliveryHandler] = None
+        self._subscribed: Set[str] = set()
+
+    async def start(self, handler: DeliveryHandler) -> None:
+        self._handler = handler
+
+    async def subscribe(self, user_id: str) -> None:
+        self._subscribed.add(user_id)
+
+    async def unsubscribe(self, user_id: str) -> None:
+        self._subscribed.discard(user_id)
+
+    async def publish(self, user_id: str, payload: str) -> None:
+        if self._handler is not None and user_id in self._subscribed:
+            await self._handler(user_id, payload)
+
+
+class RedisPubSub(PubSubBackend):
+    """
+    Redis发布订阅 - 多个uvicorn进程或副本之间分发消息
+    Redis pub/sub - fans frames out across uvicorn workers and replicas
+    客户端可注入，测试时可替换为本地fake实现
+    The client is injectable so a local fake can stand in for tests
+    """
+
+    def __init__(self, client: Any, channel_prefix: str = "jobcatcher:ws"):
+        self.client = client
+        self.channel_prefix = channel_prefix
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+        self._handler: Optional[DeliveryHandler] = None
+
+    def _channel(self, user_id: str) -> str:
+        return f"{self.channel_prefix}:user:{user_id}"
+
+    async def start(self, handler: DeliveryHandler) -> None:
+        self._handler = handler
+        self._pubsub = self.client.pubsub()
+        # 先订阅控制频道以建立连接，用户频道随连接动态订阅
+        # Subscribe to a control channel first to open the connection; user channels follow sockets dynamically
+        await self._pubsub.subscribe(f"{self.channel_prefix}:control")
+        self._listener = asyncio.create_task(self._listen(), name="ws-pubsub-listener")
+
+    async def _listen(self) -> None:
+        """
+        监听循环 - 将收到的消息交给本地连接
+        Listener loop - hand received frames to local sockets
+        """
+        user_prefix = f"{self.channel_prefix}:user:"
+        while True:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Redis订阅读取失败 / Redis pub/sub read failed: {e}")
+                await asyncio.sleep(1.0)
+                continue
+            if not message or message.get("type") != "message":
+                continue
+
+            channel = message["channel"]
+            channel = channel.decode("utf-8") if isinstance(channel, bytes) else channel
+            if not channel.startswith(user_prefix):
+                continue
+            data = message["data"]
+            data = data.decode("utf-8") if isinstance(data, bytes) else data
+            await self._handler(channel[len(user_prefix):], data)
+
+    async def subscribe(self, user_id: str) -> None:
+        await self._pubsub.subscribe(self._channel(user_id))
+
+    async def unsubscribe(self, user_id: str) -> None:
+        await self._pubsub.unsubscribe(self._channel(user_id))
+
+    async def publish(self, user_id: str, payload: str) -> None:
+        await self.client.publish(self._channel(user_id), payload)
+
+    async def aclose(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+        await self.client.aclose()
+
+
+class WebSocketConnection:
+    """
+    单个WebSocket连接 - 独立的有界发送队列和发送任务
+    A single WebSocket connection - with its own bounded send queue and sender task
+    """
+
+    def __init__(self, websocket: WebSocket, user_id: str, queue_size: int):
+        self.id = str(uuid4())
+        self.user_id = user_id
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.last_seen = time.monotonic()
+        self.consecutive_drops = 0
+        self.sender: Optional[asyncio.Task] = None
+        # 该连接上进行中的消息处理任务 / Message handler tasks in flight on this socket
+        self.tasks: Set[asyncio.Task] = set()
+        self.closed = False
+
+    def mark_alive(self) -> None:
+        """
+        收到客户端消息时调用 / Called whenever a client frame arrives
+        """
+        self.last_seen = time.monotonic()
+
+    def track(self, task: asyncio.Task) -> None:
+        """
+        登记消息处理任务，断开时取消 / Register a message handler task, cancelled on disconnect
+        """
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+
+class ConnectionManager:
+    """
+    WebSocket连接注册表 - 每用户多连接、发布订阅分发、心跳和背压
+    WebSocket connection registry - many sockets per user, pub/sub fan-out, heartbeats and backpressure
+    """
+
+    def __init__(
+        self,
+        pubsub: Optional[PubSubBackend] = None,
+        send_queue_size: Optional[int] = None,
+        slow_consumer_max_drops: Optional[int] = None,
+        heartbeat_interval: Optional[float] = None,
+        heartbeat_timeout: Optional[float] = None
+    ):
+        self.pubsub = pubsub
+        self.send_queue_size = send_queue_size or settings.WS_SEND_QUEUE_SIZE
+        self.slow_consumer_max_drops = slow_consumer_max_drops or settings.WS_SLOW_CONSUMER_MAX_DROPS
+        self.heartbeat_interval = heartbeat_interval or settings.WS_HEARTBEAT_INTERVAL_SECONDS
+        self.heartbeat_timeout = heartbeat_timeout or settings.WS_HEARTBEAT_TIMEOUT_SECONDS
+        self.active_connections: Dict[str, Dict[str, WebSocketConnection]] = defaultdict(dict)
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._started = False
+
+    async def start(self) -> None:
+        """
+        启动发布订阅和心跳
+        Start pub/sub delivery and heartbeats
+        """
+        if self._started:
+            return
+        if self.pubsub is None:
+            self.pubsub = create_pubsub_backend()
+        await self.pubsub.start(self._deliver_local)
+        self._heartbeat = asyncio.create_task(self._heartbeat_loop(), name="ws-heartbeat")
+        self._started = True
+
+    async def stop(self) -> None:
+        """
+        关闭所有本地连接并停止后台任务
+        Close all local sockets and stop background tasks
+        """
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            await asyncio.gather(self._heartbeat, return_exceptions=True)
+            self._heartbeat = None
+        for connections in list(self.active_connections.values()):
+            for connection in list(connections.values()):
+                await self._close(connection, code=1001)
+        if self.pubsub is not None:
+            await self.pubsub.aclose()
+        self._started = False
+
+    async def connect(self, websocket: WebSocket, user_id: str) -> WebSocketConnection:
+        """
+        接受连接并注册 - 同一用户的其他标签页不受影响
+        Accept and register a socket - the user's other tabs are unaffected
+        """
+        if not self._started:
+            await self.start()
+        await websocket.accept()
+
+        connection = WebSocketConnection(websocket, user_id, self.send_queue_size)
+        connection.sender = asyncio.create_task(self._send_loop(connection), name=f"ws-sender-{connection.id}")
+        first_socket = not self.active_connections[user_id]
+        self.active_connections[user_id][connection.id] = connection
+        if first_socket:
+            await self.pubsub.subscribe(user_id)
+
+        self._update_gauges()
+        logger.info(f"用户 {user_id} WebSocket连接已建立 / User {user_id} WebSocket connected ({connection.id})")
+        return connection
+
+    async def disconnect(self, connection: WebSocketConnection) -> None:
+        """
+        注销连接并取消其进行中的消息处理，最后一个连接断开时取消订阅
+        Unregister a socket and cancel its in-flight message handling, unsubscribing when the user's last socket goes away
+        """
+        connection.closed = True
+        current = asyncio.current_task()
+        for task in [connection.sender, *connection.tasks]:
+            if task is not None and task is not current:
+                task.cancel()
+
+        user_connections = self.active_connections.get(connection.user_id)
+        if user_connections is None or user_connections.pop(connection.id, None) is None:
+            return
+        if not user_connections:
+            del self.active_connections[connection.user_id]
+            await self.pubsub.unsubscribe(connection.user_id)
+
+        self._update_gauges()
+        logger.info(f"用户 {connection.user_id} WebSocket连接已断开 / User {connection.user_id} WebSocket disconnected ({connection.id})")
+
+    async def send_personal_message(self, message: dict, user_id: str) -> None:
+        """
+        发送消息给用户的所有连接（无论连接在哪个进程）
+        Send a frame to all of the user's sockets, whichever process holds them
+        """
+        payload = json.dumps(message, ensure_ascii=False, default=str)
+        try:
+            await self.pubsub.publish(str(user_id), payload)
+        except Exception as e:
+            metrics.increment("ws_frames_dropped_total", reason="publish_failed")
+            logger.error(f"WebSocket消息发布失败 / Failed to publish WebSocket frame: {e}")
+
+    def send_to_connection(self, connection: WebSocketConnection, message: dict) -> None:
+        """
+        只发送给指定连接（如心跳回复），队列满时丢弃
+        Send to one socket only (e.g. heartbeat replies), dropping the frame when its queue is full
+        """
+        try:
+            connection.queue.put_nowait(json.dumps(message, ensure_ascii=False, default=str))
+        except asyncio.QueueFull:
+            metrics.increment("ws_frames_dropped_total", reason="queue_full")
+
+    async def _deliver_local(self, user_id: str, payload: str) -> None:
+        """
+        投递到本进程持有的连接 - 队列满时丢弃，连续丢弃过多则断开慢连接
+        Deliver to sockets held by this process - drop when the queue is full and close sockets that keep falling behind
+        """
+        for connection in list(self.active_connections.get(user_id, {}).values()):
+            try:
+                connection.queue.put_nowait(payload)
+                connection.consecutive_drops = 0
+            except asyncio.QueueFull:
+                connection.consecutive_drops += 1
+                metrics.increment("ws_frames_dropped_total", reason="queue_full")
+                if connection.consecutive_drops >= self.slow_consumer_max_drops:
+                    metrics.increment("ws_slow_consumer_disconnects_total")
+                    logger.warning(f"断开慢连接 / Closing slow WebSocket consumer: {connection.id}")
+                    await self._close(connection, code=SLOW_CONSUMER_CLOSE_CODE)
+
+    async def _send_loop(self, connection: WebSocketConnection) -> None:
+        """
+        发送循环 - 每个连接独立发送，慢连接不阻塞其他连接
+        Sender loop - each socket sends independently so a slow socket never blocks the others
+        """
+        try:
+            while True:
+                payload = await connection.queue.get()
+                await connection.websocket.send_text(payload)
+                metrics.increment("ws_frames_sent_total")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.info(f"WebSocket发送失败，移除连接 / WebSocket send failed, dropping socket {connection.id}: {e}")
+            await self.disconnect(connection)
+
+    async def _heartbeat_loop(self) -> None:
+        """
+        心跳循环 - 定期发送ping，关闭长时间没有客户端消息的连接（发送成功只说明写入了缓冲区，不代表客户端仍在）
+        Heartbeat loop - send periodic pings and close sockets with no client frame for too long (a completed send only
+        means the frame reached a buffer, not that the client is still there)
+        """
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            now = time.monotonic()
+            ping = json.dumps({"type": "ping", "timestamp": datetime.now().isoformat()})
+            for connections in list(self.active_connections.values()):
+                for connection in list(connections.values()):
+                    if now - connection.last_seen > self.heartbeat_timeout:
+                        metrics.increment("ws_heartbeat_timeouts_total")
+                        await self._close(connection, code=HEARTBEAT_TIMEOUT_CLOSE_CODE)
+                        continue
+                    try:
+                        connection.queue.put_nowait(ping)
+                    except asyncio.QueueFull:
+                        pass
+
+    async def _close(self, connection: WebSocketConnection, code: int) -> None:
+        await self.disconnect(connection)
+        try:
+            await connection.websocket.close(code=code)
+        except Exception:
+            pass
+
+    def _update_gauges(self) -> None:
+        metrics.set_gauge("ws_connected_users", len(self.active_connections))
+        metrics.set_gauge(
+            "ws_connected_sockets",
+            sum(len(connections) for connections in self.active_connections.values())
+        )
+
+
+def create_pubsub_backend() -> PubSubBackend:
+    """
+    按配置创建发布订阅后端，Redis不可用时回退到进程内后端
+    Create the configured pub/sub backend, falling back to in-process delivery when Redis is unavailable
+    """
+    if settings.WS_PUBSUB_BACKEND == "redis":
+        if settings.REDIS_URL and redis_asyncio is not None:
+            return RedisPubSub(
+                redis_asyncio.from_url(settings.REDIS_URL),
+                channel_prefix=settings.WS_PUBSUB_CHANNEL_PREFIX
+            )
+        logger.warning("Redis不可用，WebSocket使用进程内分发 / Redis unavailable, WebSocket uses in-process delivery")
+    return InMemoryPubSub()
+
+
+# 全局连接管理器实例 - Global connection manager instance
+connection_manager: Optional[ConnectionManager] = None
+
+
+def get_connection_manager() -> ConnectionManager:
+    """
+    获取WebSocket连接管理器实例
+    Get the WebSocket connection manager instance
+    """
+    global connection_manager
+    if connection_manager is None:
+        connection_manager = ConnectionManager()
+    return connection_manager
@@ -0,0 +1,298 @@
+"""
+嵌入向量缓存服务
+Embedding cache service for JobCatcher
+以 SHA-256(模型, 归一化文本) 为键的内容寻址缓存：进程内LRU + 本地SQLite(float32) + 可选Redis
+Content-addressed cache keyed by SHA-256(model, normalized text): in-process LRU + local SQLite (float32) + optional Redis
+"""
+
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.single_flight import SingleFlight, request_fingerprint
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:  # Redis为可选依赖 / Redis is an optional dependency
+    redis_asyncio = None
+
+
+logger = logging.getLogger("service.embedding_cache")
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def embedding_cache_key(model: str, text: str) -> str:
+    """
+    计算缓存键 - 折叠空白后对(模型, 文本)取SHA-256
+    Compute the cache key - SHA-256 of (model, text) after collapsing whitespace
+    """
+    normalized = _WHITESPACE_PATTERN.sub(" ", text).strip()
+    return hashlib.sha256(f"{model}\x00{normalized}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    三级嵌入向量缓存 - LRU在前，SQLite持久化，Redis跨进程共享（可选）
+    Three-tier embedding cache - LRU first, SQLite for persistence, Redis shared across processes (optional)
+    """
+
+    def __init__(self, path: str, max_entries: int = 10000, redis_url: Optional[str] = None):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL) WITHOUT ROWID"
+        )
+        self._db.commit()
+
+        self._redis = None
+        if redis_url and redis_asyncio is not None:
+            self._redis = redis_asyncio.from_url(redis_url)
+        elif redis_url:
+            logger.warning("未安装redis，仅使用本地嵌入缓存 / redis not installed, using local embedding cache only")
+
+    def get_many_local(self, keys: Sequence[str]) -> Dict[str, np.ndarray]:
+        """
+        从LRU和SQLite读取向量
+        Read vectors from the LRU and SQLite tiers
+        """
+        found: Dict[str, np.ndarray] = {}
+        missing: List[str] = []
+        with self._lock:
+            for key in keys:
+                vector = self._entries.get(key)
+                if vector is None:
+                    missing.append(key)
+                    continue
+                self._entries.move_to_end(key)
+                found[key] = vector
+        if found:
+            metrics.increment("embedding_cache_hit_total", len(found), tier="memory")
+
+        if missing:
+            disk_hits: Dict[str, np.ndarray] = {}
+            with self._lock:
+                for offset in range(0, len(missing), 500):
+                    chunk = missing[offset:offset + 500]
+                    rows = self._db.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                        chunk
+                    ).fetchall()
+                    for key, blob in rows:
+                        disk_hits[key] = np.frombuffer(blob, dtype=np.float32)
+            if disk_hits:
+                metrics.increment("embedding_cache_hit_total", len(disk_hits), tier="sqlite")
+                self._set_lru(disk_hits)
+                found.update(disk_hits)
+        return found
+
+    async def get_many(self, keys: Sequence[str]) -> Dict[str, np.ndarray]:
+        """
+        依次查询LRU、SQLite和Redis
+        Look up the LRU, SQLite and Redis tiers in turn
+        """
+        found = self.get_many_local(keys)
+        missing = [key for key in keys if key not in found]
+
+        if missing and self._redis is not None:
+            try:
+                blobs = await self._redis.mget([f"emb:{key}" for key in missing])
+            except Exception as e:
+                logger.warning(f"Redis嵌入缓存读取失败 / Redis embedding cache read failed: {e}")
+                blobs = []
+            redis_hits = {
+                key: np.frombuffer(blob, dtype=np.float32)
+                for key, blob in zip(missing, blobs) if blob is not None
+            }
+            if redis_hits:
+                metrics.increment("embedding_cache_hit_total", len(redis_hits), tier="redis")
+                self._store_local(redis_hits)
+                found.update(redis_hits)
+
+        misses = len(set(keys) - found.keys())
+        if misses:
+            metrics.increment("embedding_cache_miss_total", misses)
+        return found
+
+    def set_many_local(self, vectors: Dict[str, np.ndarray]) -> None:
+        """
+        写入LRU和SQLite
+        Write to the LRU and SQLite tiers
+        """
+        self._store_local(vectors)
+
+    async def set_many(self, vectors: Dict[str, np.ndarray]) -> None:
+        """
+        写入所有层级 - 内容寻址的向量不会过期
+        Write to every tier - content-addressed vectors never go stale
+        """
+        self._store_local(vectors)
+        if self._redis is not None and vectors:
+            try:
+                async with self._redis.pipeline(transaction=False) as pipe:
+                    for key, vector in vectors.items():
+                        pipe.set(f"emb:{key}", vector.tobytes(), ex=settings.EMBEDDING_CACHE_REDIS_TTL_SECONDS)
+                    await pipe.execute()
+            except Exception as e:
+                logger.warning(f"Redis嵌入缓存写入失败 / Redis embedding cache write failed: {e}")
+
+    def _store_local(self, vectors: Dict[str, np.ndarray]) -> None:
+        if not vectors:
+            return
+        self._set_lru(vectors)
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, vector.tobytes()) for key, vector in vectors.items()]
+            )
+            self._db.commit()
+
+    def _set_lru(self, vectors: Dict[str, np.ndarray]) -> None:
+        with self._lock:
+            for key, vector in vectors.items():
+                self._entries[key] = vector
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def aclose(self) -> None:
+        """
+        关闭SQLite和Redis连接
+        Close the SQLite and Redis connections
+        """
+        with self._lock:
+            self._db.close()
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    带缓存的嵌入模型包装 - 只对未命中的文本调用嵌入API
+    Caching wrapper for an embedding model - only texts that miss the cache reach the embedding API
+    """
+
+    def __init__(self, underlying: Embeddings, model: str, cache: EmbeddingCache):
+        self.underlying = underlying
+        self.model = model
+        self.cache = cache
+
+    def _keys(self, texts: List[str]) -> List[str]:
+        return [embedding_cache_key(self.model, text) for text in texts]
+
+    @staticmethod
+    def _unique_misses(texts: List[str], keys: List[str], found: Dict[str, np.ndarray]) -> Dict[str, str]:
+        # 同一批次中重复的文本只嵌入一次 / Duplicate texts within a batch are embedded once
+        misses: Dict[str, str] = {}
+        for text, key in zip(texts, keys):
+            if key not in found and key not in misses:
+                misses[key] = text
+        return misses
+
+    @staticmethod
+    def _to_arrays(keys: List[str], vectors: List[List[float]]) -> Dict[str, np.ndarray]:
+        return {key: np.asarray(vector, dtype=np.float32) for key, vector in zip(keys, vectors)}
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = self._keys(texts)
+        found = await self.cache.get_many(keys)
+        misses = self._unique_misses(texts, keys, found)
+        if misses:
+            metrics.increment("embedding_api_texts_total", len(misses))
+            embedded = self._to_arrays(list(misses), await self.underlying.aembed_documents(list(misses.values())))
+            await self.cache.set_many(embedded)
+            found.update(embedded)
+        return [found[key].tolist() for key in keys]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = embedding_cache_key(self.model, text)
+        found = await self.cache.get_many([key])
+        if key not in found:
+            metrics.increment("embedding_api_texts_total")
+            found = self._to_arrays([key], [await self.underlying.aembed_query(text)])
+            await self.cache.set_many(found)
+        return found[key].tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = self._keys(texts)
+        found = self.cache.get_many_local(keys)
+        misses = self._unique_misses(texts, keys, found)
+        if misses:
+            metrics.increment("embedding_api_texts_total", len(misses))
+            embedded = self._to_arrays(list(misses), self.underlying.embed_documents(list(misses.values())))
+            self.cache.set_many_local(embedded)
+            found.update(embedded)
+        return [found[key].tolist() for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = embedding_cache_key(self.model, text)
+        found = self.cache.get_many_local([key])
+        if key not in found:
+            metrics.increment("embedding_api_texts_total")
+            found = self._to_arrays([key], [self.underlying.embed_query(text)])
+            self.cache.set_many_local(found)
+        return found[key].tolist()
+
+
+class SingleFlightEmbeddings(Embeddings):
+    """
+    单飞嵌入模型包装 - 并发的相同异步嵌入请求只调用一次下层模型
+    Single-flight embedding wrapper - concurrent identical async embedding requests reach the underlying model once
+    """
+
+    def __init__(self, underlying: Embeddings, model: str, flight: Optional[SingleFlight] = None):
+        self.underlying = underlying
+        self.model = model
+        self.flight = flight or SingleFlight("embeddings")
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.flight.do(
+            request_fingerprint(self.model, "documents", texts),
+            lambda: self.underlying.aembed_documents(texts)
+        )
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self.flight.do(
+            request_fingerprint(self.model, "query", text),
+            lambda: self.underlying.aembed_query(text)
+        )
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.underlying.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.underlying.embed_query(text)
+
+
+# 全局缓存实例 - Global cache instance
+embedding_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """
+    获取嵌入向量缓存实例
+    Get the embedding cache instance
+    """
+    global embedding_cache
+    if embedding_cache is None:
+        embedding_cache = EmbeddingCache(
+            path=settings.EMBEDDING_CACHE_PATH,
+            max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES,
+            redis_url=settings.REDIS_URL
+        )
+    return embedding_cache
@@ -11,15 +11,16 @@ External API service integration - JobCatcher external data sources
 - PDFMonkey (PDF生成)
 """
 
-import asyncio
-import aiohttp
 import logging
-from typing import Dict, List, Any, Optional
+from typing import AsyncIterator, Dict, List, Any, Optional
 from datetime import datetime
 import json
 import os
 
 from app.core.config import settings
+from app.services.http_clients import get_http_client
+from app.services.search_result_cache import cached_job_search
+from app.services.job_search_stream import SourceSearch, stream_job_search
 
 logger = logging.getLogger(__name__)
 
@@ -42,16 +43,6 @@ class ExternalAPIService:
         self.coresignal_key = os.getenv("CORESIGNAL_KEY")
         self.apilayer_key = os.getenv("APILAYER_KEY")
         self.pdfmonkey_key = os.getenv("PDFMONKEY_KEY")
-        
-        self.session = None
-        
-    async def _get_session(self) -> aiohttp.ClientSession:
-        """
-        获取HTTP会话 / Get HTTP session
-        """
-        if not self.session:
-            self.session = aiohttp.ClientSession()
-        return self.session
     
     async def search_stepstone_jobs(
         self, 
@@ -73,56 +64,64 @@ class ExternalAPIService:
                 logger.warning("Apify token not configured, returning mock data")
                 return await self._get_mock_stepstone_jobs(keywords, max_results)
             
-            session = await self._get_session()
-            
-            # Apify StepStone Actor配置
-            # Apify StepStone Actor configuration
-            payload = {
-                "keywords": keywords,
-                "location": location,
-                "maxItems": max_results,
-                "outputFields": [
-                    "title", "company", "location", "salary", 
-                    "jobUrl", "description", "postedAt", "jobType"
-                ]
-            }
-            
-            url = "https://api.apify.com/v2/acts/YOUR_STEPSTONE_ACTOR_ID/run-sync-get-dataset-items"
-            headers = {
-                "Authorization": f"Bearer {self.apify_token}",
-                "Content-Type": "application/json"
-            }
-            
-            async with session.post(url, json=payload, headers=headers) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    jobs = []
-                    
-                    for item in data:
-                        job = {
-                            "id": f"stepstone_{item.get('jobUrl', '').split('/')[-1]}",
-                            "title": item.get("title", ""),
-                            "company": item.get("company", ""),
-                            "location": item.get("location", ""),
-                            "salary": item.get("salary", ""),
-                            "source": "StepStone",
-                            "url": item.get("jobUrl", ""),
-                            "description": item.get("description", "")[:500],
-                            "posted_date": item.get("postedAt", ""),
-                            "job_type": item.get("jobType", "")
-                        }
-                        jobs.append(job)
-                    
-                    logger.info(f"Retrieved {len(jobs)} jobs from StepStone")
-                    return jobs
-                else:
-                    logger.error(f"StepStone API error: {response.status}")
-                    return await self._get_mock_stepstone_jobs(keywords, max_results)
+            return await cached_job_search(
+                "stepstone", keywords, location, max_results,
+                lambda: self._fetch_stepstone_jobs(keywords, location, max_results)
+            )
                     
         except Exception as e:
             logger.error(f"Error calling StepStone API: {e}")
             return await self._get_mock_stepstone_jobs(keywords, max_results)
     
+    async def _fetch_stepstone_jobs(self, keywords: str, location: str, max_results: int) -> List[Dict[str, Any]]:
+        """
+        调用Apify StepStone爬虫，失败时抛出异常（不写入缓存）
+        Call the Apify StepStone scraper; raises on failure (nothing is cached)
+        """
+        client = get_http_client("apify")
+        
+        # Apify StepStone Actor配置
+        # Apify StepStone Actor configuration
+        payload = {
+            "keywords": keywords,
+            "location": location,
+            "maxItems": max_results,
+            "outputFields": [
+                "title", "company", "location", "salary", 
+                "jobUrl", "description", "postedAt", "jobType"
+            ]
+        }
+        
+        url = "https://api.apify.com/v2/acts/YOUR_STEPSTONE_ACTOR_ID/run-sync-get-dataset-items"
+        headers = {
+            "Authorization": f"Bearer {self.apify_token}",
+            "Content-Type": "application/json"
+        }
+        
+        response = await client.post(url, json=payload, headers=headers)
+        if response.status_code == 200:
+            data = response.json()
+            jobs = []
+            
+            for item in data:
+                job = {
+                    "id": f"stepstone_{item.get('jobUrl', '').split('/')[-1]}",
+                    "title": item.get("title", ""),
+                    "company": item.get("company", ""),
+                    "location": item.get("location", ""),
+                    "salary": item.get("salary", ""),
+                    "source": "StepStone",
+                    "url": item.get("jobUrl", ""),
+                    "description": item.get("description", "")[:500],
+                    "posted_date": item.get("postedAt", ""),
+                    "job_type": item.get("jobType", "")
+                }
+                jobs.append(job)
+            
+            logger.info(f"Retrieved {len(jobs)} jobs from StepStone")
+            return jobs
+        raise RuntimeError(f"StepStone API error: {response.status_code}")
+    
     async def search_google_jobs(
         self, 
         keywords: str, 
@@ -138,48 +137,56 @@ class ExternalAPIService:
                 logger.warning("SerpAPI key not configured, returning mock data")
                 return await self._get_mock_google_jobs(keywords, max_results)
             
-            session = await self._get_session()
-            
-            params = {
-                "engine": "google_jobs",
-                "q": keywords,
-                "location": location,
-                "api_key": self.serpapi_key,
-                "num": min(max_results, 10)  # SerpAPI限制
-            }
-            
-            url = "https://serpapi.com/search"
-            
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    jobs = []
-                    
-                    for item in data.get("jobs_results", []):
-                        job = {
-                            "id": f"google_{item.get('job_id', '')}",
-                            "title": item.get("title", ""),
-                            "company": item.get("company_name", ""),
-                            "location": item.get("location", ""),
-                            "salary": item.get("detected_extensions", {}).get("salary", ""),
-                            "source": "Google Jobs",
-                            "url": item.get("share_link", ""),
-                            "description": item.get("description", "")[:500],
-                            "posted_date": item.get("detected_extensions", {}).get("posted_at", ""),
-                            "job_type": item.get("detected_extensions", {}).get("schedule_type", "")
-                        }
-                        jobs.append(job)
-                    
-                    logger.info(f"Retrieved {len(jobs)} jobs from Google Jobs")
-                    return jobs
-                else:
-                    logger.error(f"Google Jobs API error: {response.status}")
-                    return await self._get_mock_google_jobs(keywords, max_results)
+            return await cached_job_search(
+                "google_jobs", keywords, location, max_results,
+                lambda: self._fetch_google_jobs(keywords, location, max_results)
+            )
                     
         except Exception as e:
             logger.error(f"Error calling Google Jobs API: {e}")
             return await self._get_mock_google_jobs(keywords, max_results)
     
+    async def _fetch_google_jobs(self, keywords: str, location: str, max_results: int) -> List[Dict[str, Any]]:
+        """
+        调用SerpAPI Google Jobs，失败时抛出异常（不写入缓存）
+        Call SerpAPI Google Jobs; raises on failure (nothing is cached)
+        """
+        client = get_http_client("serpapi")
+        
+        params = {
+            "engine": "google_jobs",
+            "q": keywords,
+            "location": location,
+            "api_key": self.serpapi_key,
+            "num": min(max_results, 10)  # SerpAPI限制
+        }
+        
+        url = "https://serpapi.com/search"
+        
+        response = await client.get(url, params=params)
+        if response.status_code == 200:
+            data = response.json()
+            jobs = []
+            
+            for item in data.get("jobs_results", []):
+                job = {
+                    "id": f"google_{item.get('job_id', '')}",
+                    "title": item.get("title", ""),
+                    "company": item.get("company_name", ""),
+                    "location": item.get("location", ""),
+                    "salary": item.get("detected_extensions", {}).get("salary", ""),
+                    "source": "Google Jobs",
+                    "url": item.get("share_link", ""),
+                    "description": item.get("description", "")[:500],
+                    "posted_date": item.get("detected_extensions", {}).get("posted_at", ""),
+                    "job_type": item.get("detected_extensions", {}).get("schedule_type", "")
+                }
+                jobs.append(job)
+            
+            logger.info(f"Retrieved {len(jobs)} jobs from Google Jobs")
+            return jobs
+        raise RuntimeError(f"Google Jobs API error: {response.status_code}")
+    
     async def search_all_sources(
         self, 
         keywords: str, 
@@ -191,26 +198,11 @@ class ExternalAPIService:
         Search all job sources in parallel - Claude 4 will intelligently merge and analyze results
         """
         try:
-            logger.info(f"Searching all sources for: {keywords}")
-            
-            # 并行调用所有数据源 / Call all data sources in parallel
-            tasks = [
-                self.search_stepstone_jobs(keywords, location, max_results_per_source),
-                self.search_google_jobs(keywords, location, max_results_per_source),
-                # 可以添加更多数据源 / Can add more data sources
-                # self.search_jobspikr(keywords, location, max_results_per_source),
-                # self.search_coresignal(keywords, location, max_results_per_source)
-            ]
-            
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            # 合并所有结果 / Merge all results
+            # 汇总流式批次，截止时间后返回部分结果 / Collect the streamed batches; partial results after the deadline
             all_jobs = []
-            for result in results:
-                if isinstance(result, list):
-                    all_jobs.extend(result)
-                elif isinstance(result, Exception):
-                    logger.error(f"Error in parallel search: {result}")
+            async for event in self.stream_all_sources(keywords, location, max_results_per_source):
+                if event["type"] == "batch":
+                    all_jobs.extend(event["jobs"])
             
             logger.info(f"Total jobs found: {len(all_jobs)}")
             return all_jobs
@@ -219,6 +211,31 @@ class ExternalAPIService:
             logger.error(f"Error in search_all_sources: {e}")
             return []
     
+    async def stream_all_sources(
+        self,
+        keywords: str,
+        location: str = "Germany",
+        max_results_per_source: int = 10
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        流式搜索所有职位数据源 - 每个数据源完成即产出一批去重后的职位
+        Stream all job sources - yields a batch of deduplicated jobs as each source completes
+        """
+        logger.info(f"Searching all sources for: {keywords}")
+        
+        searches: Dict[str, SourceSearch] = {
+            "stepstone": lambda: self.search_stepstone_jobs(keywords, location, max_results_per_source),
+            "google_jobs": lambda: self.search_google_jobs(keywords, location, max_results_per_source),
+            # 可以添加更多数据源 / Can add more data sources
+            # "jobspikr": lambda: self.search_jobspikr(keywords, location, max_results_per_source),
+            # "coresignal": lambda: self.search_coresignal(keywords, location, max_results_per_source)
+        }
+        
+        async for event in stream_job_search(searches, settings.SEARCH_DEADLINE_SECONDS):
+            if event["type"] == "source_error":
+                logger.error(f"Error in parallel search: {event['source']}: {event['error']}")
+            yield event
+    
     async def _get_mock_stepstone_jobs(self, keywords: str, max_results: int) -> List[Dict[str, Any]]:
         """
         StepStone模拟数据 - 开发阶段使用
@@ -260,10 +277,3 @@ class ExternalAPIService:
             }
             for i in range(min(max_results, 5))
         ]
-    
-    async def close(self):
-        """
-        关闭HTTP会话 / Close HTTP session
-        """
-        if self.session:
-            await self.session.close() 
\ No newline at end of file
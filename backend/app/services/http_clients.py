@@ -0,0 +1,159 @@
+"""
+出站HTTP客户端注册表
+Outbound HTTP client registry for JobCatcher
+每个外部集成（Apify、SerpAPI、PDFMonkey…）一个长期存在的 httpx 客户端：独立连接池、保活、超时和指标，
+在应用生命周期中创建和关闭；安装 h2 时启用HTTP/2
+One long-lived httpx client per external integration (Apify, SerpAPI, PDFMonkey...): its own connection pool, keep-alive,
+timeouts and metrics, created and closed with the application lifespan; HTTP/2 is enabled when h2 is installed
+"""
+
+import logging
+import time
+from typing import Dict, Optional
+
+import httpx
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+try:
+    import h2  # noqa: F401
+except ImportError:  # HTTP/2为可选依赖，缺失时使用HTTP/1.1 / HTTP/2 is optional; HTTP/1.1 is used without it
+    h2 = None
+
+
+logger = logging.getLogger("service.http_clients")
+
+
+class InstrumentedTransport(httpx.AsyncHTTPTransport):
+    """
+    记录每个集成的请求数、状态码、耗时和网络错误的传输层
+    Transport that records request counts, status codes, latency and network errors per integration
+    """
+
+    def __init__(self, integration: str, **kwargs):
+        super().__init__(**kwargs)
+        self.integration = integration
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.perf_counter()
+        try:
+            response = await super().handle_async_request(request)
+        except httpx.TransportError as e:
+            metrics.increment("http_client_errors_total", integration=self.integration, error=type(e).__name__)
+            raise
+        finally:
+            metrics.observe("http_client_request_ms", (time.perf_counter() - started) * 1000, integration=self.integration)
+        metrics.increment(
+            "http_client_requests_total",
+            integration=self.integration,
+            status=f"{response.status_code // 100}xx"
+        )
+        return response
+
+
+class HTTPClientRegistry:
+    """
+    HTTP客户端注册表 - 按集成名懒创建客户端，同一集成始终复用同一连接池
+    HTTP client registry - clients are created lazily per integration name and always reuse the same pool
+    """
+
+    def __init__(
+        self,
+        timeouts: Dict[str, float],
+        default_timeout: float = 30.0,
+        connect_timeout: float = 10.0,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 60.0,
+        http2: bool = True,
+        connection_limits: Optional[Dict[str, int]] = None
+    ):
+        self.timeouts = timeouts
+        self.default_timeout = default_timeout
+        self.connect_timeout = connect_timeout
+        self.max_connections = max_connections
+        self.connection_limits = connection_limits or {}
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.http2 = http2 and h2 is not None
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+        if http2 and h2 is None:
+            logger.info("未安装h2，出站请求使用HTTP/1.1 / h2 not installed, outbound requests use HTTP/1.1")
+
+    def get(self, integration: str) -> httpx.AsyncClient:
+        """
+        获取集成的共享客户端
+        Get the shared client of an integration
+        """
+        client = self._clients.get(integration)
+        if client is None or client.is_closed:
+            timeout = self.timeouts.get(integration, self.default_timeout)
+            # 每个集成基本对应一个主机，客户端级连接上限即该主机的连接上限；访问多个主机的集成可单独配置总上限
+            # Each integration maps to essentially one host, so the per-client limit is that host's limit; integrations
+            # that reach many hosts can configure their own total
+            limits = httpx.Limits(
+                max_connections=self.connection_limits.get(integration, self.max_connections),
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry
+            )
+            client = httpx.AsyncClient(
+                transport=InstrumentedTransport(integration, limits=limits, http2=self.http2),
+                timeout=httpx.Timeout(timeout, connect=min(self.connect_timeout, timeout))
+            )
+            self._clients[integration] = client
+        return client
+
+    async def aclose(self) -> None:
+        """
+        关闭所有客户端连接池
+        Close every client connection pool
+        """
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            await client.aclose()
+
+
+# 全局注册表实例 - Global registry instance
+http_client_registry: Optional[HTTPClientRegistry] = None
+
+
+def get_http_client_registry() -> HTTPClientRegistry:
+    """
+    获取HTTP客户端注册表实例
+    Get the HTTP client registry instance
+    """
+    global http_client_registry
+    if http_client_registry is None:
+        http_client_registry = HTTPClientRegistry(
+            timeouts=settings.HTTP_CLIENT_TIMEOUT_SECONDS,
+            default_timeout=settings.HTTP_CLIENT_DEFAULT_TIMEOUT_SECONDS,
+            connect_timeout=settings.HTTP_CLIENT_CONNECT_TIMEOUT_SECONDS,
+            max_connections=settings.HTTP_CLIENT_MAX_CONNECTIONS_PER_HOST,
+            max_keepalive_connections=settings.HTTP_CLIENT_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_CLIENT_KEEPALIVE_EXPIRY_SECONDS,
+            http2=settings.HTTP_CLIENT_HTTP2_ENABLED,
+            connection_limits=settings.HTTP_CLIENT_MAX_CONNECTIONS
+        )
+    return http_client_registry
+
+
+def get_http_client(integration: str) -> httpx.AsyncClient:
+    """
+    获取集成的共享HTTP客户端
+    Get the shared HTTP client of an integration
+    """
+    return get_http_client_registry().get(integration)
+
+
+async def close_http_clients() -> None:
+    """
+    关闭并释放注册表（应用关闭时调用）
+    Close and release the registry (called on application shutdown)
+    """
+    global http_client_registry
+    if http_client_registry is not None:
+        await http_client_registry.aclose()
+        http_client_registry = None
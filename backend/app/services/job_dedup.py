@@ -0,0 +1,455 @@
+"""
+职位近似去重
+Near-duplicate job detection for JobCatcher
+对标题、公司名做规范化（去除 GmbH/AG 等法律后缀和 (m/w/d) 等性别标记），规范化键相同直接判重；
+否则对标题、公司和描述的词项/词组 shingle 计算 MinHash 签名，经 LSH 分桶找候选，再按估计的 Jaccard 相似度确认。
+全局索引从 Job 表加载后随行插入、下架在事务提交后增量维护，新职位只需与同桶候选比较，整体近似线性
+Titles and company names are canonicalized (legal suffixes such as GmbH/AG and gender markers such as (m/w/d) removed);
+equal canonical keys are duplicates outright. Otherwise MinHash signatures over title, company and description shingles are
+bucketed with LSH and candidates are confirmed by estimated Jaccard similarity. The global index is loaded from the Job
+table and maintained incrementally as row inserts and take-downs commit, so each new job is only compared with its bucket mates
+"""
+
+import asyncio
+import logging
+import re
+import unicodedata
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import metrics
+from app.models.job import Job
+from app.services.job_row_events import subscribe_job_rows
+
+
+logger = logging.getLogger("service.job_dedup")
+
+_WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+_HTML_TAG_PATTERN = re.compile(r"<[^>]+>")
+# (m/w/d)、(w/m/d)、(f/m/x)、(all genders) 等德国职位标题常见的性别标记；不带括号时只匹配独立的三字母形式，
+# 避免误删 "Backend/Frontend"、"R&D/IT" 中的字母
+# Gender markers common in German job titles, e.g. (m/w/d), (w/m/d), (f/m/x), (all genders); without brackets only a
+# standalone three-letter form matches, so letters in "Backend/Frontend" or "R&D/IT" are left alone
+_GENDER_MARKER_PATTERN = re.compile(
+    r"[\(\[]\s*(?:[mwfdx]\s*/\s*){1,3}[mwfdx]\s*[\)\]]"
+    r"|(?<![\w/&])(?:[mwfdx]/){2}[mwfdx](?![\w/&])"
+    r"|\(\s*all\s+genders?\s*\)|\(\s*gn\s*\)",
+    re.IGNORECASE
+)
+
+# 公司名中不区分主体的法律形式后缀 / Legal-form suffixes that do not distinguish companies
+COMPANY_LEGAL_SUFFIXES = frozenset({
+    "gmbh", "mbh", "ag", "se", "kg", "kgaa", "ohg", "gbr", "ug", "ev", "co", "haftungsbeschrankt",
+    "inc", "incorporated", "ltd", "limited", "llc", "llp", "plc", "corp", "corporation", "company",
+    "sa", "sas", "sarl", "srl", "spa", "bv", "nv", "ab", "as", "oy",
+})
+
+# 只取描述开头参与签名，限制单个职位的计算量
+# Only the start of the description is shingled, bounding the work per job
+SHINGLE_DESCRIPTION_CHARS = 1500
+DESCRIPTION_SHINGLE_SIZE = 3
+
+_MAX_HASH = np.uint32(0xFFFFFFFF)
+
+
+def _fold(text: Optional[str]) -> str:
+    # 小写并去掉重音符号（ä→a），使不同数据源的拼写一致
+    # Lowercase and strip accents (ä→a) so spellings from different sources agree
+    text = (text or "").casefold()
+    if text.isascii():
+        return text
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def canonical_company(company: Optional[str]) -> str:
+    """
+    规范化公司名 - 去除法律形式后缀和标点
+    Canonicalize a company name - legal-form suffixes and punctuation removed
+    """
+    # "e.V." 和 "Co." 等带点缩写先合并，再分词
+    # Dotted abbreviations such as "e.V." and "Co." are joined before tokenizing
+    words = _WORD_PATTERN.findall(_fold(company).replace(".", ""))
+    # 从末尾剥离，"Foo GmbH & Co. KG" 整个后缀都会去掉；只有后缀时保留原词
+    # Strip from the end so all of "Foo GmbH & Co. KG" goes; a name made only of suffixes is kept as is
+    end = len(words)
+    while end and words[end - 1] in COMPANY_LEGAL_SUFFIXES:
+        end -= 1
+    return " ".join(words[:end] or words)
+
+
+def canonical_title(title: Optional[str]) -> str:
+    """
+    规范化职位标题 - 去除性别标记和标点
+    Canonicalize a job title - gender markers and punctuation removed
+    """
+    return " ".join(_WORD_PATTERN.findall(_GENDER_MARKER_PATTERN.sub(" ", _fold(title))))
+
+
+def canonical_job_key(job: Dict[str, Any]) -> str:
+    """
+    规范化去重键 - 规范化后的标题和公司名
+    Canonical deduplication key - canonical title and company
+    """
+    return f"{canonical_title(job.get('title'))}|{canonical_company(job.get('company'))}"
+
+
+def job_shingles(job: Dict[str, Any]) -> List[bytes]:
+    """
+    职位的 shingle 集合：标题词、规范化公司名和描述中的连续词组
+    A job's shingles: title words, the canonical company and consecutive description word groups
+    """
+    shingles = {f"t:{word}" for word in canonical_title(job.get("title")).split()}
+    company = canonical_company(job.get("company"))
+    if company:
+        shingles.add(f"c:{company}")
+    description = _HTML_TAG_PATTERN.sub(" ", job.get("description") or "")[:SHINGLE_DESCRIPTION_CHARS]
+    words = _WORD_PATTERN.findall(_fold(description))
+    for start in range(max(len(words) - DESCRIPTION_SHINGLE_SIZE + 1, 0)):
+        shingles.add("d:" + " ".join(words[start:start + DESCRIPTION_SHINGLE_SIZE]))
+    return [shingle.encode("utf-8") for shingle in shingles]
+
+
+class MinHasher:
+    """
+    MinHash签名生成器 - 对 shingle 的CRC32做 num_perm 个随机 multiply-shift 哈希，取每个哈希下的最小值
+    MinHash signature generator - num_perm random multiply-shift hashes over shingle CRC32s, keeping the minimum of each
+    """
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        self.num_perm = num_perm
+        generator = np.random.RandomState(seed)
+        # multiply-shift: h(x) = (a·x + b) mod 2^64 >> 32，a 取奇数；uint64 溢出回绕即取模
+        # multiply-shift: h(x) = (a·x + b) mod 2^64 >> 32 with odd a; uint64 wrap-around is the modulo
+        self._a = generator.randint(0, 1 << 62, size=num_perm, dtype=np.int64).astype(np.uint64) * np.uint64(2) + np.uint64(1)
+        self._b = generator.randint(0, 1 << 62, size=num_perm, dtype=np.int64).astype(np.uint64)
+
+    def _hash_shingles(self, shingles: Sequence[bytes]) -> np.ndarray:
+        return np.fromiter((zlib.crc32(shingle) for shingle in shingles), dtype=np.uint64, count=len(shingles))
+
+    def _permute(self, hashes: np.ndarray) -> np.ndarray:
+        # 原地运算，避免额外的中间矩阵 / In-place operations avoid extra intermediate matrices
+        with np.errstate(over="ignore"):
+            permuted = np.multiply(hashes[:, None], self._a)
+            permuted += self._b
+        permuted >>= np.uint64(32)
+        return permuted
+
+    def signature(self, shingles: Sequence[bytes]) -> np.ndarray:
+        """
+        计算签名；没有 shingle 时返回全最大值签名（与任何签名都不相似）
+        Compute a signature; with no shingles the all-max signature is returned (similar to nothing)
+        """
+        if not shingles:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint32)
+        return self._permute(self._hash_shingles(shingles)).min(axis=0).astype(np.uint32)
+
+    def signatures(self, shingle_sets: Sequence[Sequence[bytes]], chunk_shingles: int = 8192) -> List[np.ndarray]:
+        """
+        批量计算签名 - 多个职位的 shingle 拼接后一次置换，再按职位分段取最小值
+        Compute signatures in bulk - shingles of many jobs are permuted together, then reduced per job segment
+        """
+        signatures: List[np.ndarray] = []
+        start = 0
+        while start < len(shingle_sets):
+            # 按 shingle 总数分块，中间矩阵保持在CPU缓存量级 / Chunk by total shingles so the intermediate matrix stays cache-sized
+            end, total = start, 0
+            while end < len(shingle_sets) and (total == 0 or total + len(shingle_sets[end]) <= chunk_shingles):
+                total += len(shingle_sets[end])
+                end += 1
+            chunk = shingle_sets[start:end]
+            lengths = np.fromiter((len(shingles) for shingles in chunk), dtype=np.int64, count=len(chunk))
+            block = np.full((len(chunk), self.num_perm), _MAX_HASH, dtype=np.uint32)
+            non_empty = np.flatnonzero(lengths)
+            if non_empty.size:
+                permuted = self._permute(self._hash_shingles([shingle for shingles in chunk for shingle in shingles]))
+                offsets = np.concatenate(([0], np.cumsum(lengths[non_empty])[:-1]))
+                block[non_empty] = np.minimum.reduceat(permuted, offsets, axis=0)
+            signatures.extend(block)
+            start = end
+        return signatures
+
+
+def estimated_jaccard(left: np.ndarray, right: np.ndarray) -> float:
+    """
+    由两个签名估计 Jaccard 相似度
+    Estimate Jaccard similarity from two signatures
+    """
+    return float(np.count_nonzero(left == right)) / left.size
+
+
+class NearDuplicateIndex:
+    """
+    近似重复索引 - 规范化键精确匹配，加上 MinHash LSH 分桶（bands × rows = num_perm）；在事件循环线程中使用
+    Near-duplicate index - exact canonical-key matches plus MinHash LSH banding (bands × rows = num_perm); used from the event loop thread
+    """
+
+    def __init__(self, num_perm: int = 128, bands: int = 32, threshold: float = 0.7, hasher: Optional[MinHasher] = None):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be divisible by bands ({bands})")
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.hasher = hasher if hasher is not None and hasher.num_perm == num_perm else MinHasher(num_perm)
+
+        self._buckets: Dict[Tuple[int, bytes], List[str]] = {}
+        self._signatures: Dict[str, np.ndarray] = {}
+        self._companies: Dict[str, str] = {}
+        self._keys: Dict[str, str] = {}
+        self._ids_by_key: Dict[str, str] = {}
+        self._loaded_from_database = False
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def __contains__(self, job_id: str) -> bool:
+        return job_id in self._signatures
+
+    def _band_keys(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        raw = signature.tobytes()
+        width = self.rows * signature.itemsize
+        return [(band, raw[band * width:(band + 1) * width]) for band in range(self.bands)]
+
+    def find_duplicate(
+        self,
+        job: Dict[str, Any],
+        signature: Optional[np.ndarray] = None,
+        exclude: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        查找已登记的近似重复职位ID；同一公司（规范化后）且估计相似度达到阈值才算重复
+        Find the ID of a registered near-duplicate; it must be the same (canonical) company and reach the similarity threshold
+        """
+        key = canonical_job_key(job)
+        existing = self._ids_by_key.get(key)
+        if existing is not None and existing != exclude and not key.startswith("|"):
+            return existing
+
+        if signature is None:
+            signature = self.hasher.signature(job_shingles(job))
+        if not np.any(signature != _MAX_HASH):
+            return None
+        company = canonical_company(job.get("company"))
+        best_id, best_similarity = None, self.threshold
+        checked = set()
+        for band_key in self._band_keys(signature):
+            for candidate in self._buckets.get(band_key, ()):
+                if candidate in checked or candidate == exclude:
+                    continue
+                checked.add(candidate)
+                if company and self._companies.get(candidate) and self._companies[candidate] != company:
+                    continue
+                similarity = estimated_jaccard(signature, self._signatures[candidate])
+                if similarity >= best_similarity:
+                    best_id, best_similarity = candidate, similarity
+        return best_id
+
+    def add(self, job_id: str, job: Dict[str, Any], signature: Optional[np.ndarray] = None) -> None:
+        """
+        登记职位（已登记时替换）
+        Register a job (replacing an existing registration)
+        """
+        if job_id in self._signatures:
+            self.remove(job_id)
+        if signature is None:
+            signature = self.hasher.signature(job_shingles(job))
+        self._signatures[job_id] = signature
+        self._companies[job_id] = canonical_company(job.get("company"))
+        key = canonical_job_key(job)
+        self._keys[job_id] = key
+        self._ids_by_key.setdefault(key, job_id)
+        for band_key in self._band_keys(signature):
+            self._buckets.setdefault(band_key, []).append(job_id)
+
+    def remove(self, job_id: str) -> bool:
+        """
+        移除职位
+        Remove a job
+        """
+        signature = self._signatures.pop(job_id, None)
+        if signature is None:
+            return False
+        self._companies.pop(job_id, None)
+        key = self._keys.pop(job_id, None)
+        if key is not None and self._ids_by_key.get(key) == job_id:
+            del self._ids_by_key[key]
+        for band_key in self._band_keys(signature):
+            bucket = self._buckets.get(band_key)
+            if bucket is None:
+                continue
+            bucket.remove(job_id)
+            if not bucket:
+                del self._buckets[band_key]
+        return True
+
+    def check_and_add(self, job_id: str, job: Dict[str, Any]) -> Optional[str]:
+        """
+        返回近似重复的已登记职位ID；不重复时登记该职位并返回 None
+        Return the ID of a registered near-duplicate; when there is none the job is registered and None is returned
+        """
+        signature = self.hasher.signature(job_shingles(job))
+        duplicate_of = self.find_duplicate(job, signature=signature, exclude=job_id)
+        if duplicate_of is None:
+            self.add(job_id, job, signature=signature)
+        return duplicate_of
+
+    def check_pending(self, job_id: str, job: Dict[str, Any], pending: "NearDuplicateIndex") -> Optional[str]:
+        """
+        写入数据库前的检查 - 返回已登记职位或同一事务中较早职位的ID；不重复时只登记到 pending，
+        本索引在事务提交后才随 Job 行变更更新，写入失败不会留下虚假的去重目标
+        Check before a database write - return the ID of a registered job or of an earlier job in the same transaction;
+        a unique job is only registered in pending, and this index follows the Job rows once the transaction commits, so a
+        failed write leaves no phantom dedup targets behind
+        """
+        signature = self.hasher.signature(job_shingles(job))
+        duplicate_of = (
+            self.find_duplicate(job, signature=signature, exclude=job_id)
+            or pending.find_duplicate(job, signature=signature, exclude=job_id)
+        )
+        if duplicate_of is None:
+            pending.add(job_id, job, signature=signature)
+        return duplicate_of
+
+    def job_signatures(self, jobs: Sequence[Dict[str, Any]]) -> List[np.ndarray]:
+        """
+        批量计算职位签名（不访问索引状态，可在线程中执行）
+        Compute job signatures in bulk (touches no index state, so it can run in a thread)
+        """
+        return self.hasher.signatures([job_shingles(job) for job in jobs])
+
+    async def load_from_database(self, page_size: int = 5000) -> int:
+        """
+        从 Job 表加载在架职位（按主键分页，签名在线程中计算），进程内只执行一次
+        Load active jobs from the Job table (keyset-paged by primary key, signatures computed in a thread); runs once per process
+        """
+        if self._loaded_from_database:
+            return 0
+        self._loaded_from_database = True
+
+        loaded = 0
+        last_id = ""
+        async with AsyncSessionLocal() as session:
+            while True:
+                result = await session.execute(
+                    select(Job.id, Job.title, Job.company, Job.description)
+                    .where(Job.is_active.is_(True), Job.is_expired.is_(False), Job.id > last_id)
+                    .order_by(Job.id)
+                    .limit(page_size)
+                )
+                rows = result.all()
+                if not rows:
+                    break
+                jobs = [{"title": row.title, "company": row.company, "description": row.description} for row in rows]
+                signatures = await asyncio.to_thread(self.job_signatures, jobs)
+                for row, job, signature in zip(rows, jobs, signatures):
+                    self.add(row.id, job, signature=signature)
+                loaded += len(rows)
+                last_id = rows[-1].id
+        logger.info(f"已从Job表加载去重索引 / Loaded dedup index from the Job table: {loaded} jobs")
+        return loaded
+
+
+def job_dedup_fields(job: Job) -> Dict[str, Any]:
+    return {"title": job.title, "company": job.company, "description": job.description}
+
+
+def job_dedup_entry(job: Job) -> Optional[Dict[str, Any]]:
+    """
+    Job 行对应的去重条目；已下架或过期的职位为 None（不再作为去重目标）
+    The dedup entry of a Job row; None for jobs taken down or expired (they are no longer dedup targets)
+    """
+    if not job.is_active or job.is_expired:
+        return None
+    return job_dedup_fields(job)
+
+
+def deduplicate_jobs(jobs: Iterable[Dict[str, Any]], index: Optional[NearDuplicateIndex] = None) -> List[Dict[str, Any]]:
+    """
+    去除一组职位中的近似重复，保留先出现的；传入 index 时可跨多次调用累积
+    Remove near-duplicates from a list of jobs, keeping the first occurrence; pass an index to accumulate across calls
+    """
+    if index is None:
+        index = new_near_duplicate_index()
+    unique_jobs = []
+    for position, job in enumerate(jobs):
+        if not job.get("title") and not job.get("company"):
+            continue
+        job_id = str(job.get("id") or f"#{len(index)}:{position}")
+        if job_id in index or index.check_and_add(job_id, job) is not None:
+            metrics.increment("job_dedup_duplicates_total", scope="batch")
+            continue
+        unique_jobs.append(job)
+    return unique_jobs
+
+
+def new_near_duplicate_index() -> NearDuplicateIndex:
+    """
+    按配置创建近似重复索引（复用全局MinHash置换参数）
+    Create a near-duplicate index from settings (sharing the global MinHash permutations)
+    """
+    return NearDuplicateIndex(
+        num_perm=settings.JOB_DEDUP_NUM_PERM,
+        bands=settings.JOB_DEDUP_LSH_BANDS,
+        threshold=settings.JOB_DEDUP_THRESHOLD,
+        hasher=_get_hasher()
+    )
+
+
+_hasher: Optional[MinHasher] = None
+
+
+def _get_hasher() -> MinHasher:
+    global _hasher
+    if _hasher is None:
+        _hasher = MinHasher(settings.JOB_DEDUP_NUM_PERM)
+    return _hasher
+
+
+# 全局索引实例 - Global index instance
+job_dedup_index: Optional[NearDuplicateIndex] = None
+
+
+async def get_job_dedup_index() -> NearDuplicateIndex:
+    """
+    获取已从 Job 表加载的全局去重索引
+    Get the global dedup index, loaded from the Job table
+    """
+    global job_dedup_index
+    if job_dedup_index is None:
+        job_dedup_index = new_near_duplicate_index()
+    await job_dedup_index.load_from_database()
+    return job_dedup_index
+
+
+def forget_jobs(job_ids: Iterable[str]) -> None:
+    """
+    从全局去重索引移除职位（用于不触发映射事件的批量UPDATE和DELETE）；索引尚未创建时不做任何事
+    Remove jobs from the global dedup index (for bulk UPDATEs and DELETEs that fire no mapper events); no-op until the index exists
+    """
+    if job_dedup_index is not None:
+        for job_id in job_ids:
+            job_dedup_index.remove(job_id)
+
+
+def _apply_committed_rows(entries: Dict[str, Optional[Dict[str, Any]]]) -> None:
+    for job_id, entry in entries.items():
+        if entry is None:
+            job_dedup_index.remove(job_id)
+        else:
+            job_dedup_index.add(job_id, entry)
+
+
+# Job 行插入、更新（含下架和过期）和删除提交后增量维护索引；回滚的变更不会进入索引，索引尚未创建时不做任何事
+# Maintain the index incrementally once Job inserts, updates (including take-down and expiry) and deletes commit;
+# rolled-back changes never reach the index, and nothing happens until the index exists
+subscribe_job_rows(
+    "job_dedup",
+    active=lambda: job_dedup_index is not None,
+    snapshot=job_dedup_entry,
+    apply=_apply_committed_rows
+)
@@ -0,0 +1,327 @@
+"""
+职位链接存活检查
+Job link liveness checking for JobCatcher
+按主键分页流式读取未过期职位，以有界并发和按主机限速发送 HEAD 请求（不支持HEAD时退回GET）；
+last_checked_at 较新的职位跳过，检查结果批量写回 jobs 表，过期职位的索引文档批量删除
+Streams unexpired jobs in primary-key pages and sends HEAD requests (GET when HEAD is refused) with bounded concurrency
+and per-host rate limits; jobs with a recent last_checked_at are skipped, results are written back to the jobs table in
+bulk and index documents of expired jobs are deleted in batches
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+from pydantic import BaseModel, Field
+from sqlalchemy import or_, select, update
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import metrics
+from app.models.job import Job
+from app.services.azure_search import get_search_service
+from app.services.http_clients import get_http_client
+from app.services.job_dedup import forget_jobs
+from app.services.skill_trends import subtract_live_jobs
+
+
+logger = logging.getLogger("service.job_expiry")
+
+HTTP_INTEGRATION = "job_links"
+USER_AGENT = "Mozilla/5.0 (compatible; JobCatcher-LinkChecker/1.0)"
+
+# 明确表示职位已下线的状态码 / Status codes that definitely mean the posting is gone
+EXPIRED_STATUS_CODES = {404, 410}
+# 站点拒绝 HEAD 时改用 GET 再判断 / Retry with GET when the site refuses HEAD
+HEAD_REFUSED_STATUS_CODES = {403, 405, 501}
+# 反爬、限流等无法判断存活的状态码，下次再查 / Anti-bot, throttling and similar codes are inconclusive; check again next time
+INCONCLUSIVE_STATUS_CODES = {401, 403, 407, 408, 425, 429}
+
+
+class LinkStatus:
+    ALIVE = "alive"
+    EXPIRED = "expired"
+    UNKNOWN = "unknown"
+
+
+def classify_status(status_code: int) -> str:
+    """
+    按状态码判断链接状态：404/410 及其他4xx为过期，反爬和限流类状态码与5xx无法判断
+    Classify a link by status code: 404/410 and other 4xx are expired; anti-bot/throttling codes and 5xx are inconclusive
+    """
+    if status_code < 400:
+        return LinkStatus.ALIVE
+    if status_code in EXPIRED_STATUS_CODES:
+        return LinkStatus.EXPIRED
+    if status_code in INCONCLUSIVE_STATUS_CODES or status_code >= 500:
+        return LinkStatus.UNKNOWN
+    return LinkStatus.EXPIRED
+
+
+class LinkCheckReport(BaseModel):
+    """
+    一次链接检查的报告
+    Report of one link check run
+    """
+    checked: int = Field(0, description="检查的职位数 / Jobs checked")
+    alive: int = Field(0, description="仍然有效的职位数 / Jobs still live")
+    expired: int = Field(0, description="标记为过期的职位数 / Jobs marked expired")
+    unknown: int = Field(0, description="无法判断的职位数（下次再查） / Inconclusive jobs (checked again next time)")
+    index_deleted: int = Field(0, description="删除的索引文档数 / Index documents deleted")
+    total_seconds: float = Field(0.0, description="总耗时 / Total duration")
+    checks_per_second: float = Field(0.0, description="吞吐量 / Throughput")
+
+
+class HostLimiter:
+    """
+    按主机的礼貌限速 - 每个主机的并发上限和相邻请求的最小间隔
+    Per-host politeness - a concurrency cap per host and a minimum interval between consecutive requests
+    """
+
+    def __init__(self, concurrency: int = 4, interval: float = 0.25):
+        self.concurrency = concurrency
+        self.interval = interval
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._next_slot: Dict[str, float] = {}
+
+    async def acquire(self, host: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._semaphores[host] = asyncio.Semaphore(self.concurrency)
+        await semaphore.acquire()
+        # 预约下一个发送时刻，同一主机的请求按间隔错开
+        # Reserve the next send slot so requests to one host are spaced by the interval
+        now = time.monotonic()
+        slot = max(now, self._next_slot.get(host, 0.0))
+        self._next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+        return semaphore
+
+
+class JobLinkChecker:
+    """
+    职位链接检查器 - 分页读取、Worker池检查、批量写回
+    Job link checker - paged reads, a worker pool for checks and bulk write-back
+    """
+
+    def __init__(
+        self,
+        client: Optional[httpx.AsyncClient] = None,
+        max_concurrency: int = 64,
+        per_host_concurrency: int = 4,
+        host_interval: float = 0.25,
+        recheck_seconds: float = 20 * 3600,
+        page_size: int = 1000,
+        write_batch_size: int = 500
+    ):
+        self._client = client
+        self.max_concurrency = max_concurrency
+        self.per_host_concurrency = per_host_concurrency
+        self.host_interval = host_interval
+        self.recheck_seconds = recheck_seconds
+        self.page_size = page_size
+        self.write_batch_size = write_batch_size
+        self._lock = asyncio.Lock()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self._client if self._client is not None else get_http_client(HTTP_INTEGRATION)
+
+    async def iter_due_jobs(self, checked_before: datetime) -> AsyncIterator[Tuple[str, str]]:
+        """
+        按主键分页流式产出需要检查的 (job_id, url)，每页一个短事务
+        Stream the (job_id, url) pairs that are due, keyset-paged by primary key with one short transaction per page
+        """
+        last_id = ""
+        while True:
+            async with AsyncSessionLocal() as session:
+                result = await session.execute(
+                    select(Job.id, Job.application_url)
+                    .where(
+                        Job.id > last_id,
+                        Job.is_active.is_(True),
+                        Job.is_expired.is_(False),
+                        Job.application_url.is_not(None),
+                        or_(Job.last_checked_at.is_(None), Job.last_checked_at < checked_before)
+                    )
+                    .order_by(Job.id)
+                    .limit(self.page_size)
+                )
+                rows = result.all()
+            if not rows:
+                return
+            for job_id, url in rows:
+                yield job_id, url
+            last_id = rows[-1][0]
+
+    async def check_url(self, url: str, hosts: HostLimiter) -> str:
+        """
+        检查单个链接 - 先 HEAD，站点拒绝 HEAD 时改用只读响应头的 GET；任何异常（含无法解析的URL）都视为未知
+        Check one link - HEAD first, then a headers-only GET when the site refuses HEAD; any error (malformed URLs
+        included) counts as unknown
+        """
+        try:
+            return await self._check_url(url, hosts)
+        except Exception as e:
+            logger.debug(f"链接检查失败 / Link check failed: {url}: {e}")
+            return LinkStatus.UNKNOWN
+
+    async def _check_url(self, url: str, hosts: HostLimiter) -> str:
+        host = urlsplit(url).hostname
+        # 没有主机的链接是数据问题而非失效链接，不据此判定过期 / A link without a host is bad data, not a dead link
+        if not host:
+            return LinkStatus.UNKNOWN
+        semaphore = await hosts.acquire(host)
+        try:
+            headers = {"User-Agent": USER_AGENT}
+            response = await self.client.head(url, headers=headers, follow_redirects=True)
+            if response.status_code in HEAD_REFUSED_STATUS_CODES:
+                async with self.client.stream("GET", url, headers=headers, follow_redirects=True) as response:
+                    pass
+            return classify_status(response.status_code)
+        finally:
+            semaphore.release()
+
+    async def run(self) -> LinkCheckReport:
+        """
+        检查所有到期的职位链接；同一时间只运行一次
+        Check every due job link; only one run executes at a time
+        """
+        async with self._lock:
+            started = time.perf_counter()
+            report = LinkCheckReport()
+            checked_before = datetime.now(timezone.utc) - timedelta(seconds=self.recheck_seconds)
+            hosts = HostLimiter(self.per_host_concurrency, self.host_interval)
+            queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_concurrency * 2)
+            results: Dict[str, List[str]] = {LinkStatus.ALIVE: [], LinkStatus.EXPIRED: []}
+            write_lock = asyncio.Lock()
+
+            async def flush(force: bool = False) -> None:
+                async with write_lock:
+                    if force or len(results[LinkStatus.ALIVE]) + len(results[LinkStatus.EXPIRED]) >= self.write_batch_size:
+                        alive, expired = results[LinkStatus.ALIVE], results[LinkStatus.EXPIRED]
+                        results[LinkStatus.ALIVE], results[LinkStatus.EXPIRED] = [], []
+                        report.index_deleted += await self._write_back(alive, expired)
+
+            async def handle(job_id: str, url: str) -> None:
+                status = await self.check_url(url, hosts)
+                report.checked += 1
+                if status == LinkStatus.UNKNOWN:
+                    report.unknown += 1
+                    return
+                setattr(report, status, getattr(report, status) + 1)
+                results[status].append(job_id)
+                await flush()
+
+            async def worker() -> None:
+                # 单个条目失败不结束Worker，否则生产者会阻塞在已满的队列上
+                # A failing item never ends the worker, otherwise the producer would block on a full queue
+                while True:
+                    item = await queue.get()
+                    try:
+                        if item is None:
+                            return
+                        await handle(*item)
+                    except Exception as e:
+                        logger.warning(f"链接检查条目处理失败 / Failed to process link check item: {item[0]}: {e}")
+                    finally:
+                        queue.task_done()
+
+            workers = [asyncio.create_task(worker()) for _ in range(self.max_concurrency)]
+            try:
+                async for item in self.iter_due_jobs(checked_before):
+                    await queue.put(item)
+                for _ in workers:
+                    await queue.put(None)
+                await asyncio.gather(*workers, return_exceptions=True)
+            finally:
+                for task in workers:
+                    task.cancel()
+                await flush(force=True)
+
+            report.total_seconds = time.perf_counter() - started
+            report.checks_per_second = round(report.checked / report.total_seconds, 2) if report.total_seconds else 0.0
+            metrics.increment("link_checks_total", report.alive, status=LinkStatus.ALIVE)
+            metrics.increment("link_checks_total", report.expired, status=LinkStatus.EXPIRED)
+            metrics.increment("link_checks_total", report.unknown, status=LinkStatus.UNKNOWN)
+            metrics.set_gauge("link_checks_per_second", report.checks_per_second)
+            logger.info(
+                f"职位链接检查完成 / Job link check finished: checked={report.checked} alive={report.alive} "
+                f"expired={report.expired} unknown={report.unknown} index_deleted={report.index_deleted} "
+                f"in {report.total_seconds:.2f}s ({report.checks_per_second}/s)"
+            )
+            return report
+
+    async def _write_back(self, alive: List[str], expired: List[str]) -> int:
+        """
+        批量写回检查结果并删除过期职位的索引文档，返回删除的索引文档数
+        Write results back in bulk and delete the index documents of expired jobs; returns how many index documents were removed
+        """
+        if not alive and not expired:
+            return 0
+        now = datetime.now(timezone.utc)
+        async with AsyncSessionLocal() as session:
+            if alive:
+                await session.execute(
+                    update(Job).where(Job.id.in_(alive)).values(last_checked_at=now),
+                    execution_options={"synchronize_session": False}
+                )
+            if expired:
+                # 过期前从技能需求聚合中扣除，与状态更新同一事务
+                # Subtract from the skill demand aggregate before expiring, in the same transaction as the update
+                await subtract_live_jobs(session, expired)
+                await session.execute(
+                    update(Job).where(Job.id.in_(expired)).values(is_expired=True, last_checked_at=now),
+                    execution_options={"synchronize_session": False}
+                )
+            await session.commit()
+        if not expired:
+            return 0
+
+        # 批量UPDATE不触发映射事件，内存索引需要显式同步
+        # Bulk UPDATEs fire no mapper events, so the in-memory indexes are synced explicitly
+        forget_jobs(expired)
+        try:
+            search_service = await get_search_service()
+            return await search_service.delete_jobs(expired)
+        except Exception as e:
+            logger.error(f"删除过期职位索引文档失败 / Failed to delete expired job documents: {e}")
+            return 0
+
+
+# 全局检查器实例 - Global checker instance
+job_link_checker: Optional[JobLinkChecker] = None
+
+
+def get_job_link_checker() -> JobLinkChecker:
+    """
+    获取职位链接检查器实例
+    Get the job link checker instance
+    """
+    global job_link_checker
+    if job_link_checker is None:
+        job_link_checker = JobLinkChecker(
+            max_concurrency=settings.LINK_CHECK_MAX_CONCURRENCY,
+            per_host_concurrency=settings.LINK_CHECK_PER_HOST_CONCURRENCY,
+            host_interval=settings.LINK_CHECK_HOST_INTERVAL_SECONDS,
+            recheck_seconds=settings.LINK_CHECK_RECHECK_HOURS * 3600,
+            page_size=settings.LINK_CHECK_PAGE_SIZE,
+            write_batch_size=settings.LINK_CHECK_WRITE_BATCH_SIZE
+        )
+    return job_link_checker
+
+
+async def cleanup_jobs() -> None:
+    """
+    每日定时任务入口（开发文档第14节）- 异常只记录日志，不影响调度器
+    Daily scheduled task entry point (development doc section 14) - exceptions are logged without affecting the scheduler
+    """
+    try:
+        await get_job_link_checker().run()
+    except Exception as e:
+        logger.error(f"职位链接检查失败 / Job link check failed: {e}")
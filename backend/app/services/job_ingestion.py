@@ -0,0 +1,436 @@
+"""
+定时职位抓取
+Scheduled job ingestion for JobCatcher
+按配置的 查询 × 地点 × 数据源 定时抓取上游职位，规范化后按 external_id 写入 jobs 表；只有新增或内容变化的职位
+会重新生成向量并写入检索索引。每个组合一个检查点，中断的运行重启后只补做尚未完成的组合
+Crawls upstream jobs for the configured queries × locations × sources on a schedule, normalizes them and upserts them into
+the jobs table by external_id; only new or changed jobs are re-embedded and written to the search index. Each combination
+has a checkpoint, so an interrupted run only redoes the unfinished combinations after a restart.
+检查点记录已见过的最新发布时间；之后的运行不再写入早于它（减去重叠窗口）且尚未入库的职位
+The checkpoint records the newest posting time seen; later runs no longer insert jobs posted before it (minus an overlap
+window) that are not stored yet
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+from sqlalchemy import or_, select
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import metrics
+from app.models.job import Job, JobIngestionCheckpoint
+from app.services.azure_search import JobDocument, get_search_service
+from app.services.job_dedup import get_job_dedup_index, new_near_duplicate_index
+from app.services.search_result_cache import job_row_values, normalize_search_query
+from app.services.skill_trends import SkillDemandDelta
+from app.services.source_resilience import get_source_guard
+
+
+logger = logging.getLogger("service.job_ingestion")
+
+SourceFetcher = Callable[[str, str, int], Awaitable[List[Dict[str, Any]]]]
+
+# 判断职位内容是否变化的字段；变化时重新生成向量并更新索引
+# Fields that decide whether a job changed; a change re-embeds the job and updates the index
+TRACKED_FIELDS = (
+    "title", "company", "location", "description", "salary_min", "salary_max",
+    "job_type", "skills", "application_url", "posted_at",
+)
+
+
+class IngestionUnitReport(BaseModel):
+    """
+    单个 (数据源, 查询, 地点) 的抓取报告
+    Ingestion report of one (source, query, location)
+    """
+    source: str = Field(..., description="数据源 / Source")
+    query: str = Field(..., description="查询 / Query")
+    location: str = Field(..., description="地点 / Location")
+    status: str = Field("success", description="success / failed / skipped")
+    fetched: int = Field(0, description="上游返回的职位数 / Jobs returned upstream")
+    new: int = Field(0, description="新增职位数 / New jobs")
+    updated: int = Field(0, description="内容变化的职位数 / Changed jobs")
+    skipped: int = Field(0, description="未变化的职位数 / Unchanged jobs")
+    duplicates: int = Field(0, description="与已有职位近似重复而未写入的职位数 / Near-duplicates of stored jobs that were not written")
+    stale: int = Field(0, description="早于检查点发布时间且未入库而未写入的职位数 / Unstored jobs posted before the checkpoint cutoff that were not written")
+    fetch_seconds: float = Field(0.0, description="抓取耗时 / Fetch duration")
+    upsert_seconds: float = Field(0.0, description="写库耗时 / Upsert duration")
+    error: Optional[str] = Field(None, description="失败原因 / Failure reason")
+
+
+class IngestionReport(BaseModel):
+    """
+    一次抓取运行的报告 - 汇总计数和各阶段耗时
+    Report of one ingestion run - aggregate counts and per-stage timing
+    """
+    started_at: datetime = Field(..., description="开始时间 / Start time")
+    units: List[IngestionUnitReport] = Field(default_factory=list, description="各组合的报告 / Per-combination reports")
+    fetched: int = Field(0, description="上游返回的职位数 / Jobs returned upstream")
+    new: int = Field(0, description="新增职位数 / New jobs")
+    updated: int = Field(0, description="内容变化的职位数 / Changed jobs")
+    skipped: int = Field(0, description="未变化的职位数 / Unchanged jobs")
+    duplicates: int = Field(0, description="近似重复而未写入的职位数 / Near-duplicates that were not written")
+    stale: int = Field(0, description="早于检查点发布时间而未写入的职位数 / Jobs posted before the checkpoint cutoff that were not written")
+    failed_units: int = Field(0, description="失败的组合数 / Failed combinations")
+    checkpointed_units: int = Field(0, description="因检查点跳过的组合数 / Combinations skipped by checkpoint")
+    indexed: int = Field(0, description="写入检索索引的职位数 / Jobs written to the search index")
+    index_failed: int = Field(0, description="索引失败的职位数 / Jobs that failed to index")
+    fetch_seconds: float = Field(0.0, description="抓取阶段累计耗时 / Cumulative fetch duration")
+    upsert_seconds: float = Field(0.0, description="写库阶段累计耗时 / Cumulative upsert duration")
+    index_seconds: float = Field(0.0, description="索引阶段耗时 / Indexing duration")
+    total_seconds: float = Field(0.0, description="总耗时 / Total duration")
+
+
+def checkpoint_key(source: str, query: str, location: Optional[str]) -> str:
+    """
+    计算检查点键
+    Compute the checkpoint key
+    """
+    payload = json.dumps([source, normalize_search_query(query), normalize_search_query(location)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _comparable(value: Any) -> Any:
+    # SQLite 返回不带时区的时间，按UTC处理 / SQLite returns naive datetimes; treat them as UTC
+    if isinstance(value, datetime) and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _job_document(job: Dict[str, Any], values: Dict[str, Any]) -> JobDocument:
+    return JobDocument(
+        id=values["id"],
+        title=values["title"],
+        company=values["company"],
+        location=values["location"] or "",
+        salary=job.get("salary") or None,
+        description=values["description"] or "",
+        skills=[str(skill) for skill in job.get("skills") or []],
+        source=values["source"],
+        url=values["application_url"] or "",
+        indexed_at=datetime.now(timezone.utc),
+        expired=False
+    )
+
+
+def default_source_fetchers() -> Dict[str, SourceFetcher]:
+    """
+    已配置密钥的数据源抓取函数 - 与交互式搜索共用 WebSearchTool 的上游调用和解析，不经过结果缓存
+    Fetchers of the sources whose keys are configured - shares WebSearchTool's upstream calls and parsing with interactive
+    search, bypassing the result cache
+    """
+    from app.agents.job_search_agent import WebSearchTool
+
+    tool = WebSearchTool()
+    fetchers: Dict[str, SourceFetcher] = {}
+    if settings.APIFY_TOKEN:
+        fetchers["stepstone"] = tool._fetch_stepstone
+    if settings.SERPAPI_KEY:
+        fetchers["google_jobs"] = tool._fetch_google_jobs
+    return fetchers
+
+
+class JobIngestionPipeline:
+    """
+    职位抓取管道 - 抓取、规范化、按 external_id 增量写库、只为变化的职位更新索引
+    Job ingestion pipeline - fetch, normalize, upsert incrementally by external_id, and re-index only changed jobs
+    """
+
+    def __init__(
+        self,
+        queries: List[str],
+        locations: List[str],
+        sources: List[str],
+        max_results: int = 50,
+        interval_seconds: float = 6 * 3600,
+        max_concurrency: int = 2,
+        posted_overlap_seconds: float = 48 * 3600,
+        fetchers: Optional[Dict[str, SourceFetcher]] = None
+    ):
+        self.queries = queries
+        self.locations = locations
+        self.sources = sources
+        self.max_results = max_results
+        self.interval_seconds = interval_seconds
+        self.max_concurrency = max_concurrency
+        self.posted_overlap_seconds = posted_overlap_seconds
+        self._fetchers = fetchers
+        self._lock = asyncio.Lock()
+        self.last_report: Optional[IngestionReport] = None
+
+    @property
+    def fetchers(self) -> Dict[str, SourceFetcher]:
+        if self._fetchers is None:
+            self._fetchers = default_source_fetchers()
+        return self._fetchers
+
+    async def run(self, force: bool = False) -> IngestionReport:
+        """
+        执行一次抓取；默认跳过半个周期内已成功完成的组合并按检查点的发布时间截断，force=True 时全部重新抓取并写入。
+        同一时间只运行一次
+        Run one ingestion; by default combinations completed successfully within half an interval are skipped and each
+        combination is cut off at its checkpoint's posting time, while force=True re-fetches and writes everything. Only
+        one run executes at a time
+        """
+        async with self._lock:
+            started = time.perf_counter()
+            report = IngestionReport(started_at=datetime.now(timezone.utc))
+            fresh_after = None if force else report.started_at - timedelta(seconds=self.interval_seconds / 2)
+
+            units = [
+                (source, query, location)
+                for source in self.sources if source in self.fetchers
+                for query in self.queries
+                for location in self.locations
+            ]
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+
+            async def run_unit(source: str, query: str, location: str) -> Tuple[IngestionUnitReport, List[JobDocument]]:
+                async with semaphore:
+                    return await self._run_unit(source, query, location, fresh_after)
+
+            documents: List[JobDocument] = []
+            for unit_report, unit_documents in await asyncio.gather(*(run_unit(*unit) for unit in units)):
+                report.units.append(unit_report)
+                documents.extend(unit_documents)
+                if unit_report.status == "skipped":
+                    report.checkpointed_units += 1
+                    continue
+                if unit_report.status == "failed":
+                    report.failed_units += 1
+                for field in ("fetched", "new", "updated", "skipped", "duplicates", "stale"):
+                    setattr(report, field, getattr(report, field) + getattr(unit_report, field))
+                report.fetch_seconds += unit_report.fetch_seconds
+                report.upsert_seconds += unit_report.upsert_seconds
+
+            # 阶段三：只为新增和变化的职位生成向量并写入索引
+            # Stage 3: embed and index only new and changed jobs
+            if documents:
+                index_started = time.perf_counter()
+                try:
+                    search_service = await get_search_service()
+                    indexing = await search_service.bulk_index_jobs(documents)
+                    report.indexed = indexing.succeeded
+                    report.index_failed = len(indexing.failed_ids)
+                except Exception as e:
+                    report.index_failed = len(documents)
+                    logger.error(f"抓取职位索引失败 / Failed to index ingested jobs: {e}")
+                report.index_seconds = time.perf_counter() - index_started
+
+            report.total_seconds = time.perf_counter() - started
+            self.last_report = report
+
+            for field in ("new", "updated", "skipped", "duplicates", "stale"):
+                metrics.increment("ingestion_jobs_total", getattr(report, field), result=field)
+            metrics.observe("ingestion_run_ms", report.total_seconds * 1000)
+            logger.info(
+                f"职位抓取完成 / Job ingestion finished: fetched={report.fetched} new={report.new} "
+                f"updated={report.updated} skipped={report.skipped} duplicates={report.duplicates} stale={report.stale} "
+                f"indexed={report.indexed} failed_units={report.failed_units} "
+                f"checkpointed_units={report.checkpointed_units} in {report.total_seconds:.2f}s"
+            )
+            return report
+
+    async def _run_unit(
+        self,
+        source: str,
+        query: str,
+        location: str,
+        fresh_after: Optional[datetime]
+    ) -> Tuple[IngestionUnitReport, List[JobDocument]]:
+        unit = IngestionUnitReport(source=source, query=query, location=location)
+        key = checkpoint_key(source, query, location)
+
+        documents: List[JobDocument] = []
+        newest_posted_at: Optional[datetime] = None
+        try:
+            async with AsyncSessionLocal() as session:
+                checkpoint = await session.get(JobIngestionCheckpoint, key)
+                if (
+                    fresh_after is not None
+                    and checkpoint is not None
+                    and checkpoint.last_status == "success"
+                    and checkpoint.last_completed_at is not None
+                    and _comparable(checkpoint.last_completed_at) >= fresh_after
+                ):
+                    unit.status = "skipped"
+                    return unit, []
+                if checkpoint is None:
+                    checkpoint = JobIngestionCheckpoint(
+                        key=key,
+                        source=source,
+                        query=normalize_search_query(query)[:500],
+                        location=normalize_search_query(location)[:200] or None
+                    )
+                    session.add(checkpoint)
+                # 发布时间截断（force 时不截断）：上游发布时间不精确，留出重叠窗口
+                # Posting time cutoff (none when forced): upstream posting times are imprecise, so an overlap window is kept
+                posted_cutoff = (
+                    _comparable(checkpoint.last_posted_at) - timedelta(seconds=self.posted_overlap_seconds)
+                    if fresh_after is not None and checkpoint.last_posted_at is not None else None
+                )
+                checkpoint.last_started_at = datetime.now(timezone.utc)
+                await session.commit()
+
+            # 阶段一：经数据源熔断器和自适应超时抓取 / Stage 1: fetch through the source's circuit breaker and adaptive timeout
+            fetch_started = time.perf_counter()
+            fetcher = self.fetchers[source]
+            jobs = await get_source_guard(source).call(lambda: fetcher(query, location, self.max_results))
+            unit.fetch_seconds = time.perf_counter() - fetch_started
+            unit.fetched = len(jobs)
+
+            # 阶段二：规范化并按 external_id 增量写库 / Stage 2: normalize and upsert incrementally by external_id
+            upsert_started = time.perf_counter()
+            documents, newest_posted_at = await self._upsert(source, jobs, unit, posted_cutoff)
+            unit.upsert_seconds = time.perf_counter() - upsert_started
+        except Exception as e:
+            unit.status = "failed"
+            unit.error = str(e)
+            logger.error(f"职位抓取失败 / Job ingestion failed ({source}, '{query}', '{location}'): {e}")
+
+        # 检查点写入失败只记录日志，下次运行重做该组合 / A failed checkpoint write is only logged; the next run redoes the combination
+        try:
+            async with AsyncSessionLocal() as session:
+                checkpoint = await session.get(JobIngestionCheckpoint, key)
+                if checkpoint is not None:
+                    checkpoint.last_status = unit.status
+                    checkpoint.last_error = unit.error
+                    checkpoint.last_report = unit.model_dump()
+                    if unit.status == "success":
+                        checkpoint.last_completed_at = datetime.now(timezone.utc)
+                    if newest_posted_at is not None and (
+                        checkpoint.last_posted_at is None or newest_posted_at > _comparable(checkpoint.last_posted_at)
+                    ):
+                        checkpoint.last_posted_at = newest_posted_at
+                    await session.commit()
+        except Exception as e:
+            logger.error(f"抓取检查点更新失败 / Failed to update ingestion checkpoint ({source}, '{query}', '{location}'): {e}")
+        return unit, documents
+
+    async def _upsert(
+        self,
+        source: str,
+        jobs: List[Dict[str, Any]],
+        unit: IngestionUnitReport,
+        posted_cutoff: Optional[datetime] = None
+    ) -> Tuple[List[JobDocument], Optional[datetime]]:
+        """
+        插入新职位、更新变化的职位、跳过未变化的职位；发布时间早于 posted_cutoff 的未入库职位不再写入（已被清理或早已
+        错过）。返回需要重新索引的文档和最新的发布时间
+        Insert new jobs, update changed ones and skip unchanged ones; unstored jobs posted before posted_cutoff are not
+        written (they were purged or missed long ago). Returns the documents to re-index and the newest posting time
+        """
+        rows: Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]] = {}
+        for job in jobs:
+            values = job_row_values(job, source)
+            if values is not None:
+                rows.setdefault(values["external_id"], (job, values))
+        if not rows:
+            return [], None
+
+        documents: List[JobDocument] = []
+        newest_posted_at: Optional[datetime] = None
+        dedup_index = await get_job_dedup_index()
+        pending_dedup = new_near_duplicate_index()
+        skill_demand = SkillDemandDelta()
+        async with AsyncSessionLocal() as session:
+            external_ids = list(rows)
+            ids = [values["id"] for _, values in rows.values()]
+            result = await session.execute(
+                select(Job).where(
+                    or_(Job.external_id.in_(external_ids), Job.id.in_(ids))
+                )
+            )
+            existing_by_external_id: Dict[str, Job] = {}
+            existing_by_id: Dict[str, Job] = {}
+            for row in result.scalars():
+                existing_by_id[row.id] = row
+                if row.external_id:
+                    existing_by_external_id[row.external_id] = row
+
+            for external_id, (job, values) in rows.items():
+                if values["posted_at"] is not None and (newest_posted_at is None or values["posted_at"] > newest_posted_at):
+                    newest_posted_at = values["posted_at"]
+
+                row = existing_by_external_id.get(external_id) or existing_by_id.get(values["id"])
+                if row is None:
+                    if posted_cutoff is not None and values["posted_at"] is not None and values["posted_at"] < posted_cutoff:
+                        unit.stale += 1
+                        continue
+                    if dedup_index.check_pending(values["id"], job, pending_dedup) is not None:
+                        unit.duplicates += 1
+                        continue
+                    session.add(Job(**values))
+                    skill_demand.add(values)
+                    unit.new += 1
+                    documents.append(_job_document(job, values))
+                    continue
+
+                # 早于 external_id 写入的行补齐该字段（不算内容变化）
+                # Rows written before external_id was recorded get it filled in (not a content change)
+                if row.external_id is None:
+                    row.external_id = external_id
+                changes = {
+                    field: values[field]
+                    for field in TRACKED_FIELDS
+                    if _comparable(getattr(row, field)) != _comparable(values[field])
+                }
+                # 重新出现在上游列表中的职位恢复为在架 / Jobs that reappear upstream are active again
+                if not row.is_active or row.is_expired:
+                    changes.update(is_active=True, is_expired=False)
+                if not changes:
+                    unit.skipped += 1
+                    continue
+                # 技能需求聚合：扣除旧内容（已下架或过期的行本就未计入），计入新内容
+                # Skill demand aggregate: subtract the old content (rows taken down or expired were not counted) and add the new
+                if row.is_active and not row.is_expired:
+                    skill_demand.remove(row)
+                for field, value in changes.items():
+                    setattr(row, field, value)
+                skill_demand.add(row)
+                unit.updated += 1
+                documents.append(_job_document(job, {**values, "id": row.id}))
+            await skill_demand.apply(session)
+            await session.commit()
+        return documents, newest_posted_at
+
+
+# 全局抓取管道实例 - Global ingestion pipeline instance
+job_ingestion_pipeline: Optional[JobIngestionPipeline] = None
+
+
+def get_job_ingestion_pipeline() -> JobIngestionPipeline:
+    """
+    获取职位抓取管道实例
+    Get the job ingestion pipeline instance
+    """
+    global job_ingestion_pipeline
+    if job_ingestion_pipeline is None:
+        job_ingestion_pipeline = JobIngestionPipeline(
+            queries=settings.INGESTION_QUERIES,
+            locations=settings.INGESTION_LOCATIONS,
+            sources=settings.INGESTION_SOURCES,
+            max_results=settings.INGESTION_MAX_RESULTS,
+            interval_seconds=settings.INGESTION_INTERVAL_HOURS * 3600,
+            max_concurrency=settings.INGESTION_MAX_CONCURRENCY,
+            posted_overlap_seconds=settings.INGESTION_POSTED_OVERLAP_HOURS * 3600
+        )
+    return job_ingestion_pipeline
+
+
+async def run_scheduled_ingestion() -> None:
+    """
+    定时任务入口 - 异常只记录日志，不影响调度器
+    Scheduled task entry point - exceptions are logged without affecting the scheduler
+    """
+    try:
+        await get_job_ingestion_pipeline().run()
+    except Exception as e:
+        logger.error(f"定时职位抓取失败 / Scheduled job ingestion failed: {e}")
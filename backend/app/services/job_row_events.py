@@ -0,0 +1,98 @@
+"""
+Job 行变更的提交后通知
+After-commit notifications of Job row changes for JobCatcher
+flush 时收集会话中插入、更新和删除的 Job 行快照，事务提交后才交给订阅者，回滚时丢弃；
+进程内索引因此不会看到未提交或已回滚的行
+Snapshots of Job rows inserted, updated and deleted in a session are collected at flush, handed to subscribers only
+once the transaction commits and dropped on rollback, so in-process indexes never see uncommitted or rolled-back rows
+"""
+
+import logging
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models.job import Job
+
+
+logger = logging.getLogger("service.job_row_events")
+
+# session.info 中待提交变更的键 / session.info key of the changes waiting for commit
+_PENDING_KEY = "job_row_events.pending"
+_FLUSHED_KEY = "job_row_events.flushed"
+
+
+class JobRowSubscriber(NamedTuple):
+    """
+    订阅者 - active() 为假时不收集；snapshot(job) 在 flush 后取快照（返回 None 表示移除）；
+    apply({job_id: 快照或None}) 在提交后执行
+    A subscriber - nothing is collected while active() is false; snapshot(job) is taken after the flush (None means
+    remove); apply({job_id: snapshot or None}) runs after the commit
+    """
+    active: Callable[[], bool]
+    snapshot: Callable[[Job], Optional[Any]]
+    apply: Callable[[Dict[str, Optional[Any]]], None]
+
+
+_subscribers: Dict[str, JobRowSubscriber] = {}
+
+
+def subscribe_job_rows(
+    name: str,
+    active: Callable[[], bool],
+    snapshot: Callable[[Job], Optional[Any]],
+    apply: Callable[[Dict[str, Optional[Any]]], None]
+) -> None:
+    """
+    注册订阅者（同名覆盖）
+    Register a subscriber (replacing one with the same name)
+    """
+    _subscribers[name] = JobRowSubscriber(active, snapshot, apply)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_job_rows(session: Session, flush_context: Any) -> None:
+    # 此时 new/dirty/deleted 仍是 flush 前的集合 / new/dirty/deleted still hold their pre-flush contents here
+    if not any(subscriber.active() for subscriber in _subscribers.values()):
+        return
+    flushed: List[Any] = session.info.setdefault(_FLUSHED_KEY, [])
+    flushed.extend((job, False) for job in session.new if isinstance(job, Job))
+    flushed.extend((job, False) for job in session.dirty if isinstance(job, Job))
+    flushed.extend((job, True) for job in session.deleted if isinstance(job, Job))
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def _snapshot_job_rows(session: Session, flush_context: Any) -> None:
+    # flush 完成后取快照，服务端生成的列已可读取 / Snapshot once the flush completes, so server-generated columns are readable
+    flushed = session.info.pop(_FLUSHED_KEY, None)
+    if not flushed:
+        return
+    pending: Dict[str, Dict[str, Optional[Any]]] = session.info.setdefault(_PENDING_KEY, {})
+    for name, subscriber in _subscribers.items():
+        if not subscriber.active():
+            continue
+        changes = pending.setdefault(name, {})
+        for job, deleted in flushed:
+            changes[job.id] = None if deleted else subscriber.snapshot(job)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_job_rows(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    for name, changes in pending.items():
+        subscriber = _subscribers.get(name)
+        if subscriber is None or not subscriber.active():
+            continue
+        try:
+            subscriber.apply(changes)
+        except Exception as e:
+            logger.error(f"Job行变更通知失败 / Failed to apply Job row changes ({name}): {e}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_job_rows(session: Session) -> None:
+    session.info.pop(_FLUSHED_KEY, None)
+    session.info.pop(_PENDING_KEY, None)
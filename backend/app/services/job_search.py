@@ -5,7 +5,7 @@ Job search service - Simplified version
 
 import asyncio
 import logging
-from typing import List, Optional, Dict, Any
+from typing import AsyncIterator, List, Optional, Dict, Any
 from datetime import datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_, or_
@@ -73,6 +73,23 @@ class JobSearchService:
             # If external APIs fail, return basic mock data to keep functionality available
             return await self._get_fallback_jobs(query, location)
     
+    async def stream_jobs(
+        self,
+        query: str,
+        location: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        流式职位搜索 - 每个外部数据源完成即产出一批结果，最后产出 complete 事件
+        Streaming job search - yields a batch as each external source completes, then a complete event
+        """
+        logger.info(f"Streaming jobs with query: {query}")
+        async for event in self.external_api_service.stream_all_sources(
+            keywords=query,
+            location=location or "Germany",
+            max_results_per_source=10
+        ):
+            yield event
+    
     async def _get_fallback_jobs(self, query: str, location: Optional[str]) -> List[Dict[str, Any]]:
         """
         外部API失败时的回退数据
@@ -0,0 +1,125 @@
+"""
+职位搜索结果流式输出
+Streaming job search results for JobCatcher
+每个数据源完成后立即产出一批去重后的职位，而不是等待最慢的数据源；供 WebSocket 帧和 NDJSON/SSE 响应使用
+Each source yields a batch of deduplicated jobs as soon as it completes instead of waiting for the slowest source;
+consumed by WebSocket frames and NDJSON/SSE responses
+"""
+
+import json
+import logging
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from app.core.metrics import metrics
+from app.services.job_dedup import deduplicate_jobs, new_near_duplicate_index
+from app.services.source_resilience import iter_within_deadline
+
+
+logger = logging.getLogger("service.job_search_stream")
+
+SourceSearch = Callable[[], Awaitable[List[Dict[str, Any]]]]
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+SSE_MEDIA_TYPE = "text/event-stream"
+
+
+class JobBatchDeduplicator:
+    """
+    跨批次近似去重 - 后完成的数据源只产出此前批次中未出现过（含近似重复）的职位
+    Cross-batch near-duplicate removal - later sources only yield jobs not seen (even approximately) in earlier batches
+    """
+
+    def __init__(self):
+        self._index = new_near_duplicate_index()
+
+    def filter(self, jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return deduplicate_jobs(jobs, self._index)
+
+
+async def stream_job_search(searches: Dict[str, SourceSearch], deadline: float) -> AsyncIterator[Dict[str, Any]]:
+    """
+    并行搜索各数据源并按完成顺序产出事件：
+    batch（一个数据源的去重结果）、source_error（失败或超过截止时间），最后是 complete
+    Search every source in parallel and yield events in completion order:
+    batch (one source's deduplicated jobs), source_error (failed or missed the deadline), then a final complete
+    """
+    started = time.perf_counter()
+    deduplicator = JobBatchDeduplicator()
+    statuses: Dict[str, str] = {}
+    total = 0
+
+    async for source, result in iter_within_deadline(
+        list(searches),
+        [search() for search in searches.values()],
+        deadline
+    ):
+        elapsed_ms = round((time.perf_counter() - started) * 1000)
+        if isinstance(result, Exception):
+            statuses[source] = "timeout" if isinstance(result, TimeoutError) else "error"
+            logger.error(f"数据源搜索失败 / Source search failed: {source}: {result}")
+            yield {
+                "type": "source_error",
+                "source": source,
+                "status": statuses[source],
+                "error": str(result),
+                "elapsed_ms": elapsed_ms
+            }
+            continue
+
+        jobs = deduplicator.filter(result or [])
+        statuses[source] = "ok"
+        total += len(jobs)
+        metrics.observe("job_search_batch_ms", elapsed_ms, source=source)
+        yield {
+            "type": "batch",
+            "source": source,
+            "jobs": jobs,
+            "count": len(jobs),
+            "elapsed_ms": elapsed_ms
+        }
+
+    yield {
+        "type": "complete",
+        "total": total,
+        "sources": statuses,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000)
+    }
+
+
+def ndjson_event(event: Dict[str, Any]) -> str:
+    return json.dumps(event, ensure_ascii=False, default=str) + "\n"
+
+
+def sse_event(event: Dict[str, Any]) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False, default=str)}\n\n"
+
+
+STREAM_ENCODERS = {NDJSON_MEDIA_TYPE: ndjson_event, SSE_MEDIA_TYPE: sse_event}
+
+
+def negotiate_stream_media_type(accept: Optional[str]) -> Optional[str]:
+    """
+    根据 Accept 头选择流式格式（NDJSON 或 SSE），普通JSON请求返回 None
+    Pick the streaming format (NDJSON or SSE) from the Accept header; None for plain JSON requests
+    """
+    if not accept:
+        return None
+    for media_type in STREAM_ENCODERS:
+        if media_type in accept:
+            return media_type
+    return None
+
+
+async def encode_event_stream(events: AsyncIterator[Dict[str, Any]], media_type: str) -> AsyncIterator[str]:
+    """
+    将事件编码为 NDJSON 行或 SSE 事件；响应头发出后的异常以 error 事件结束流
+    Encode events as NDJSON lines or SSE events; an exception after the headers are sent ends the stream with an error event
+    """
+    encode = STREAM_ENCODERS[media_type]
+    try:
+        async for event in events:
+            yield encode(event)
+    except Exception as e:
+        logger.error(f"流式职位搜索失败 / Streaming job search failed: {e}")
+        yield encode({"type": "error", "message": "搜索职位时发生错误 / Error occurred while searching jobs"})
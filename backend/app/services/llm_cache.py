@@ -0,0 +1,215 @@
+"""
+LLM响应缓存服务
+LLM response cache service for JobCatcher
+进程内LRU + 可选Redis两级缓存，用于幂等的LLM调用（如简历解析、针对同一职位的改写）
+Two-tier cache (in-process LRU + optional Redis) for idempotent LLM calls such as resume parsing and rewrites against the same job
+"""
+
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, Optional, Tuple
+
+from anthropic.types import Message
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:  # Redis为可选依赖 / Redis is an optional dependency
+    redis_asyncio = None
+
+
+logger = logging.getLogger("service.llm_cache")
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+# 不影响模型输出的请求字段，计算缓存键时忽略
+# Request fields that do not affect model output; ignored when computing cache keys
+_IGNORED_BLOCK_KEYS = {"cache_control"}
+
+
+def _normalize(value: Any) -> Any:
+    """
+    归一化请求内容 - 折叠空白并去除缓存断点等无关字段
+    Normalize request content - collapse whitespace and drop irrelevant fields such as cache breakpoints
+    """
+    if isinstance(value, str):
+        return _WHITESPACE_PATTERN.sub(" ", value).strip()
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items() if key not in _IGNORED_BLOCK_KEYS}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    if hasattr(value, "model_dump"):
+        return _normalize(value.model_dump())
+    return value
+
+
+def _hash(value: Any) -> str:
+    payload = json.dumps(value, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def build_cache_key(request_kwargs: Dict[str, Any]) -> str:
+    """
+    由(模型, 温度, 归一化提示词哈希, 工具定义哈希)构建缓存键
+    Build a cache key from (model, temperature, normalized prompt hash, tool schema hash)
+    """
+    prompt_hash = _hash(_normalize({
+        "system": request_kwargs.get("system"),
+        "messages": request_kwargs.get("messages"),
+        "max_tokens": request_kwargs.get("max_tokens"),
+    }))
+    tools_hash = _hash(_normalize({
+        "tools": request_kwargs.get("tools"),
+        "tool_choice": request_kwargs.get("tool_choice"),
+    }))
+    return "llm:{model}:{temperature}:{prompt}:{tools}".format(
+        model=request_kwargs.get("model"),
+        temperature=request_kwargs.get("temperature", 1.0),
+        prompt=prompt_hash,
+        tools=tools_hash[:16]
+    )
+
+
+class LLMResponseCache:
+    """
+    两级LLM响应缓存 - 进程内LRU在前，Redis在后（配置了REDIS_URL时启用）
+    Two-tier LLM response cache - in-process LRU first, Redis behind it (enabled when REDIS_URL is set)
+    """
+
+    def __init__(self, max_entries: int = 512, redis_url: Optional[str] = None):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._hits: Dict[str, int] = defaultdict(int)
+        self._misses: Dict[str, int] = defaultdict(int)
+        self._redis = None
+        if redis_url and redis_asyncio is not None:
+            self._redis = redis_asyncio.from_url(redis_url)
+        elif redis_url:
+            logger.warning("未安装redis，仅使用进程内缓存 / redis not installed, using in-process cache only")
+
+    def ttl_for(self, call_site: str) -> Optional[int]:
+        """
+        获取调用位置的缓存TTL，未配置返回None（不缓存）
+        Get the cache TTL of a call site; None (not cached) when unconfigured
+        """
+        return settings.LLM_CACHE_TTL_SECONDS.get(call_site)
+
+    def is_cacheable(self, request_kwargs: Dict[str, Any]) -> bool:
+        """
+        判断请求是否可缓存 - temperature>0 的请求是采样结果，除非全局开启否则绕过缓存
+        Decide whether a request is cacheable - requests with temperature > 0 are samples and bypass the cache unless
+        enabled globally
+        """
+        if request_kwargs.get("stream"):
+            return False
+        temperature = request_kwargs.get("temperature", 1.0)
+        if temperature > 0:
+            return settings.LLM_CACHE_ALLOW_NONZERO_TEMPERATURE
+        return True
+
+    async def get(self, key: str, call_site: str) -> Optional[Message]:
+        """
+        读取缓存的响应
+        Read a cached response
+        """
+        payload = self._get_local(key)
+        tier = "memory"
+
+        if payload is None and self._redis is not None:
+            tier = "redis"
+            try:
+                raw = await self._redis.get(key)
+                if raw is not None:
+                    payload = json.loads(raw)
+                    ttl = await self._redis.ttl(key)
+                    self._set_local(key, payload, ttl if ttl and ttl > 0 else self.ttl_for(call_site) or 60)
+            except Exception as e:
+                logger.warning(f"Redis缓存读取失败 / Redis cache read failed: {e}")
+                payload = None
+
+        if payload is None:
+            self._misses[call_site] += 1
+            metrics.increment("llm_cache_miss_total", call_site=call_site)
+            self._update_hit_rate(call_site)
+            return None
+
+        self._hits[call_site] += 1
+        metrics.increment("llm_cache_hit_total", call_site=call_site, tier=tier)
+        self._update_hit_rate(call_site)
+        return Message.model_validate(payload)
+
+    async def set(self, key: str, response: Message, ttl: int) -> None:
+        """
+        写入响应到两级缓存
+        Write a response to both cache tiers
+        """
+        payload = response.model_dump(mode="json")
+        self._set_local(key, payload, ttl)
+
+        if self._redis is not None:
+            try:
+                await self._redis.set(key, json.dumps(payload, ensure_ascii=False), ex=ttl)
+            except Exception as e:
+                logger.warning(f"Redis缓存写入失败 / Redis cache write failed: {e}")
+
+    def _get_local(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, payload = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return payload
+
+    def _set_local(self, key: str, payload: Dict[str, Any], ttl: int) -> None:
+        self._entries[key] = (time.monotonic() + ttl, payload)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            metrics.increment("llm_cache_evictions_total")
+
+    def _update_hit_rate(self, call_site: str) -> None:
+        hits, misses = self._hits[call_site], self._misses[call_site]
+        metrics.set_gauge("llm_cache_hit_rate", round(hits / (hits + misses), 4), call_site=call_site)
+
+    async def clear(self) -> None:
+        """
+        清空进程内缓存
+        Clear the in-process cache
+        """
+        self._entries.clear()
+
+    async def aclose(self) -> None:
+        """
+        关闭Redis连接
+        Close the Redis connection
+        """
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+
+# 全局缓存实例 - Global cache instance
+llm_response_cache: Optional[LLMResponseCache] = None
+
+
+def get_llm_response_cache() -> LLMResponseCache:
+    """
+    获取LLM响应缓存实例
+    Get the LLM response cache instance
+    """
+    global llm_response_cache
+    if llm_response_cache is None:
+        llm_response_cache = LLMResponseCache(
+            max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+            redis_url=settings.REDIS_URL
+        )
+    return llm_response_cache
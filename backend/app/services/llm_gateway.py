@@ -0,0 +1,404 @@
+"""
+LLM网关服务
+LLM gateway service for JobCatcher
+进程内唯一的Anthropic客户端，统一连接池、速率预算和优先级调度
+Single process-wide Anthropic client with a shared connection pool, rate budgets and priority scheduling
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from enum import Enum
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+import anthropic
+import httpx
+
+from app.core.config import settings
+from app.core.metrics import metrics, record_llm_usage
+from app.core.single_flight import SingleFlight
+from app.services.llm_cache import build_cache_key, get_llm_response_cache
+
+
+logger = logging.getLogger("service.llm_gateway")
+
+
+class LLMPriority(str, Enum):
+    """
+    LLM请求优先级
+    LLM request priority
+    """
+    INTERACTIVE = "interactive"  # 用户聊天等交互请求 / Interactive chat turns
+    BATCH = "batch"              # 后台批处理任务 / Background batch work
+
+
+# 当前上下文的请求优先级，后台任务通过 llm_priority_scope 切换为批处理
+# Request priority of the current context; background tasks switch to batch via llm_priority_scope
+_current_priority: ContextVar[LLMPriority] = ContextVar("llm_priority", default=LLMPriority.INTERACTIVE)
+
+_PRIORITY_RANK = {LLMPriority.INTERACTIVE: 0, LLMPriority.BATCH: 1}
+
+# 非文本内容块（文档、图片）的估算token数
+# Estimated token count for non-text content blocks (documents, images)
+_NON_TEXT_BLOCK_TOKENS = 1500
+
+
+@contextmanager
+def llm_priority_scope(priority: LLMPriority) -> Iterator[None]:
+    """
+    在当前上下文中设置LLM请求优先级
+    Set the LLM request priority for the current context
+    """
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def _stream_snapshot(stream: Any) -> Optional[Any]:
+    """
+    流的当前消息快照；尚未收到任何事件时为None（SDK的属性此时会断言失败）
+    The stream's current message snapshot; None before any event arrived (the SDK property asserts then)
+    """
+    try:
+        return stream.current_message_snapshot
+    except AssertionError:
+        return None
+
+
+class TokenBucket:
+    """
+    按分钟补充的令牌桶 - 用于RPM/TPM预算
+    Per-minute refilling token bucket - used for RPM/TPM budgets
+    """
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.refill_per_second = per_minute / 60.0
+        self._updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated_at) * self.refill_per_second)
+        self._updated_at = now
+
+    async def acquire(self, amount: float, reserve: float = 0.0) -> None:
+        """
+        获取令牌，余量不足时等待补充；reserve 为必须保留给更高优先级的余量
+        Take tokens, waiting for refill when short; reserve is headroom kept for higher priorities
+        """
+        # 单次请求不能超过桶容量，否则永远无法满足
+        # A single request may not exceed capacity, otherwise it could never be satisfied
+        amount = min(amount, self.capacity - reserve)
+        while True:
+            self._refill()
+            if self.tokens - amount >= reserve:
+                self.tokens -= amount
+                return
+            wait_seconds = (amount + reserve - self.tokens) / self.refill_per_second
+            await asyncio.sleep(min(max(wait_seconds, 0.05), 1.0))
+
+    def adjust(self, delta: float) -> None:
+        """
+        按实际用量修正令牌（可为负，超支会延后后续请求）
+        Correct tokens by actual usage (may go negative; overspend delays later requests)
+        """
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+
+class PriorityGate:
+    """
+    按优先级分配的并发槽位 - 交互式请求优先出队，并保留部分槽位
+    Priority-ordered concurrency slots - interactive requests dequeue first and keep reserved slots
+    """
+
+    def __init__(self, limit: int, reserved_interactive: int):
+        self.limit = limit
+        self.batch_limit = max(1, limit - reserved_interactive)
+        self.active = 0
+        self.active_batch = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future, LLMPriority]] = []
+        self._sequence = itertools.count()
+
+    def _can_start(self, priority: LLMPriority) -> bool:
+        if self.active >= self.limit:
+            return False
+        return priority == LLMPriority.INTERACTIVE or self.active_batch < self.batch_limit
+
+    def _start(self, priority: LLMPriority) -> None:
+        self.active += 1
+        if priority == LLMPriority.BATCH:
+            self.active_batch += 1
+
+    async def acquire(self, priority: LLMPriority) -> None:
+        """
+        获取一个并发槽位
+        Acquire a concurrency slot
+        """
+        if not self._waiters and self._can_start(priority):
+            self._start(priority)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (_PRIORITY_RANK[priority], next(self._sequence), future, priority))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 已分配槽位但调用方被取消，归还槽位
+                # Slot was granted but the caller was cancelled; give it back
+                self.release(priority)
+            else:
+                self._waiters = [waiter for waiter in self._waiters if waiter[2] is not future]
+                heapq.heapify(self._waiters)
+            raise
+
+    def release(self, priority: LLMPriority) -> None:
+        """
+        释放槽位并唤醒等待者
+        Release a slot and wake waiters
+        """
+        self.active -= 1
+        if priority == LLMPriority.BATCH:
+            self.active_batch -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        # 队首是当前最高优先级；若队首无法启动，其后的请求也无法启动
+        # The head is the highest priority; if it cannot start, nothing behind it can
+        while self._waiters and self._can_start(self._waiters[0][3]):
+            _, _, future, priority = heapq.heappop(self._waiters)
+            if future.cancelled():
+                continue
+            self._start(priority)
+            future.set_result(None)
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+
+class LLMGateway:
+    """
+    LLM网关 - 共享连接池的Anthropic客户端加全局并发和速率控制
+    LLM gateway - pooled Anthropic client plus global concurrency and rate control
+    """
+
+    def __init__(self):
+        self._client: Optional[anthropic.AsyncAnthropic] = None
+        self._gate = PriorityGate(
+            settings.LLM_MAX_CONCURRENT_REQUESTS,
+            settings.LLM_INTERACTIVE_RESERVED_SLOTS
+        )
+        self._request_bucket = TokenBucket(settings.LLM_REQUESTS_PER_MINUTE) if settings.LLM_REQUESTS_PER_MINUTE else None
+        self._token_bucket = TokenBucket(settings.LLM_TOKENS_PER_MINUTE) if settings.LLM_TOKENS_PER_MINUTE else None
+        self._reserve_ratio = settings.LLM_INTERACTIVE_RESERVE_RATIO
+        self._flight = SingleFlight("llm")
+
+    @property
+    def client(self) -> anthropic.AsyncAnthropic:
+        """
+        懒加载的共享Anthropic客户端
+        Lazily created shared Anthropic client
+        """
+        if self._client is None:
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=settings.LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS
+                ),
+                timeout=httpx.Timeout(settings.LLM_REQUEST_TIMEOUT_SECONDS, connect=10.0)
+            )
+            self._client = anthropic.AsyncAnthropic(
+                api_key=settings.ANTHROPIC_API_KEY,
+                base_url=settings.ANTHROPIC_BASE_URL,
+                max_retries=settings.LLM_MAX_RETRIES,
+                http_client=http_client
+            )
+        return self._client
+
+    async def create_message(
+        self,
+        call_site: str,
+        **request_kwargs: Any
+    ):
+        """
+        发送一次非流式消息请求，配置了缓存TTL的调用位置先查响应缓存
+        Send a single non-streaming message request; call sites with a cache TTL check the response cache first
+
+        Args:
+            call_site: 调用位置标识，用于指标和缓存TTL / Call site identifier for metrics and cache TTL
+            **request_kwargs: 传给 messages.create 的参数 / Arguments for messages.create
+        """
+        cache = get_llm_response_cache() if settings.LLM_CACHE_ENABLED else None
+        cache_ttl = cache.ttl_for(call_site) if cache else None
+        cache_key = None
+        if cache_ttl:
+            if cache.is_cacheable(request_kwargs):
+                cache_key = build_cache_key(request_kwargs)
+                cached_response = await cache.get(cache_key, call_site)
+                if cached_response is not None:
+                    return cached_response
+            else:
+                metrics.increment("llm_cache_bypass_total", call_site=call_site)
+
+        if cache_key is None:
+            return await self._send_message(call_site, request_kwargs)
+
+        # 可缓存（确定性）的请求在未命中时按缓存键单飞，并发的相同请求共享一次调用
+        # Cacheable (deterministic) requests are single-flighted by cache key on a miss; concurrent identical requests share one call
+        async def send_and_cache():
+            response = await self._send_message(call_site, request_kwargs)
+            # 只缓存正常结束的响应，截断的输出不缓存
+            # Only cache responses that finished normally; truncated output is not cached
+            if response.stop_reason in ("end_turn", "stop_sequence"):
+                await cache.set(cache_key, response, cache_ttl)
+            return response
+
+        return await self._flight.do(cache_key, send_and_cache)
+
+    async def _send_message(self, call_site: str, request_kwargs: Dict[str, Any]):
+        estimated_tokens = self._estimate_input_tokens(request_kwargs)
+        async with self._admit(call_site, estimated_tokens) as settle:
+            response = await self.client.messages.create(**request_kwargs)
+            settle(response)
+        return response
+
+    @asynccontextmanager
+    async def stream_message(self, call_site: str, **request_kwargs: Any) -> AsyncIterator[Any]:
+        """
+        打开一次流式消息请求，退出时按最终用量结算
+        Open a streaming message request; usage is settled on exit
+        """
+        estimated_tokens = self._estimate_input_tokens(request_kwargs)
+        async with self._admit(call_site, estimated_tokens) as settle:
+            async with self.client.messages.stream(**request_kwargs) as stream:
+                try:
+                    yield stream
+                finally:
+                    # 首个事件之前被取消或失败时没有快照；结算失败不能掩盖原始异常
+                    # There is no snapshot when cancelled or failed before the first event; a failed settle must not
+                    # mask the original exception
+                    try:
+                        settle(_stream_snapshot(stream))
+                    except Exception as e:
+                        logger.warning(f"流式请求用量结算失败 / Failed to settle streamed usage ({call_site}): {e}")
+
+    @asynccontextmanager
+    async def _admit(self, call_site: str, estimated_tokens: int) -> AsyncIterator[Any]:
+        """
+        准入控制：按优先级获取并发槽位和速率预算，结束后按实际用量结算
+        Admission control: acquire a slot and rate budget by priority, then settle with actual usage
+        """
+        priority = _current_priority.get()
+        queued_at = time.perf_counter()
+
+        await self._gate.acquire(priority)
+        try:
+            is_batch = priority == LLMPriority.BATCH
+            if self._request_bucket:
+                reserve = self._request_bucket.capacity * self._reserve_ratio if is_batch else 0.0
+                await self._request_bucket.acquire(1, reserve)
+            if self._token_bucket:
+                reserve = self._token_bucket.capacity * self._reserve_ratio if is_batch else 0.0
+                await self._token_bucket.acquire(estimated_tokens, reserve)
+
+            started_at = time.perf_counter()
+            metrics.observe("llm_queue_wait_ms", (started_at - queued_at) * 1000, priority=priority.value)
+            metrics.set_gauge("llm_active_requests", self._gate.active)
+            metrics.set_gauge("llm_waiting_requests", self._gate.waiting)
+
+            settled = False
+
+            def settle(message: Any) -> None:
+                nonlocal settled
+                if settled or message is None or getattr(message, "usage", None) is None:
+                    return
+                settled = True
+                usage = record_llm_usage(call_site, message.usage)
+                if self._token_bucket:
+                    actual_tokens = (
+                        usage["input_tokens"]
+                        + usage["cache_creation_input_tokens"]
+                        + usage["output_tokens"]
+                    )
+                    self._token_bucket.adjust(actual_tokens - estimated_tokens)
+
+            try:
+                yield settle
+            finally:
+                metrics.observe(
+                    "llm_request_duration_ms",
+                    (time.perf_counter() - started_at) * 1000,
+                    call_site=call_site
+                )
+        finally:
+            self._gate.release(priority)
+            metrics.set_gauge("llm_active_requests", self._gate.active)
+
+    @staticmethod
+    def _estimate_input_tokens(request_kwargs: Dict[str, Any]) -> int:
+        """
+        粗略估算输入token数（约4字符/token）
+        Roughly estimate input tokens (about 4 characters per token)
+        """
+        characters = 0
+        non_text_blocks = 0
+
+        def visit(content: Any) -> None:
+            nonlocal characters, non_text_blocks
+            if isinstance(content, str):
+                characters += len(content)
+            elif isinstance(content, list):
+                for block in content:
+                    visit(block)
+            elif isinstance(content, dict):
+                if content.get("type") in ("document", "image"):
+                    non_text_blocks += 1
+                elif "text" in content:
+                    characters += len(str(content["text"]))
+                else:
+                    characters += len(str(content.get("content", content.get("input", ""))))
+            elif hasattr(content, "text"):
+                characters += len(content.text or "")
+            elif hasattr(content, "input"):
+                characters += len(str(content.input))
+
+        visit(request_kwargs.get("system", ""))
+        for message in request_kwargs.get("messages", []):
+            visit(message.get("content", ""))
+        for tool_definition in request_kwargs.get("tools", []) or []:
+            characters += len(str(tool_definition))
+
+        return characters // 4 + non_text_blocks * _NON_TEXT_BLOCK_TOKENS
+
+    async def aclose(self) -> None:
+        """
+        关闭共享客户端和连接池
+        Close the shared client and its connection pool
+        """
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+# 全局LLM网关实例 - Global LLM gateway instance
+llm_gateway: Optional[LLMGateway] = None
+
+
+def get_llm_gateway() -> LLMGateway:
+    """
+    获取LLM网关实例
+    Get the LLM gateway instance
+    """
+    global llm_gateway
+    if llm_gateway is None:
+        llm_gateway = LLMGateway()
+    return llm_gateway
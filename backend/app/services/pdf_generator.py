@@ -6,12 +6,23 @@ Using Claude 4 to generate Markdown resumes, then convert to PDF via PDFMonkey
 """
 
 import logging
-import httpx
 import asyncio
 from typing import Dict, Any, Optional
-import anthropic
 
 from app.core.config import settings
+from app.services.http_clients import get_http_client
+from app.services.llm_gateway import get_llm_gateway
+
+
+# Markdown简历生成的系统提示词 - 跨请求稳定，可被提示缓存复用
+# System prompt for Markdown resume generation - stable across requests and reusable by the prompt cache
+MARKDOWN_SYSTEM_PROMPT = """你是JobCatcher平台的简历排版专家，负责将结构化简历数据转换为专业、符合ATS要求的Markdown简历。
+You are JobCatcher's resume formatting expert, turning structured resume data into professional, ATS-friendly Markdown resumes.
+
+输出要求 / Output rules:
+- 使用标准Markdown语法，标题层级清晰 / Use standard Markdown with a clear heading hierarchy
+- 只输出Markdown内容，不要附加解释 / Output Markdown only, without explanations
+- 保持内容真实，不虚构经历 / Keep content truthful, never invent experience"""
 
 
 class PDFGeneratorService:
@@ -27,12 +38,9 @@ class PDFGeneratorService:
         """
         self.logger = logging.getLogger("service.pdf_generator")
         
-        # 初始化Claude 4客户端
-        # Initialize Claude 4 client
-        self.anthropic_client = anthropic.AsyncAnthropic(
-            api_key=settings.ANTHROPIC_API_KEY,
-            base_url=settings.ANTHROPIC_BASE_URL
-        )
+        # 通过共享LLM网关调用Claude 4
+        # Call Claude 4 through the shared LLM gateway
+        self.llm_gateway = get_llm_gateway()
         
         # PDFMonkey API配置
         # PDFMonkey API configuration
@@ -52,17 +60,34 @@ class PDFGeneratorService:
         try:
             # 构建提示词，包含简历数据和目标职位信息
             # Build prompt including resume data and target job information
+            resume_section = self._build_resume_section_for_prompt(resume_data)
             prompt = self._build_markdown_prompt(resume_data, target_job, style)
             
-            # 调用Claude 4生成Markdown
-            # Call Claude 4 to generate Markdown
-            response = await self.anthropic_client.messages.create(
+            # 调用Claude 4生成Markdown - 系统提示词和简历数据作为可缓存前缀
+            # Call Claude 4 to generate Markdown - system prompt and resume data as cacheable prefixes
+            response = await self.llm_gateway.create_message(
+                "pdf_generator.resume_markdown",
                 model="claude-sonnet-4-20250514",
                 max_tokens=4000,
                 temperature=settings.CLAUDE_TEMPERATURE,
+                system=[{
+                    "type": "text",
+                    "text": MARKDOWN_SYSTEM_PROMPT,
+                    "cache_control": {"type": "ephemeral"}
+                }],
                 messages=[{
                     "role": "user",
-                    "content": prompt
+                    "content": [
+                        {
+                            "type": "text",
+                            "text": resume_section,
+                            "cache_control": {"type": "ephemeral"}
+                        },
+                        {
+                            "type": "text",
+                            "text": prompt
+                        }
+                    ]
                 }]
             )
             
@@ -123,15 +148,10 @@ class PDFGeneratorService:
                 "fallback_markdown": markdown_content if 'markdown_content' in locals() else None
             }
     
-    def _build_markdown_prompt(
-        self, 
-        resume_data: Dict[str, Any], 
-        target_job: Optional[Dict[str, Any]], 
-        style: str
-    ) -> str:
+    def _build_resume_section_for_prompt(self, resume_data: Dict[str, Any]) -> str:
         """
-        构建Claude 4的Markdown生成提示词
-        Build Claude 4 prompt for Markdown generation
+        构建简历数据部分 - 与风格和目标职位无关，作为可缓存的稳定前缀
+        Build the resume data section - independent of style and target job, used as a stable cacheable prefix
         """
         # 基础简历信息
         personal_info = resume_data.get("personal_info", {})
@@ -140,20 +160,8 @@ class PDFGeneratorService:
         skills = resume_data.get("skills", {})
         projects = resume_data.get("projects", [])
         
-        # 目标职位信息（如果有）
-        job_context = ""
-        if target_job:
-            job_context = f"""
-目标职位信息：
-- 职位名称：{target_job.get('title', '')}
-- 公司：{target_job.get('company', '')}
-- 关键要求：{target_job.get('description', '')[:200]}...
-"""
-        
-        prompt = f"""
-请基于以下简历数据生成一份专业的Markdown格式简历，风格为{style}：
-
-{job_context}
+        return f"""
+简历数据：
 
 个人信息：
 - 姓名：{personal_info.get('name', '')}
@@ -173,6 +181,32 @@ class PDFGeneratorService:
 
 项目经验：
 {self._format_projects_for_prompt(projects)}
+"""
+    
+    def _build_markdown_prompt(
+        self, 
+        resume_data: Dict[str, Any], 
+        target_job: Optional[Dict[str, Any]], 
+        style: str
+    ) -> str:
+        """
+        构建Claude 4的Markdown生成提示词（简历数据由 _build_resume_section_for_prompt 单独提供）
+        Build Claude 4 prompt for Markdown generation (resume data is supplied separately by _build_resume_section_for_prompt)
+        """
+        # 目标职位信息（如果有）
+        job_context = ""
+        if target_job:
+            job_context = f"""
+目标职位信息：
+- 职位名称：{target_job.get('title', '')}
+- 公司：{target_job.get('company', '')}
+- 关键要求：{target_job.get('description', '')[:200]}...
+"""
+        
+        prompt = f"""
+请基于上述简历数据生成一份专业的Markdown格式简历，风格为{style}：
+
+{job_context}
 
 请生成一份符合ATS系统要求的Markdown简历，要求：
 1. 使用标准的Markdown语法
@@ -209,50 +243,49 @@ class PDFGeneratorService:
             
             # 实际PDFMonkey API调用
             # Actual PDFMonkey API call
-            async with httpx.AsyncClient() as client:
-                headers = {
-                    "Authorization": f"Bearer {self.pdfmonkey_api_key}",
-                    "Content-Type": "application/json"
-                }
-                
-                # PDFMonkey API请求数据
-                # PDFMonkey API request data
-                request_data = {
-                    "document": {
-                        "document_template_id": self._get_template_id(template_style),
-                        "payload": {
-                            "markdown_content": markdown_content,
-                            "style": template_style
-                        }
+            client = get_http_client("pdfmonkey")
+            headers = {
+                "Authorization": f"Bearer {self.pdfmonkey_api_key}",
+                "Content-Type": "application/json"
+            }
+            
+            # PDFMonkey API请求数据
+            # PDFMonkey API request data
+            request_data = {
+                "document": {
+                    "document_template_id": self._get_template_id(template_style),
+                    "payload": {
+                        "markdown_content": markdown_content,
+                        "style": template_style
                     }
                 }
+            }
+            
+            # 发送PDF生成请求
+            # Send PDF generation request
+            response = await client.post(
+                f"{self.pdfmonkey_base_url}/documents",
+                headers=headers,
+                json=request_data
+            )
+            
+            if response.status_code == 201:
+                result = response.json()
+                document_id = result["document"]["id"]
                 
-                # 发送PDF生成请求
-                # Send PDF generation request
-                response = await client.post(
-                    f"{self.pdfmonkey_base_url}/documents",
-                    headers=headers,
-                    json=request_data,
-                    timeout=30
-                )
+                # 轮询PDF生成状态
+                # Poll PDF generation status
+                pdf_url = await self._poll_pdf_status(document_id, headers)
+                
+                return {
+                    "download_url": pdf_url,
+                    "file_size": "估算 2-3MB",
+                    "pages": 2,
+                    "document_id": document_id
+                }
+            else:
+                raise Exception(f"PDFMonkey API错误: {response.status_code} - {response.text}")
                 
-                if response.status_code == 201:
-                    result = response.json()
-                    document_id = result["document"]["id"]
-                    
-                    # 轮询PDF生成状态
-                    # Poll PDF generation status
-                    pdf_url = await self._poll_pdf_status(document_id, headers)
-                    
-                    return {
-                        "download_url": pdf_url,
-                        "file_size": "估算 2-3MB",
-                        "pages": 2,
-                        "document_id": document_id
-                    }
-                else:
-                    raise Exception(f"PDFMonkey API错误: {response.status_code} - {response.text}")
-                    
         except Exception as e:
             self.logger.error(f"PDFMonkey转换失败 / PDFMonkey conversion failed: {e}")
             # 返回fallback结果
@@ -272,34 +305,34 @@ class PDFGeneratorService:
         max_attempts = 30  # 最多等待30秒
         attempt = 0
         
-        async with httpx.AsyncClient() as client:
-            while attempt < max_attempts:
-                try:
-                    response = await client.get(
-                        f"{self.pdfmonkey_base_url}/documents/{document_id}",
-                        headers=headers,
-                        timeout=10
-                    )
+        client = get_http_client("pdfmonkey")
+        while attempt < max_attempts:
+            try:
+                response = await client.get(
+                    f"{self.pdfmonkey_base_url}/documents/{document_id}",
+                    headers=headers,
+                    timeout=10
+                )
+                
+                if response.status_code == 200:
+                    result = response.json()
+                    status = result["document"]["status"]
+                    
+                    if status == "success":
+                        return result["document"]["download_url"]
+                    elif status == "failure":
+                        raise Exception("PDF生成失败")
                     
-                    if response.status_code == 200:
-                        result = response.json()
-                        status = result["document"]["status"]
-                        
-                        if status == "success":
-                            return result["document"]["download_url"]
-                        elif status == "failure":
-                            raise Exception("PDF生成失败")
-                        
-                        # 等待1秒后重试
-                        await asyncio.sleep(1)
-                        attempt += 1
-                    else:
-                        raise Exception(f"状态查询失败: {response.status_code}")
-                        
-                except Exception as e:
-                    self.logger.warning(f"PDF状态轮询失败 / PDF status polling failed: {e}")
+                    # 等待1秒后重试
                     await asyncio.sleep(1)
                     attempt += 1
+                else:
+                    raise Exception(f"状态查询失败: {response.status_code}")
+                    
+            except Exception as e:
+                self.logger.warning(f"PDF状态轮询失败 / PDF status polling failed: {e}")
+                await asyncio.sleep(1)
+                attempt += 1
         
         raise Exception("PDF生成超时")
     
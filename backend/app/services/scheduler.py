@@ -0,0 +1,131 @@
+"""
+后台定时任务调度
+Background task scheduling for JobCatcher
+基于 apscheduler 的 AsyncIOScheduler，在应用事件循环中运行定时抓取、过期职位清理等任务；多副本部署时只在一个副本开启
+Runs scheduled tasks such as job ingestion and expired job cleanup on the application event loop with apscheduler's
+AsyncIOScheduler; enable it on a single replica in multi-replica deployments. Of the worker processes on one host, only
+the one holding the scheduler lock file starts it
+"""
+
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import IO, Optional
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from app.core.config import settings
+from app.services.job_expiry import cleanup_jobs
+from app.services.job_ingestion import run_scheduled_ingestion
+
+
+logger = logging.getLogger("service.scheduler")
+
+# 启动后首次抓取的延迟，避免与启动流程争抢资源；检查点让重启后的首次运行只补做未完成的组合
+# Delay before the first ingestion after startup so it does not compete with startup; checkpoints make that run only
+# redo unfinished combinations after a restart
+INITIAL_INGESTION_DELAY_SECONDS = 60
+
+
+class JobScheduler:
+    """
+    定时任务调度器 - 同一任务不会重叠执行，错过的多次触发合并为一次
+    Scheduled task runner - a task never overlaps itself, and missed firings are coalesced into one
+    """
+
+    def __init__(self, lock_path: Optional[str] = None):
+        self.lock_path = lock_path or settings.JOB_SCHEDULER_LOCK_PATH
+        self._scheduler: Optional[AsyncIOScheduler] = None
+        self._lock_file: Optional[IO] = None
+
+    @property
+    def started(self) -> bool:
+        return self._scheduler is not None
+
+    def _acquire_lock(self) -> bool:
+        """
+        非阻塞地获取主机级进程锁；锁随进程退出自动释放，之后启动的worker可以接管
+        Take the host-level process lock without blocking; it is released when the process exits so a later worker can
+        take over
+        """
+        if fcntl is None:
+            return True
+        lock_file = open(self.lock_path, "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def _release_lock(self) -> None:
+        if self._lock_file is not None:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            self._lock_file.close()
+            self._lock_file = None
+
+    def start(self) -> None:
+        """
+        注册并启动定时任务（需在运行中的事件循环内调用）；同一主机上已有worker持有锁时不启动
+        Register and start the scheduled tasks (must be called inside the running event loop); nothing starts when
+        another worker on the host holds the lock
+        """
+        if self.started or not settings.JOB_SCHEDULER_ENABLED:
+            return
+        if not self._acquire_lock():
+            logger.info(f"定时任务由其他worker运行 / Scheduler runs in another worker (pid {os.getpid()} skipped)")
+            return
+
+        scheduler = AsyncIOScheduler(job_defaults={"coalesce": True, "max_instances": 1})
+        if settings.INGESTION_QUERIES:
+            scheduler.add_job(
+                run_scheduled_ingestion,
+                IntervalTrigger(hours=settings.INGESTION_INTERVAL_HOURS),
+                id="job_ingestion",
+                next_run_time=datetime.now() + timedelta(seconds=INITIAL_INGESTION_DELAY_SECONDS)
+            )
+        # 每日 UTC 凌晨检查职位链接并清理过期职位（开发文档第14节）
+        # Check job links and clean up expired jobs daily in the early UTC morning (development doc section 14)
+        scheduler.add_job(
+            cleanup_jobs,
+            CronTrigger(hour=settings.LINK_CHECK_CRON_HOUR, timezone="UTC"),
+            id="job_cleanup"
+        )
+        scheduler.start()
+        self._scheduler = scheduler
+        logger.info(f"定时任务已启动 / Scheduler started: {[job.id for job in scheduler.get_jobs()]}")
+
+    async def stop(self) -> None:
+        """
+        停止调度器，不等待执行中的任务（检查点保证下次启动时继续）
+        Stop the scheduler without waiting for running tasks (checkpoints let them continue on next startup)
+        """
+        if self._scheduler is None:
+            return
+        self._scheduler.shutdown(wait=False)
+        self._scheduler = None
+        self._release_lock()
+        logger.info("定时任务已停止 / Scheduler stopped")
+
+
+# 全局调度器实例 - Global scheduler instance
+job_scheduler: Optional[JobScheduler] = None
+
+
+def get_job_scheduler() -> JobScheduler:
+    """
+    获取定时任务调度器实例
+    Get the scheduler instance
+    """
+    global job_scheduler
+    if job_scheduler is None:
+        job_scheduler = JobScheduler()
+    return job_scheduler
@@ -0,0 +1,921 @@
+"""
+职位检索后端
+Job search backends for JobCatcher
+Azure AI Search 和进程内本地混合索引（向量 + BM25，RRF融合）共用同一接口，本地后端无需任何网络服务
+Azure AI Search and an embedded local hybrid index (vector + BM25, fused by RRF) share one interface; the local backend needs no network service
+"""
+
+import asyncio
+import bisect
+import hashlib
+import heapq
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+from azure.core.credentials import AzureKeyCredential
+from azure.search.documents.aio import SearchClient
+from azure.search.documents.indexes.aio import SearchIndexClient
+from azure.search.documents.models import VectorizedQuery
+from azure.search.documents.indexes.models import (
+    SearchIndex,
+    SearchField,
+    SearchFieldDataType,
+    SimpleField,
+    SearchableField,
+    VectorSearch,
+    VectorSearchProfile,
+    HnswAlgorithmConfiguration,
+)
+from langchain_core.embeddings import Embeddings
+
+from app.core.config import settings
+from app.services.bm25_index import BM25Index, get_bm25_index
+
+try:
+    import hnswlib
+except ImportError:  # HNSW为可选依赖，缺失时始终使用暴力检索 / HNSW is optional; brute force is used without it
+    hnswlib = None
+
+
+logger = logging.getLogger("service.search_backends")
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# Azure AI Search 单次查询的 top 和 skip 上限 / Azure AI Search caps on top and skip per query
+AZURE_MAX_TOP = 1000
+AZURE_MAX_SKIP = 100000
+
+# 新文档分配下一个行号，已有文档保留原行号（行号即向量文件中的位置）
+# New documents get the next row while existing ones keep theirs (a row is the position in the vector file)
+_UPSERT_DOCUMENT_SQL = (
+    "INSERT INTO documents (row, id, document, version) "
+    "VALUES ((SELECT COALESCE(MAX(row), -1) + 1 FROM documents), ?, ?, ?) "
+    "ON CONFLICT (id) DO UPDATE SET document = excluded.document, version = excluded.version "
+    "RETURNING row"
+)
+
+
+class UploadResult(NamedTuple):
+    """
+    单文档上传结果（与Azure IndexingResult字段一致）
+    Per-document upload result (same fields as Azure's IndexingResult)
+    """
+    key: str
+    succeeded: bool
+    status_code: int
+    error_message: Optional[str] = None
+
+
+class SearchBackend(ABC):
+    """
+    检索后端基类
+    Base class for search backends
+    """
+
+    @abstractmethod
+    async def ensure_index(self) -> None:
+        """
+        确保索引存在
+        Ensure the index exists
+        """
+        pass
+
+    @abstractmethod
+    async def upload_documents(self, documents: List[Dict[str, Any]]) -> List[UploadResult]:
+        """
+        上传（插入或覆盖）文档，文档包含 content_vector
+        Upload (insert or replace) documents carrying a content_vector
+        """
+        pass
+
+    @abstractmethod
+    async def search(
+        self,
+        query: str,
+        query_vector: List[float],
+        top_k: int,
+        filter_expression: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        混合检索，结果带 @search.score
+        Hybrid search; results carry @search.score
+        """
+        pass
+
+    @abstractmethod
+    async def list_expired_ids(self, after: Optional[str], limit: int) -> List[str]:
+        """
+        按键范围分页列出过期文档ID：返回 ID 大于 after 的最多 limit 个，按ID升序
+        List expired document IDs by key range: up to limit IDs greater than after, in ascending ID order
+        """
+        pass
+
+    @abstractmethod
+    async def delete_documents(self, ids: List[str]) -> int:
+        """
+        按ID删除文档，返回删除数量（不存在的ID不计入）
+        Delete documents by ID, returning how many were removed (unknown IDs are not counted)
+        """
+        pass
+
+
+class AzureSearchBackend(SearchBackend):
+    """
+    Azure AI Search后端
+    Azure AI Search backend
+    """
+
+    def __init__(self):
+        # 验证配置 - Validate configuration
+        if not settings.AZURE_SEARCH_ENDPOINT or not settings.AZURE_SEARCH_KEY:
+            raise ValueError("Azure Search endpoint 和 key 必须在环境变量中配置")
+
+        self.index_name = settings.AZURE_SEARCH_INDEX_NAME
+        credential = AzureKeyCredential(settings.AZURE_SEARCH_KEY)
+        self.search_client = SearchClient(
+            endpoint=settings.AZURE_SEARCH_ENDPOINT,
+            index_name=self.index_name,
+            credential=credential
+        )
+        self.index_client = SearchIndexClient(
+            endpoint=settings.AZURE_SEARCH_ENDPOINT,
+            credential=credential
+        )
+        # id 字段是否可过滤和排序（早期创建的索引不可以），None 表示尚未检查
+        # Whether the id field is filterable and sortable (indexes created early on are not); None until checked
+        self._keyset_paging: Optional[bool] = None
+        self._expired_snapshot: Optional[List[str]] = None
+
+    async def ensure_index(self) -> None:
+        # 检查索引是否存在 - Check if index exists
+        try:
+            index = await self.index_client.get_index(self.index_name)
+        except Exception:
+            logger.info(f"创建新的Azure Search索引: {self.index_name}")
+        else:
+            logger.info(f"Azure Search索引 '{self.index_name}' 已存在")
+            self._check_keyset_paging(index)
+            return
+
+        # 创建索引配置 - Create index configuration
+        fields = [
+            SimpleField(name="id", type=SearchFieldDataType.String, key=True, filterable=True, sortable=True),
+            SearchableField(name="title", type=SearchFieldDataType.String, analyzer_name="en.microsoft"),
+            SearchableField(name="company", type=SearchFieldDataType.String),
+            SearchableField(name="location", type=SearchFieldDataType.String),
+            SimpleField(name="salary", type=SearchFieldDataType.String, facetable=True),
+            SearchableField(name="description", type=SearchFieldDataType.String, analyzer_name="en.microsoft"),
+            SimpleField(name="skills", type=SearchFieldDataType.Collection(SearchFieldDataType.String), facetable=True),
+            SimpleField(name="source", type=SearchFieldDataType.String, facetable=True),
+            SimpleField(name="url", type=SearchFieldDataType.String),
+            SimpleField(name="indexed_at", type=SearchFieldDataType.DateTimeOffset),
+            SimpleField(name="expired", type=SearchFieldDataType.Boolean, filterable=True, facetable=True),
+
+            # 向量字段 - Vector field for semantic search
+            SearchField(
+                name="content_vector",
+                type=SearchFieldDataType.Collection(SearchFieldDataType.Single),
+                searchable=True,
+                vector_search_dimensions=1536,  # 基于text-embedding-3-small模型维度
+                vector_search_profile_name="jobs-profile"
+            )
+        ]
+
+        # 向量搜索配置 - Vector search configuration
+        vector_search = VectorSearch(
+            profiles=[
+                VectorSearchProfile(
+                    name="jobs-profile",
+                    algorithm_configuration_name="jobs-hnsw"
+                )
+            ],
+            algorithms=[
+                HnswAlgorithmConfiguration(
+                    name="jobs-hnsw",
+                    parameters={
+                        "m": 4,
+                        "efConstruction": 400,
+                        "efSearch": 500,
+                        "metric": "cosine"
+                    }
+                )
+            ]
+        )
+
+        # 创建索引 - Create index
+        index = SearchIndex(
+            name=self.index_name,
+            fields=fields,
+            vector_search=vector_search
+        )
+
+        await self.index_client.create_index(index)
+        self._keyset_paging = True
+        logger.info(f"成功创建Azure Search索引: {self.index_name}")
+
+    def _check_keyset_paging(self, index: SearchIndex) -> bool:
+        """
+        检查 id 字段能否用于按键分页；已有字段的属性不能原地修改，不可用时需重建索引，在此之前退回 skip 分页
+        Check whether the id field supports keyset paging; attributes of existing fields cannot be changed in place, so
+        the index has to be rebuilt and skip paging is used until then
+        """
+        key_field = next((field for field in index.fields if field.name == "id"), None)
+        self._keyset_paging = bool(key_field is not None and key_field.filterable and key_field.sortable)
+        if not self._keyset_paging:
+            logger.warning(
+                f"Azure Search索引 '{self.index_name}' 的 id 字段不可过滤或排序，清理过期文档将使用 skip 分页（最多 {AZURE_MAX_SKIP} 个）；"
+                f"重建索引后恢复按键分页 / The id field of index '{self.index_name}' is not filterable or sortable, so purging "
+                f"expired documents uses skip paging (at most {AZURE_MAX_SKIP}); rebuild the index to restore keyset paging"
+            )
+        return self._keyset_paging
+
+    async def upload_documents(self, documents: List[Dict[str, Any]]) -> List[UploadResult]:
+        results = await self.search_client.upload_documents(documents)
+        return [
+            UploadResult(result.key, result.succeeded, result.status_code, result.error_message)
+            for result in results
+        ]
+
+    async def search(
+        self,
+        query: str,
+        query_vector: List[float],
+        top_k: int,
+        filter_expression: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        # 构建向量查询 - Build vector query
+        vector_query = VectorizedQuery(
+            vector=query_vector,
+            k_nearest_neighbors=top_k,
+            fields="content_vector"
+        )
+
+        # 执行搜索 - Execute search
+        results = await self.search_client.search(
+            search_text=query,
+            vector_queries=[vector_query],
+            filter=filter_expression,
+            top=top_k,
+            include_total_count=True
+        )
+        return [dict(result) async for result in results]
+
+    async def list_expired_ids(self, after: Optional[str], limit: int) -> List[str]:
+        if self._keyset_paging is None:
+            self._check_keyset_paging(await self.index_client.get_index(self.index_name))
+        if not self._keyset_paging:
+            return await self._list_expired_ids_by_skip(after, limit)
+
+        # 按ID范围过滤而不是用 skip 翻页，不受服务端分页上限影响，删除也不会让后续页错位
+        # Filter by ID range instead of paging with skip: unaffected by the service paging cap, and deletions do not shift later pages
+        filter_expression = "expired eq true"
+        if after:
+            filter_expression += f" and id gt '{after.replace(chr(39), chr(39) * 2)}'"
+        results = await self.search_client.search(
+            search_text="*",
+            filter=filter_expression,
+            order_by=["id asc"],
+            select=["id"],
+            top=limit
+        )
+        return [result["id"] async for result in results]
+
+    async def _list_expired_ids_by_skip(self, after: Optional[str], limit: int) -> List[str]:
+        """
+        id 字段不可排序时的退路 - 首页先用 skip 分页取齐过期ID（在任何删除之前，受服务端 skip 上限约束）并排序，
+        之后的页从该快照中按键范围返回；快照取完即丢弃，超出上限的部分由下次清理处理
+        Fallback when the id field is not sortable - the first page collects all expired IDs with skip paging (before any
+        deletion, within the service skip cap) and sorts them, and later pages come from that snapshot by key range; the
+        snapshot is dropped once exhausted and anything beyond the cap is left for the next purge
+        """
+        if after is None or self._expired_snapshot is None:
+            expired_ids: List[str] = []
+            while len(expired_ids) <= AZURE_MAX_SKIP:
+                results = await self.search_client.search(
+                    search_text="*",
+                    filter="expired eq true",
+                    select=["id"],
+                    top=AZURE_MAX_TOP,
+                    skip=len(expired_ids)
+                )
+                page = [result["id"] async for result in results]
+                expired_ids.extend(page)
+                if len(page) < AZURE_MAX_TOP:
+                    break
+            self._expired_snapshot = sorted(set(expired_ids))
+
+        start = bisect.bisect_right(self._expired_snapshot, after) if after is not None else 0
+        page = self._expired_snapshot[start:start + limit]
+        if len(page) < limit:
+            self._expired_snapshot = None
+        return page
+
+    async def delete_documents(self, ids: List[str]) -> int:
+        if not ids:
+            return 0
+        delete_results = await self.search_client.delete_documents([{"id": job_id} for job_id in ids])
+        return sum(1 for result in delete_results if result.succeeded)
+
+
+def _parse_filter_value(raw: str) -> Any:
+    raw = raw.strip()
+    if raw.startswith("'") and raw.endswith("'"):
+        return raw[1:-1].replace("''", "'")
+    lowered = raw.lower()
+    if lowered in ("true", "false"):
+        return lowered == "true"
+    if lowered == "null":
+        return None
+    return float(raw) if "." in raw else int(raw)
+
+
+_COMPARISON_PATTERN = re.compile(r"^(\w+)\s+(eq|ne)\s+(.+)$", re.IGNORECASE)
+_ANY_PATTERN = re.compile(r"^(\w+)/any\(\s*(\w+)\s*:\s*\2\s+eq\s+(.+)\)$", re.IGNORECASE)
+_AND_PATTERN = re.compile(r"\s+and\s+", re.IGNORECASE)
+
+
+def parse_odata_filter(expression: Optional[str]) -> List[Callable[[Dict[str, Any]], bool]]:
+    """
+    解析OData过滤表达式的常用子集：and 连接的 eq/ne 比较，以及集合字段的 any(x: x eq ...)
+    Parse the common OData subset: eq/ne comparisons joined by and, plus any(x: x eq ...) on collection fields
+    """
+    predicates: List[Callable[[Dict[str, Any]], bool]] = []
+    if not expression or not expression.strip():
+        return predicates
+
+    for clause in _AND_PATTERN.split(expression.strip()):
+        clause = clause.strip()
+        if match := _ANY_PATTERN.match(clause):
+            field, value = match.group(1), _parse_filter_value(match.group(3))
+            predicates.append(lambda doc, field=field, value=value: value in (doc.get(field) or []))
+            continue
+        if match := _COMPARISON_PATTERN.match(clause):
+            field, operator, value = match.group(1), match.group(2).lower(), _parse_filter_value(match.group(3))
+            if operator == "eq":
+                predicates.append(lambda doc, field=field, value=value: doc.get(field) == value)
+            else:
+                predicates.append(lambda doc, field=field, value=value: doc.get(field) != value)
+            continue
+        raise ValueError(f"本地检索不支持的过滤条件 / Unsupported filter clause for local search: {clause}")
+    return predicates
+
+
+def _tokenize(text: str) -> List[str]:
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    本地特征哈希嵌入 - 未配置Azure OpenAI时使用，无网络调用
+    Local feature-hashing embeddings - used when Azure OpenAI is not configured; no network calls
+    """
+
+    def __init__(self, dimensions: int = 384):
+        self.dimensions = dimensions
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        tokens = _tokenize(text)
+        # 词和相邻词对都参与哈希，保留少量词序信息
+        # Hash both tokens and adjacent token pairs to keep a little word-order signal
+        for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return self.embed_query(text)
+
+
+class LocalSearchBackend(SearchBackend):
+    """
+    进程内混合索引后端 - 向量部分小语料NumPy暴力检索、大语料切换HNSW，向量持久化为内存映射文件；
+    关键词部分使用BM25倒排索引（同时覆盖 Job 表中的职位），两路排名按RRF融合。
+    文档按行保存在SQLite中，每次写入只涉及变更的行，并在线程中由单个写事务完成；共享同一目录的进程由存储分配行号，
+    按版本号增量读取彼此的写入
+    In-process hybrid index backend - vectors use NumPy brute force for small corpora and HNSW for large ones, persisted as
+    memory-mapped files; keywords use the BM25 inverted index (which also covers Job table rows); both rankings are fused by RRF.
+    Documents are stored per row in SQLite, so a write only touches the changed rows and runs in a thread as one write
+    transaction; processes sharing the directory get their rows assigned by the store and read each other's writes by version
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        hnsw_threshold: int = 10000,
+        vector_weight: float = 0.5,
+        rrf_k: int = 60,
+        text_index: Optional[BM25Index] = None,
+        sync_interval: float = 1.0,
+        hnsw_save_interval: float = 300.0
+    ):
+        self.directory = Path(directory)
+        self.hnsw_threshold = hnsw_threshold
+        self.vector_weight = vector_weight
+        self.rrf_k = rrf_k
+        self.text_index = text_index if text_index is not None else get_bm25_index()
+        self.sync_interval = sync_interval
+        self.hnsw_save_interval = hnsw_save_interval
+
+        self._documents: List[Optional[Dict[str, Any]]] = []
+        self._row_by_id: Dict[str, int] = {}
+        self._dimensions: Optional[int] = None
+        self._vectors: Optional[np.memmap] = None
+        self._capacity = 0
+        self._alive = np.zeros(0, dtype=bool)
+        self._expired = np.zeros(0, dtype=bool)
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+
+        # 文档存储连接只在工作线程中使用，由锁串行化 / The store connection is used from worker threads, serialized by a lock
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._version = 0
+        self._synced_at = 0.0
+
+        self._hnsw = None
+        self._hnsw_lock = threading.Lock()
+        self._hnsw_pending: Set[int] = set()
+        self._hnsw_saved_at: Optional[float] = None
+
+    @property
+    def size(self) -> int:
+        return len(self._documents)
+
+    @property
+    def _vectors_path(self) -> Path:
+        return self.directory / "vectors.f32"
+
+    @property
+    def _store_path(self) -> Path:
+        return self.directory / "documents.db"
+
+    @property
+    def _legacy_documents_path(self) -> Path:
+        return self.directory / "documents.json"
+
+    @property
+    def _hnsw_path(self) -> Path:
+        return self.directory / "hnsw.bin"
+
+    async def ensure_index(self) -> None:
+        await self._load()
+        await self.text_index.load_from_database()
+
+    async def _load(self) -> None:
+        """
+        加载持久化的索引 - 文档存储在线程中读取，向量以内存映射方式打开，不整体读入内存
+        Load the persisted index - the document store is read in a thread and vectors are memory-mapped rather than read into memory
+        """
+        if self._loaded:
+            return
+        async with self._load_lock:
+            if self._loaded:
+                return
+            self.directory.mkdir(parents=True, exist_ok=True)
+            dimensions, hnsw_version, changes = await asyncio.to_thread(self._open_store)
+            self._dimensions = dimensions
+            self._remap_vectors()
+
+            if hnswlib is not None and self._dimensions and self._hnsw_path.exists():
+                try:
+                    self._hnsw = hnswlib.Index(space="ip", dim=self._dimensions)
+                    self._hnsw.load_index(str(self._hnsw_path), max_elements=self._capacity, allow_replace_deleted=True)
+                except RuntimeError as e:
+                    logger.warning(f"HNSW索引文件无法加载，将重建 / Could not load the HNSW index, rebuilding: {e}")
+                    self._hnsw = None
+
+            rows = self._apply_changes(dimensions, changes)
+            if self._hnsw is not None:
+                # 只补齐索引保存之后的变更 / Only catch up on changes made after the index was saved
+                present = set(self._hnsw.get_ids_list())
+                rows = [row for row, _, _, version in changes if version > hnsw_version]
+                rows.extend(int(row) for row in np.flatnonzero(self._alive) if row not in present)
+            self._update_hnsw(rows)
+            self._synced_at = time.monotonic()
+            self._loaded = True
+        logger.info(f"已加载本地向量索引 / Loaded local vector index: {len(self._row_by_id)} documents")
+
+    def _open_store(self) -> Tuple[Optional[int], int, List[tuple]]:
+        """
+        打开文档存储（首次打开时迁移旧版 documents.json）并读取全部文档
+        Open the document store (migrating a legacy documents.json on first open) and read every document
+        """
+        db = sqlite3.connect(self._store_path, check_same_thread=False, isolation_level=None, timeout=30)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS documents "
+            "(row INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE, document TEXT, version INTEGER NOT NULL)"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS documents_version ON documents (version)")
+        db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        with self._db_lock:
+            self._db = db
+            if self._legacy_documents_path.exists():
+                self._migrate_legacy_documents()
+            hnsw_version = db.execute("SELECT value FROM meta WHERE key = 'hnsw_version'").fetchone()
+            dimensions, changes = self._read_changes(0)
+        return dimensions, int(hnsw_version[0]) if hnsw_version else 0, changes
+
+    def _migrate_legacy_documents(self) -> None:
+        """
+        将旧版整文件 documents.json 导入文档存储，行号保持不变（行号即向量文件中的位置）
+        Import a legacy whole-file documents.json into the store, keeping row numbers (they index the vector file)
+        """
+        state = json.loads(self._legacy_documents_path.read_text(encoding="utf-8"))
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            # 其他进程可能已完成迁移 / Another process may already have migrated
+            if self._db.execute("SELECT 1 FROM documents LIMIT 1").fetchone() is None:
+                if state.get("dimensions"):
+                    self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('dimensions', ?)", (str(state["dimensions"]),))
+                self._db.executemany(
+                    "INSERT INTO documents (row, id, document, version) VALUES (?, ?, ?, 1)",
+                    [
+                        (row, document["id"], json.dumps(document, ensure_ascii=False, default=str))
+                        for row, document in enumerate(state["documents"]) if document is not None
+                    ]
+                )
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._legacy_documents_path.unlink(missing_ok=True)
+        logger.info("已将 documents.json 迁移到文档存储 / Migrated documents.json into the document store")
+
+    def _read_changes(self, since: int) -> Tuple[Optional[int], List[tuple]]:
+        """
+        读取版本号大于 since 的行（document 为 None 表示已删除），调用方持有 _db_lock
+        Read rows whose version is above since (a None document means deleted); the caller holds _db_lock
+        """
+        dimensions = self._db.execute("SELECT value FROM meta WHERE key = 'dimensions'").fetchone()
+        changes = self._db.execute(
+            "SELECT row, id, document, version FROM documents WHERE version > ? ORDER BY version", (since,)
+        ).fetchall()
+        return int(dimensions[0]) if dimensions else None, changes
+
+    def _read_changes_locked(self, since: int) -> Tuple[Optional[int], List[tuple]]:
+        with self._db_lock:
+            return self._read_changes(since)
+
+    def _write_rows(
+        self,
+        upserts: List[Tuple[str, str, np.ndarray]],
+        deletes: List[str],
+        since: int
+    ) -> Tuple[Optional[int], List[tuple]]:
+        """
+        在一个写事务中写入文档和向量，并返回 since 之后的全部变更（包括其他进程的写入）；
+        BEGIN IMMEDIATE 使共享目录的进程依次写入，行号由存储分配，进程之间不会互相覆盖
+        Write documents and vectors in one write transaction and return every change after since (including other
+        processes' writes); BEGIN IMMEDIATE makes processes sharing the directory write one at a time and rows are
+        assigned by the store, so processes never overwrite each other
+        """
+        with self._db_lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                version = self._db.execute("SELECT COALESCE(MAX(version), 0) + 1 FROM documents").fetchone()[0]
+                if upserts:
+                    self._db.execute(
+                        "INSERT OR IGNORE INTO meta (key, value) VALUES ('dimensions', ?)", (str(upserts[0][2].size),)
+                    )
+                    fd = os.open(self._vectors_path, os.O_RDWR | os.O_CREAT)
+                    try:
+                        for job_id, document, vector in upserts:
+                            row = self._db.execute(_UPSERT_DOCUMENT_SQL, (job_id, document, version)).fetchone()[0]
+                            offset, size = row * vector.nbytes, os.fstat(fd).st_size
+                            if offset + vector.nbytes > size:
+                                # 按倍数扩展向量文件，读取方在应用变更时重新映射
+                                # Grow the vector file geometrically; readers re-map it when applying changes
+                                os.ftruncate(fd, max(offset + vector.nbytes, size * 2, 1024 * vector.nbytes))
+                            os.pwrite(fd, vector.tobytes(), offset)
+                    finally:
+                        os.close(fd)
+                for offset in range(0, len(deletes), 500):
+                    chunk = deletes[offset:offset + 500]
+                    self._db.execute(
+                        f"UPDATE documents SET document = NULL, version = ? "
+                        f"WHERE document IS NOT NULL AND id IN ({','.join('?' * len(chunk))})",
+                        (version, *chunk)
+                    )
+                result = self._read_changes(since)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return result
+
+    async def _write(self, upserts: List[Tuple[str, str, np.ndarray]], deletes: List[str]) -> None:
+        dimensions, changes = await asyncio.to_thread(self._write_rows, upserts, deletes, self._version)
+        self._synced_at = time.monotonic()
+        self._update_hnsw(self._apply_changes(dimensions, changes))
+        await self._save_hnsw()
+
+    async def _sync(self) -> None:
+        """
+        读取其他进程写入的变更（按 sync_interval 节流）
+        Pick up changes written by other processes (throttled by sync_interval)
+        """
+        await self._load()
+        if time.monotonic() - self._synced_at < self.sync_interval:
+            return
+        self._synced_at = time.monotonic()
+        dimensions, changes = await asyncio.to_thread(self._read_changes_locked, self._version)
+        self._update_hnsw(self._apply_changes(dimensions, changes))
+
+    def _apply_changes(self, dimensions: Optional[int], changes: List[tuple]) -> List[int]:
+        """
+        将存储中的变更应用到内存状态并返回变更的行；已应用的版本被跳过，因此结果的应用顺序无关紧要
+        Apply store changes to the in-memory state and return the changed rows; versions already applied are skipped,
+        so results may be applied in any order
+        """
+        if self._dimensions is None:
+            self._dimensions = dimensions
+        self._remap_vectors()
+        applied = self._version
+        rows: List[int] = []
+        for row, job_id, payload, version in changes:
+            if version <= applied:
+                continue
+            if row >= self.size:
+                self._documents.extend([None] * (row + 1 - self.size))
+            previous = self._documents[row]
+            if previous is not None:
+                self._row_by_id.pop(previous["id"], None)
+            if payload is None:
+                self._documents[row] = None
+                self._alive[row] = False
+                self._expired[row] = False
+                self.text_index.remove(job_id)
+            else:
+                document = json.loads(payload)
+                self._documents[row] = document
+                self._row_by_id[job_id] = row
+                self._alive[row] = True
+                self._expired[row] = bool(document.get("expired"))
+                self._index_text(document)
+            rows.append(row)
+            self._version = max(self._version, version)
+        return rows
+
+    def _remap_vectors(self) -> None:
+        """
+        向量文件被（本进程或其他进程的）写入扩展后重新映射
+        Re-map the vector file after a write (from this or another process) has grown it
+        """
+        if not self._dimensions or not self._vectors_path.exists():
+            return
+        capacity = os.path.getsize(self._vectors_path) // (self._dimensions * 4)
+        if capacity <= self._capacity:
+            return
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(capacity, self._dimensions))
+        self._alive = np.concatenate([self._alive, np.zeros(capacity - self._alive.size, dtype=bool)])
+        self._expired = np.concatenate([self._expired, np.zeros(capacity - self._expired.size, dtype=bool)])
+        self._capacity = capacity
+
+    async def upload_documents(self, documents: List[Dict[str, Any]]) -> List[UploadResult]:
+        await self._load()
+        results: List[UploadResult] = []
+        upserts: List[Tuple[str, str, np.ndarray]] = []
+
+        for document in documents:
+            vector = np.asarray(document.get("content_vector") or [], dtype=np.float32)
+            dimensions = self._dimensions or (upserts[0][2].size if upserts else vector.size)
+            if not vector.size or vector.size != dimensions:
+                results.append(UploadResult(document["id"], False, 400, "向量维度不匹配 / Vector dimension mismatch"))
+                continue
+
+            norm = np.linalg.norm(vector)
+            payload = json.dumps(
+                {key: value for key, value in document.items() if key != "content_vector"}, ensure_ascii=False, default=str
+            )
+            upserts.append((document["id"], payload, vector / norm if norm else vector))
+            results.append(UploadResult(document["id"], True, 201))
+
+        if upserts:
+            await self._write(upserts, [])
+        return results
+
+    def _index_text(self, document: Dict[str, Any]) -> None:
+        # 展示文档由本后端保存，BM25索引只保存倒排信息
+        # The display document is kept by this backend; the BM25 index only holds postings
+        self.text_index.upsert(
+            document["id"],
+            document.get("title"),
+            document.get("description"),
+            document.get("skills"),
+            expired=bool(document.get("expired"))
+        )
+
+    def _update_hnsw(self, rows: List[int]) -> None:
+        """
+        语料超过阈值时构建HNSW索引，之后增量更新；后台保存索引期间到达的变更留到下次应用
+        Build the HNSW index once the corpus passes the threshold, then update it incrementally; changes arriving while
+        the index is being saved in the background are applied next time
+        """
+        if hnswlib is None or (self._hnsw is None and self.size < self.hnsw_threshold):
+            return
+        self._hnsw_pending.update(rows)
+        if not self._hnsw_pending or not self._hnsw_lock.acquire(blocking=False):
+            return
+        try:
+            if self._hnsw is None:
+                self._hnsw = hnswlib.Index(space="ip", dim=self._dimensions)
+                self._hnsw.init_index(max_elements=self._capacity, ef_construction=200, M=16, allow_replace_deleted=True)
+                self._hnsw_pending = set(np.flatnonzero(self._alive).tolist())
+                logger.info(f"构建HNSW索引 / Building HNSW index: {len(self._hnsw_pending)} documents")
+            elif self._hnsw.get_max_elements() < self._capacity:
+                self._hnsw.resize_index(self._capacity)
+
+            added: List[int] = []
+            for row in sorted(self._hnsw_pending):
+                try:
+                    if self._alive[row]:
+                        self._hnsw.unmark_deleted(row)
+                    else:
+                        self._hnsw.mark_deleted(row)
+                except RuntimeError:
+                    pass  # 标签不在索引中或已是该状态 / The label is not in the index or already in that state
+                if self._alive[row]:
+                    added.append(row)
+            self._hnsw_pending.clear()
+            if added:
+                self._hnsw.add_items(np.asarray(self._vectors[added]), np.asarray(added))
+        finally:
+            self._hnsw_lock.release()
+
+    async def _save_hnsw(self) -> None:
+        """
+        在线程中保存HNSW索引（按 hnsw_save_interval 节流）并记录其覆盖的版本，加载时只补齐之后的变更
+        Save the HNSW index in a thread (throttled by hnsw_save_interval), recording the version it covers so a load
+        only catches up on later changes
+        """
+        if self._hnsw is None or self._hnsw_pending:
+            return
+        if self._hnsw_saved_at is not None and time.monotonic() - self._hnsw_saved_at < self.hnsw_save_interval:
+            return
+        self._hnsw_saved_at = time.monotonic()
+        await asyncio.to_thread(self._save_hnsw_sync, self._version)
+
+    def _save_hnsw_sync(self, version: int) -> None:
+        with self._hnsw_lock:
+            temp_path = self._hnsw_path.with_suffix(f".{os.getpid()}.tmp")
+            self._hnsw.save_index(str(temp_path))
+            temp_path.replace(self._hnsw_path)
+        with self._db_lock:
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('hnsw_version', ?)", (str(version),))
+
+    async def search(
+        self,
+        query: str,
+        query_vector: List[float],
+        top_k: int,
+        filter_expression: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        await self._sync()
+        if top_k <= 0 or not (self._row_by_id or len(self.text_index)):
+            return []
+
+        # expired 条件在两路检索中向量化处理，其余条件在融合后的候选上逐条判断
+        # The expired clause is vectorized in both retrievers; remaining clauses are checked on fused candidates
+        predicates = parse_odata_filter(filter_expression)
+        mask = self._alive.copy()
+        expired: Optional[bool] = None
+        remaining = []
+        for clause, predicate in zip(_AND_PATTERN.split(filter_expression.strip()) if filter_expression else [], predicates):
+            normalized = clause.strip().lower().replace(" ", "")
+            if normalized == "expiredeqfalse":
+                mask &= ~self._expired
+                expired = False
+            elif normalized == "expiredeqtrue":
+                mask &= self._expired
+                expired = True
+            else:
+                remaining.append(predicate)
+
+        candidate_count = max(top_k * 5, 50)
+        vector_ranking: List[str] = []
+        if self._row_by_id:
+            vector = np.asarray(query_vector, dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            vector = vector / norm if norm else vector
+            rows, _ = self._vector_candidates(vector, mask, candidate_count)
+            vector_ranking = [self._documents[row]["id"] for row in rows]
+        text_ranking = [job_id for job_id, _ in self.text_index.search(query, candidate_count, expired=expired)]
+
+        # 倒数排名融合：score = Σ w / (k + rank)
+        # Reciprocal rank fusion: score = Σ w / (k + rank)
+        fused: Dict[str, float] = {}
+        for weight, ranking in ((self.vector_weight, vector_ranking), (1.0 - self.vector_weight, text_ranking)):
+            for rank, job_id in enumerate(ranking, start=1):
+                fused[job_id] = fused.get(job_id, 0.0) + weight / (self.rrf_k + rank)
+
+        results = []
+        for job_id, score in sorted(fused.items(), key=lambda item: item[1], reverse=True):
+            row = self._row_by_id.get(job_id)
+            document = self._documents[row] if row is not None else self.text_index.get_document(job_id)
+            if document is None or any(not predicate(document) for predicate in remaining):
+                continue
+            results.append({**document, "@search.score": round(score, 6)})
+            if len(results) >= top_k:
+                break
+        return results
+
+    def _vector_candidates(self, vector: np.ndarray, mask: np.ndarray, count: int):
+        """
+        向量近邻候选 - HNSW可用时过采样后过滤，不足时回退到暴力检索
+        Vector neighbour candidates - oversampled HNSW results filtered by mask, falling back to brute force when short
+        """
+        if self._hnsw is not None:
+            k = min(count * 2, len(self._row_by_id))
+            self._hnsw.set_ef(max(k, 64))
+            labels, distances = self._hnsw.knn_query(vector, k=k)
+            labels, similarities = labels[0], 1.0 - distances[0]
+            keep = mask[labels]
+            if keep.sum() >= min(count, int(mask.sum())):
+                return labels[keep][:count], similarities[keep][:count]
+
+        # 对整个向量矩阵做一次矩阵乘法（避免按行拷贝内存映射），再按掩码剔除
+        # One matmul over the whole vector matrix (no row copies out of the memmap), then mask out rows
+        mask = mask[:self.size]
+        if not mask.any():
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        similarities = self._vectors[:self.size] @ vector
+        similarities[~mask] = -np.inf
+        count = min(count, int(mask.sum()))
+        if count < self.size:
+            rows = np.argpartition(-similarities, count - 1)[:count]
+        else:
+            rows = np.arange(self.size)
+        rows = rows[np.argsort(-similarities[rows])]
+        return rows, similarities[rows]
+
+    async def list_expired_ids(self, after: Optional[str], limit: int) -> List[str]:
+        await self._sync()
+        expired = {self._documents[row]["id"] for row in np.flatnonzero(self._alive & self._expired)}
+        expired.update(self.text_index.expired_ids())
+        return heapq.nsmallest(limit, (job_id for job_id in expired if after is None or job_id > after))
+
+    async def delete_documents(self, ids: List[str]) -> int:
+        await self._load()
+        deleted = sum(1 for job_id in set(ids) if job_id in self._row_by_id)
+        for job_id in ids:
+            self.text_index.remove(job_id)
+        if ids:
+            # 也删除其他进程写入、本进程尚未同步的行 / Also deletes rows other processes wrote that are not synced here yet
+            await self._write([], list(ids))
+        return deleted
+
+
+def _azure_configured(endpoint: str, key: str) -> bool:
+    return bool(endpoint and key) and "demo" not in endpoint and key != "demo_key"
+
+
+def create_search_backend() -> SearchBackend:
+    """
+    按配置创建检索后端 - auto 在未配置Azure时使用本地后端
+    Create the configured search backend - auto uses the local backend when Azure is not configured
+    """
+    backend = settings.SEARCH_BACKEND
+    if backend == "auto":
+        backend = "azure" if _azure_configured(settings.AZURE_SEARCH_ENDPOINT, settings.AZURE_SEARCH_KEY) else "local"
+    if backend == "azure":
+        return AzureSearchBackend()
+
+    if hnswlib is None:
+        logger.info("未安装hnswlib，本地检索使用NumPy暴力检索 / hnswlib not installed, local search uses NumPy brute force")
+    return LocalSearchBackend(
+        directory=settings.LOCAL_SEARCH_INDEX_DIR,
+        hnsw_threshold=settings.LOCAL_SEARCH_HNSW_THRESHOLD,
+        vector_weight=settings.LOCAL_SEARCH_VECTOR_WEIGHT,
+        rrf_k=settings.LOCAL_SEARCH_RRF_K
+    )
+
+
+def azure_openai_configured() -> bool:
+    """
+    是否配置了Azure OpenAI嵌入服务
+    Whether the Azure OpenAI embedding service is configured
+    """
+    return _azure_configured(settings.AZURE_OPENAI_ENDPOINT, settings.AZURE_OPENAI_API_KEY)
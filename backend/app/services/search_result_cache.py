@@ -0,0 +1,429 @@
+"""
+外部职位搜索结果缓存
+External job search result cache for JobCatcher
+按 (来源, 归一化查询, 地点, 数量) 缓存Apify/SerpAPI结果，支持分来源TTL和 stale-while-revalidate；
+职位写入 jobs 表，缓存条目只记录结果ID；相同查询并发时共享一次上游调用
+Caches Apify/SerpAPI results per (source, normalized query, location, limit) with per-source TTLs and stale-while-revalidate;
+jobs are written to the jobs table and cache entries only record result IDs; concurrent identical queries share one upstream call
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import metrics
+from app.core.single_flight import SingleFlight
+from app.models.job import Job, JobSearchCacheEntry
+from app.services.job_dedup import get_job_dedup_index, new_near_duplicate_index
+from app.services.skill_trends import SkillDemandDelta
+from app.services.source_resilience import get_source_guard
+
+
+logger = logging.getLogger("service.search_result_cache")
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+_SALARY_NUMBER_PATTERN = re.compile(r"(\d+(?:[.,]\d{3})*)\s*([kK])?")
+
+JobFetcher = Callable[[], Awaitable[List[Dict[str, Any]]]]
+
+# 由链接检查维护的字段，写入已入库职位时不覆盖 / Columns maintained by the link check, not overwritten for stored jobs
+LINK_STATE_FIELDS = ("is_active", "is_expired", "last_checked_at")
+
+# 外部职位搜索的单飞分组，以缓存键为指纹；未启用缓存时同样生效
+# Single-flight group for external job searches, fingerprinted by cache key; also applies when caching is disabled
+external_search_flight = SingleFlight("external_job_search")
+
+
+def normalize_search_query(text: Optional[str]) -> str:
+    """
+    归一化查询文本 - 小写并折叠空白
+    Normalize query text - lowercase with whitespace collapsed
+    """
+    return _WHITESPACE_PATTERN.sub(" ", text or "").strip().lower()
+
+
+def search_cache_key(source: str, query: str, location: Optional[str], limit: int) -> str:
+    """
+    计算缓存键
+    Compute the cache key
+    """
+    payload = json.dumps([source, normalize_search_query(query), normalize_search_query(location), limit])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _parse_salary(text: Any) -> Tuple[Optional[int], Optional[int]]:
+    # "€45.000 - €75.000"、"50k-70k" 等常见写法，无法解析时返回空
+    # Common forms such as "€45.000 - €75.000" or "50k-70k"; empty when unparseable
+    if not isinstance(text, str):
+        return None, None
+    amounts = []
+    for number, thousands in _SALARY_NUMBER_PATTERN.findall(text):
+        amount = int(re.sub(r"[.,]", "", number)) * (1000 if thousands else 1)
+        if amount >= 1000:
+            amounts.append(amount)
+    if not amounts:
+        return None, None
+    if len(amounts) == 1:
+        return amounts[0], None
+    return min(amounts[:2]), max(amounts[:2])
+
+
+def _parse_posted_at(value: Any) -> Optional[datetime]:
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        posted_at = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return posted_at if posted_at.tzinfo else posted_at.replace(tzinfo=timezone.utc)
+
+
+def job_row_values(job: Dict[str, Any], source: str) -> Optional[Dict[str, Any]]:
+    """
+    将上游职位字典转换为 jobs 表字段，缺少必填字段时返回None
+    Convert an upstream job dictionary to jobs table columns; None when required fields are missing
+    """
+    if not job.get("id") or not job.get("title") or not job.get("company"):
+        return None
+    salary_min, salary_max = _parse_salary(job.get("salary"))
+    return {
+        "id": str(job["id"])[:100],
+        "external_id": str(job["id"])[:200],
+        "title": str(job["title"])[:200],
+        "company": str(job["company"])[:200],
+        "location": (job.get("location") or "")[:200] or None,
+        "description": job.get("description") or None,
+        "salary_min": salary_min,
+        "salary_max": salary_max,
+        "job_type": (job.get("job_type") or "")[:20] or None,
+        "source": source[:20],
+        "skills": job.get("skills") or None,
+        "application_url": (job.get("url") or "")[:1000] or None,
+        "posted_at": _parse_posted_at(job.get("posted_date")),
+        "is_active": True,
+        "is_expired": False,
+        "last_checked_at": datetime.now(timezone.utc),
+    }
+
+
+def job_search_result(job: Job) -> Dict[str, Any]:
+    """
+    将 jobs 表行还原为搜索结果字典
+    Rebuild a search result dictionary from a jobs table row
+    """
+    return {
+        "id": job.id,
+        "title": job.title,
+        "company": job.company,
+        "location": job.location or "",
+        "salary": job.get_salary_range() if job.salary_min or job.salary_max else "",
+        "description": job.description or "",
+        "url": job.application_url or "",
+        "source": job.source,
+        "skills": job.skills or [],
+        "posted_date": job.posted_at.isoformat() if job.posted_at else "",
+        "job_type": job.job_type or "",
+    }
+
+
+def upstream_job_results(jobs: List[Dict[str, Any]], source: str) -> List[Dict[str, Any]]:
+    """
+    未写入 jobs 表时按表字段规范化上游职位，结果与数据库命中的形状一致
+    Normalize upstream jobs through the jobs table columns when they could not be stored, matching the shape of database hits
+    """
+    results = []
+    for job in jobs:
+        values = job_row_values(job, source)
+        if values is not None:
+            results.append(job_search_result(Job(salary_currency="EUR", **values)))
+    return results
+
+
+def _timestamp(value: datetime) -> float:
+    # SQLite 返回不带时区的时间，按UTC处理 / SQLite returns naive datetimes; treat them as UTC
+    return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).timestamp()
+
+
+class SearchResultCache:
+    """
+    搜索结果缓存 - 进程内LRU在前，jobs 表和 job_search_cache 表持久化
+    Search result cache - in-process LRU first, persisted in the jobs and job_search_cache tables
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: Dict[str, int],
+        default_ttl: int = 3600,
+        stale_seconds: int = 86400,
+        empty_ttl: int = 300,
+        max_memory_entries: int = 512,
+        flight: Optional[SingleFlight] = None
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.default_ttl = default_ttl
+        self.stale_seconds = stale_seconds
+        self.empty_ttl = empty_ttl
+        self.max_memory_entries = max_memory_entries
+
+        self._entries: "OrderedDict[str, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        self._flight = flight if flight is not None else external_search_flight
+
+    def ttl_for(self, source: str, jobs: List[Dict[str, Any]]) -> int:
+        """
+        获取结果的新鲜期 - 空结果使用较短的TTL，避免上游临时故障被长期缓存
+        Get the freshness period of a result - empty results use a short TTL so transient upstream failures are not cached for long
+        """
+        if not jobs:
+            return min(self.empty_ttl, self.ttl_seconds.get(source, self.default_ttl))
+        return self.ttl_seconds.get(source, self.default_ttl)
+
+    async def get_or_fetch(
+        self,
+        source: str,
+        query: str,
+        location: Optional[str],
+        limit: int,
+        fetcher: JobFetcher
+    ) -> List[Dict[str, Any]]:
+        """
+        读取缓存结果：新鲜直接返回；过期但在容忍期内先返回旧结果并后台刷新；否则等待上游调用
+        Read cached results: fresh ones return directly; stale ones within the grace period return immediately while
+        a background refresh runs; otherwise wait for the upstream call
+        """
+        key = search_cache_key(source, query, location, limit)
+        cached = await self._lookup(key)
+        if cached is not None:
+            fetched_at, jobs = cached
+            age = time.time() - fetched_at
+            ttl = self.ttl_for(source, jobs)
+            if age < ttl:
+                metrics.increment("search_cache_requests_total", source=source, result="fresh")
+                return jobs
+            if age < ttl + self.stale_seconds:
+                metrics.increment("search_cache_requests_total", source=source, result="stale")
+                self._refresh(key, source, query, location, limit, fetcher)
+                return jobs
+
+        metrics.increment("search_cache_requests_total", source=source, result="miss")
+        # shield: 单个等待方取消时不影响共享的上游调用
+        # shield: one waiter being cancelled does not cancel the shared upstream call
+        return await asyncio.shield(self._refresh(key, source, query, location, limit, fetcher))
+
+    def _refresh(
+        self,
+        key: str,
+        source: str,
+        query: str,
+        location: Optional[str],
+        limit: int,
+        fetcher: JobFetcher
+    ) -> asyncio.Task:
+        """
+        启动或加入该键的上游调用
+        Start or join the upstream call for this key
+        """
+        return self._flight.start(key, lambda: self._fetch_and_store(key, source, query, location, limit, fetcher))
+
+    async def _fetch_and_store(
+        self,
+        key: str,
+        source: str,
+        query: str,
+        location: Optional[str],
+        limit: int,
+        fetcher: JobFetcher
+    ) -> List[Dict[str, Any]]:
+        started = time.perf_counter()
+        try:
+            jobs = await fetcher()
+        except Exception as e:
+            metrics.increment("search_cache_refresh_total", source=source, status="error")
+            logger.warning(f"搜索结果刷新失败 / Search result refresh failed ({source}): {e}")
+            raise
+        metrics.observe("search_cache_upstream_ms", (time.perf_counter() - started) * 1000, source=source)
+        metrics.increment("search_cache_refresh_total", source=source, status="success")
+
+        fetched_at = time.time()
+        stored = None
+        try:
+            await self._persist(key, source, query, location, limit, jobs, fetched_at)
+            stored = await self._load_entry(key)
+        except Exception as e:
+            logger.warning(f"搜索结果持久化失败 / Failed to persist search results: {e}")
+        # 返回与数据库命中相同的结果：由 jobs 表行重建，去重后不含已下架或过期的职位
+        # Return the same results a database hit would: rebuilt from jobs rows, deduplicated, without jobs taken down or expired
+        results = stored[1] if stored is not None else upstream_job_results(jobs, source)
+        self._set_local(key, fetched_at, results)
+        return results
+
+    async def _persist(
+        self,
+        key: str,
+        source: str,
+        query: str,
+        location: Optional[str],
+        limit: int,
+        jobs: List[Dict[str, Any]],
+        fetched_at: float
+    ) -> None:
+        """
+        职位写入（或更新）jobs 表，条目记录结果ID
+        Write (or update) jobs in the jobs table; the entry records the result IDs
+        """
+        job_ids: List[str] = []
+        dedup_index = await get_job_dedup_index()
+        pending_dedup = new_near_duplicate_index()
+        skill_demand = SkillDemandDelta()
+        async with AsyncSessionLocal() as session:
+            # 已入库的行先取出，技能需求聚合据此扣除旧内容
+            # Load rows already stored so the skill demand aggregate can subtract their old content
+            candidate_ids = [str(job["id"])[:100] for job in jobs if job.get("id")]
+            existing_rows = {
+                row.id: row
+                for row in (await session.execute(select(Job).where(Job.id.in_(candidate_ids)))).scalars()
+            }
+            for job in jobs:
+                values = job_row_values(job, source)
+                if values is None or values["id"] in job_ids:
+                    continue
+                # 其他来源已入库的近似重复职位不再写入，条目指向已有职位
+                # Near-duplicates of jobs already stored from another source are not written; the entry points at the existing job
+                duplicate_of = dedup_index.check_pending(values["id"], job, pending_dedup)
+                if duplicate_of is not None:
+                    metrics.increment("job_dedup_duplicates_total", scope="persisted", source=source)
+                    if duplicate_of not in job_ids:
+                        job_ids.append(duplicate_of)
+                    continue
+                # 提交后BM25索引随之更新 / The BM25 index follows along once the transaction commits
+                existing = existing_rows.get(values["id"])
+                if existing is not None:
+                    # 已入库职位保留其在架/过期状态和检查时间，旧的上游结果不会恢复链接检查判定过期的职位
+                    # Stored jobs keep their active/expired state and check time, so a stale upstream result never
+                    # revives a job the link check expired
+                    for field in LINK_STATE_FIELDS:
+                        values.pop(field)
+                    if existing.is_active and not existing.is_expired:
+                        skill_demand.remove(existing)
+                # 按合并后的行计入（保留已有行的抓取时间），与过期时扣除的周一致
+                # Count the merged row (keeping the stored row's scrape time), matching the week expiry subtracts from
+                merged = await session.merge(Job(**values))
+                if merged.is_active and not merged.is_expired:
+                    skill_demand.add(merged)
+                job_ids.append(values["id"])
+
+            await session.merge(JobSearchCacheEntry(
+                key=key,
+                source=source,
+                query=normalize_search_query(query)[:500],
+                location=normalize_search_query(location)[:200] or None,
+                limit=limit,
+                job_ids=job_ids,
+                fetched_at=datetime.fromtimestamp(fetched_at, tz=timezone.utc)
+            ))
+            await skill_demand.apply(session)
+            await session.commit()
+
+    async def _lookup(self, key: str) -> Optional[Tuple[float, List[Dict[str, Any]]]]:
+        cached = self._entries.get(key)
+        if cached is not None:
+            self._entries.move_to_end(key)
+            return cached
+
+        try:
+            stored = await self._load_entry(key)
+        except Exception as e:
+            logger.warning(f"搜索结果缓存读取失败 / Search result cache read failed: {e}")
+            return None
+        if stored is not None:
+            self._set_local(key, *stored)
+        return stored
+
+    async def _load_entry(self, key: str) -> Optional[Tuple[float, List[Dict[str, Any]]]]:
+        """
+        从 job_search_cache 和 jobs 表读取条目，结果由 jobs 表行重建
+        Read an entry from the job_search_cache and jobs tables, rebuilding results from the jobs rows
+        """
+        async with AsyncSessionLocal() as session:
+            entry = await session.get(JobSearchCacheEntry, key)
+            if entry is None:
+                return None
+            jobs_by_id: Dict[str, Job] = {}
+            if entry.job_ids:
+                result = await session.execute(select(Job).where(Job.id.in_(entry.job_ids)))
+                jobs_by_id = {job.id: job for job in result.scalars()}
+
+        # 已下架或过期的职位不再返回 / Jobs that were taken down or expired are no longer returned
+        jobs = [
+            job_search_result(jobs_by_id[job_id])
+            for job_id in entry.job_ids
+            if job_id in jobs_by_id and jobs_by_id[job_id].is_active and not jobs_by_id[job_id].is_expired
+        ]
+        return _timestamp(entry.fetched_at), jobs
+
+    def _set_local(self, key: str, fetched_at: float, jobs: List[Dict[str, Any]]) -> None:
+        if self.max_memory_entries <= 0:
+            return
+        self._entries[key] = (fetched_at, jobs)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_memory_entries:
+            self._entries.popitem(last=False)
+
+    async def aclose(self) -> None:
+        """
+        取消进行中的后台刷新
+        Cancel in-flight background refreshes
+        """
+        await self._flight.cancel_all()
+
+
+async def cached_job_search(
+    source: str,
+    query: str,
+    location: Optional[str],
+    limit: int,
+    fetcher: JobFetcher
+) -> List[Dict[str, Any]]:
+    """
+    通过结果缓存执行上游搜索，上游调用受数据源熔断器和自适应超时保护；未启用缓存时只做单飞合并
+    Run an upstream search through the result cache, with the upstream call guarded by the source's circuit breaker and
+    adaptive timeout; only single-flight coalescing applies when caching is disabled
+    """
+    guard = get_source_guard(source)
+
+    def guarded_fetcher() -> Awaitable[List[Dict[str, Any]]]:
+        return guard.call(fetcher)
+
+    if not settings.SEARCH_CACHE_ENABLED:
+        return await external_search_flight.do(search_cache_key(source, query, location, limit), guarded_fetcher)
+    return await get_search_result_cache().get_or_fetch(source, query, location, limit, guarded_fetcher)
+
+
+# 全局缓存实例 - Global cache instance
+search_result_cache: Optional[SearchResultCache] = None
+
+
+def get_search_result_cache() -> SearchResultCache:
+    """
+    获取搜索结果缓存实例
+    Get the search result cache instance
+    """
+    global search_result_cache
+    if search_result_cache is None:
+        search_result_cache = SearchResultCache(
+            ttl_seconds=settings.SEARCH_CACHE_TTL_SECONDS,
+            default_ttl=settings.SEARCH_CACHE_DEFAULT_TTL_SECONDS,
+            stale_seconds=settings.SEARCH_CACHE_STALE_SECONDS,
+            empty_ttl=settings.SEARCH_CACHE_EMPTY_TTL_SECONDS,
+            max_memory_entries=settings.SEARCH_CACHE_MEMORY_ENTRIES
+        )
+    return search_result_cache
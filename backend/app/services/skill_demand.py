@@ -0,0 +1,266 @@
+"""
+技能需求聚合引擎
+Skill demand aggregation engine for JobCatcher
+职位只编码一次：稀疏的 职位×技能 CSR 矩阵，加上解析后的薪资、公司ID、地点ID并行数组；
+频次、渗透率、平均薪资、共现和公司/地点基数都由向量化归约得到
+Jobs are encoded once into a sparse job x skill CSR matrix plus parallel arrays of parsed salary, company ID and
+location ID; frequency, penetration, average salary, co-occurrence and company/location cardinalities all come from
+vectorized reductions
+"""
+
+import hashlib
+import re
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from app.services.skill_taxonomy import SkillMatcher, get_skill_matcher
+
+
+# 千位分隔的数字（80,000 / 80.000 / 60.000,00）整体识别，可带两位小数，后面可接句号等标点
+# Thousands-grouped numbers (80,000 / 80.000 / 60.000,00) are read as one number, with an optional two-digit decimal
+# tail and trailing punctuation such as a full stop
+_SALARY_NUMBER = re.compile(
+    r'(?:(?P<grouped>\d{1,3}(?:[,.]\d{3})+)(?P<fraction>[,.]\d{1,2})?(?!\d|[.,]\d)|(?P<plain>\d+(?:\.\d+)?))'
+    r'\s*(?P<unit>[kKmM]?)'
+)
+_SALARY_UNITS = {"k": 1e3, "m": 1e6}
+
+# 文本技能提取结果缓存（按文本摘要），重复分析同一批缓存职位时跳过扫描。首次编码没有加速：扫描是纯Python的
+# 逐字符自动机，约 0.3 µs/字符，10万个800字符的职位约需20秒，达不到亚秒级；因此这里只编码对话中给定的职位列表，
+# 已入库职位的市场趋势由 skill_trends 的周聚合表提供，不经过逐个职位的扫描
+# Cache of text skill extraction keyed by text digest, so analysing the same cached jobs again skips the scan. A cold
+# encode is not sped up: the scan is a pure-Python per-character automaton at about 0.3 µs per character, roughly 20s
+# for 100k jobs of 800 characters, nowhere near sub-second; so only job lists given in a conversation are encoded here,
+# while market trends over stored jobs come from the weekly aggregate in skill_trends without scanning any job
+SKILL_CACHE_MAX_ENTRIES = 100000
+
+
+@lru_cache(maxsize=65536)
+def parse_salary_value(salary: str) -> float:
+    """
+    从薪资字符串中提取第一个数值（支持K、M单位），无法解析时为 NaN；同一字符串只解析一次
+    Extract the first number from a salary string (K and M units supported), NaN when nothing parses; each distinct
+    string is parsed once
+    """
+    match = _SALARY_NUMBER.search(salary) if salary else None
+    if match is None:
+        return float("nan")
+    grouped, fraction = match.group("grouped", "fraction")
+    if grouped:
+        number = float(re.sub(r"[,.]", "", grouped)) + (float(f"0.{fraction[1:]}") if fraction else 0.0)
+    else:
+        number = float(match.group("plain"))
+    value = number * _SALARY_UNITS.get(match.group("unit").lower(), 1.0)
+    return value if value > 0 else float("nan")
+
+
+def _factorize(values: Iterable[Any]) -> Tuple[np.ndarray, List[str]]:
+    """
+    把取值编码为整数ID（空值为 -1），返回ID数组和取值表
+    Encode values as integer IDs (-1 for blanks), returning the ID array and the value table
+    """
+    table: Dict[str, int] = {}
+    ids = [table.setdefault(value, len(table)) if value else -1 for value in values]
+    return np.asarray(ids, dtype=np.int32), list(table)
+
+
+class SkillDemandMatrix:
+    """
+    编码后的职位集合 - 职位×技能CSR矩阵及薪资、公司、地点并行数组
+    An encoded job set - a job x skill CSR matrix with parallel salary, company and location arrays
+    """
+
+    def __init__(
+        self,
+        matrix: sparse.csr_matrix,
+        skills: Sequence[str],
+        categories: Sequence[Optional[str]],
+        salaries: np.ndarray,
+        company_ids: np.ndarray,
+        location_ids: np.ndarray
+    ):
+        self.matrix = matrix
+        self.skills = list(skills)
+        self.categories = list(categories)
+        self.salaries = salaries
+        self.company_ids = company_ids
+        self.location_ids = location_ids
+
+    @property
+    def job_count(self) -> int:
+        return self.matrix.shape[0]
+
+    @classmethod
+    def from_jobs(
+        cls,
+        jobs: Sequence[Dict[str, Any]],
+        categories: Optional[Iterable[str]] = None,
+        matcher: Optional[SkillMatcher] = None
+    ) -> "SkillDemandMatrix":
+        """
+        编码职位列表：每个职位的标题和描述扫描一次技能，给定类别时只保留带有其中任一类别标签的技能
+        Encode a job list: each job's title and description is scanned once for skills; with categories, only skills
+        tagged with one of them are kept
+        """
+        shared = get_skill_matcher()
+        matcher = matcher or shared
+        wanted = list(categories) if categories is not None else None
+        # 只有共享匹配器的结果进缓存 / Only results of the shared matcher are cached
+        cache_key = tuple(sorted(wanted)) if wanted is not None else ()
+        extract = (
+            (lambda text: _extract_cached(matcher, text, wanted, cache_key)) if matcher is shared
+            else (lambda text: tuple(matcher.extract(text, wanted)))
+        )
+
+        # 相同的技能组合只映射一次列号 / Each distinct skill combination is mapped to columns once
+        columns: Dict[str, int] = {}
+        column_lists: Dict[Tuple[str, ...], List[int]] = {}
+        indices: List[int] = []
+        lengths: List[int] = []
+        for job in jobs:
+            found = extract(f"{job.get('title', '')} {job.get('description', '')}")
+            job_columns = column_lists.get(found)
+            if job_columns is None:
+                job_columns = column_lists[found] = [columns.setdefault(skill, len(columns)) for skill in found]
+            indices.extend(job_columns)
+            lengths.append(len(job_columns))
+        indptr = np.zeros(len(jobs) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+
+        matrix = sparse.csr_matrix(
+            (np.ones(len(indices), dtype=np.float32), np.asarray(indices, dtype=np.int32), indptr),
+            shape=(len(jobs), len(columns))
+        )
+        salaries = np.fromiter(
+            (parse_salary_value(str(job.get("salary") or "")) for job in jobs), dtype=np.float64, count=len(jobs)
+        )
+        company_ids, _ = _factorize(job.get("company") for job in jobs)
+        location_ids, _ = _factorize(job.get("location") for job in jobs)
+        skills = list(columns)
+        return cls(
+            matrix,
+            skills,
+            [matcher.category(skill, wanted) for skill in skills],
+            salaries,
+            company_ids,
+            location_ids
+        )
+
+    def frequency(self) -> np.ndarray:
+        """
+        每个技能出现的职位数
+        Number of jobs mentioning each skill
+        """
+        return np.asarray(self.matrix.sum(axis=0), dtype=np.int64).ravel()
+
+    def penetration(self) -> np.ndarray:
+        """
+        市场渗透率（百分比）= 提到该技能的职位数 / 总职位数
+        Market penetration (percent) = jobs mentioning the skill / all jobs
+        """
+        if not self.job_count:
+            return np.zeros(len(self.skills))
+        return self.frequency() / self.job_count * 100
+
+    def average_salary(self) -> np.ndarray:
+        """
+        每个技能的平均薪资（只计有薪资的职位），没有薪资数据时为 NaN
+        Average salary per skill over jobs that state one; NaN where no salary data exists
+        """
+        has_salary = ~np.isnan(self.salaries)
+        transposed = self.matrix.T.tocsr()
+        totals = transposed @ np.where(has_salary, self.salaries, 0.0)
+        counts = transposed @ has_salary.astype(np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(counts > 0, totals / counts, np.nan)
+
+    def co_occurrence(self) -> sparse.csr_matrix:
+        """
+        技能共现矩阵（技能×技能，同时出现的职位数），对角线置零
+        Skill co-occurrence matrix (skill x skill, number of jobs mentioning both) with a zeroed diagonal
+        """
+        co_occurrence = (self.matrix.T @ self.matrix).tocsr()
+        co_occurrence.setdiag(0)
+        co_occurrence.eliminate_zeros()
+        return co_occurrence
+
+    def cardinality(self, ids: np.ndarray) -> np.ndarray:
+        """
+        每个技能涉及的不同取值数（如公司数、地点数）：对 (技能, 取值) 对去重后按技能计数，空值不计
+        Distinct values per skill (e.g. companies, locations): (skill, value) pairs are de-duplicated and counted per
+        skill; blanks are not counted
+        """
+        coo = self.matrix.tocoo()
+        values = ids[coo.row]
+        keep = values >= 0
+        if not keep.any():
+            return np.zeros(len(self.skills), dtype=np.int64)
+        width = int(values.max()) + 1
+        pairs = coo.col[keep].astype(np.int64) * width + values[keep]
+        return np.bincount(np.unique(pairs) // width, minlength=len(self.skills))
+
+    def skill_trends(self, top_k: Optional[int] = None, related_k: int = 5) -> List[Dict[str, Any]]:
+        """
+        按需求评分排序的技能趋势（需求评分 = 频次 / 最大频次 × 100），每个技能附带最常共现的技能
+        Skill trends ordered by demand score (frequency / max frequency x 100), each with its most frequent co-occurring skills
+        """
+        if not self.skills:
+            return []
+        frequency = self.frequency()
+        demand = frequency / frequency.max() * 100
+        penetration = self.penetration()
+        salary = self.average_salary()
+        companies = self.cardinality(self.company_ids)
+        locations = self.cardinality(self.location_ids)
+        co_occurrence = self.co_occurrence()
+
+        order = np.lexsort((np.asarray(self.skills), -frequency))
+        if top_k is not None:
+            order = order[:top_k]
+
+        trends = []
+        for column in order:
+            start, end = co_occurrence.indptr[column], co_occurrence.indptr[column + 1]
+            partners, counts = co_occurrence.indices[start:end], co_occurrence.data[start:end]
+            top = np.argsort(-counts, kind="stable")[:related_k]
+            trends.append({
+                "skill_name": self.skills[column],
+                "demand_score": round(float(demand[column]), 1),
+                "frequency": int(frequency[column]),
+                "penetration_rate": round(float(penetration[column]), 1),
+                "avg_salary": None if np.isnan(salary[column]) else round(float(salary[column]), 0),
+                "job_count": int(frequency[column]),
+                "company_count": int(companies[column]),
+                "location_count": int(locations[column]),
+                "category": self.categories[column],
+                "co_occurring_skills": [
+                    {"skill_name": self.skills[partners[index]], "job_count": int(counts[index])} for index in top
+                ],
+            })
+        return trends
+
+
+# 提取结果LRU缓存 - Extraction result LRU cache
+_skill_cache: "OrderedDict[Tuple[bytes, Tuple[str, ...]], Tuple[str, ...]]" = OrderedDict()
+
+
+def _extract_cached(
+    matcher: SkillMatcher,
+    text: str,
+    categories: Optional[List[str]],
+    categories_key: Tuple[str, ...]
+) -> Tuple[str, ...]:
+    key = (hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest(), categories_key)
+    skills = _skill_cache.get(key)
+    if skills is not None:
+        _skill_cache.move_to_end(key)
+        return skills
+    skills = tuple(matcher.extract(text, categories))
+    _skill_cache[key] = skills
+    if len(_skill_cache) > SKILL_CACHE_MAX_ENTRIES:
+        _skill_cache.popitem(last=False)
+    return skills
@@ -0,0 +1,371 @@
+"""
+技能分类与匹配
+Skill taxonomy and matching for JobCatcher
+所有Agent共用一份技能词表（别名、类别标签），编译为 Aho-Corasick 自动机，每个文档只扫描一遍（线性时间），
+按词边界和最左最长规则取匹配，避免 "r"、"go"、"ai" 命中其他单词内部
+All agents share one skill vocabulary (aliases, category tags) compiled into an Aho-Corasick automaton; each document
+is scanned once in linear time and matches are taken on word boundaries by the leftmost-longest rule, so "r", "go" and
+"ai" no longer match inside other words
+"""
+
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+
+# 技能词表：类别 -> {技能展示名: 别名列表}；规范名为展示名的小写，同一技能出现在多个类别时按出现顺序带多个类别标签
+# Skill vocabulary: category -> {display name: aliases}; the canonical name is the lower-cased display name, and a skill
+# listed under several categories carries every tag in listing order
+SKILL_TAXONOMY: Dict[str, Dict[str, List[str]]] = {
+    "programming": {
+        "Python": [],
+        "JavaScript": ["js"],
+        "TypeScript": [],
+        "Java": [],
+        "Go": ["golang"],
+        "Rust": [],
+        "Kotlin": [],
+        "Swift": [],
+        "C++": ["cpp"],
+        "C#": ["c sharp", "csharp"],
+        "PHP": [],
+        "Ruby": [],
+        "Scala": [],
+        "R": [],
+        "Dart": [],
+        "Julia": [],
+        "SQL": [],
+        "HTML": ["html5"],
+        "CSS": ["css3"],
+    },
+    "frameworks": {
+        "React": ["react.js", "reactjs"],
+        "Vue": ["vue.js", "vuejs"],
+        "Angular": ["angularjs"],
+        "Svelte": [],
+        "Next.js": ["nextjs"],
+        "Nuxt": ["nuxt.js", "nuxtjs"],
+        "Node.js": ["nodejs"],
+        "Django": [],
+        "FastAPI": [],
+        "Flask": [],
+        "Spring": ["spring boot"],
+        "Express": ["express.js", "expressjs"],
+        "Nest.js": ["nestjs"],
+        "Laravel": [],
+        "TensorFlow": [],
+        "PyTorch": [],
+        "HuggingFace": ["hugging face"],
+        "LangChain": [],
+        "Pandas": [],
+        "NumPy": [],
+    },
+    "tools": {
+        "Git": [],
+        "Docker": [],
+        "Kubernetes": ["k8s"],
+        "Terraform": [],
+        "Ansible": [],
+        "Jenkins": [],
+        "GitLab CI": [],
+        "GitHub Actions": [],
+        "GitLab": [],
+        "Jira": [],
+        "Figma": [],
+        "VSCode": ["vs code", "visual studio code"],
+        "Postman": [],
+        "Prometheus": [],
+        "Linux": [],
+    },
+    "cloud": {
+        "AWS": ["amazon web services"],
+        "Azure": ["microsoft azure"],
+        "GCP": ["google cloud", "google cloud platform"],
+        "Vercel": [],
+        "Netlify": [],
+        "Railway": [],
+        "Supabase": [],
+        "Firebase": [],
+        "Cloudflare": [],
+        "DigitalOcean": ["digital ocean"],
+        "Heroku": [],
+    },
+    "databases": {
+        "PostgreSQL": ["postgres"],
+        "MySQL": [],
+        "MongoDB": ["mongo"],
+        "Redis": [],
+        "Elasticsearch": ["elastic search"],
+        "SQLite": [],
+        "Cassandra": [],
+        "Neo4j": [],
+        "Prisma": [],
+        "Supabase": [],
+        "SQL": [],
+    },
+    "ai_ml": {
+        "Machine Learning": ["ml"],
+        "Deep Learning": [],
+        "NLP": ["natural language processing"],
+        "Computer Vision": [],
+        "LLM": ["llms", "large language models", "large language model"],
+        "GPT": [],
+        "Claude": [],
+        "Transformers": [],
+        "AI": ["artificial intelligence"],
+        "Data Science": [],
+        "PyTorch": [],
+        "TensorFlow": [],
+    },
+    "practices": {
+        "CI/CD": ["cicd"],
+        "Agile": [],
+        "Scrum": [],
+        "Microservices": ["microservice"],
+        "RESTful": ["rest api", "restful api"],
+        "GraphQL": [],
+    },
+}
+
+# 同时是常用英文单词的技能名，只有按展示名大小写出现时才算（别名仍不区分大小写）
+# Skill names that are also common English words only count when written with their display casing (aliases stay
+# case-insensitive)
+CASE_SENSITIVE_SKILLS = {"Go", "R", "Rust", "Swift", "Ruby", "Dart", "Julia", "Spring", "Express", "Railway", "Claude"}
+
+# 包含技能名但不是技能的短语：参与最左最长匹配但不产出技能
+# Phrases containing a skill name that are not skills: they take part in leftmost-longest matching but yield no skill
+BLOCKED_PHRASES = ["r&d", "go-to-market", "go to market", "go-live", "go live", "spring semester", "ai-generated"]
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class SkillDefinition(NamedTuple):
+    """
+    技能定义 - 规范名、展示名和类别标签（第一个为主类别）
+    Skill definition - canonical name, display name and category tags (the first is the primary category)
+    """
+    name: str
+    display: str
+    categories: Tuple[str, ...]
+
+
+class SkillMatch(NamedTuple):
+    """
+    文本中的一次技能匹配
+    One skill match in a text
+    """
+    skill: str
+    start: int
+    end: int
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+def _normalize(text: str) -> str:
+    return _WHITESPACE.sub(" ", text)
+
+
+def _lower(text: str) -> str:
+    """
+    逐字符转小写以保持位置不变（个别Unicode字符整体转小写会改变长度）
+    Lower-case per character so offsets are preserved (lower-casing some Unicode characters as a whole changes the length)
+    """
+    if text.isascii():
+        return text.lower()
+    return "".join(char.lower()[0] for char in text)
+
+
+class SkillMatcher:
+    """
+    技能匹配器 - 编译后的 Aho-Corasick 自动机；构建后只读，可在多个协程和线程间共享
+    Skill matcher - a compiled Aho-Corasick automaton; read-only once built and safe to share across coroutines and threads
+    """
+
+    def __init__(
+        self,
+        taxonomy: Dict[str, Dict[str, List[str]]] = SKILL_TAXONOMY,
+        case_sensitive: Iterable[str] = CASE_SENSITIVE_SKILLS,
+        blocked_phrases: Sequence[str] = BLOCKED_PHRASES
+    ):
+        self.skills: Dict[str, SkillDefinition] = {}
+        self._aliases: Dict[str, str] = {}
+        case_sensitive = set(case_sensitive)
+
+        # (小写模式, 规范技能名或None, 需要精确匹配的原文) / (lower-cased pattern, canonical skill or None, exact original form)
+        patterns: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+        for category, entries in taxonomy.items():
+            for display, aliases in entries.items():
+                name = display.lower()
+                existing = self.skills.get(name)
+                categories = (existing.categories if existing else ()) + (category,)
+                self.skills[name] = SkillDefinition(name, display, tuple(dict.fromkeys(categories)))
+                patterns[name] = (name, display if display in case_sensitive else None)
+                self._aliases[name] = name
+                for alias in aliases:
+                    alias = _normalize(alias.lower())
+                    patterns[alias] = (name, None)
+                    self._aliases[alias] = name
+        for phrase in blocked_phrases:
+            patterns.setdefault(phrase.lower(), (None, None))
+
+        self._patterns: List[Tuple[str, Optional[str], Optional[str]]] = [
+            (pattern, skill, exact) for pattern, (skill, exact) in patterns.items()
+        ]
+        self._build()
+
+    def _build(self) -> None:
+        """
+        构建 goto/fail/output 表（广度优先），output 沿失败链合并
+        Build the goto/fail/output tables breadth-first, merging outputs along failure links
+        """
+        goto: List[Dict[str, int]] = [{}]
+        output: List[List[int]] = [[]]
+        for index, (pattern, _, _) in enumerate(self._patterns):
+            state = 0
+            for char in pattern:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][char] = next_state
+                    goto.append({})
+                    output.append([])
+                state = next_state
+            output[state].append(index)
+
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        for state in queue:
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[next_state] = goto[fallback].get(char, 0)
+                output[next_state].extend(output[fail[next_state]])
+
+        self._goto = goto
+        self._fail = fail
+        self._output = output
+
+    def find_matches(self, text: str) -> List[SkillMatch]:
+        """
+        扫描一遍文本，返回按位置排序、互不重叠的技能匹配（最左最长，满足词边界）；位置针对折叠空白后的文本
+        Scan the text once and return non-overlapping skill matches in position order (leftmost-longest, on word
+        boundaries); offsets refer to the text with whitespace collapsed
+        """
+        if not text:
+            return []
+        original = _normalize(text)
+        lowered = _lower(original)
+        goto, fail, output, patterns = self._goto, self._fail, self._output, self._patterns
+
+        candidates: List[Tuple[int, int, int]] = []
+        state = 0
+        for position, char in enumerate(lowered):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for index in output[state]:
+                end = position + 1
+                start = end - len(patterns[index][0])
+                if self._accept(original, lowered, start, end, index):
+                    candidates.append((start, -(end - start), index))
+
+        matches: List[SkillMatch] = []
+        last_end = 0
+        for start, negative_length, index in sorted(candidates):
+            if start < last_end:
+                continue
+            last_end = start - negative_length
+            skill = patterns[index][1]
+            if skill is not None:
+                matches.append(SkillMatch(skill, start, last_end))
+        return matches
+
+    def _accept(self, original: str, lowered: str, start: int, end: int, index: int) -> bool:
+        """
+        词边界检查：模式首尾是单词字符时，相邻字符不能是单词字符；以 + 或 # 结尾时后面也不能再接 + 或 #
+        Word-boundary check: when a pattern starts or ends with a word character the neighbouring character must not be
+        one; a pattern ending in + or # must not be followed by another + or #
+        """
+        pattern, _, exact = self._patterns[index]
+        if start > 0 and _is_word_char(pattern[0]) and _is_word_char(lowered[start - 1]):
+            return False
+        if end < len(lowered):
+            following = lowered[end]
+            if _is_word_char(pattern[-1]) and _is_word_char(following):
+                return False
+            if pattern[-1] in "+#" and (_is_word_char(following) or following in "+#"):
+                return False
+        return exact is None or original[start:end] == exact
+
+    def extract(self, text: str, categories: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        提取文本中的技能规范名（去重，按首次出现顺序）；给定类别时只保留带有其中任一类别标签的技能
+        Extract the canonical skill names in a text (unique, in order of first appearance); with categories, only
+        skills tagged with one of them are kept
+        """
+        wanted = set(categories) if categories is not None else None
+        skills: Dict[str, None] = {}
+        for match in self.find_matches(text):
+            if wanted is None or not wanted.isdisjoint(self.skills[match.skill].categories):
+                skills.setdefault(match.skill, None)
+        return list(skills)
+
+    def canonicalize(self, name: str) -> str:
+        """
+        把技能名或别名（如 "K8s"）转换为规范名；词表外的名称原样小写返回
+        Map a skill name or alias (e.g. "K8s") to its canonical name; names outside the vocabulary are returned lower-cased
+        """
+        normalized = _normalize(str(name).strip().lower())
+        return self._aliases.get(normalized, normalized)
+
+    def canonicalize_all(self, names: Iterable[str]) -> List[str]:
+        """
+        批量规范化技能名（去重并去掉空值，保持顺序）
+        Canonicalize skill names in bulk (unique and non-empty, order preserved)
+        """
+        skills: Dict[str, None] = {}
+        for name in names:
+            if name:
+                skill = self.canonicalize(name)
+                if skill:
+                    skills.setdefault(skill, None)
+        return list(skills)
+
+    def category(self, skill: str, categories: Optional[Iterable[str]] = None) -> Optional[str]:
+        """
+        技能的类别 - 默认主类别；给定类别时返回第一个在其中的类别标签
+        Category of a skill - the primary one by default; with categories, the first tag among them
+        """
+        definition = self.skills.get(self.canonicalize(skill))
+        if definition is None:
+            return None
+        if categories is None:
+            return definition.categories[0]
+        wanted = set(categories)
+        return next((category for category in definition.categories if category in wanted), None)
+
+    def display_name(self, skill: str) -> str:
+        """
+        技能的展示名（如 "postgresql" -> "PostgreSQL"）；词表外的名称原样返回
+        Display name of a skill (e.g. "postgresql" -> "PostgreSQL"); names outside the vocabulary are returned as given
+        """
+        definition = self.skills.get(self.canonicalize(skill))
+        return definition.display if definition else skill
+
+
+# 全局匹配器实例 - Global matcher instance
+skill_matcher: Optional[SkillMatcher] = None
+
+
+def get_skill_matcher() -> SkillMatcher:
+    """
+    获取技能匹配器实例
+    Get the skill matcher instance
+    """
+    global skill_matcher
+    if skill_matcher is None:
+        skill_matcher = SkillMatcher()
+    return skill_matcher
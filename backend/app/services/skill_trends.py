@@ -0,0 +1,310 @@
+"""
+技能需求趋势（周聚合物化视图）
+Skill demand trends (weekly aggregate materialized view) for JobCatcher
+职位入库、更新、过期和删除时，在写 jobs 表的同一事务里对 skill_demand_weekly 做增量加减；
+热点图按时间窗口读取聚合行，复杂度与技能数×周数相关，与职位数无关
+When jobs are stored, updated, expire or are deleted, skill_demand_weekly is incremented or decremented in the same
+transaction that writes the jobs table; heatmaps read aggregate rows for a time window, so the cost depends on
+skills x weeks rather than on the number of jobs
+"""
+
+import asyncio
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, engine
+from app.models.job import Job, SkillDemandWeekly
+from app.services.bm25_index import skill_names
+from app.services.skill_taxonomy import get_skill_matcher
+
+
+logger = logging.getLogger("service.skill_trends")
+
+# 记录职位总数的伪技能 / Pseudo-skill holding the total job count
+TOTAL_SKILL = "*"
+
+# 时间窗口上限（周） / Longest time window in weeks
+MAX_TREND_WEEKS = 104
+
+# 每条 INSERT ... ON CONFLICT 语句的行数 / Rows per INSERT ... ON CONFLICT statement
+UPSERT_BATCH_SIZE = 500
+
+# 计算贡献时需要的 Job 列 / Job columns needed to compute a contribution
+CONTRIBUTION_COLUMNS = (
+    Job.id, Job.title, Job.description, Job.skills, Job.location,
+    Job.posted_at, Job.scraped_at, Job.salary_min, Job.salary_max,
+)
+
+
+class JobContribution(NamedTuple):
+    """
+    一个职位对聚合表的贡献
+    What one job contributes to the aggregate table
+    """
+    skills: Tuple[Tuple[str, Optional[str]], ...]
+    location: str
+    week_start: date
+    salary: Optional[float]
+
+
+def week_start(moment: Optional[datetime]) -> date:
+    """
+    所在周的周一（UTC）；无时间时取当前周
+    Monday of the week (UTC); the current week when no time is given
+    """
+    moment = moment or datetime.now(timezone.utc)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc)
+    day = moment.date()
+    return day - timedelta(days=day.weekday())
+
+
+def _field(job: Any, name: str) -> Any:
+    # 字段字典或 Job 行/查询结果行 / A column dictionary, or a Job row / result row
+    return job.get(name) if isinstance(job, dict) else getattr(job, name, None)
+
+
+def job_contribution(job: Any) -> JobContribution:
+    """
+    计算职位（Job 行、查询结果行或 jobs 表字段字典）的贡献：标题和描述中的技能加上职位自带的词表内技能，
+    地点，发布（或抓取）所在周，薪资区间中值
+    Compute the contribution of a job (a Job row, result row or jobs column dictionary): skills in the title and
+    description plus the job's own skills that are in the vocabulary, location, week posted (or scraped) and salary midpoint
+    """
+    matcher = get_skill_matcher()
+    skills = dict.fromkeys(matcher.extract(f"{_field(job, 'title') or ''} {_field(job, 'description') or ''}"))
+    for name in skill_names(_field(job, "skills")):
+        skill = matcher.canonicalize(name)
+        if skill in matcher.skills:
+            skills.setdefault(skill, None)
+
+    salary_min, salary_max = _field(job, "salary_min"), _field(job, "salary_max")
+    bounds = [value for value in (salary_min, salary_max) if value]
+    return JobContribution(
+        skills=tuple((skill, matcher.category(skill)) for skill in skills),
+        location=(_field(job, "location") or "").strip()[:200],
+        week_start=week_start(_field(job, "posted_at") or _field(job, "scraped_at")),
+        salary=sum(bounds) / len(bounds) if bounds else None
+    )
+
+
+class SkillDemandDelta:
+    """
+    待写入的聚合增量 - 先在内存中合并，再用一批 INSERT ... ON CONFLICT DO UPDATE 累加到聚合表
+    Pending aggregate changes - merged in memory, then added onto the aggregate table with batched
+    INSERT ... ON CONFLICT DO UPDATE statements
+    """
+
+    def __init__(self):
+        # (技能, 地点, 周) -> [类别, 职位数, 薪资和, 薪资数] / (skill, location, week) -> [category, jobs, salary sum, salaries]
+        self._rows: Dict[Tuple[str, str, date], List[Any]] = {}
+
+    def add(self, job: Any, sign: int = 1) -> None:
+        """
+        计入一个在架职位（sign=-1 时扣除）
+        Count a live job (subtract it when sign is -1)
+        """
+        contribution = job if isinstance(job, JobContribution) else job_contribution(job)
+        has_salary = contribution.salary is not None
+        for skill, category in ((TOTAL_SKILL, None),) + contribution.skills:
+            row = self._rows.setdefault((skill, contribution.location, contribution.week_start), [category, 0, 0.0, 0])
+            row[1] += sign
+            if has_salary:
+                row[2] += sign * contribution.salary
+                row[3] += sign
+
+    def remove(self, job: Any) -> None:
+        """
+        扣除一个下架、过期或删除的职位
+        Subtract a job that was taken down, expired or deleted
+        """
+        self.add(job, sign=-1)
+
+    async def apply(self, session: AsyncSession) -> None:
+        """
+        在调用方的事务中写入增量（与 jobs 表的改动一起提交）
+        Write the changes inside the caller's transaction (committed together with the jobs table changes)
+        """
+        rows = [
+            {
+                "skill": skill,
+                "location": location,
+                "week_start": week,
+                "category": category,
+                "job_count": job_count,
+                "salary_sum": salary_sum,
+                "salary_count": salary_count,
+            }
+            for (skill, location, week), (category, job_count, salary_sum, salary_count) in self._rows.items()
+            if job_count or salary_count
+        ]
+        self._rows = {}
+        if engine.dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        for offset in range(0, len(rows), UPSERT_BATCH_SIZE):
+            statement = insert(SkillDemandWeekly).values(rows[offset:offset + UPSERT_BATCH_SIZE])
+            await session.execute(statement.on_conflict_do_update(
+                index_elements=[SkillDemandWeekly.skill, SkillDemandWeekly.location, SkillDemandWeekly.week_start],
+                set_={
+                    "category": func.coalesce(statement.excluded.category, SkillDemandWeekly.category),
+                    "job_count": SkillDemandWeekly.job_count + statement.excluded.job_count,
+                    "salary_sum": SkillDemandWeekly.salary_sum + statement.excluded.salary_sum,
+                    "salary_count": SkillDemandWeekly.salary_count + statement.excluded.salary_count,
+                }
+            ))
+
+
+async def subtract_live_jobs(session: AsyncSession, job_ids: List[str]) -> int:
+    """
+    从聚合表扣除这些职位中仍在架且未过期的部分（在批量UPDATE/DELETE之前调用），返回扣除的职位数
+    Subtract those of the jobs that are still active and unexpired from the aggregate (call before bulk UPDATEs or
+    DELETEs); returns how many jobs were subtracted
+    """
+    if not job_ids:
+        return 0
+    result = await session.execute(
+        select(*CONTRIBUTION_COLUMNS).where(
+            Job.id.in_(job_ids), Job.is_active.is_(True), Job.is_expired.is_(False)
+        )
+    )
+    rows = result.all()
+    delta = SkillDemandDelta()
+    for row in rows:
+        delta.remove(row)
+    await delta.apply(session)
+    return len(rows)
+
+
+async def rebuild_skill_demand(page_size: int = 1000) -> int:
+    """
+    从 jobs 表全量重建聚合表（按主键分页，技能提取在线程中执行），返回计入的职位数
+    Rebuild the aggregate from the jobs table (keyset-paged by primary key, skill extraction runs in a thread);
+    returns how many jobs were counted
+    """
+    counted = 0
+    last_id = ""
+    async with AsyncSessionLocal() as session:
+        await session.execute(delete(SkillDemandWeekly))
+        while True:
+            result = await session.execute(
+                select(*CONTRIBUTION_COLUMNS)
+                .where(Job.id > last_id, Job.is_active.is_(True), Job.is_expired.is_(False))
+                .order_by(Job.id)
+                .limit(page_size)
+            )
+            rows = [dict(row) for row in result.mappings()]
+            if not rows:
+                break
+            contributions = await asyncio.to_thread(lambda: [job_contribution(row) for row in rows])
+            delta = SkillDemandDelta()
+            for contribution in contributions:
+                delta.add(contribution)
+            await delta.apply(session)
+            counted += len(rows)
+            last_id = rows[-1]["id"]
+        await session.commit()
+    logger.info(f"已重建技能需求聚合表 / Rebuilt the skill demand aggregate: {counted} jobs")
+    return counted
+
+
+async def ensure_skill_demand_backfilled() -> int:
+    """
+    聚合表为空而 jobs 表有数据时（如首次升级）重建一次，否则不做任何事
+    Rebuild once when the aggregate is empty but the jobs table is not (e.g. right after upgrading); otherwise a no-op
+    """
+    async with AsyncSessionLocal() as session:
+        has_aggregate = await session.scalar(select(SkillDemandWeekly.skill).limit(1))
+        has_jobs = await session.scalar(select(Job.id).limit(1))
+    if has_aggregate is not None or has_jobs is None:
+        return 0
+    return await rebuild_skill_demand()
+
+
+async def query_skill_trends(
+    weeks: Optional[int] = None,
+    location: Optional[str] = None,
+    categories: Optional[Iterable[str]] = None,
+    top_k: Optional[int] = 20,
+    end: Optional[date] = None
+) -> Dict[str, Any]:
+    """
+    读取时间窗口内的技能趋势：每个技能的职位数、渗透率、平均薪资、每周序列和增长率（后半窗口相对前半窗口）
+    Read skill trends for a time window: per skill job count, penetration, average salary, weekly series and growth
+    (second half of the window versus the first half); the window defaults to SKILL_TRENDS_DEFAULT_WEEKS and is
+    capped at MAX_TREND_WEEKS
+    """
+    weeks = min(max(weeks or settings.SKILL_TRENDS_DEFAULT_WEEKS, 1), MAX_TREND_WEEKS)
+    last_week = week_start(datetime.combine(end, datetime.min.time(), timezone.utc) if end else None)
+    first_week = last_week - timedelta(weeks=weeks - 1)
+    week_list = [first_week + timedelta(weeks=offset) for offset in range(weeks)]
+    week_index = {week: offset for offset, week in enumerate(week_list)}
+
+    statement = (
+        select(
+            SkillDemandWeekly.skill,
+            func.max(SkillDemandWeekly.category),
+            SkillDemandWeekly.week_start,
+            func.sum(SkillDemandWeekly.job_count),
+            func.sum(SkillDemandWeekly.salary_sum),
+            func.sum(SkillDemandWeekly.salary_count),
+        )
+        .where(SkillDemandWeekly.week_start >= first_week, SkillDemandWeekly.week_start <= last_week)
+        .group_by(SkillDemandWeekly.skill, SkillDemandWeekly.week_start)
+    )
+    if location:
+        statement = statement.where(SkillDemandWeekly.location.ilike(f"%{location.strip()}%"))
+    async with AsyncSessionLocal() as session:
+        rows = (await session.execute(statement)).all()
+
+    wanted = set(categories) if categories else None
+    series: Dict[str, Dict[str, Any]] = {}
+    for skill, category, week, job_count, salary_sum, salary_count in rows:
+        if skill != TOTAL_SKILL and wanted is not None and category not in wanted:
+            continue
+        entry = series.setdefault(skill, {"category": category, "weekly": [0] * weeks, "salary_sum": 0.0, "salary_count": 0})
+        entry["weekly"][week_index[week]] += max(int(job_count or 0), 0)
+        entry["salary_sum"] += float(salary_sum or 0.0)
+        entry["salary_count"] += int(salary_count or 0)
+
+    totals = series.pop(TOTAL_SKILL, None)
+    total_weekly = totals["weekly"] if totals else [0] * weeks
+    total_jobs = sum(total_weekly)
+    half = weeks // 2
+
+    trends = []
+    for skill, entry in series.items():
+        job_count = sum(entry["weekly"])
+        if job_count <= 0:
+            continue
+        earlier, recent = sum(entry["weekly"][:half]), sum(entry["weekly"][half:])
+        trends.append({
+            "skill_name": skill,
+            "category": entry["category"],
+            "job_count": job_count,
+            "penetration_rate": round(job_count / total_jobs * 100, 1) if total_jobs else 0.0,
+            "avg_salary": round(entry["salary_sum"] / entry["salary_count"], 0) if entry["salary_count"] > 0 else None,
+            "weekly_counts": entry["weekly"],
+            "growth_rate": round((recent - earlier) / earlier * 100, 1) if half and earlier else None,
+        })
+    trends.sort(key=lambda trend: (-trend["job_count"], trend["skill_name"]))
+    if top_k is not None:
+        trends = trends[:top_k]
+    max_count = trends[0]["job_count"] if trends else 1
+    for trend in trends:
+        trend["demand_score"] = round(trend["job_count"] / max_count * 100, 1)
+
+    return {
+        "window": {"start": first_week.isoformat(), "end": (last_week + timedelta(days=6)).isoformat(), "weeks": weeks},
+        "location": location,
+        "weeks": [week.isoformat() for week in week_list],
+        "total_jobs": total_jobs,
+        "weekly_job_counts": total_weekly,
+        "skill_trends": trends,
+    }
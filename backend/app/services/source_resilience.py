@@ -0,0 +1,333 @@
+"""
+职位数据源容错
+Job source resilience for JobCatcher
+每个外部数据源一个熔断器（关闭/打开/半开）、基于观测p95的自适应超时和可选的对冲请求；
+多源搜索在截止时间后返回部分结果，迟到的数据源继续在后台填充缓存
+One circuit breaker (closed/open/half-open) per external source, adaptive timeouts from observed p95 latency and optional
+hedged requests; multi-source searches return partial results after a deadline while late sources keep filling the cache
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from enum import Enum
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple, TypeVar
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+
+logger = logging.getLogger("service.source_resilience")
+
+T = TypeVar("T")
+
+# 数据源对应的出站HTTP集成，其超时配置作为自适应超时的上限
+# Outbound HTTP integration of each source; its configured timeout caps the adaptive timeout
+SOURCE_INTEGRATIONS = {"stepstone": "apify", "google_jobs": "serpapi"}
+
+
+class CircuitState(str, Enum):
+    """
+    熔断器状态
+    Circuit breaker state
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+_STATE_GAUGE = {CircuitState.CLOSED: 0, CircuitState.HALF_OPEN: 1, CircuitState.OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """
+    熔断器打开，调用被直接拒绝
+    The circuit is open and the call was rejected without reaching the source
+    """
+
+    def __init__(self, source: str, retry_after: float):
+        self.source = source
+        self.retry_after = retry_after
+        super().__init__(f"数据源熔断中 / Source circuit open: {source} (retry in {retry_after:.1f}s)")
+
+
+class CircuitBreaker:
+    """
+    熔断器 - 连续失败达到阈值后打开，冷却后半开放行一次试探调用
+    Circuit breaker - opens after consecutive failures reach the threshold, then lets one probe through half-open after a cooldown
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_seconds: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._publish()
+
+    def allow(self) -> bool:
+        """
+        是否放行本次调用
+        Whether this call may proceed
+        """
+        if self.state == CircuitState.CLOSED:
+            return True
+        if self.state == CircuitState.OPEN:
+            if time.monotonic() - self._opened_at < self.recovery_seconds:
+                return False
+            self._transition(CircuitState.HALF_OPEN)
+        # 半开状态同一时间只放行一次试探 / Half-open lets a single probe through at a time
+        if self._probe_in_flight:
+            return False
+        self._probe_in_flight = True
+        return True
+
+    def retry_after(self) -> float:
+        return max(0.0, self.recovery_seconds - (time.monotonic() - self._opened_at))
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._probe_in_flight = False
+        if self.state != CircuitState.CLOSED:
+            self._transition(CircuitState.CLOSED)
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._probe_in_flight = False
+        if self.state == CircuitState.HALF_OPEN or self._failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            self._transition(CircuitState.OPEN)
+
+    def release(self) -> None:
+        """
+        调用被取消时释放试探名额，不计成功或失败
+        Release the probe slot when a call is cancelled, counting neither success nor failure
+        """
+        self._probe_in_flight = False
+
+    def _transition(self, state: CircuitState) -> None:
+        if state != self.state:
+            logger.info(f"数据源熔断器状态变更 / Source circuit {self.name}: {self.state.value} -> {state.value}")
+            metrics.increment("source_circuit_transitions_total", source=self.name, state=state.value)
+        self.state = state
+        self._publish()
+
+    def _publish(self) -> None:
+        metrics.set_gauge("source_circuit_state", _STATE_GAUGE[self.state], source=self.name)
+
+
+class LatencyWindow:
+    """
+    最近N次调用耗时的滑动窗口
+    Sliding window of the latest N call latencies
+    """
+
+    def __init__(self, size: int = 100):
+        self._samples: Deque[float] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))]
+
+
+class SourceGuard:
+    """
+    单个数据源的调用保护 - 熔断、自适应超时和对冲
+    Call protection for one source - circuit breaking, adaptive timeout and hedging
+    """
+
+    def __init__(
+        self,
+        source: str,
+        max_timeout: float,
+        min_timeout: float = 2.0,
+        p95_multiplier: float = 2.0,
+        min_samples: int = 20,
+        window_size: int = 100,
+        failure_threshold: int = 5,
+        recovery_seconds: float = 30.0,
+        hedge: bool = False,
+        hedge_min_spread: float = 3.0
+    ):
+        self.source = source
+        self.max_timeout = max_timeout
+        self.min_timeout = min(min_timeout, max_timeout)
+        self.p95_multiplier = p95_multiplier
+        self.min_samples = min_samples
+        self.hedge = hedge
+        self.hedge_min_spread = hedge_min_spread
+        self.breaker = CircuitBreaker(source, failure_threshold, recovery_seconds)
+        self.latency = LatencyWindow(window_size)
+
+    def timeout(self) -> float:
+        """
+        自适应超时 = p95 × 倍数，限制在 [最小超时, 集成超时] 内；样本不足时使用集成超时
+        Adaptive timeout = p95 × multiplier, clamped to [min timeout, integration timeout]; the integration timeout until enough samples exist
+        """
+        p95 = self.latency.percentile(95)
+        if p95 is None or len(self.latency) < self.min_samples:
+            return self.max_timeout
+        return max(self.min_timeout, min(self.max_timeout, p95 * self.p95_multiplier))
+
+    def _hedge_delay(self) -> Optional[float]:
+        # 仅在耗时波动大（p95/p50 超过阈值）时对冲，对冲延迟为p95
+        # Hedge only when latency varies widely (p95/p50 above the threshold); the hedge fires at p95
+        if not self.hedge or len(self.latency) < self.min_samples:
+            return None
+        p50, p95 = self.latency.percentile(50), self.latency.percentile(95)
+        if not p50 or p95 / p50 < self.hedge_min_spread:
+            return None
+        return p95
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        在熔断器和自适应超时保护下调用数据源
+        Call the source under the circuit breaker and adaptive timeout
+        """
+        if not self.breaker.allow():
+            metrics.increment("source_calls_total", source=self.source, status="rejected")
+            raise CircuitOpenError(self.source, self.breaker.retry_after())
+
+        timeout = self.timeout()
+        started = time.perf_counter()
+        try:
+            hedge_delay = self._hedge_delay()
+            if hedge_delay is not None and hedge_delay < timeout:
+                result = await self._hedged(fn, timeout, hedge_delay)
+            else:
+                result = await asyncio.wait_for(fn(), timeout)
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        except TimeoutError:
+            # 超时按超时值记入窗口，避免p95被低估导致超时越收越紧
+            # Timeouts are recorded at the timeout value so p95 is not underestimated into ever-tighter timeouts
+            self.latency.record(timeout)
+            self.breaker.record_failure()
+            metrics.increment("source_calls_total", source=self.source, status="timeout")
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            metrics.increment("source_calls_total", source=self.source, status="error")
+            raise
+
+        elapsed = time.perf_counter() - started
+        self.latency.record(elapsed)
+        self.breaker.record_success()
+        metrics.increment("source_calls_total", source=self.source, status="success")
+        metrics.observe("source_call_ms", elapsed * 1000, source=self.source)
+        metrics.set_gauge("source_timeout_seconds", self.timeout(), source=self.source)
+        return result
+
+    async def _hedged(self, fn: Callable[[], Awaitable[T]], timeout: float, hedge_delay: float) -> T:
+        """
+        对冲请求 - 主请求超过对冲延迟仍未完成时发出第二个请求，取先成功的结果
+        Hedged request - a second request starts once the primary passes the hedge delay; the first success wins
+        """
+        deadline = time.monotonic() + timeout
+        pending = {asyncio.ensure_future(fn())}
+        hedged = False
+        last_error: Optional[BaseException] = None
+        try:
+            while pending:
+                wait_for = deadline - time.monotonic()
+                if not hedged:
+                    wait_for = min(wait_for, hedge_delay)
+                if wait_for <= 0:
+                    raise TimeoutError()
+                done, pending = await asyncio.wait(pending, timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+                if not done and not hedged:
+                    hedged = True
+                    metrics.increment("source_hedged_requests_total", source=self.source)
+                    pending.add(asyncio.ensure_future(fn()))
+                elif not done:
+                    raise TimeoutError()
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+async def iter_within_deadline(
+    sources: List[str],
+    awaitables: List[Awaitable[Any]],
+    deadline: float
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    按完成顺序产出 (数据源, 结果或异常)，截止时间后未完成的数据源产出 TimeoutError；
+    提前关闭迭代器会取消仍在等待的数据源（其单飞上游调用不受影响）
+    Yield (source, result or exception) in completion order, with TimeoutError for sources still running at the deadline;
+    closing the iterator early cancels the sources still awaited (their single-flight upstream calls are unaffected)
+    """
+    async def labelled(source: str, awaitable: Awaitable[Any]) -> Tuple[str, Any]:
+        try:
+            return source, await awaitable
+        except Exception as e:
+            return source, e
+
+    tasks = {asyncio.ensure_future(labelled(source, awaitable)): source for source, awaitable in zip(sources, awaitables)}
+    finished = set()
+    try:
+        for next_done in asyncio.as_completed(tasks, timeout=deadline):
+            try:
+                source, result = await next_done
+            except TimeoutError:
+                break
+            finished.add(source)
+            yield source, result
+
+        for task, source in tasks.items():
+            if source in finished:
+                continue
+            if task.done():
+                yield task.result()
+                continue
+            task.cancel()
+            metrics.increment("source_deadline_missed_total", source=source)
+            logger.info(f"数据源未在截止时间内返回，先返回部分结果 / Source missed the deadline, returning partial results: {source}")
+            yield source, TimeoutError(f"{source} missed the {deadline:.1f}s search deadline")
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+# 全局数据源保护实例 - Global source guard instances
+source_guards: Dict[str, SourceGuard] = {}
+
+
+def get_source_guard(source: str) -> SourceGuard:
+    """
+    获取数据源的调用保护实例
+    Get the call guard of a source
+    """
+    guard = source_guards.get(source)
+    if guard is None:
+        integration = SOURCE_INTEGRATIONS.get(source, source)
+        guard = source_guards[source] = SourceGuard(
+            source,
+            max_timeout=settings.HTTP_CLIENT_TIMEOUT_SECONDS.get(integration, settings.HTTP_CLIENT_DEFAULT_TIMEOUT_SECONDS),
+            min_timeout=settings.SOURCE_TIMEOUT_MIN_SECONDS,
+            p95_multiplier=settings.SOURCE_TIMEOUT_P95_MULTIPLIER,
+            min_samples=settings.SOURCE_LATENCY_MIN_SAMPLES,
+            window_size=settings.SOURCE_LATENCY_WINDOW,
+            failure_threshold=settings.SOURCE_BREAKER_FAILURE_THRESHOLD,
+            recovery_seconds=settings.SOURCE_BREAKER_RECOVERY_SECONDS,
+            hedge=source in settings.SOURCE_HEDGE_SOURCES,
+            hedge_min_spread=settings.SOURCE_HEDGE_MIN_SPREAD
+        )
+    return guard
@@ -0,0 +1,247 @@
+"""
+工作流检查点存储服务
+Workflow checkpoint storage service for JobCatcher
+基于SQLAlchemy的LangGraph检查点存储（SQLite/Postgres），支持崩溃后从最后完成的Agent恢复
+SQLAlchemy-backed LangGraph checkpointer (SQLite/Postgres) so workflows resume from the last completed agent after a crash
+"""
+
+import logging
+import random
+from typing import Any, AsyncIterator, Dict, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from sqlalchemy import delete, select
+
+from app.core.database import AsyncSessionLocal
+from app.models.workflow import WorkflowCheckpoint, WorkflowCheckpointWrite
+
+
+logger = logging.getLogger("service.workflow_checkpointer")
+
+
+class SQLAlchemyCheckpointSaver(BaseCheckpointSaver[str]):
+    """
+    SQLAlchemy异步检查点存储
+    Async SQLAlchemy checkpoint saver
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal):
+        super().__init__()
+        self.session_factory = session_factory
+        self.jsonplus_serde = JsonPlusSerializer()
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """
+        获取指定或最新的检查点
+        Get the requested checkpoint, or the latest one for the thread
+        """
+        thread_id = str(config["configurable"]["thread_id"])
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+
+        query = select(WorkflowCheckpoint).where(
+            WorkflowCheckpoint.thread_id == thread_id,
+            WorkflowCheckpoint.checkpoint_ns == checkpoint_ns
+        )
+        if checkpoint_id := get_checkpoint_id(config):
+            query = query.where(WorkflowCheckpoint.checkpoint_id == checkpoint_id)
+        else:
+            query = query.order_by(WorkflowCheckpoint.checkpoint_id.desc()).limit(1)
+
+        async with self.session_factory() as session:
+            row = (await session.execute(query)).scalars().first()
+            if row is None:
+                return None
+            pending_writes = await self._load_writes(session, row)
+
+        return self._to_tuple(row, pending_writes)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        """
+        按时间倒序列出检查点
+        List checkpoints, newest first
+        """
+        query = select(WorkflowCheckpoint)
+        if config:
+            query = query.where(WorkflowCheckpoint.thread_id == str(config["configurable"]["thread_id"]))
+            checkpoint_ns = config["configurable"].get("checkpoint_ns")
+            if checkpoint_ns is not None:
+                query = query.where(WorkflowCheckpoint.checkpoint_ns == checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                query = query.where(WorkflowCheckpoint.checkpoint_id == checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            query = query.where(WorkflowCheckpoint.checkpoint_id < before_id)
+        query = query.order_by(WorkflowCheckpoint.checkpoint_id.desc())
+
+        returned = 0
+        async with self.session_factory() as session:
+            rows = (await session.execute(query)).scalars().all()
+            for row in rows:
+                checkpoint_tuple = self._to_tuple(row, await self._load_writes(session, row))
+                # 元数据过滤在内存中完成 / Metadata filtering is done in memory
+                if filter and any(checkpoint_tuple.metadata.get(key) != value for key, value in filter.items()):
+                    continue
+                yield checkpoint_tuple
+                returned += 1
+                if limit and returned >= limit:
+                    break
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """
+        保存检查点
+        Save a checkpoint
+        """
+        thread_id = str(config["configurable"]["thread_id"])
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_type, serialized_checkpoint = self.serde.dumps_typed(checkpoint)
+
+        async with self.session_factory() as session:
+            await session.merge(WorkflowCheckpoint(
+                thread_id=thread_id,
+                checkpoint_ns=checkpoint_ns,
+                checkpoint_id=checkpoint["id"],
+                parent_checkpoint_id=config["configurable"].get("checkpoint_id"),
+                checkpoint_type=checkpoint_type,
+                checkpoint=serialized_checkpoint,
+                checkpoint_metadata=self.jsonplus_serde.dumps(get_checkpoint_metadata(config, metadata))
+            ))
+            await session.commit()
+
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """
+        保存节点的挂起写入
+        Save a node's pending writes
+        """
+        thread_id = str(config["configurable"]["thread_id"])
+        checkpoint_ns = str(config["configurable"].get("checkpoint_ns", ""))
+        checkpoint_id = str(config["configurable"]["checkpoint_id"])
+        # 特殊通道（错误、中断等）覆盖写入，普通通道已存在则忽略
+        # Special channels (errors, interrupts, ...) overwrite; regular channels are ignored if already stored
+        replace = all(channel in WRITES_IDX_MAP for channel, _ in writes)
+
+        async with self.session_factory() as session:
+            for idx, (channel, value) in enumerate(writes):
+                key = (thread_id, checkpoint_ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(channel, idx))
+                if not replace and await session.get(WorkflowCheckpointWrite, key) is not None:
+                    continue
+                value_type, serialized_value = self.serde.dumps_typed(value)
+                await session.merge(WorkflowCheckpointWrite(
+                    thread_id=thread_id,
+                    checkpoint_ns=checkpoint_ns,
+                    checkpoint_id=checkpoint_id,
+                    task_id=task_id,
+                    idx=key[-1],
+                    channel=channel,
+                    value_type=value_type,
+                    value=serialized_value,
+                    task_path=task_path
+                ))
+            await session.commit()
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        """
+        删除线程的全部检查点和写入
+        Delete all checkpoints and writes of a thread
+        """
+        async with self.session_factory() as session:
+            await session.execute(delete(WorkflowCheckpoint).where(WorkflowCheckpoint.thread_id == str(thread_id)))
+            await session.execute(delete(WorkflowCheckpointWrite).where(WorkflowCheckpointWrite.thread_id == str(thread_id)))
+            await session.commit()
+
+    def get_next_version(self, current: Optional[str], channel: Any) -> str:
+        """
+        生成单调递增的通道版本号
+        Generate a monotonically increasing channel version
+        """
+        if current is None:
+            current_version = 0
+        elif isinstance(current, int):
+            current_version = current
+        else:
+            current_version = int(current.split(".")[0])
+        return f"{current_version + 1:032}.{random.random():016}"
+
+    async def _load_writes(self, session, row: WorkflowCheckpoint) -> list:
+        """
+        加载检查点的挂起写入
+        Load the pending writes of a checkpoint
+        """
+        result = await session.execute(
+            select(WorkflowCheckpointWrite)
+            .where(
+                WorkflowCheckpointWrite.thread_id == row.thread_id,
+                WorkflowCheckpointWrite.checkpoint_ns == row.checkpoint_ns,
+                WorkflowCheckpointWrite.checkpoint_id == row.checkpoint_id
+            )
+            .order_by(WorkflowCheckpointWrite.task_id, WorkflowCheckpointWrite.idx)
+        )
+        return [
+            (write.task_id, write.channel, self.serde.loads_typed((write.value_type, write.value)))
+            for write in result.scalars()
+        ]
+
+    def _to_tuple(self, row: WorkflowCheckpoint, pending_writes: list) -> CheckpointTuple:
+        """
+        将数据库行转换为CheckpointTuple
+        Convert a database row into a CheckpointTuple
+        """
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": row.thread_id,
+                    "checkpoint_ns": row.checkpoint_ns,
+                    "checkpoint_id": row.checkpoint_id,
+                }
+            },
+            checkpoint=self.serde.loads_typed((row.checkpoint_type, row.checkpoint)),
+            metadata=self.jsonplus_serde.loads(row.checkpoint_metadata) if row.checkpoint_metadata else {},
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": row.thread_id,
+                        "checkpoint_ns": row.checkpoint_ns,
+                        "checkpoint_id": row.parent_checkpoint_id,
+                    }
+                }
+                if row.parent_checkpoint_id
+                else None
+            ),
+            pending_writes=pending_writes
+        )
@@ -0,0 +1,115 @@
+"""
+工作流运行租约服务
+Workflow run lease service for JobCatcher
+执行中的运行记录归属进程和租约到期时间；只有待执行、已中断或租约已过期的运行可以被认领，执行期间定期续约，
+多个进程因此不会同时执行同一个运行
+A running run records its owning process and lease expiry; only pending, interrupted or lease-expired runs can be
+claimed and the lease is renewed while the run executes, so several processes never execute the same run at once
+"""
+
+import asyncio
+import logging
+import os
+import socket
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from uuid import uuid4
+
+from sqlalchemy import and_, or_, update
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.workflow import WorkflowRun, WorkflowRunStatus
+
+
+logger = logging.getLogger("service.workflow_leases")
+
+# 本进程的租约持有者ID / Lease owner ID of this process
+WORKER_ID = f"{socket.gethostname()}-{os.getpid()}-{uuid4().hex[:8]}"
+
+
+def _lease_expired(now: datetime):
+    return and_(
+        WorkflowRun.status == WorkflowRunStatus.RUNNING.value,
+        or_(WorkflowRun.lease_expires_at.is_(None), WorkflowRun.lease_expires_at < now)
+    )
+
+
+async def claim_workflow_run(run_id: str, owner_id: str = WORKER_ID) -> bool:
+    """
+    认领运行 - 条件UPDATE只对待执行、已中断或租约已过期的运行生效，影响一行即认领成功
+    Claim a run - a conditional UPDATE that only matches pending, interrupted or lease-expired runs; the claim
+    succeeds when exactly one row changes
+    """
+    now = datetime.now(timezone.utc)
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            update(WorkflowRun)
+            .where(
+                WorkflowRun.id == run_id,
+                or_(
+                    WorkflowRun.status.in_([WorkflowRunStatus.PENDING.value, WorkflowRunStatus.INTERRUPTED.value]),
+                    _lease_expired(now)
+                )
+            )
+            .values(
+                status=WorkflowRunStatus.RUNNING,
+                owner_id=owner_id,
+                lease_expires_at=now + timedelta(seconds=settings.WORKFLOW_RUN_LEASE_SECONDS)
+            )
+        )
+        await db.commit()
+        return result.rowcount == 1
+
+
+async def renew_workflow_lease(run_id: str, owner_id: str = WORKER_ID) -> bool:
+    """
+    续约 - 只有仍持有该运行的进程能续约
+    Renew the lease - only the process that still owns the run can renew it
+    """
+    now = datetime.now(timezone.utc)
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            update(WorkflowRun)
+            .where(
+                WorkflowRun.id == run_id,
+                WorkflowRun.owner_id == owner_id,
+                WorkflowRun.status == WorkflowRunStatus.RUNNING.value
+            )
+            .values(lease_expires_at=now + timedelta(seconds=settings.WORKFLOW_RUN_LEASE_SECONDS))
+        )
+        await db.commit()
+        return result.rowcount == 1
+
+
+async def keep_workflow_lease(run_id: str, owner_id: str = WORKER_ID) -> None:
+    """
+    续约循环 - 每三分之一租约时长续约一次，直到被取消
+    Renewal loop - renew every third of the lease duration until cancelled
+    """
+    interval = settings.WORKFLOW_RUN_LEASE_SECONDS / 3
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            if not await renew_workflow_lease(run_id, owner_id):
+                logger.warning(f"工作流租约已丢失 / Workflow lease lost: {run_id}")
+                return
+        except Exception as e:
+            logger.warning(f"工作流续约失败 / Failed to renew workflow lease: {run_id}: {e}")
+
+
+async def expire_stale_runs(now: Optional[datetime] = None) -> int:
+    """
+    将租约已过期的运行中记录标记为中断（持有进程已退出），返回标记数；仍在续约的运行不受影响
+    Mark running runs whose lease has expired (their owner is gone) as interrupted, returning how many were marked;
+    runs still being renewed are left alone
+    """
+    now = now or datetime.now(timezone.utc)
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            update(WorkflowRun)
+            .where(_lease_expired(now))
+            .values(status=WorkflowRunStatus.INTERRUPTED, owner_id=None, lease_expires_at=None)
+        )
+        await db.commit()
+        return result.rowcount or 0
@@ -0,0 +1,510 @@
+"""
+工作流任务队列服务
+Workflow job queue service for JobCatcher
+工作流在后台Worker池中执行，与WebSocket接收循环解耦；按工作流类型限制并发并进行准入控制
+Workflows run on background worker pools decoupled from the WebSocket receive loop, with per-type concurrency limits and admission control
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from pydantic import BaseModel, Field
+from sqlalchemy import func, select
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import metrics
+from app.models.workflow import WorkflowRun, WorkflowRunStatus
+from app.services.llm_gateway import LLMPriority, llm_priority_scope
+from app.services.workflow_leases import claim_workflow_run
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:  # Redis为可选依赖 / Redis is an optional dependency
+    redis_asyncio = None
+
+
+logger = logging.getLogger("service.workflow_queue")
+
+
+class WorkflowJob(BaseModel):
+    """
+    工作流任务 - 任务ID同时作为工作流运行ID
+    Workflow job - the job ID doubles as the workflow run ID
+    """
+    job_id: str = Field(default_factory=lambda: str(uuid4()), description="任务ID / Job ID")
+    workflow_type: str = Field(description="工作流类型 / Workflow type")
+    user_id: int = Field(description="用户ID / User ID")
+    session_id: str = Field(description="会话ID / Session ID")
+    user_input: Dict[str, Any] = Field(default_factory=dict, description="用户输入 / User input")
+    reply_type: str = Field(default="workflow_completed", description="结果消息类型 / Result message type")
+    agent_type: Optional[str] = Field(default=None, description="单Agent请求的Agent类型 / Agent type of single-agent requests")
+    priority: LLMPriority = Field(default=LLMPriority.INTERACTIVE, description="LLM请求优先级 / LLM request priority")
+    enqueued_at: float = Field(default_factory=time.time, description="入队时间戳 / Enqueue timestamp")
+
+
+class WorkflowQueueFullError(Exception):
+    """
+    准入控制拒绝了任务
+    Raised when admission control rejects a job
+    """
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+class WorkflowQueueBackend(ABC):
+    """
+    工作流队列后端基类
+    Base class for workflow queue backends
+    """
+
+    # 进程重启后队列内容是否仍然存在 / Whether queued jobs survive a process restart
+    durable: bool = False
+
+    async def start(self, workflow_types: List[str]) -> None:
+        """
+        启动后端
+        Start the backend
+        """
+        return None
+
+    @abstractmethod
+    async def enqueue(self, job: WorkflowJob) -> None:
+        """
+        任务入队
+        Enqueue a job
+        """
+        pass
+
+    @abstractmethod
+    async def dequeue(self, workflow_type: str, timeout: float) -> Optional[Tuple[str, WorkflowJob]]:
+        """
+        取出任务，超时返回None
+        Take a job, or None on timeout; returns (delivery_id, job)
+        """
+        pass
+
+    @abstractmethod
+    async def ack(self, workflow_type: str, delivery_id: str) -> None:
+        """
+        确认任务已处理完成
+        Acknowledge that a job has been processed
+        """
+        pass
+
+    @abstractmethod
+    async def depth(self, workflow_type: str) -> int:
+        """
+        当前排队任务数
+        Number of jobs currently queued
+        """
+        pass
+
+    async def aclose(self) -> None:
+        """
+        关闭后端
+        Close the backend
+        """
+        return None
+
+
+class InProcessQueueBackend(WorkflowQueueBackend):
+    """
+    进程内asyncio队列后端 - 重启后丢失的任务由运行记录恢复
+    In-process asyncio queue backend - jobs lost on restart are recovered from the run records
+    """
+
+    def __init__(self):
+        self._queues: Dict[str, asyncio.Queue] = defaultdict(asyncio.Queue)
+
+    async def enqueue(self, job: WorkflowJob) -> None:
+        self._queues[job.workflow_type].put_nowait(job)
+
+    async def dequeue(self, workflow_type: str, timeout: float) -> Optional[Tuple[str, WorkflowJob]]:
+        try:
+            job = await asyncio.wait_for(self._queues[workflow_type].get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        return job.job_id, job
+
+    async def ack(self, workflow_type: str, delivery_id: str) -> None:
+        self._queues[workflow_type].task_done()
+
+    async def depth(self, workflow_type: str) -> int:
+        return self._queues[workflow_type].qsize()
+
+
+class RedisStreamQueueBackend(WorkflowQueueBackend):
+    """
+    Redis Stream队列后端 - 多个API进程通过消费者组共享任务
+    Redis stream queue backend - API processes share jobs through a consumer group
+    客户端可注入，测试时可替换为本地fake实现
+    The client is injectable so a local fake can stand in for tests
+    """
+
+    durable = True
+
+    def __init__(
+        self,
+        client: Any,
+        stream_prefix: str = "jobcatcher:workflows",
+        group: str = "workflow-workers",
+        consumer: Optional[str] = None,
+        claim_idle_seconds: int = 3600
+    ):
+        self.client = client
+        self.stream_prefix = stream_prefix
+        self.group = group
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self.claim_idle_seconds = claim_idle_seconds
+        # 启动时从已退出的消费者接管的任务 / Jobs taken over from dead consumers at startup
+        self._reclaimed: Dict[str, Deque[Tuple[str, WorkflowJob]]] = defaultdict(deque)
+
+    def _stream(self, workflow_type: str) -> str:
+        return f"{self.stream_prefix}:{workflow_type}"
+
+    @staticmethod
+    def _decode(value: Any) -> str:
+        return value.decode("utf-8") if isinstance(value, bytes) else str(value)
+
+    def _parse_entry(self, entry_id: Any, fields: Dict[Any, Any]) -> Tuple[str, WorkflowJob]:
+        decoded = {self._decode(key): self._decode(value) for key, value in fields.items()}
+        return self._decode(entry_id), WorkflowJob.model_validate(json.loads(decoded["job"]))
+
+    async def start(self, workflow_types: List[str]) -> None:
+        """
+        创建消费者组，并接管长时间未确认的任务
+        Create consumer groups and take over entries left unacknowledged for too long
+        """
+        for workflow_type in workflow_types:
+            stream = self._stream(workflow_type)
+            try:
+                await self.client.xgroup_create(stream, self.group, id="0", mkstream=True)
+            except Exception as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+
+            try:
+                claimed = await self.client.xautoclaim(
+                    stream, self.group, self.consumer,
+                    min_idle_time=self.claim_idle_seconds * 1000,
+                    start_id="0-0"
+                )
+            except Exception as e:
+                logger.warning(f"接管未确认任务失败 / Failed to claim pending jobs: {stream}: {e}")
+                continue
+            for entry_id, fields in claimed[1]:
+                if fields:
+                    self._reclaimed[workflow_type].append(self._parse_entry(entry_id, fields))
+
+    async def enqueue(self, job: WorkflowJob) -> None:
+        await self.client.xadd(self._stream(job.workflow_type), {"job": job.model_dump_json()})
+
+    async def dequeue(self, workflow_type: str, timeout: float) -> Optional[Tuple[str, WorkflowJob]]:
+        if self._reclaimed[workflow_type]:
+            return self._reclaimed[workflow_type].popleft()
+
+        response = await self.client.xreadgroup(
+            self.group, self.consumer,
+            {self._stream(workflow_type): ">"},
+            count=1,
+            block=int(timeout * 1000)
+        )
+        for _, entries in response or []:
+            for entry_id, fields in entries:
+                return self._parse_entry(entry_id, fields)
+        return None
+
+    async def ack(self, workflow_type: str, delivery_id: str) -> None:
+        # 确认后删除，使流长度等于排队和执行中的任务数
+        # Delete after acknowledging so the stream length equals queued plus in-flight jobs
+        stream = self._stream(workflow_type)
+        await self.client.xack(stream, self.group, delivery_id)
+        await self.client.xdel(stream, delivery_id)
+
+    async def depth(self, workflow_type: str) -> int:
+        return await self.client.xlen(self._stream(workflow_type))
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+WorkflowExecutor = Callable[[WorkflowJob], Awaitable[Any]]
+
+
+class WorkflowQueue:
+    """
+    工作流队列 - 每种工作流类型一个有界Worker池
+    Workflow queue - one bounded worker pool per workflow type
+    """
+
+    def __init__(
+        self,
+        executor: WorkflowExecutor,
+        backend: Optional[WorkflowQueueBackend] = None,
+        workers_per_type: Optional[Dict[str, int]] = None,
+        max_queued_per_type: Optional[int] = None,
+        max_active_jobs_per_user: Optional[int] = None,
+        poll_timeout: float = 5.0
+    ):
+        self.executor = executor
+        self.backend = backend
+        self.workers_per_type = workers_per_type or settings.WORKFLOW_WORKERS_PER_TYPE
+        self.max_queued_per_type = max_queued_per_type or settings.WORKFLOW_MAX_QUEUED_PER_TYPE
+        self.max_active_jobs_per_user = max_active_jobs_per_user or settings.WORKFLOW_MAX_ACTIVE_JOBS_PER_USER
+        self.poll_timeout = poll_timeout
+        self._workers: List[asyncio.Task] = []
+        self._active: Dict[str, int] = defaultdict(int)
+        # 每个用户进行中的流式单Agent运行 / In-flight streamed single-agent runs per user
+        self._streaming: Dict[int, int] = defaultdict(int)
+
+    @property
+    def started(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self) -> None:
+        """
+        启动Worker池，并重新入队上次进程遗留的任务
+        Start the worker pools and re-enqueue jobs left over by the previous process
+        """
+        if self.started:
+            return
+        if self.backend is None:
+            self.backend = create_workflow_queue_backend()
+
+        workflow_types = list(self.workers_per_type)
+        await self.backend.start(workflow_types)
+        if not self.backend.durable:
+            recovered = await self._recover_jobs()
+            if recovered:
+                logger.info(f"重新入队遗留工作流 / Re-enqueued leftover workflows: {recovered}")
+
+        for workflow_type, worker_count in self.workers_per_type.items():
+            for index in range(worker_count):
+                self._workers.append(asyncio.create_task(
+                    self._worker(workflow_type),
+                    name=f"workflow-worker-{workflow_type}-{index}"
+                ))
+        logger.info(f"工作流队列已启动 / Workflow queue started: {self.workers_per_type}")
+
+    async def stop(self) -> None:
+        """
+        停止Worker池 - 执行中的运行会被标记为中断，下次启动时恢复
+        Stop the worker pools - in-flight runs are marked interrupted and resume on next startup
+        """
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+        if self.backend is not None:
+            await self.backend.aclose()
+        logger.info("工作流队列已停止 / Workflow queue stopped")
+
+    async def submit(
+        self,
+        workflow_type: str,
+        user_id: int,
+        session_id: str,
+        user_input: Dict[str, Any],
+        **job_fields: Any
+    ) -> Tuple[WorkflowJob, int]:
+        """
+        提交任务 - 准入通过后创建待执行的运行记录并入队，返回任务和排队位置
+        Submit a job - after admission, create a pending run record and enqueue it; returns the job and its queue position
+        """
+        if not self.started:
+            await self.start()
+        if workflow_type not in self.workers_per_type:
+            raise ValueError(f"未配置Worker的工作流类型 / Workflow type has no workers: {workflow_type}")
+
+        queued = await self.backend.depth(workflow_type)
+        if queued >= self.max_queued_per_type:
+            metrics.increment("workflow_jobs_rejected_total", workflow_type=workflow_type, reason="queue_full")
+            raise WorkflowQueueFullError(
+                "queue_full",
+                f"工作流队列已满，请稍后重试 / Workflow queue is full, please retry later ({workflow_type})"
+            )
+
+        if await self._count_active_jobs(user_id) + self._streaming[user_id] >= self.max_active_jobs_per_user:
+            raise self._user_limit_error(workflow_type)
+
+        job = WorkflowJob(
+            workflow_type=workflow_type,
+            user_id=user_id,
+            session_id=session_id,
+            user_input=user_input,
+            **job_fields
+        )
+        async with AsyncSessionLocal() as db:
+            db.add(WorkflowRun(
+                id=job.job_id,
+                user_id=user_id,
+                session_id=session_id,
+                workflow_type=workflow_type,
+                status=WorkflowRunStatus.PENDING,
+                user_input=user_input
+            ))
+            await db.commit()
+
+        await self.backend.enqueue(job)
+        metrics.increment("workflow_jobs_submitted_total", workflow_type=workflow_type)
+        metrics.set_gauge("workflow_queue_depth", queued + 1, workflow_type=workflow_type)
+        return job, queued + 1
+
+    @asynccontextmanager
+    async def admit_stream(self, workflow_type: str, user_id: int) -> AsyncIterator[None]:
+        """
+        流式单Agent运行的准入 - 不经过队列，但与排队任务共用每用户并发上限；
+        流式运行绑定本进程的WebSocket连接，因此只在进程内计数
+        Admission for a streamed single-agent run - it bypasses the queue but shares the per-user concurrency limit with
+        queued jobs; a streamed run is tied to this process's WebSocket, so it is only counted in-process
+        """
+        # 先占位再检查，并发的流式请求不会同时通过 / Take the slot before checking so concurrent streams cannot all pass
+        self._streaming[user_id] += 1
+        try:
+            if await self._count_active_jobs(user_id) + self._streaming[user_id] > self.max_active_jobs_per_user:
+                raise self._user_limit_error(workflow_type)
+            yield
+        finally:
+            self._streaming[user_id] -= 1
+            if not self._streaming[user_id]:
+                del self._streaming[user_id]
+
+    def _user_limit_error(self, workflow_type: str) -> WorkflowQueueFullError:
+        metrics.increment("workflow_jobs_rejected_total", workflow_type=workflow_type, reason="user_limit")
+        return WorkflowQueueFullError(
+            "user_limit",
+            f"同时进行的工作流过多（上限 {self.max_active_jobs_per_user}） / Too many concurrent workflows (limit {self.max_active_jobs_per_user})"
+        )
+
+    async def _worker(self, workflow_type: str) -> None:
+        """
+        Worker循环 - 逐个取出并执行任务
+        Worker loop - take and execute jobs one at a time
+        """
+        while True:
+            try:
+                delivery = await self.backend.dequeue(workflow_type, self.poll_timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"读取工作流队列失败 / Failed to read workflow queue: {workflow_type}: {e}")
+                await asyncio.sleep(self.poll_timeout)
+                continue
+            if delivery is None:
+                continue
+
+            delivery_id, job = delivery
+            await self._process(workflow_type, delivery_id, job)
+
+    async def _process(self, workflow_type: str, delivery_id: str, job: WorkflowJob) -> None:
+        """
+        执行单个任务 - 认领后交给执行器；被取消时不确认，留给下次启动恢复
+        Execute a single job - handed to the executor once claimed; left unacknowledged when cancelled so the next
+        startup recovers it
+        """
+        # 先认领运行（条件UPDATE，只有一个Worker能成功）；已取消/已完成的运行，或已被其他Worker认领的重复投递，直接确认跳过
+        # Claim the run first (a conditional UPDATE only one worker can win); cancelled/finished runs and duplicate
+        # deliveries claimed by another worker are acknowledged and skipped
+        if not await claim_workflow_run(job.job_id):
+            logger.info(f"跳过工作流任务 / Skipping workflow job: {job.job_id} ({await self._get_run_status(job.job_id)})")
+            await self.backend.ack(workflow_type, delivery_id)
+            return
+
+        metrics.observe("workflow_queue_wait_ms", (time.time() - job.enqueued_at) * 1000, workflow_type=workflow_type)
+        self._active[workflow_type] += 1
+        metrics.set_gauge("workflow_jobs_active", self._active[workflow_type], workflow_type=workflow_type)
+        started_at = time.perf_counter()
+        outcome = "completed"
+        try:
+            with llm_priority_scope(job.priority):
+                await self.executor(job)
+        except asyncio.CancelledError:
+            outcome = "interrupted"
+            raise
+        except Exception as e:
+            outcome = "failed"
+            logger.error(f"工作流任务执行失败 / Workflow job failed: {job.job_id}: {e}")
+        finally:
+            self._active[workflow_type] -= 1
+            metrics.set_gauge("workflow_jobs_active", self._active[workflow_type], workflow_type=workflow_type)
+            metrics.observe("workflow_job_duration_ms", (time.perf_counter() - started_at) * 1000, workflow_type=workflow_type)
+            metrics.increment("workflow_jobs_total", workflow_type=workflow_type, status=outcome)
+
+        await self.backend.ack(workflow_type, delivery_id)
+        metrics.set_gauge("workflow_queue_depth", await self.backend.depth(workflow_type), workflow_type=workflow_type)
+
+    async def _count_active_jobs(self, user_id: int) -> int:
+        """
+        统计用户排队中和执行中的任务数（基于运行记录，跨进程有效）
+        Count the user's queued and running jobs (from run records, so it holds across processes)
+        """
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(func.count()).select_from(WorkflowRun).where(
+                    WorkflowRun.user_id == user_id,
+                    WorkflowRun.status.in_([WorkflowRunStatus.PENDING.value, WorkflowRunStatus.RUNNING.value])
+                )
+            )
+            return result.scalar_one()
+
+    async def _get_run_status(self, run_id: str) -> Optional[str]:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(WorkflowRun.status).where(WorkflowRun.id == run_id))
+            return result.scalar_one_or_none()
+
+    async def _recover_jobs(self) -> int:
+        """
+        进程内后端重启后，将待执行和已中断的运行重新入队（无用户等待，按批处理优先级执行）；
+        多个进程可能入队同一运行，执行前的认领保证只执行一次
+        After an in-process backend restart, re-enqueue pending and interrupted runs (nobody is waiting, so they run at
+        batch priority); several processes may enqueue the same run, and the claim before execution runs it only once
+        """
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(WorkflowRun)
+                .where(WorkflowRun.status.in_([WorkflowRunStatus.PENDING.value, WorkflowRunStatus.INTERRUPTED.value]))
+                .order_by(WorkflowRun.created_at)
+            )
+            runs = list(result.scalars())
+
+        recovered = 0
+        for run in runs:
+            if run.workflow_type not in self.workers_per_type:
+                continue
+            await self.backend.enqueue(WorkflowJob(
+                job_id=run.id,
+                workflow_type=run.workflow_type,
+                user_id=run.user_id,
+                session_id=run.session_id,
+                user_input=run.user_input or {},
+                priority=LLMPriority.BATCH
+            ))
+            recovered += 1
+        return recovered
+
+
+def create_workflow_queue_backend() -> WorkflowQueueBackend:
+    """
+    按配置创建队列后端，Redis不可用时回退到进程内后端
+    Create the configured queue backend, falling back to the in-process backend when Redis is unavailable
+    """
+    if settings.WORKFLOW_QUEUE_BACKEND == "redis":
+        if settings.REDIS_URL and redis_asyncio is not None:
+            return RedisStreamQueueBackend(
+                redis_asyncio.from_url(settings.REDIS_URL),
+                stream_prefix=settings.WORKFLOW_QUEUE_STREAM_PREFIX
+            )
+        logger.warning("Redis不可用，工作流队列使用进程内后端 / Redis unavailable, workflow queue uses the in-process backend")
+    return InProcessQueueBackend()
@@ -0,0 +1,74 @@
+"""
+pytest公共配置 - 测试使用临时目录中的SQLite数据库、本地检索索引和嵌入缓存
+Shared pytest configuration - tests use a SQLite database, local search index and embedding cache in a temporary directory
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+# 必须在导入 app 之前设置 / Must be set before app is imported
+_test_dir = tempfile.mkdtemp(prefix="jobcatcher-tests-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_test_dir}/test.db"
+os.environ["LOCAL_SEARCH_INDEX_DIR"] = os.path.join(_test_dir, "search_index")
+os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(_test_dir, "embedding_cache.db")
+os.environ.setdefault("ENVIRONMENT", "test")
+
+
+def _reset_singletons() -> None:
+    """
+    重置进程内索引和缓存，使每个测试从空状态开始
+    Reset in-process indexes and caches so every test starts empty
+    """
+    from app.services import bm25_index, job_dedup, search_result_cache
+
+    bm25_index.bm25_index = None
+    job_dedup.job_dedup_index = None
+    search_result_cache.search_result_cache = None
+
+
+@pytest.fixture
+def run():
+    """
+    在新事件循环中执行协程，结束时释放数据库连接（连接不能跨事件循环复用）
+    Run a coroutine on a fresh event loop, disposing database connections afterwards (they cannot cross event loops)
+    """
+    from app.core.database import engine
+
+    def _run(coroutine):
+        async def _main():
+            try:
+                return await coroutine
+            finally:
+                await engine.dispose()
+        return asyncio.run(_main())
+
+    return _run
+
+
+@pytest.fixture
+def database(run):
+    """
+    重建所有表的空数据库
+    An empty database with every table recreated
+    """
+    from app.core.database import Base, engine, init_db
+
+    async def _reset():
+        await init_db()
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+
+    _reset_singletons()
+    run(_reset())
+    yield
+    _reset_singletons()
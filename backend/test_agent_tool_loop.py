@@ -0,0 +1,155 @@
+"""
+Agent工具调用循环测试 - 多轮工具调用、同轮并发执行、最终回答取最后一轮文本
+Agent tool loop tests - multi-round tool calls, concurrent execution within a round, and the final answer taken from
+the last round's text
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from typing import List
+
+from anthropic.types import Message
+from langchain_core.messages import HumanMessage
+from langchain_core.tools import StructuredTool
+
+from app.agents.base import BaseAgent
+
+
+def _message(*blocks: dict) -> Message:
+    return Message.model_validate({
+        "id": "msg_test",
+        "type": "message",
+        "role": "assistant",
+        "model": "claude-sonnet-4-20250514",
+        "content": list(blocks),
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {"input_tokens": 10, "output_tokens": 5},
+    })
+
+
+def _text(text: str) -> dict:
+    return {"type": "text", "text": text}
+
+
+def _tool_use(tool_id: str, city: str) -> dict:
+    return {"type": "tool_use", "id": tool_id, "name": "lookup_city", "input": {"city": city}}
+
+
+class _Gateway:
+    def __init__(self, responses: List[Message]):
+        self.responses = responses
+        self.requests = []
+
+    async def create_message(self, call_site, **kwargs):
+        self.requests.append(kwargs)
+        return self.responses[len(self.requests) - 1]
+
+
+class _FakeStream:
+    """
+    按消息内容块产出SDK风格的流事件 / Yields SDK-style stream events from a message's content blocks
+    """
+
+    def __init__(self, message: Message):
+        self.message = message
+
+    async def __aiter__(self):
+        for block in self.message.content:
+            if block.type == "text":
+                for word in block.text.split(" "):
+                    await asyncio.sleep(0)
+                    yield SimpleNamespace(type="text", text=word + " ")
+            else:
+                yield SimpleNamespace(type="content_block_start", content_block=block)
+
+    async def get_final_message(self) -> Message:
+        return self.message
+
+
+class _StreamingGateway(_Gateway):
+    @asynccontextmanager
+    async def stream_message(self, call_site, **kwargs):
+        self.requests.append(kwargs)
+        yield _FakeStream(self.responses[len(self.requests) - 1])
+
+
+class _CityAgent(BaseAgent):
+    def __init__(self):
+        super().__init__("city_agent", "Looks up cities")
+        self.active = 0
+        self.max_active = 0
+
+    def _setup_tools(self) -> None:
+        async def lookup_city(city: str) -> str:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            await asyncio.sleep(0.01)
+            self.active -= 1
+            return f"{city}: 12 open roles"
+
+        self.tools = [StructuredTool.from_function(
+            coroutine=lookup_city, name="lookup_city", description="Count open roles in a city"
+        )]
+
+    def get_system_prompt(self) -> str:
+        return "You look up cities."
+
+
+def test_last_response_is_the_final_rounds_text():
+    """
+    工具调用前的"我来查一下"不是最终回答；同一轮的两个工具并发执行，结果回传给模型
+    The "let me check" text before the tool calls is not the final answer; the round's two tools run concurrently and
+    their results are sent back to the model
+    """
+    agent = _CityAgent()
+    agent.llm_gateway = _Gateway([_message(_text("Berlin and Munich each have 12 open roles."))])
+    first = _message(_text("Let me check both cities."), _tool_use("t1", "Berlin"), _tool_use("t2", "Munich"))
+    state = {"messages": [HumanMessage(content="Compare Berlin and Munich")]}
+
+    result = asyncio.run(agent._process_response(first, state))
+
+    assert result["last_response"] == "Berlin and Munich each have 12 open roles."
+    assert result["tool_results"] == ["Berlin: 12 open roles", "Munich: 12 open roles"]
+    assert agent.max_active == 2
+    tool_results = agent.llm_gateway.requests[-1]["messages"][-1]["content"]
+    assert [block["tool_use_id"] for block in tool_results] == ["t1", "t2"]
+
+
+def test_invoke_stream_events_and_final_text():
+    """
+    流式路径：文本增量、工具开始、工具结果按顺序推送，message_complete 与非流式路径一样只含最后一轮文本
+    Streaming path: text deltas, tool starts and tool results arrive in order, and message_complete carries only the
+    last round's text, as in the non-streaming path
+    """
+    agent = _CityAgent()
+    agent.llm_gateway = _StreamingGateway([
+        _message(_text("Let me check."), _tool_use("t1", "Berlin"), _tool_use("t2", "Munich")),
+        _message(_text("Both have 12 roles.")),
+    ])
+    state = {"messages": [HumanMessage(content="Compare Berlin and Munich")]}
+
+    async def collect():
+        return [event async for event in agent.invoke_stream(state)]
+
+    events = asyncio.run(collect())
+    types = [event["type"] for event in events]
+    assert types == [
+        "agent_stream_start",
+        "text_delta", "text_delta", "text_delta", "tool_use_start", "tool_use_start",
+        "tool_result", "tool_result",
+        "text_delta", "text_delta", "text_delta", "text_delta",
+        "message_complete",
+    ]
+    assert [event["tool_use_id"] for event in events if event["type"] == "tool_result"] == ["t1", "t2"]
+    assert "".join(event["text"] for event in events if event["type"] == "text_delta").startswith("Let me check. ")
+
+    complete = events[-1]
+    assert complete["content"] == "Both have 12 roles. "
+    assert complete["state"]["last_response"] == complete["content"]
+    assert complete["state"]["messages"][-1].content == complete["content"]
+    assert [call["round"] for call in complete["tool_calls"]] == [1, 1]
+    assert complete["usage"]["input_tokens"] == 20
+    # 第二轮请求带上工具结果 / The second round's request carries the tool results
+    assert agent.llm_gateway.requests[1]["messages"][-1]["content"][0]["tool_use_id"] == "t1"
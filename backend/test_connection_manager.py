@@ -0,0 +1,128 @@
+"""
+WebSocket连接管理测试 - 多连接分发、慢连接断开、心跳超时、断开时取消进行中的消息处理
+WebSocket connection manager tests - fan-out to many sockets, slow consumer disconnects, heartbeat timeouts and
+cancelling in-flight message handling on disconnect
+"""
+
+import asyncio
+import json
+from typing import List, Optional
+
+from app.services.connection_manager import (
+    HEARTBEAT_TIMEOUT_CLOSE_CODE,
+    SLOW_CONSUMER_CLOSE_CODE,
+    ConnectionManager,
+    InMemoryPubSub,
+)
+
+
+class _FakeWebSocket:
+    """
+    记录发送的消息和关闭码；stuck 时发送永远不完成
+    Records sent frames and the close code; sends never finish when stuck
+    """
+
+    def __init__(self, stuck: bool = False):
+        self.stuck = stuck
+        self.sent: List[dict] = []
+        self.close_code: Optional[int] = None
+
+    async def accept(self) -> None:
+        return None
+
+    async def send_text(self, payload: str) -> None:
+        if self.stuck:
+            await asyncio.sleep(3600)
+        self.sent.append(json.loads(payload))
+
+    async def close(self, code: int) -> None:
+        self.close_code = code
+
+
+def _manager(**options) -> ConnectionManager:
+    return ConnectionManager(pubsub=InMemoryPubSub(), **options)
+
+
+def test_frames_reach_every_socket_of_the_user():
+    async def scenario():
+        manager = _manager()
+        tabs = [_FakeWebSocket(), _FakeWebSocket()]
+        other = _FakeWebSocket()
+        for websocket in tabs:
+            await manager.connect(websocket, "1")
+        await manager.connect(other, "2")
+
+        await manager.send_personal_message({"type": "workflow_queued", "job_id": "a"}, "1")
+        await manager.send_personal_message({"type": "workflow_queued", "job_id": "b"}, 2)
+        await asyncio.sleep(0.01)
+
+        # 关闭一个标签页后另一个仍然收到消息 / After one tab closes the other still receives frames
+        await manager.disconnect(next(iter(manager.active_connections["1"].values())))
+        await manager.send_personal_message({"type": "workflow_completed", "job_id": "a"}, "1")
+        await asyncio.sleep(0.01)
+        await manager.stop()
+        return tabs, other
+
+    tabs, other = asyncio.run(scenario())
+    assert [frame["job_id"] for frame in tabs[0].sent] == ["a"]
+    assert [frame["job_id"] for frame in tabs[1].sent] == ["a", "a"]
+    assert [frame["job_id"] for frame in other.sent] == ["b"]
+
+
+def test_slow_consumer_is_closed_without_blocking_other_sockets():
+    async def scenario():
+        manager = _manager(send_queue_size=2, slow_consumer_max_drops=3)
+        slow, fast = _FakeWebSocket(stuck=True), _FakeWebSocket()
+        await manager.connect(slow, "1")
+        await manager.connect(fast, "1")
+
+        for index in range(10):
+            await manager.send_personal_message({"type": "text_delta", "index": index}, "1")
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.01)
+        remaining = list(manager.active_connections["1"].values())
+        await manager.stop()
+        return slow, fast, remaining
+
+    slow, fast, remaining = asyncio.run(scenario())
+    assert slow.close_code == SLOW_CONSUMER_CLOSE_CODE
+    assert [connection.websocket for connection in remaining] == [fast]
+    assert [frame["index"] for frame in fast.sent] == list(range(10))
+
+
+def test_sockets_without_client_frames_time_out_even_while_sends_succeed():
+    async def scenario():
+        manager = _manager(heartbeat_interval=0.02, heartbeat_timeout=0.1)
+        silent, responsive = _FakeWebSocket(), _FakeWebSocket()
+        await manager.connect(silent, "1")
+        connection = await manager.connect(responsive, "1")
+
+        for _ in range(15):
+            await asyncio.sleep(0.02)
+            # 客户端回复pong / The client answers with a pong
+            connection.mark_alive()
+        remaining = list(manager.active_connections["1"].values())
+        await manager.stop()
+        return silent, responsive, remaining
+
+    silent, responsive, remaining = asyncio.run(scenario())
+    assert silent.close_code == HEARTBEAT_TIMEOUT_CLOSE_CODE
+    # 收到的ping说明发送一直成功 / The pings it received show sends kept succeeding
+    assert any(frame["type"] == "ping" for frame in silent.sent)
+    assert [connection.websocket for connection in remaining] == [responsive]
+
+
+def test_disconnect_cancels_in_flight_message_handling():
+    async def scenario():
+        manager = _manager()
+        connection = await manager.connect(_FakeWebSocket(), "1")
+        handler = asyncio.create_task(asyncio.sleep(3600))
+        connection.track(handler)
+        await manager.disconnect(connection)
+        await asyncio.gather(handler, return_exceptions=True)
+        await manager.stop()
+        return handler, connection
+
+    handler, connection = asyncio.run(scenario())
+    assert handler.cancelled()
+    assert not connection.tasks
@@ -0,0 +1,202 @@
+"""
+Agent协调器测试 - 综合工作流DAG的并行与合并、从检查点恢复中断的运行、租约持有期间拒绝重复认领、取消
+Agent coordinator tests - parallel branches and merging in the comprehensive DAG, resuming interrupted runs from
+checkpoints, refusing a second claim while the lease is held, and cancellation
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from langchain_core.messages import AIMessage
+from sqlalchemy import select, update
+
+from app.agents.coordinator import WORKFLOW_DEPENDENCIES, AgentCoordinator, WorkflowType
+from app.core.database import AsyncSessionLocal
+from app.models.workflow import WorkflowRun, WorkflowRunStatus
+from app.services.workflow_leases import claim_workflow_run, expire_stale_runs
+
+
+class _StubAgent:
+    """
+    替换Agent.invoke：记录调用，可选地阻塞到放行
+    Stands in for Agent.invoke: records calls and optionally blocks until released
+    """
+
+    def __init__(self, name: str, release: Optional[asyncio.Event] = None):
+        self.name = name
+        self.release = release
+        self.tasks: List[str] = []
+        self.started = asyncio.Event()
+
+    async def __call__(self, state: Dict) -> Dict:
+        self.tasks.append(state["messages"][-1].content)
+        self.started.set()
+        if self.release is not None:
+            await self.release.wait()
+        response = f"{self.name} done"
+        return {"messages": state["messages"] + [AIMessage(content=response)], "last_response": response}
+
+
+def _coordinator(blocked: tuple = (), release: Optional[asyncio.Event] = None):
+    coordinator = AgentCoordinator()
+    stubs = {}
+    for agent_name, agent in coordinator.agents.items():
+        stubs[agent_name] = _StubAgent(agent_name, release if agent_name in blocked else None)
+        agent.invoke = stubs[agent_name]
+    return coordinator, stubs
+
+
+async def _runs() -> Dict[str, WorkflowRun]:
+    async with AsyncSessionLocal() as db:
+        return {run.id: run for run in (await db.execute(select(WorkflowRun))).scalars()}
+
+
+_INPUT = {"user_message": "Python jobs in Berlin"}
+
+
+def test_critic_and_heatmap_run_concurrently_and_rewrite_waits_for_both(database, run):
+    async def scenario():
+        coordinator, stubs = _coordinator()
+        events: List[str] = []
+        both_started = asyncio.Barrier(2)
+
+        def parallel_branch(agent_name: str, field: str):
+            async def invoke(state: Dict) -> Dict:
+                events.append(f"{agent_name} started")
+                # 两个分支都开始后才能继续，串行执行会在这里超时
+                # Neither branch proceeds until both have started; running them one after another times out here
+                await asyncio.wait_for(both_started.wait(), timeout=5)
+                events.append(f"{agent_name} finished")
+                return {
+                    "messages": state["messages"] + [AIMessage(content=f"{agent_name} done")],
+                    "last_response": f"{agent_name} done",
+                    field: {"from": agent_name}
+                }
+            return invoke
+
+        coordinator.agents["resume_critic_agent"].invoke = parallel_branch("resume_critic_agent", "current_resume_data")
+        coordinator.agents["skill_heatmap_agent"].invoke = parallel_branch("skill_heatmap_agent", "skill_analysis")
+        rewrite = stubs["resume_rewrite_agent"]
+
+        async def invoke_rewrite(state: Dict) -> Dict:
+            events.append("resume_rewrite_agent started")
+            return await rewrite(state)
+
+        coordinator.agents["resume_rewrite_agent"].invoke = invoke_rewrite
+        result = await coordinator.execute_workflow(WorkflowType.COMPREHENSIVE, _INPUT, 1, "session")
+        return result, events, rewrite
+
+    result, events, rewrite = run(scenario())
+    assert result["success"]
+    assert events.index("resume_critic_agent started") < events.index("skill_heatmap_agent finished")
+    assert events.index("skill_heatmap_agent started") < events.index("resume_critic_agent finished")
+    assert events[-1] == "resume_rewrite_agent started"
+    # 改写任务带上两个上游的结果 / The rewrite task carries both upstream results
+    assert "resume_critic_agent done" in rewrite.tasks[0] and "skill_heatmap_agent done" in rewrite.tasks[0]
+
+    # reducer合并两个并行分支的输出 / The reducers merge the outputs of both parallel branches
+    final_state = result["final_state"]
+    assert sorted(final_state["completed_agents"]) == sorted(WORKFLOW_DEPENDENCIES[WorkflowType.COMPREHENSIVE])
+    assert set(final_state["agent_results"]) == set(WORKFLOW_DEPENDENCIES[WorkflowType.COMPREHENSIVE])
+    assert final_state["current_resume_data"] == {"from": "resume_critic_agent"}
+    assert final_state["skill_analysis"] == {"from": "skill_heatmap_agent"}
+    assert final_state["error_count"] == 0
+    responses = [message.content for message in final_state["messages"] if isinstance(message, AIMessage)]
+    assert sorted(responses) == sorted(f"{agent_name} done" for agent_name in WORKFLOW_DEPENDENCIES[WorkflowType.COMPREHENSIVE])
+
+
+def test_interrupted_run_resumes_from_its_checkpoint(database, run):
+    async def scenario():
+        release = asyncio.Event()
+        coordinator, stubs = _coordinator(blocked=("resume_critic_agent",), release=release)
+
+        # 模拟进程在简历分析期间退出 / Simulate the process dying during the resume critique
+        first = asyncio.create_task(coordinator.execute_workflow(WorkflowType.COMPREHENSIVE, _INPUT, 1, "session"))
+        await stubs["resume_critic_agent"].started.wait()
+        first.cancel()
+        await asyncio.gather(first, return_exceptions=True)
+        interrupted = await _runs()
+
+        release.set()
+        resumed = await coordinator.execute_workflow(WorkflowType.COMPREHENSIVE, _INPUT, 1, "session")
+        # 输入不同的请求开始新运行 / A request with different input starts a new run
+        other = await coordinator.execute_workflow(WorkflowType.COMPREHENSIVE, {"user_message": "Go jobs"}, 1, "session")
+        return interrupted, resumed, other, stubs, await _runs()
+
+    interrupted, resumed, other, stubs, runs = run(scenario())
+    (run_id, interrupted_run), = interrupted.items()
+    assert interrupted_run.status == WorkflowRunStatus.INTERRUPTED.value and interrupted_run.owner_id is None
+
+    assert resumed["success"] and resumed["run_id"] == run_id
+    assert sorted(resumed["final_state"]["completed_agents"]) == sorted(stubs)
+    # 职位搜索已经完成，恢复时不会重跑（第二次调用来自输入不同的新运行）
+    # The job search already finished and is not rerun on resume (the second call is the new run with different input)
+    assert len(stubs["job_search_agent"].tasks) == 2
+    assert len(stubs["resume_critic_agent"].tasks) == 3
+    assert other["run_id"] != run_id
+    assert runs[run_id].status == WorkflowRunStatus.COMPLETED.value
+
+
+def test_a_run_under_another_process_lease_is_not_executed_until_the_lease_expires(database, run):
+    async def scenario():
+        coordinator, stubs = _coordinator()
+        async with AsyncSessionLocal() as db:
+            db.add(WorkflowRun(
+                id="leased",
+                user_id=1,
+                session_id="session",
+                workflow_type=WorkflowType.JOB_SEARCH.value,
+                status=WorkflowRunStatus.PENDING,
+                user_input=_INPUT
+            ))
+            await db.commit()
+        assert await claim_workflow_run("leased", owner_id="other-process")
+        assert not await claim_workflow_run("leased")
+
+        refused = await coordinator.resume_workflow("leased")
+        assert await expire_stale_runs() == 0
+
+        # 持有进程停止续约 / The owning process stops renewing
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(WorkflowRun)
+                .where(WorkflowRun.id == "leased")
+                .values(lease_expires_at=datetime.now(timezone.utc) - timedelta(seconds=1))
+            )
+            await db.commit()
+        assert await expire_stale_runs() == 1
+        resumed = await coordinator.resume_workflow("leased")
+        return refused, resumed, stubs, await _runs()
+
+    refused, resumed, stubs, runs = run(scenario())
+    assert not refused["success"] and refused["run_id"] == "leased"
+    assert resumed["success"]
+    assert len(stubs["job_search_agent"].tasks) == 1
+    assert runs["leased"].status == WorkflowRunStatus.COMPLETED.value
+    assert runs["leased"].owner_id is None
+
+
+def test_cancel_stops_the_running_workflow_and_is_not_resumed(database, run):
+    async def scenario():
+        coordinator, stubs = _coordinator(blocked=("job_search_agent",), release=asyncio.Event())
+        task = asyncio.create_task(coordinator.execute_workflow(WorkflowType.COMPREHENSIVE, _INPUT, 1, "session"))
+        await stubs["job_search_agent"].started.wait()
+
+        cancelled = await coordinator.cancel_workflow("session")
+        result = await task
+        nothing_left = await coordinator.cancel_workflow("session")
+
+        stubs["job_search_agent"].release = None
+        rerun = await coordinator.execute_workflow(WorkflowType.COMPREHENSIVE, _INPUT, 1, "session")
+        return cancelled, result, nothing_left, rerun, stubs, await _runs()
+
+    cancelled, result, nothing_left, rerun, stubs, runs = run(scenario())
+    assert cancelled["success"] and cancelled["cancelled_runs"] == [result["run_id"]]
+    assert not result["success"]
+    assert runs[result["run_id"]].status == WorkflowRunStatus.CANCELLED.value
+    assert not nothing_left["success"]
+    # 已取消的运行不会被恢复，相同的请求开始新运行 / A cancelled run is never resumed; the same request starts a new run
+    assert rerun["success"] and rerun["run_id"] != result["run_id"]
+    # 取消后的运行没有进入下游Agent / The cancelled run never reached the downstream agents
+    assert len(stubs["resume_critic_agent"].tasks) == 1
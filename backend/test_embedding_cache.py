@@ -0,0 +1,103 @@
+"""
+嵌入向量缓存测试 - 未变化的文本不再调用嵌入API、批内去重、SQLite持久化、LRU淘汰、单飞
+Embedding cache tests - unchanged texts skip the embedding API, in-batch dedup, SQLite persistence, LRU eviction and
+single-flight
+"""
+
+import asyncio
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from app.services.embedding_cache import (
+    CachedEmbeddings,
+    EmbeddingCache,
+    SingleFlightEmbeddings,
+    embedding_cache_key,
+)
+
+
+class _CountingEmbeddings(Embeddings):
+    """
+    记录每次调用嵌入的文本 / Records the texts of every embedding call
+    """
+
+    def __init__(self):
+        self.calls: List[List[str]] = []
+
+    @staticmethod
+    def _vector(text: str) -> List[float]:
+        return [float(len(text)), float(sum(map(ord, text)) % 97), 0.5]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls.append(list(texts))
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self.calls.append([text])
+        return self._vector(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        await asyncio.sleep(0.01)
+        return self.embed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        await asyncio.sleep(0.01)
+        return self.embed_query(text)
+
+
+def _embeddings(tmp_path, max_entries: int = 100):
+    underlying = _CountingEmbeddings()
+    cache = EmbeddingCache(str(tmp_path / "embeddings.db"), max_entries=max_entries)
+    return underlying, CachedEmbeddings(underlying, "text-embedding-3-small", cache)
+
+
+def test_only_new_texts_reach_the_embedding_api(tmp_path):
+    underlying, embeddings = _embeddings(tmp_path)
+
+    async def scenario():
+        first = await embeddings.aembed_documents(["Python Developer", "Go Engineer", "Python Developer"])
+        second = await embeddings.aembed_documents(["Go  Engineer", "Rust Engineer", "Python Developer "])
+        query = await embeddings.aembed_query("Rust Engineer")
+        return first, second, query
+
+    first, second, query = asyncio.run(scenario())
+    assert underlying.calls == [["Python Developer", "Go Engineer"], ["Rust Engineer"]]
+    assert first[0] == first[2] == second[2]
+    assert query == second[1]
+    assert np.asarray(query, dtype=np.float32).tolist() == query
+
+
+def test_vectors_survive_a_restart_and_keys_depend_on_the_model(tmp_path):
+    underlying, embeddings = _embeddings(tmp_path)
+    vector = embeddings.embed_query("Python Developer")
+    embeddings.cache._db.close()
+
+    reopened_underlying, reopened = _embeddings(tmp_path)
+    assert reopened.embed_documents(["Python Developer"]) == [vector]
+    assert reopened_underlying.calls == []
+    assert embedding_cache_key("model-a", "Python") != embedding_cache_key("model-b", "Python")
+
+
+def test_lru_evicts_oldest_entries_and_falls_back_to_sqlite(tmp_path):
+    underlying, embeddings = _embeddings(tmp_path, max_entries=2)
+    embeddings.embed_documents(["a", "b", "c"])
+    keys = [embedding_cache_key("text-embedding-3-small", text) for text in "abc"]
+    assert list(embeddings.cache._entries) == keys[1:]
+
+    assert embeddings.embed_query("a") == [1.0, 0.0, 0.5]
+    assert len(underlying.calls) == 1
+    assert list(embeddings.cache._entries) == [keys[2], keys[0]]
+
+
+def test_single_flight_embeddings_coalesce_identical_requests():
+    underlying = _CountingEmbeddings()
+    embeddings = SingleFlightEmbeddings(underlying, "text-embedding-3-small")
+
+    async def scenario():
+        return await asyncio.gather(*[embeddings.aembed_query("Python Developer") for _ in range(5)])
+
+    results = asyncio.run(scenario())
+    assert underlying.calls == [["Python Developer"]]
+    assert all(result == results[0] for result in results)
@@ -0,0 +1,186 @@
+"""
+过期文档清理测试 - 旧索引的 skip 分页退路、按键分页、失败计数与乱序完成时的 last_id
+Expired document purge tests - the skip-paging fallback for old indexes, keyset paging, failure counting and last_id
+when batches finish out of order
+"""
+
+import asyncio
+from typing import List, Optional
+
+from azure.search.documents.indexes.models import SearchIndex, SearchFieldDataType, SimpleField
+
+from app.core.config import settings
+from app.services import azure_search
+from app.services.azure_search import AzureSearchService
+from app.services.search_backends import AzureSearchBackend
+
+
+class _Results:
+    def __init__(self, documents):
+        self._documents = documents
+
+    def __aiter__(self):
+        async def iterate():
+            for document in self._documents:
+                yield document
+        return iterate()
+
+
+class _FakeSearchClient:
+    """
+    只支持清理用到的查询：expired 过滤、可选的 id 范围过滤与排序、top/skip
+    Supports only the queries the purge uses: the expired filter, optional id range filter and ordering, top/skip
+    """
+
+    def __init__(self, ids: List[str], keyset: bool):
+        self.expired = set(ids)
+        self.keyset = keyset
+        self.queries = []
+
+    async def search(self, search_text, filter, select, top, skip: int = 0, order_by: Optional[list] = None):
+        self.queries.append({"filter": filter, "skip": skip, "order_by": order_by})
+        if ("id gt" in filter or order_by) and not self.keyset:
+            raise RuntimeError("id is not filterable or sortable")
+        ids = sorted(self.expired, reverse=True)
+        if order_by:
+            ids.sort()
+        if " and id gt '" in filter:
+            after = filter.split(" and id gt '", 1)[1][:-1]
+            ids = [job_id for job_id in ids if job_id > after]
+        return _Results([{"id": job_id} for job_id in ids[skip:skip + top]])
+
+
+class _FakeIndexClient:
+    def __init__(self, keyset: bool):
+        self.index = SearchIndex(name="jobs", fields=[
+            SimpleField(name="id", type=SearchFieldDataType.String, key=True, filterable=keyset, sortable=keyset),
+        ])
+
+    async def get_index(self, name):
+        return self.index
+
+
+class _FakeBackend:
+    def __init__(self, backend: AzureSearchBackend):
+        self.backend = backend
+
+    async def list_expired_ids(self, after, limit):
+        return await self.backend.list_expired_ids(after, limit)
+
+    async def delete_documents(self, ids):
+        self.backend.search_client.expired.difference_update(ids)
+        return len(ids)
+
+
+def _azure_backend(monkeypatch, ids: List[str], keyset: bool) -> AzureSearchBackend:
+    monkeypatch.setattr(settings, "AZURE_SEARCH_ENDPOINT", "https://search.example.net")
+    monkeypatch.setattr(settings, "AZURE_SEARCH_KEY", "test-key")
+    backend = AzureSearchBackend()
+    backend.search_client = _FakeSearchClient(ids, keyset)
+    backend.index_client = _FakeIndexClient(keyset)
+    return backend
+
+
+async def _purge(backend: AzureSearchBackend):
+    service = AzureSearchService(backend=_FakeBackend(backend))
+    return await service.delete_expired_jobs()
+
+
+def test_old_index_without_sortable_id_falls_back_to_skip_paging(database, run, monkeypatch):
+    """
+    id 字段不可排序的已有索引仍能清理全部过期文档
+    An existing index whose id field is not sortable still has every expired document purged
+    """
+    ids = [f"job-{index:04d}" for index in range(2500)]
+    backend = _azure_backend(monkeypatch, ids, keyset=False)
+    monkeypatch.setattr(settings, "SEARCH_PURGE_PAGE_SIZE", 300)
+
+    async def scenario():
+        await backend.ensure_index()
+        return await _purge(backend)
+
+    report = run(scenario())
+    assert report.completed and report.listed == 2500 and report.failed == 0
+    assert not backend.search_client.expired
+    assert all(query["order_by"] is None for query in backend.search_client.queries)
+
+
+def test_keyset_paging_is_used_when_id_is_sortable(database, run, monkeypatch):
+    ids = [f"job-{index:04d}" for index in range(700)]
+    backend = _azure_backend(monkeypatch, ids, keyset=True)
+    monkeypatch.setattr(settings, "SEARCH_PURGE_PAGE_SIZE", 300)
+
+    report = run(_purge(backend))
+    assert report.completed and report.listed == 700
+    assert not backend.search_client.expired
+    assert all(query["skip"] == 0 for query in backend.search_client.queries)
+
+
+def test_failed_job_row_deletes_are_counted(database, run, monkeypatch):
+    """
+    jobs 表删除失败的批次计入 failed
+    Batches whose job rows fail to delete are counted in failed
+    """
+    backend = _azure_backend(monkeypatch, [f"job-{index}" for index in range(10)], keyset=True)
+
+    async def failing_delete_job_rows(job_ids):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(azure_search, "delete_job_rows", failing_delete_job_rows)
+    report = run(_purge(backend))
+    assert report.deleted == 10
+    assert report.failed == 10
+    assert report.rows_deleted == 0
+
+
+class _OutOfOrderBackend:
+    """
+    越早调度的批次越晚完成，可指定失败的文档
+    Batches scheduled earlier finish later, and chosen documents fail to delete
+    """
+
+    def __init__(self, ids: List[str], failing: str):
+        self.expired = sorted(ids)
+        self.failing = failing
+        self.listed_after: List[Optional[str]] = []
+
+    async def list_expired_ids(self, after, limit):
+        self.listed_after.append(after)
+        return [job_id for job_id in self.expired if after is None or job_id > after][:limit]
+
+    async def delete_documents(self, ids):
+        await asyncio.sleep(0.01 * (len(self.expired) - self.expired.index(ids[0])))
+        if self.failing in ids:
+            raise RuntimeError("HTTP 503")
+        self.expired = [job_id for job_id in self.expired if job_id not in ids]
+        return len(ids)
+
+
+def test_last_id_only_covers_the_contiguous_run_of_succeeded_batches(database, run, monkeypatch):
+    """
+    后面的批次先完成或前面的批次失败时，last_id 不会越过未完成或失败的批次
+    When later batches finish first or an earlier batch fails, last_id never moves past an unfinished or failed batch
+    """
+    monkeypatch.setattr(settings, "SEARCH_PURGE_PAGE_SIZE", 4)
+    monkeypatch.setattr(settings, "SEARCH_PURGE_BATCH_SIZE", 2)
+    monkeypatch.setattr(settings, "SEARCH_PURGE_MAX_CONCURRENCY", 5)
+    backend = _OutOfOrderBackend([f"job-{index:02d}" for index in range(10)], failing="job-04")
+    service = AzureSearchService(backend=backend)
+    progress: List[Optional[str]] = []
+
+    async def scenario():
+        report = await service.delete_expired_jobs(on_progress=lambda report: progress.append(report.last_id))
+        resumed = await service.delete_expired_jobs(start_after=report.last_id)
+        return report, resumed
+
+    report, resumed = run(scenario())
+    assert report.completed and (report.deleted, report.failed) == (8, 2)
+    assert report.last_id == "job-03"
+    # 进度中的 last_id 单调不减，且从未越过失败的批次 / last_id in progress reports never decreases or passes the failed batch
+    assert progress[0] is None
+    assert all(last_id is None or last_id <= "job-03" for last_id in progress)
+    assert [last_id for last_id in progress if last_id] == sorted(last_id for last_id in progress if last_id)
+
+    # 从 last_id 继续时失败的批次被重新列出 / Continuing from last_id lists the failed batch again
+    assert resumed.listed == 2 and resumed.failed == 2
+    assert backend.listed_after[-1] == "job-03"
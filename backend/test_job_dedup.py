@@ -0,0 +1,86 @@
+"""
+职位近似去重测试 - 标题规范化、批内去重、只在事务提交后登记
+Job near-duplicate detection tests - title canonicalization, in-batch dedup and registration only after commit
+"""
+
+import time
+
+import pytest
+from sqlalchemy import select
+
+from app.core.database import AsyncSessionLocal
+from app.models.job import Job
+from app.services import job_dedup
+from app.services.job_dedup import canonical_title, get_job_dedup_index
+from app.services.search_result_cache import get_search_result_cache
+from app.services.skill_trends import SkillDemandDelta
+
+
+def _job(job_id: str, company: str, title: str = "Python Developer (m/w/d)") -> dict:
+    return {
+        "id": job_id,
+        "title": title,
+        "company": company,
+        "location": "Berlin",
+        "description": "Build Python services with FastAPI, PostgreSQL and Docker for our data platform team",
+        "url": f"https://jobs.example/{job_id}",
+    }
+
+
+@pytest.mark.parametrize("title, expected", [
+    ("Python Developer (m/w/d)", "python developer"),
+    ("Entwickler [w/m/d] Berlin", "entwickler berlin"),
+    ("Entwickler m/w/d", "entwickler"),
+    ("Engineer (all genders)", "engineer"),
+    ("Backend/Frontend Developer", "backend frontend developer"),
+    ("Head of R&D/IT", "head of r d it"),
+    ("R&D/F&E Lead", "r d f e lead"),
+])
+def test_canonical_title_only_strips_gender_markers(title, expected):
+    assert canonical_title(title) == expected
+
+
+async def _persist(source: str, jobs: list) -> None:
+    await get_search_result_cache()._persist(f"{source}-key", source, "python", "Berlin", 10, jobs, time.time())
+
+
+async def _stored_ids() -> set:
+    async with AsyncSessionLocal() as session:
+        return set((await session.execute(select(Job.id))).scalars())
+
+
+def test_failed_persist_leaves_no_phantom_duplicates(database, run, monkeypatch):
+    """
+    写入失败时去重索引不变，之后其他来源的同一职位仍会入库
+    A failed write leaves the dedup index untouched, so the same job from another source is still stored afterwards
+    """
+    async def failing_apply(self, session):
+        raise RuntimeError("database unavailable")
+
+    async def scenario():
+        with monkeypatch.context() as patch:
+            patch.setattr(SkillDemandDelta, "apply", failing_apply)
+            with pytest.raises(RuntimeError):
+                await _persist("stepstone", [_job("stepstone-1", "Acme GmbH")])
+        index = await get_job_dedup_index()
+        assert "stepstone-1" not in index
+
+        await _persist("google_jobs", [_job("google-1", "Acme")])
+        assert "google-1" in index
+        return await _stored_ids()
+
+    assert run(scenario()) == {"google-1"}
+
+
+def test_duplicates_within_and_across_batches(database, run):
+    """
+    同一批次内和已入库的近似重复职位都不会重复写入
+    Near-duplicates inside one batch and of jobs already stored are not written again
+    """
+    async def scenario():
+        await _persist("stepstone", [_job("stepstone-1", "Acme GmbH"), _job("stepstone-2", "ACME AG")])
+        await _persist("google_jobs", [_job("google-1", "Acme"), _job("google-2", "Other Corp")])
+        return await _stored_ids()
+
+    assert run(scenario()) == {"stepstone-1", "google-2"}
+    assert job_dedup.job_dedup_index is not None and "stepstone-2" not in job_dedup.job_dedup_index
@@ -0,0 +1,119 @@
+"""
+职位链接检查测试 - 状态码分类、HEAD被拒时改用GET、过期写回与索引删除、近期检查过的职位跳过
+Job link check tests - status classification, GET when HEAD is refused, expiry write-back and index deletion, and
+skipping recently checked jobs
+"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+from sqlalchemy import select, update
+
+from app.core.database import AsyncSessionLocal
+from app.models.job import Job
+from app.services import job_expiry
+from app.services.job_dedup import get_job_dedup_index
+from app.services.job_expiry import HostLimiter, JobLinkChecker, LinkStatus, classify_status
+from app.services.search_result_cache import get_search_result_cache
+
+
+@pytest.mark.parametrize("status_code, expected", [
+    (200, LinkStatus.ALIVE),
+    (301, LinkStatus.ALIVE),
+    (404, LinkStatus.EXPIRED),
+    (410, LinkStatus.EXPIRED),
+    (400, LinkStatus.EXPIRED),
+    (403, LinkStatus.UNKNOWN),
+    (429, LinkStatus.UNKNOWN),
+    (503, LinkStatus.UNKNOWN),
+])
+def test_classify_status(status_code, expected):
+    assert classify_status(status_code) == expected
+
+
+@pytest.mark.parametrize("url", ["/jobs/123", "jobs.example/123", ""])
+def test_links_without_a_host_are_unknown(url):
+    """
+    相对链接或缺少协议的链接是数据问题，不会让职位过期
+    Relative or scheme-less links are bad data and never expire a job
+    """
+    checker = JobLinkChecker(client=httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(404))))
+    assert asyncio.run(checker.check_url(url, HostLimiter(interval=0))) == LinkStatus.UNKNOWN
+
+
+# 每个职位链接的 (HEAD状态码, GET状态码) / (HEAD status, GET status) per job link
+_RESPONSES = {
+    "/alive": (200, 200),
+    "/gone": (404, 404),
+    "/head-refused-gone": (405, 410),
+    "/throttled": (429, 429),
+}
+
+
+def _job(path: str) -> dict:
+    name = path.strip("/")
+    return {
+        "id": f"job-{name}",
+        "title": f"Python Developer {name}",
+        "company": f"Company {name}",
+        "location": "Berlin",
+        "description": f"Python role {name}",
+        "url": f"https://jobs.example{path}",
+    }
+
+
+class _FakeSearchService:
+    def __init__(self):
+        self.deleted = []
+
+    async def delete_jobs(self, job_ids):
+        self.deleted.extend(job_ids)
+        return len(job_ids)
+
+
+def test_link_check_expires_dead_links_and_skips_recent_checks(database, run, monkeypatch):
+    requests = []
+
+    def respond(request: httpx.Request) -> httpx.Response:
+        requests.append((request.method, request.url.path))
+        head_status, get_status = _RESPONSES[request.url.path]
+        return httpx.Response(head_status if request.method == "HEAD" else get_status)
+
+    search_service = _FakeSearchService()
+
+    async def get_search_service():
+        return search_service
+
+    monkeypatch.setattr(job_expiry, "get_search_service", get_search_service)
+    client = httpx.AsyncClient(transport=httpx.MockTransport(respond))
+    checker = JobLinkChecker(client=client, max_concurrency=4, host_interval=0)
+
+    async def scenario():
+        jobs = [_job(path) for path in _RESPONSES]
+        await get_search_result_cache()._persist("key", "stepstone", "python", "Berlin", 10, jobs, time.time())
+        # 写入时视为刚见过；模拟很久之前入库的职位 / A write counts as a fresh sighting; simulate jobs stored long ago
+        async with AsyncSessionLocal() as session:
+            await session.execute(update(Job).values(last_checked_at=None))
+            await session.commit()
+        index = await get_job_dedup_index()
+        report = await checker.run()
+        rerun = await checker.run()
+        async with AsyncSessionLocal() as session:
+            rows = {row.id: row for row in (await session.execute(select(Job))).scalars()}
+        return report, rerun, rows, index
+
+    report, rerun, rows, index = run(scenario())
+    assert (report.checked, report.alive, report.expired, report.unknown) == (4, 1, 2, 1)
+    assert ("GET", "/head-refused-gone") in requests and ("GET", "/gone") not in requests
+    assert sorted(search_service.deleted) == ["job-gone", "job-head-refused-gone"]
+    assert report.index_deleted == 2
+
+    assert rows["job-gone"].is_expired and rows["job-head-refused-gone"].is_expired
+    assert not rows["job-alive"].is_expired and rows["job-alive"].last_checked_at is not None
+    assert rows["job-throttled"].last_checked_at is None
+    assert "job-gone" not in index and "job-alive" in index
+
+    # 只有无法判断的职位再次检查 / Only the inconclusive job is checked again
+    assert (rerun.checked, rerun.unknown) == (1, 1)
@@ -0,0 +1,161 @@
+"""
+定时职位抓取测试 - 增量写库、检查点发布时间截断、单个组合失败不影响其他组合、调度器进程锁
+Scheduled job ingestion tests - incremental upserts, the checkpoint posting time cutoff, one failing combination not
+affecting the others, and the scheduler process lock
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import delete, select
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.job import Job
+from app.services import job_ingestion, scheduler
+from app.services.job_ingestion import JobIngestionPipeline
+from app.services.scheduler import JobScheduler
+
+
+def _job(job_id: str, title: str, posted_days_ago: int) -> dict:
+    posted_at = datetime.now(timezone.utc) - timedelta(days=posted_days_ago)
+    return {
+        "id": job_id,
+        "title": title,
+        "company": f"Company {job_id}",
+        "location": "Berlin",
+        "description": f"{title} working with Python and Docker",
+        "url": f"https://jobs.example/{job_id}",
+        "posted_date": posted_at.isoformat(),
+    }
+
+
+class _Fetcher:
+    def __init__(self, jobs: list):
+        self.jobs = jobs
+        self.calls = 0
+
+    async def __call__(self, query: str, location: str, limit: int) -> list:
+        self.calls += 1
+        return list(self.jobs)
+
+
+class _FakeSearchService:
+    def __init__(self):
+        self.documents = []
+
+    async def bulk_index_jobs(self, documents):
+        self.documents.extend(documents)
+        return type("Indexing", (), {"succeeded": len(documents), "failed_ids": []})()
+
+
+def _pipeline(monkeypatch, fetchers: dict, locations=("Berlin",)) -> JobIngestionPipeline:
+    search_service = _FakeSearchService()
+
+    async def get_search_service():
+        return search_service
+
+    monkeypatch.setattr(job_ingestion, "get_search_service", get_search_service)
+    return JobIngestionPipeline(
+        queries=["python"], locations=list(locations), sources=list(fetchers), fetchers=fetchers,
+        posted_overlap_seconds=2 * 86400
+    )
+
+
+async def _stored_ids() -> set:
+    async with AsyncSessionLocal() as session:
+        return set((await session.execute(select(Job.id))).scalars())
+
+
+def test_reruns_only_write_changes_and_cut_off_old_unstored_jobs(database, run, monkeypatch):
+    """
+    再次运行只写入变化；早于检查点发布时间（减去重叠窗口）且已被清理的职位不会重新写入，force 时仍写入
+    A rerun only writes changes; a purged job posted before the checkpoint cutoff (minus the overlap) is not written
+    again unless forced
+    """
+    fetcher = _Fetcher([_job("old-1", "Python Developer", 10), _job("new-1", "Data Engineer", 1)])
+    pipeline = _pipeline(monkeypatch, {"stepstone": fetcher})
+
+    async def scenario():
+        first = await pipeline.run()
+        assert (first.new, first.indexed) == (2, 2)
+
+        unchanged = await pipeline.run(force=True)
+        assert (unchanged.new, unchanged.updated, unchanged.skipped) == (0, 0, 2)
+
+        # 过期清理删除了旧职位 / The expiry purge deleted the old job
+        async with AsyncSessionLocal() as session:
+            await session.execute(delete(Job).where(Job.id == "old-1"))
+            await session.commit()
+        fetcher.jobs.append(_job("new-2", "Backend Engineer", 0))
+        pipeline.interval_seconds = 0
+        cut_off = await pipeline.run()
+        assert (cut_off.new, cut_off.stale, cut_off.skipped) == (1, 1, 1)
+        assert await _stored_ids() == {"new-1", "new-2"}
+
+        forced = await pipeline.run(force=True)
+        assert (forced.new, forced.stale) == (1, 0)
+        return await _stored_ids()
+
+    assert run(scenario()) == {"old-1", "new-1", "new-2"}
+
+
+def test_failing_combination_does_not_abort_the_run(database, run, monkeypatch):
+    """
+    某个组合的检查点读取失败时只有该组合失败，其他组合照常写入
+    When reading one combination's checkpoint fails only that combination fails and the others are still written
+    """
+    pipeline = _pipeline(
+        monkeypatch, {"stepstone": _Fetcher([_job("py-1", "Python Developer", 1)])}, locations=("Berlin", "Munich")
+    )
+    munich_key = job_ingestion.checkpoint_key("stepstone", "python", "Munich")
+    session_factory = job_ingestion.AsyncSessionLocal
+
+    class _FailingSession:
+        def __init__(self):
+            self.session = session_factory()
+
+        async def __aenter__(self):
+            session = await self.session.__aenter__()
+            get = session.get
+
+            async def failing_get(model, key, *args, **kwargs):
+                if key == munich_key:
+                    raise RuntimeError("database unavailable")
+                return await get(model, key, *args, **kwargs)
+
+            session.get = failing_get
+            return session
+
+        async def __aexit__(self, *exc_info):
+            return await self.session.__aexit__(*exc_info)
+
+    monkeypatch.setattr(job_ingestion, "AsyncSessionLocal", _FailingSession)
+    report = run(pipeline.run())
+    statuses = {unit.location: unit.status for unit in report.units}
+    assert statuses == {"Berlin": "success", "Munich": "failed"}
+    assert report.failed_units == 1 and report.new == 1
+
+
+@pytest.mark.skipif(scheduler.fcntl is None, reason="no fcntl on this platform")
+def test_only_one_worker_per_host_starts_the_scheduler(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_SCHEDULER_ENABLED", True)
+    monkeypatch.setattr(settings, "INGESTION_QUERIES", [])
+    lock_path = str(tmp_path / "scheduler.lock")
+    first, second = JobScheduler(lock_path), JobScheduler(lock_path)
+
+    async def scenario():
+        first.start()
+        second.start()
+        assert first.started and not second.started
+        await first.stop()
+        second.start()
+        assert second.started
+        await second.stop()
+
+    asyncio.run(scenario())
+
+
+def test_scheduler_is_disabled_by_default():
+    assert type(settings).model_fields["JOB_SCHEDULER_ENABLED"].default is False
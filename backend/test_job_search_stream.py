@@ -0,0 +1,152 @@
+"""
+流式职位搜索测试 - 按数据源完成顺序产出批次、跨批次去重、source_error/complete 事件、NDJSON/SSE 协商与编码
+Streaming job search tests - batches in source completion order, cross-batch dedup, source_error/complete events, and
+NDJSON/SSE negotiation and encoding
+"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import jobs
+from app.api.auth import get_current_user
+from app.services.job_search_stream import (
+    NDJSON_MEDIA_TYPE,
+    SSE_MEDIA_TYPE,
+    encode_event_stream,
+    negotiate_stream_media_type,
+    stream_job_search,
+)
+
+
+def _job(job_id: str, company: str, title: str = "Python Developer (m/w/d)") -> dict:
+    return {
+        "id": job_id,
+        "title": title,
+        "company": company,
+        "location": "Berlin",
+        "description": f"Build Python services with FastAPI and PostgreSQL at {company}",
+        "url": f"https://jobs.example/{job_id}",
+    }
+
+
+def _source(delay: float, result):
+    async def search():
+        await asyncio.sleep(delay)
+        if isinstance(result, Exception):
+            raise result
+        return result
+    return search
+
+
+def _searches() -> dict:
+    """
+    声明顺序与完成顺序不同的数据源 / Sources whose declaration order differs from their completion order
+    """
+    return {
+        "stepstone": _source(0.05, [_job("s1", "Acme"), _job("s2", "Globex", "Go Engineer")]),
+        "google_jobs": _source(0.0, [_job("g1", "Acme"), _job("g2", "Initech", "Data Engineer")]),
+        "broken": _source(0.01, RuntimeError("HTTP 500")),
+        "slow": _source(5.0, [_job("x1", "Late Corp")]),
+    }
+
+
+async def _collect(events) -> list:
+    return [event async for event in events]
+
+
+def test_batches_arrive_in_completion_order_without_cross_batch_duplicates():
+    events = asyncio.run(_collect(stream_job_search(_searches(), deadline=0.5)))
+
+    assert [(event["type"], event.get("source")) for event in events] == [
+        ("batch", "google_jobs"),
+        ("source_error", "broken"),
+        ("batch", "stepstone"),
+        ("source_error", "slow"),
+        ("complete", None),
+    ]
+    google_jobs, broken, stepstone, slow, complete = events
+    assert [job["id"] for job in google_jobs["jobs"]] == ["g1", "g2"]
+    # Acme 的同一职位已在前一批出现 / Acme's identical posting already came in the earlier batch
+    assert [job["id"] for job in stepstone["jobs"]] == ["s2"] and stepstone["count"] == 1
+    assert (broken["status"], broken["error"]) == ("error", "HTTP 500")
+    assert slow["status"] == "timeout"
+    assert google_jobs["elapsed_ms"] <= stepstone["elapsed_ms"] < 500
+
+    assert complete["total"] == 3
+    assert complete["sources"] == {"google_jobs": "ok", "broken": "error", "stepstone": "ok", "slow": "timeout"}
+
+
+@pytest.mark.parametrize("accept, expected", [
+    ("application/x-ndjson", NDJSON_MEDIA_TYPE),
+    ("text/event-stream", SSE_MEDIA_TYPE),
+    ("application/json, text/event-stream;q=0.9", SSE_MEDIA_TYPE),
+    ("application/json", None),
+    ("*/*", None),
+    (None, None),
+])
+def test_negotiate_stream_media_type(accept, expected):
+    assert negotiate_stream_media_type(accept) == expected
+
+
+def test_encoding_ends_with_an_error_event_when_the_stream_fails():
+    async def failing():
+        yield {"type": "batch", "source": "stepstone", "jobs": [], "count": 0, "elapsed_ms": 1}
+        raise RuntimeError("source crashed")
+
+    lines = asyncio.run(_collect(encode_event_stream(failing(), NDJSON_MEDIA_TYPE)))
+    assert [json.loads(line)["type"] for line in lines] == ["batch", "error"]
+    assert all(line.endswith("\n") and line.count("\n") == 1 for line in lines)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    class _JobSearchService:
+        def stream_jobs(self, query, location=None):
+            return stream_job_search(_searches(), deadline=0.5)
+
+        async def search_jobs(self, **kwargs):
+            return [_job("g1", "Acme")]
+
+    monkeypatch.setattr(jobs, "job_search_service", _JobSearchService())
+    app = FastAPI()
+    app.include_router(jobs.router, prefix="/jobs")
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=1)
+    return TestClient(app)
+
+
+def test_search_streams_ndjson(client):
+    response = client.get("/jobs/search", params={"q": "python"}, headers={"Accept": NDJSON_MEDIA_TYPE})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith(NDJSON_MEDIA_TYPE)
+    assert response.headers["cache-control"] == "no-cache"
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert [event["type"] for event in events] == ["batch", "source_error", "batch", "source_error", "complete"]
+    assert events[-1]["total"] == 3
+
+
+def test_search_streams_sse(client):
+    response = client.get("/jobs/search", params={"q": "python"}, headers={"Accept": SSE_MEDIA_TYPE})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith(SSE_MEDIA_TYPE)
+    frames = response.text.split("\n\n")
+    assert frames[-1] == ""
+    parsed = [frame.split("\n") for frame in frames[:-1]]
+    assert [lines[0] for lines in parsed] == [
+        "event: batch", "event: source_error", "event: batch", "event: source_error", "event: complete"
+    ]
+    assert all(lines[1].startswith("data: ") and len(lines) == 2 for lines in parsed)
+    assert json.loads(parsed[0][1][len("data: "):])["source"] == "google_jobs"
+
+
+def test_search_without_streaming_accept_returns_json(client):
+    response = client.get("/jobs/search", params={"q": "python"}, headers={"Accept": "application/json"})
+
+    assert response.status_code == 200
+    assert [job["id"] for job in response.json()["data"]] == ["g1"]
@@ -0,0 +1,111 @@
+"""
+LLM响应缓存测试 - 确定性调用命中缓存并单飞，采样调用绕过缓存
+LLM response cache tests - deterministic calls hit the cache and are single-flighted, sampled calls bypass it
+"""
+
+import asyncio
+
+from anthropic.types import Message
+
+from app.services import llm_cache
+from app.services.llm_cache import LLMResponseCache, build_cache_key
+from app.services.llm_gateway import LLMGateway
+
+
+def _message(text: str) -> Message:
+    return Message.model_validate({
+        "id": "msg_test",
+        "type": "message",
+        "role": "assistant",
+        "model": "claude-sonnet-4-20250514",
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {"input_tokens": 10, "output_tokens": 5},
+    })
+
+
+def _gateway(monkeypatch) -> tuple:
+    monkeypatch.setattr(llm_cache, "llm_response_cache", LLMResponseCache(max_entries=16))
+    gateway = LLMGateway()
+    calls = []
+
+    async def send_message(call_site, request_kwargs):
+        calls.append(request_kwargs)
+        await asyncio.sleep(0.01)
+        return _message(f"sample {len(calls)}")
+
+    monkeypatch.setattr(gateway, "_send_message", send_message)
+    return gateway, calls
+
+
+def _request(temperature: float, prompt: str = "Rewrite my resume") -> dict:
+    return {
+        "model": "claude-sonnet-4-20250514",
+        "max_tokens": 100,
+        "temperature": temperature,
+        "messages": [{"role": "user", "content": prompt}],
+    }
+
+
+def test_sampled_calls_are_not_cached(monkeypatch):
+    """
+    配置了TTL的调用位置以 temperature>0 调用时每次都重新生成
+    A call site with a TTL is generated afresh every time when called with temperature > 0
+    """
+    gateway, calls = _gateway(monkeypatch)
+
+    async def scenario():
+        first = await gateway.create_message("resume_critic.resume_parsing", **_request(0.3))
+        second = await gateway.create_message("resume_critic.resume_parsing", **_request(0.3))
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert len(calls) == 2
+    assert first.content[0].text != second.content[0].text
+
+
+def test_only_deterministic_call_sites_have_a_default_ttl():
+    """
+    默认配置中的每个调用位置都以 temperature=0 调用，否则该TTL永远不会生效
+    Every call site in the default TTLs is called at temperature 0, otherwise its TTL would never apply
+    """
+    cache = LLMResponseCache(max_entries=1)
+    assert cache.ttl_for("resume_critic.resume_parsing") == 86400
+    assert cache.ttl_for("resume_rewrite.personalized_rewrite") is None
+    assert cache.ttl_for("resume_rewrite.cover_letter") is None
+
+
+def test_deterministic_calls_are_cached_and_single_flighted(monkeypatch):
+    """
+    temperature=0 的并发相同请求只调用一次，之后的请求命中缓存
+    Concurrent identical temperature-0 requests make one call and later requests hit the cache
+    """
+    gateway, calls = _gateway(monkeypatch)
+
+    async def scenario():
+        concurrent = await asyncio.gather(*[
+            gateway.create_message("resume_critic.resume_parsing", **_request(0.0, "Parse   my resume"))
+            for _ in range(5)
+        ])
+        later = await gateway.create_message("resume_critic.resume_parsing", **_request(0.0, "Parse my resume"))
+        return concurrent, later
+
+    concurrent, later = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert {response.content[0].text for response in concurrent} == {"sample 1"}
+    assert later.content[0].text == "sample 1"
+
+
+def test_cache_key_ignores_whitespace_and_cache_breakpoints():
+    plain = _request(0.0, "Parse my resume")
+    spaced = _request(0.0, "Parse \n my   resume ")
+    marked = {**plain, "messages": [{
+        "role": "user",
+        "content": [{"type": "text", "text": "Parse my resume", "cache_control": {"type": "ephemeral"}}],
+    }]}
+    unmarked = {**plain, "messages": [{"role": "user", "content": [{"type": "text", "text": "Parse my resume"}]}]}
+
+    assert build_cache_key(plain) == build_cache_key(spaced)
+    assert build_cache_key(marked) == build_cache_key(unmarked)
+    assert build_cache_key(plain) != build_cache_key({**plain, "temperature": 0.5})
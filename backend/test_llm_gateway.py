@@ -0,0 +1,80 @@
+"""
+LLM网关测试 - 首个事件之前取消或失败的流式请求保留原始异常并释放槽位
+LLM gateway tests - a streamed request cancelled or failing before its first event keeps the original exception and
+releases its slot
+"""
+
+import asyncio
+
+import anthropic
+import httpx
+import pytest
+
+from app.services.llm_gateway import LLMGateway
+
+
+def _gateway(body) -> LLMGateway:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=body())
+
+    gateway = LLMGateway()
+    gateway._client = anthropic.AsyncAnthropic(
+        api_key="test-key",
+        max_retries=0,
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    return gateway
+
+
+_REQUEST = {
+    "model": "claude-sonnet-4-20250514",
+    "max_tokens": 100,
+    "messages": [{"role": "user", "content": "Find Python jobs in Berlin"}],
+}
+
+
+async def _consume(gateway: LLMGateway, started: asyncio.Event) -> None:
+    async with gateway.stream_message("chat.stream", **_REQUEST) as stream:
+        started.set()
+        async for _ in stream:
+            pass
+
+
+def test_cancel_before_first_event_raises_cancelled_error():
+    """
+    等待首个token时断开（如WebSocket关闭）抛出 CancelledError，而不是快照断言错误
+    Disconnecting while waiting for the first token (e.g. a closed WebSocket) raises CancelledError, not a snapshot
+    assertion error
+    """
+    async def silent():
+        await asyncio.sleep(3600)
+        yield b""
+
+    gateway = _gateway(silent)
+
+    async def scenario():
+        started = asyncio.Event()
+        task = asyncio.create_task(_consume(gateway, started))
+        await started.wait()
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return gateway._gate.active
+
+    assert asyncio.run(scenario()) == 0
+
+
+def test_failure_before_first_event_keeps_the_original_exception():
+    async def broken():
+        raise httpx.ReadError("connection reset")
+        yield b""
+
+    gateway = _gateway(broken)
+
+    async def scenario():
+        with pytest.raises(httpx.ReadError):
+            await _consume(gateway, asyncio.Event())
+        return gateway._gate.active
+
+    assert asyncio.run(scenario()) == 0
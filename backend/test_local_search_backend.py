@@ -0,0 +1,123 @@
+"""
+本地检索后端测试 - 按行持久化、多实例共享目录、HNSW增量更新
+Local search backend tests - per-row persistence, instances sharing a directory and incremental HNSW updates
+"""
+
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+from app.services.bm25_index import BM25Index
+from app.services.search_backends import HashingEmbeddings, LocalSearchBackend, hnswlib
+
+_EMBEDDINGS = HashingEmbeddings(dimensions=64)
+
+
+def _backend(directory, **kwargs) -> LocalSearchBackend:
+    text_index = BM25Index(field_boosts={"title": 3.0, "skills": 2.0, "description": 1.0})
+    return LocalSearchBackend(str(directory), text_index=text_index, sync_interval=0, **kwargs)
+
+
+def _document(job_id: str, title: str, expired: bool = False) -> dict:
+    return {
+        "id": job_id,
+        "title": title,
+        "description": f"{title} role",
+        "expired": expired,
+        "content_vector": _EMBEDDINGS.embed_query(title),
+    }
+
+
+async def _search_ids(backend: LocalSearchBackend, query: str, top_k: int = 10) -> list:
+    results = await backend.search(query, _EMBEDDINGS.embed_query(query), top_k, "expired eq false")
+    return [result["id"] for result in results]
+
+
+def test_documents_survive_a_restart_without_rewriting_the_store(tmp_path):
+    """
+    上传和删除只写入变更的行，重新打开后状态一致
+    Uploads and deletes only write the changed rows, and a reopened backend sees the same state
+    """
+    async def scenario():
+        backend = _backend(tmp_path)
+        await backend.upload_documents([_document("py-1", "Python Developer"), _document("go-1", "Go Engineer")])
+        await backend.upload_documents([_document("py-1", "Senior Python Developer")])
+        assert await backend.delete_documents(["go-1", "missing"]) == 1
+        assert not (tmp_path / "documents.json").exists()
+
+        reopened = _backend(tmp_path)
+        assert await _search_ids(reopened, "python") == ["py-1"]
+        assert reopened._documents[reopened._row_by_id["py-1"]]["title"] == "Senior Python Developer"
+        assert "go-1" not in reopened._row_by_id
+
+    asyncio.run(scenario())
+
+
+def test_instances_sharing_a_directory_do_not_overwrite_each_other(tmp_path):
+    """
+    共享目录的两个实例（模拟两个worker）各自写入，行号不冲突，并能看到对方的写入
+    Two instances sharing a directory (standing in for two workers) write independently without row clashes and see each other's writes
+    """
+    async def scenario():
+        first, second = _backend(tmp_path), _backend(tmp_path)
+        await first.upload_documents([_document("py-1", "Python Developer")])
+        await second.upload_documents([_document("rust-1", "Rust Engineer")])
+        await first.upload_documents([_document("java-1", "Java Developer")])
+
+        assert len({first._row_by_id["py-1"], first._row_by_id["rust-1"], first._row_by_id["java-1"]}) == 3
+        assert await _search_ids(first, "rust", top_k=1) == ["rust-1"]
+        assert await _search_ids(second, "java", top_k=1) == ["java-1"]
+
+        await second.delete_documents(["py-1"])
+        assert "py-1" not in await _search_ids(first, "python")
+
+    asyncio.run(scenario())
+
+
+def test_legacy_documents_file_is_migrated(tmp_path):
+    """
+    旧版 documents.json 在首次打开时导入，行号与向量文件保持对应
+    A legacy documents.json is imported on first open, keeping rows aligned with the vector file
+    """
+    vectors = np.asarray([_EMBEDDINGS.embed_query("python"), _EMBEDDINGS.embed_query("rust")], dtype=np.float32)
+    vectors.tofile(tmp_path / "vectors.f32")
+    (tmp_path / "documents.json").write_text(json.dumps({
+        "dimensions": 64,
+        "documents": [{"id": "py-1", "title": "Python"}, {"id": "rust-1", "title": "Rust"}],
+    }))
+
+    async def scenario():
+        backend = _backend(tmp_path)
+        assert await _search_ids(backend, "rust", top_k=1) == ["rust-1"]
+        assert not (tmp_path / "documents.json").exists()
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.skipif(hnswlib is None, reason="hnswlib not installed")
+def test_hnsw_index_catches_up_after_reload(tmp_path):
+    """
+    HNSW索引在后台保存，重新加载后补齐保存之后的变更
+    The HNSW index is saved in the background and a reload catches up on changes made after the save
+    """
+    titles = [f"Engineer {index} {word}" for index, word in enumerate(["python", "rust", "java", "go"] * 10)]
+
+    async def scenario():
+        backend = _backend(tmp_path, hnsw_threshold=20, hnsw_save_interval=3600)
+        await backend.upload_documents([_document(f"job-{index}", title) for index, title in enumerate(titles)])
+        assert backend._hnsw is not None and (tmp_path / "hnsw.bin").exists()
+
+        # 保存间隔内，之后的变更只写入文档存储 / Within the save interval, later changes only reach the document store
+        await backend.upload_documents([_document("kotlin-1", "Kotlin Engineer")])
+        await backend.delete_documents(["job-0"])
+
+        reopened = _backend(tmp_path, hnsw_threshold=20)
+        ids = await _search_ids(reopened, "Kotlin Engineer", top_k=1)
+        labels = set(reopened._hnsw.get_ids_list())
+        assert ids == ["kotlin-1"]
+        assert reopened._row_by_id["kotlin-1"] in labels
+        assert "job-0" not in await _search_ids(reopened, "Engineer 0 python")
+
+    asyncio.run(scenario())
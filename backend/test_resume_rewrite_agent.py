@@ -174,21 +174,21 @@ async def test_resume_rewrite_agent():
     try:
         pdf_service = agent.pdf_generator_service
         print(f"   ✅ PDF生成服务已初始化")
-        print(f"   🔧 Claude 4集成: {'已启用' if hasattr(pdf_service, 'anthropic_client') else '未启用'}")
+        print(f"   🔧 Claude 4集成: {'已启用' if hasattr(pdf_service, 'llm_gateway') else '未启用'}")
         print(f"   🐵 PDFMonkey配置: {'已配置' if pdf_service.pdfmonkey_api_key != 'demo_key' else '演示模式'}")
     except Exception as e:
         print(f"   ❌ PDF服务验证失败: {e}")
     
-    # 测试Anthropic客户端
+    # 测试LLM网关（共享的Anthropic客户端）
     try:
-        if hasattr(agent, 'anthropic_client'):
-            print(f"   ✅ Anthropic客户端已初始化")
+        if hasattr(agent, 'llm_gateway'):
+            print(f"   ✅ LLM网关已初始化")
             print(f"   🌐 Base URL: {settings.ANTHROPIC_BASE_URL}")
             print(f"   🌡️  Temperature: {settings.CLAUDE_TEMPERATURE}")
         else:
-            print(f"   ❌ Anthropic客户端未初始化")
+            print(f"   ❌ LLM网关未初始化")
     except Exception as e:
-        print(f"   ⚠️  Anthropic客户端验证失败: {e}")
+        print(f"   ⚠️  LLM网关验证失败: {e}")
     
     print()
     print("4. 功能完成度评估 / Functionality Completion Assessment:")
@@ -252,7 +252,7 @@ async def test_resume_rewrite_agent():
     print("\n" + "="*70)
     print("📝 测试总结:")
     print(f"   - Agent工具数量: {len(actual_tools)}")
-    print(f"   - Claude 4集成: {'✅ 完成' if hasattr(agent, 'anthropic_client') else '❌ 缺失'}")
+    print(f"   - Claude 4集成: {'✅ 完成' if hasattr(agent, 'llm_gateway') else '❌ 缺失'}")
     print(f"   - PDF生成能力: {'✅ 完成' if 'generate_pdf_resume' in actual_tools else '❌ 缺失'}")
     print(f"   - 个性化功能: {'✅ 完成' if 'generate_personalized_resume' in actual_tools else '❌ 缺失'}")
     print(f"   - 配置一致性: {'✅ 统一' if settings.CLAUDE_TEMPERATURE == 0.3 else '⚠️  检查'}")
@@ -39,7 +39,7 @@ def test_resume_rewrite_configuration():
         print("   ✅ PDF生成服务初始化成功")
         
         # 检查Claude 4集成
-        if hasattr(pdf_service, 'anthropic_client'):
+        if hasattr(pdf_service, 'llm_gateway'):
             print("   ✅ Claude 4客户端已集成")
         else:
             print("   ❌ Claude 4客户端未集成")
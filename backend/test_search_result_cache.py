@@ -0,0 +1,126 @@
+"""
+搜索结果缓存测试 - 新鲜/过期/未命中、内存与数据库命中的结果形状一致、旧结果不会恢复已过期职位
+Search result cache tests - fresh/stale/miss, the same result shape from memory and database hits, and stale results
+never reviving expired jobs
+"""
+
+import asyncio
+
+from app.core.database import AsyncSessionLocal
+from app.core.single_flight import SingleFlight
+from app.models.job import Job
+from app.services.job_expiry import JobLinkChecker
+from app.services.search_result_cache import SearchResultCache
+
+
+def _job(job_id: str, title: str) -> dict:
+    return {
+        "id": job_id,
+        "title": title,
+        "company": f"Company {job_id}",
+        "location": "Berlin",
+        "description": f"{title} working with Python",
+        "salary": "€60,000 - €80,000",
+        "url": f"https://jobs.example/{job_id}",
+        "company_logo": "https://logos.example/logo.png",
+    }
+
+
+class _Upstream:
+    """
+    计数的上游搜索 / An upstream search that counts its calls
+    """
+
+    def __init__(self, jobs: list, delay: float = 0.0):
+        self.jobs = jobs
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self) -> list:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return list(self.jobs)
+
+
+def _cache(**kwargs) -> SearchResultCache:
+    options = {"ttl_seconds": {"stepstone": 3600}, "stale_seconds": 3600, "flight": SingleFlight("test_search")}
+    return SearchResultCache(**{**options, **kwargs})
+
+
+def test_memory_and_database_hits_return_the_same_results(database, run):
+    """
+    上游结果、进程内命中和数据库命中（新进程）返回相同的字典
+    The upstream result, an in-process hit and a database hit (a fresh process) return the same dictionaries
+    """
+    upstream = _Upstream([_job("py-1", "Python Developer"), _job("go-1", "Go Developer")])
+
+    async def scenario():
+        cache = _cache()
+        fetched = await cache.get_or_fetch("stepstone", "Python", "Berlin", 10, upstream)
+        from_memory = await cache.get_or_fetch("stepstone", "python ", "berlin", 10, upstream)
+        from_database = await _cache().get_or_fetch("stepstone", "python", "Berlin", 10, upstream)
+        return fetched, from_memory, from_database
+
+    fetched, from_memory, from_database = run(scenario())
+    assert upstream.calls == 1
+    assert fetched == from_memory == from_database
+    assert [job["id"] for job in fetched] == ["py-1", "go-1"]
+    assert "company_logo" not in fetched[0]
+    assert fetched[0]["salary"] == "60,000 - 80,000 EUR"
+
+
+def test_concurrent_misses_share_one_upstream_call(database, run):
+    upstream = _Upstream([_job("py-1", "Python Developer")], delay=0.05)
+
+    async def scenario():
+        cache = _cache()
+        return await asyncio.gather(*[
+            cache.get_or_fetch("stepstone", "python", "Berlin", 10, upstream) for _ in range(10)
+        ])
+
+    results = run(scenario())
+    assert upstream.calls == 1
+    assert all(result == results[0] for result in results)
+
+
+def test_stale_results_are_served_while_refreshing(database, run):
+    """
+    超过TTL但在容忍期内时先返回旧结果，后台刷新后返回新结果
+    Past the TTL but within the grace period the old results are served while a background refresh runs
+    """
+    upstream = _Upstream([_job("py-1", "Python Developer")])
+
+    async def scenario():
+        cache = _cache(ttl_seconds={"stepstone": 0})
+        first = await cache.get_or_fetch("stepstone", "python", "Berlin", 10, upstream)
+        upstream.jobs = [_job("py-2", "Senior Python Developer")]
+        stale = await cache.get_or_fetch("stepstone", "python", "Berlin", 10, upstream)
+        await asyncio.sleep(0.05)
+        refreshed = await cache.get_or_fetch("stepstone", "python", "Berlin", 10, upstream)
+        return first, stale, refreshed
+
+    first, stale, refreshed = run(scenario())
+    assert stale == first
+    assert [job["id"] for job in refreshed] == ["py-2"]
+
+
+def test_stale_upstream_results_do_not_revive_expired_jobs(database, run):
+    """
+    链接检查判定过期的职位再次出现在（旧的）上游结果中时保持过期，也不再返回
+    A job the link check expired stays expired, and is not returned, when it shows up again in a (stale) upstream result
+    """
+    upstream = _Upstream([_job("py-1", "Python Developer"), _job("go-1", "Go Developer")])
+
+    async def scenario():
+        cache = _cache(ttl_seconds={"stepstone": 0}, stale_seconds=0)
+        await cache.get_or_fetch("stepstone", "python", "Berlin", 10, upstream)
+        await JobLinkChecker(client=None)._write_back([], ["py-1"])
+        results = await cache.get_or_fetch("stepstone", "python", "Berlin", 10, upstream)
+        async with AsyncSessionLocal() as session:
+            stored = await session.get(Job, "py-1")
+        return results, stored
+
+    results, stored = run(scenario())
+    assert upstream.calls == 2
+    assert [job["id"] for job in results] == ["go-1"]
+    assert stored.is_expired
@@ -0,0 +1,75 @@
+"""
+单飞请求合并测试 - 并发合并、共享异常、调用方取消不影响共享调用
+Single-flight tests - concurrent coalescing, shared exceptions, and caller cancellation leaving the shared call running
+"""
+
+import asyncio
+
+import pytest
+
+from app.core.single_flight import SingleFlight, request_fingerprint
+
+
+def test_concurrent_calls_with_one_key_run_once():
+    flight = SingleFlight("test")
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return ["job"]
+
+    async def scenario():
+        results = await asyncio.gather(*[flight.do("python", fetch) for _ in range(10)], flight.do("java", fetch))
+        assert flight.in_flight == 0
+        # 完成后同一键重新调用 / The same key calls again once finished
+        await flight.do("python", fetch)
+        return results
+
+    results = asyncio.run(scenario())
+    assert calls == 3
+    assert all(result == ["job"] for result in results)
+
+
+def test_exceptions_are_shared_and_not_cached():
+    flight = SingleFlight("test")
+    calls = 0
+
+    async def failing():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    async def scenario():
+        results = await asyncio.gather(*[flight.do("key", failing) for _ in range(3)], return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        with pytest.raises(RuntimeError):
+            await flight.do("key", failing)
+
+    asyncio.run(scenario())
+    assert calls == 2
+
+
+def test_cancelling_one_caller_keeps_the_shared_call():
+    flight = SingleFlight("test")
+
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def scenario():
+        first = asyncio.ensure_future(flight.do("key", fetch))
+        second = asyncio.ensure_future(flight.do("key", fetch))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        assert await second == "done"
+        return first.cancelled()
+
+    assert asyncio.run(scenario())
+
+
+def test_fingerprint_is_stable_across_key_order():
+    assert request_fingerprint({"a": 1, "b": 2}) == request_fingerprint({"b": 2, "a": 1})
+    assert request_fingerprint("python", "Berlin") != request_fingerprint("python", "Munich")
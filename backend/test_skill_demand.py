@@ -0,0 +1,49 @@
+"""
+技能需求矩阵测试 - 薪资解析、频次/渗透率/平均薪资/共现/基数
+Skill demand matrix tests - salary parsing and frequency/penetration/average salary/co-occurrence/cardinality
+"""
+
+import math
+
+import pytest
+
+from app.services.skill_demand import SkillDemandMatrix, parse_salary_value
+
+
+@pytest.mark.parametrize("salary, expected", [
+    ("€60,000 - €80,000", 60000.0),
+    ("60.000,00 €", 60000.0),
+    ("€80,000.", 80000.0),
+    ("Gehalt: 55.000 - 65.000 EUR.", 55000.0),
+    ("€80,000.50", 80000.5),
+    ("50,000,000", 50000000.0),
+    ("60k", 60000.0),
+    ("1.5M", 1500000.0),
+    ("45000 EUR", 45000.0),
+])
+def test_parse_salary_value(salary, expected):
+    assert parse_salary_value(salary) == expected
+
+
+@pytest.mark.parametrize("salary", ["", "negotiable", "0"])
+def test_unparseable_salary_is_nan(salary):
+    assert math.isnan(parse_salary_value(salary))
+
+
+def test_skill_trends_from_matrix():
+    jobs = [
+        {"title": "Python Developer", "description": "Python and Docker", "salary": "60.000,00 €",
+         "company": "Acme", "location": "Berlin"},
+        {"title": "Backend Engineer", "description": "Python, Docker, AWS", "salary": "€80,000.",
+         "company": "Acme", "location": "Munich"},
+        {"title": "Frontend Engineer", "description": "React", "salary": "", "company": "Other", "location": "Berlin"},
+    ]
+    trends = {trend["skill_name"]: trend for trend in SkillDemandMatrix.from_jobs(jobs).skill_trends()}
+
+    python = trends["python"]
+    assert python["frequency"] == 2 and python["demand_score"] == 100.0
+    assert python["penetration_rate"] == pytest.approx(66.7)
+    assert python["avg_salary"] == 70000.0
+    assert python["company_count"] == 1 and python["location_count"] == 2
+    assert {"skill_name": "docker", "job_count": 2} in python["co_occurring_skills"]
+    assert trends["react"]["avg_salary"] is None
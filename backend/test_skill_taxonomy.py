@@ -0,0 +1,99 @@
+"""
+技能匹配测试 - 词边界、别名、带标点的技能名、大小写敏感的常用词、屏蔽短语与类别标签
+Skill matching tests - word boundaries, aliases, punctuated skill names, case-sensitive common words, blocked phrases
+and category tags
+"""
+
+import pytest
+
+from app.services.skill_taxonomy import SkillMatcher, get_skill_matcher
+
+
+@pytest.fixture
+def matcher() -> SkillMatcher:
+    return get_skill_matcher()
+
+
+@pytest.mark.parametrize("text", [
+    "We value good communication and algorithms",
+    "Strong documentation, ownership and rigor",
+    "Daily standups, paid vacation and an Ergonomic workplace",
+    "Hair salon, said the recruiter; AIrline experience and mail handling",
+    "Erlang, Gopher enthusiasts, Rubyists and Django-ish templates",
+])
+def test_short_names_never_match_inside_other_words(matcher, text):
+    assert not {"go", "r", "ai", "ruby"} & set(matcher.extract(text))
+
+
+def test_short_names_match_as_whole_words(matcher):
+    assert matcher.extract("Go, R and AI; (Go) / R-Studio") == ["go", "r", "ai"]
+
+
+def test_common_words_only_count_with_their_display_casing(matcher):
+    assert matcher.extract("Ready to go the extra mile, rust belt, swift replies, express delivery") == []
+    assert matcher.extract("Go, Rust and Swift with Express") == ["go", "rust", "swift", "express"]
+
+
+def test_blocked_phrases_yield_no_skill(matcher):
+    assert matcher.extract("Own the go-to-market plan, R&D budget and the go-live") == []
+    assert matcher.extract("AI-generated summaries, but we build AI products") == ["ai"]
+
+
+@pytest.mark.parametrize("text, skill", [
+    ("Experience with k8s clusters", "kubernetes"),
+    ("Golang microservices", "go"),
+    ("golang", "go"),
+    ("Postgres and Mongo", "postgresql"),
+    ("Amazon   Web\nServices", "aws"),
+    ("Natural Language Processing", "nlp"),
+    ("Spring Boot", "spring"),
+])
+def test_aliases_map_to_canonical_names(matcher, text, skill):
+    assert matcher.extract(text)[0] == skill
+
+
+def test_canonicalize_and_display_names(matcher):
+    assert matcher.canonicalize("K8s") == "kubernetes"
+    assert matcher.canonicalize(" GoLang ") == "go"
+    assert matcher.canonicalize("Bash") == "bash"
+    assert matcher.canonicalize_all(["k8s", "Kubernetes", "", "golang", "Go"]) == ["kubernetes", "go"]
+    assert matcher.display_name("postgres") == "PostgreSQL"
+    assert matcher.display_name("Bash") == "Bash"
+
+
+def test_punctuated_names(matcher):
+    assert matcher.extract("C++, C# and Node.js; also Next.js and CI/CD") == ["c++", "c#", "node.js", "next.js", "ci/cd"]
+    # 更长的写法和其他语言不被截断匹配 / Longer spellings and other languages are not matched by a prefix
+    assert matcher.extract("C+++ and C## and Nodejs") == ["node.js"]
+    assert matcher.extract("Objective-C, C, F# and .NET") == []
+    assert matcher.extract("React.js and Vue.js, not Reactive") == ["react", "vue"]
+
+
+def test_leftmost_longest_match_wins(matcher):
+    matches = matcher.find_matches("GitLab CI pipelines on Google Cloud Platform")
+    assert [match.skill for match in matches] == ["gitlab ci", "gcp"]
+    assert (matches[1].start, matches[1].end) == (23, 44)
+
+
+def test_category_tags(matcher):
+    # 出现在多个类别的技能带全部标签，第一个为主类别 / Skills listed in several categories carry every tag, the first is primary
+    assert matcher.skills["pytorch"].categories == ("frameworks", "ai_ml")
+    assert matcher.category("PyTorch") == "frameworks"
+    assert matcher.category("PyTorch", ["ai_ml", "cloud"]) == "ai_ml"
+    assert matcher.category("supabase", ["databases"]) == "databases"
+    assert matcher.category("Bash") is None
+
+    text = "Python, PyTorch, Docker and SQL on AWS"
+    assert matcher.extract(text, ["ai_ml"]) == ["pytorch"]
+    assert matcher.extract(text, ["databases", "cloud"]) == ["sql", "aws"]
+    assert matcher.extract(text, []) == []
+
+
+def test_custom_taxonomy():
+    matcher = SkillMatcher(
+        taxonomy={"languages": {"Go": ["golang"], "Elixir": []}},
+        case_sensitive=["Go"],
+        blocked_phrases=["go live"]
+    )
+    assert matcher.extract("We go live in Go and golang; elixir later") == ["go", "elixir"]
+    assert matcher.category("golang") == "languages"
@@ -0,0 +1,102 @@
+"""
+技能需求周聚合测试 - 入库、再次出现、过期后聚合表与全量重建一致
+Skill demand weekly aggregate tests - after ingest, re-seeing and expiry the aggregate matches a full rebuild
+"""
+
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, update
+
+from app.core.database import AsyncSessionLocal
+from app.models.job import Job, SkillDemandWeekly
+from app.services.job_expiry import JobLinkChecker
+from app.services.search_result_cache import get_search_result_cache
+from app.services.skill_trends import TOTAL_SKILL, query_skill_trends, rebuild_skill_demand, week_start
+
+
+def _job(job_id: str, title: str, description: str) -> dict:
+    return {
+        "id": job_id,
+        "title": title,
+        "company": f"Company {job_id}",
+        "location": "Berlin",
+        "description": description,
+        "salary": "€60,000 - €80,000",
+        "url": f"https://jobs.example/{job_id}",
+    }
+
+
+async def _aggregate() -> dict:
+    async with AsyncSessionLocal() as session:
+        rows = (await session.execute(select(SkillDemandWeekly))).scalars().all()
+    return {(row.skill, row.week_start): row.job_count for row in rows if row.job_count}
+
+
+async def _persist(jobs: list) -> None:
+    await get_search_result_cache()._persist("key", "test", "developer", "Berlin", 10, jobs, time.time())
+
+
+def test_reseen_and_expired_jobs_keep_the_aggregate_consistent(database, run):
+    """
+    未带发布时间的职位再次出现时仍计入原抓取周，过期后从该周扣除
+    A job without a posting date stays in its original scrape week when seen again and leaves that week on expiry
+    """
+    old_scrape = datetime.now(timezone.utc) - timedelta(weeks=3)
+    old_week = week_start(old_scrape)
+    python_job = _job("py-1", "Python Developer", "Python, Docker and AWS")
+    react_job = _job("react-1", "Frontend Engineer", "React and TypeScript")
+
+    async def scenario():
+        await _persist([python_job, react_job])
+        # 模拟较早抓取的职位 / Simulate a job scraped weeks ago
+        async with AsyncSessionLocal() as session:
+            await session.execute(update(Job).where(Job.id == "py-1").values(scraped_at=old_scrape))
+            await session.commit()
+        await rebuild_skill_demand()
+        assert (await _aggregate())[("python", old_week)] == 1
+
+        # 再次出现：描述变化，仍计入原抓取周 / Seen again with a new description, still counted in the scrape week
+        await _persist([{**python_job, "description": "Python and Kubernetes"}, react_job])
+        after_reseen = await _aggregate()
+        assert after_reseen[("python", old_week)] == 1
+        assert after_reseen[("kubernetes", old_week)] == 1
+        assert ("docker", old_week) not in after_reseen
+        assert after_reseen[(TOTAL_SKILL, old_week)] == 1
+
+        # 过期后该周清零，且不再出现在趋势中 / Expiry clears the week and drops the job from trends
+        await JobLinkChecker(client=None)._write_back([], ["py-1"])
+        after_expiry = await _aggregate()
+        assert all(skill not in ("python", "kubernetes") for skill, _ in after_expiry)
+        assert all(count > 0 for count in after_expiry.values())
+        trends = await query_skill_trends(weeks=8)
+        assert "python" not in {trend["skill_name"] for trend in trends["skill_trends"]}
+        assert trends["total_jobs"] == 1
+
+        # 增量维护的结果与全量重建一致 / The incrementally maintained aggregate matches a full rebuild
+        await rebuild_skill_demand()
+        assert await _aggregate() == after_expiry
+
+    run(scenario())
+
+
+def test_query_skill_trends_filters_window_location_and_category(database, run):
+    """
+    趋势查询按时间窗口、地点和类别筛选
+    Trend queries filter by time window, location and category
+    """
+    async def scenario():
+        await _persist([
+            _job("py-1", "Python Developer", "Python and AWS"),
+            {**_job("py-2", "Python Engineer", "Python"), "location": "Munich"},
+        ])
+        everywhere = await query_skill_trends(weeks=4)
+        berlin = await query_skill_trends(weeks=4, location="berlin", categories=["cloud"])
+        return everywhere, berlin
+
+    everywhere, berlin = run(scenario())
+    assert everywhere["total_jobs"] == 2
+    assert everywhere["skill_trends"][0]["skill_name"] == "python"
+    assert everywhere["skill_trends"][0]["penetration_rate"] == 100.0
+    assert [trend["skill_name"] for trend in berlin["skill_trends"]] == ["aws"]
+    assert berlin["window"]["weeks"] == 4
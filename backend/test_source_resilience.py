@@ -0,0 +1,124 @@
+"""
+数据源容错测试 - 熔断器状态转换、自适应超时、截止时间内的部分结果
+Source resilience tests - circuit breaker transitions, adaptive timeouts and partial results within a deadline
+"""
+
+import asyncio
+
+import pytest
+
+from app.services import source_resilience
+from app.services.source_resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    CircuitState,
+    SourceGuard,
+    iter_within_deadline,
+)
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(source_resilience.time, "monotonic", clock.monotonic)
+    return clock
+
+
+def test_breaker_opens_after_consecutive_failures_and_recovers_through_one_probe(clock):
+    breaker = CircuitBreaker("stepstone", failure_threshold=3, recovery_seconds=30)
+
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    breaker.record_success()
+    for _ in range(3):
+        breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN and not breaker.allow()
+    assert breaker.retry_after() == 30
+
+    # 冷却后只放行一次试探，试探失败重新打开 / After the cooldown a single probe passes; a failed probe reopens
+    clock.now += 30
+    assert breaker.allow() and breaker.state == CircuitState.HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN and not breaker.allow()
+
+    # 被取消的试探不计结果，下一次调用可以再试探 / A cancelled probe counts for nothing and the next call may probe
+    clock.now += 30
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitState.CLOSED and breaker.allow()
+
+
+def test_guard_rejects_calls_while_open_and_counts_timeouts_as_failures():
+    guard = SourceGuard("google_jobs", max_timeout=0.05, min_timeout=0.01, failure_threshold=2, recovery_seconds=60)
+    calls = 0
+
+    async def slow():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(1)
+
+    async def scenario():
+        for _ in range(2):
+            with pytest.raises(TimeoutError):
+                await guard.call(slow)
+        with pytest.raises(CircuitOpenError):
+            await guard.call(slow)
+
+    asyncio.run(scenario())
+    assert calls == 2
+    assert guard.breaker.state == CircuitState.OPEN
+    assert len(guard.latency) == 2
+
+
+def test_adaptive_timeout_follows_p95_within_bounds():
+    guard = SourceGuard(
+        "stepstone", max_timeout=30.0, min_timeout=2.0, p95_multiplier=2.0, min_samples=20, window_size=20
+    )
+    assert guard.timeout() == 30.0
+
+    for _ in range(19):
+        guard.latency.record(1.5)
+    assert guard.timeout() == 30.0
+    guard.latency.record(1.5)
+    assert guard.timeout() == 3.0
+
+    for _ in range(20):
+        guard.latency.record(0.1)
+    assert guard.timeout() == 2.0
+    for _ in range(20):
+        guard.latency.record(60.0)
+    assert guard.timeout() == 30.0
+
+
+def test_deadline_returns_partial_results_and_errors():
+    async def after(delay: float, value):
+        await asyncio.sleep(delay)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    async def scenario():
+        return [
+            item async for item in iter_within_deadline(
+                ["fast", "broken", "slow"],
+                [after(0.0, ["job"]), after(0.0, RuntimeError("HTTP 500")), after(5.0, ["late"])],
+                deadline=0.1
+            )
+        ]
+
+    results = dict(asyncio.run(scenario()))
+    assert results["fast"] == ["job"]
+    assert isinstance(results["broken"], RuntimeError)
+    assert isinstance(results["slow"], TimeoutError)
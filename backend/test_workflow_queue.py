@@ -0,0 +1,159 @@
+"""
+工作流队列测试 - 队列与每用户准入控制（含流式运行）、执行前认领、重启后恢复遗留运行
+Workflow queue tests - queue and per-user admission control (streamed runs included), claiming before execution and
+recovering leftover runs after a restart
+"""
+
+import asyncio
+from typing import List
+
+import pytest
+from sqlalchemy import select
+
+from app.core.database import AsyncSessionLocal
+from app.models.workflow import WorkflowRun, WorkflowRunStatus
+from app.services.llm_gateway import LLMPriority
+from app.services.workflow_leases import claim_workflow_run
+from app.services.workflow_queue import InProcessQueueBackend, WorkflowJob, WorkflowQueue, WorkflowQueueFullError
+
+
+class _Executor:
+    """
+    记录执行的任务，可选地阻塞到放行 / Records executed jobs, optionally blocking until released
+    """
+
+    def __init__(self, block: bool = False):
+        self.jobs: List[WorkflowJob] = []
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+        if not block:
+            self.release.set()
+
+    async def __call__(self, job: WorkflowJob) -> None:
+        self.jobs.append(job)
+        self.started.set()
+        await self.release.wait()
+
+
+def _queue(executor: _Executor, backend: InProcessQueueBackend, **limits) -> WorkflowQueue:
+    return WorkflowQueue(
+        executor=executor,
+        backend=backend,
+        workers_per_type={"job_search": 1, "resume_analysis": 1},
+        poll_timeout=0.05,
+        **limits
+    )
+
+
+async def _add_run(run_id: str, status: WorkflowRunStatus, workflow_type: str = "job_search", user_id: int = 1):
+    async with AsyncSessionLocal() as db:
+        db.add(WorkflowRun(
+            id=run_id,
+            user_id=user_id,
+            session_id="session",
+            workflow_type=workflow_type,
+            status=status,
+            user_input={"query": run_id}
+        ))
+        await db.commit()
+
+
+def test_admission_rejects_full_queues_and_users_over_the_limit(database, run):
+    async def scenario():
+        executor = _Executor(block=True)
+        queue = _queue(executor, InProcessQueueBackend(), max_queued_per_type=1, max_active_jobs_per_user=2)
+        try:
+            running, position = await queue.submit("job_search", 1, "session", {"query": "python"})
+            assert position == 1
+            await executor.started.wait()
+            queued, position = await queue.submit("job_search", 1, "session", {"query": "go"})
+            assert position == 1
+
+            with pytest.raises(WorkflowQueueFullError) as rejected:
+                await queue.submit("job_search", 2, "session", {"query": "rust"})
+            assert rejected.value.reason == "queue_full"
+
+            # 排队和执行中的任务占满了用户1的上限，流式运行同样被拒绝
+            # Queued and running jobs fill user 1's limit, so a streamed run is rejected too
+            with pytest.raises(WorkflowQueueFullError) as rejected:
+                async with queue.admit_stream("job_search", 1):
+                    pass
+            assert rejected.value.reason == "user_limit"
+
+            # 流式运行计入排队任务的准入 / Streamed runs count towards queued-job admission
+            async with queue.admit_stream("job_search", 2):
+                async with queue.admit_stream("job_search", 2):
+                    with pytest.raises(WorkflowQueueFullError) as rejected:
+                        await queue.submit("resume_analysis", 2, "session", {})
+                    assert rejected.value.reason == "user_limit"
+                    with pytest.raises(WorkflowQueueFullError):
+                        async with queue.admit_stream("job_search", 2):
+                            pass
+            assert not queue._streaming
+            await queue.submit("resume_analysis", 2, "session", {})
+
+            executor.release.set()
+            for workflow_type in ("job_search", "resume_analysis"):
+                await queue.backend._queues[workflow_type].join()
+            return running, queued, executor.jobs
+        finally:
+            await queue.stop()
+
+    running, queued, jobs = run(scenario())
+    assert [job.job_id for job in jobs if job.workflow_type == "job_search"] == [running.job_id, queued.job_id]
+    assert len(jobs) == 3
+
+
+def test_jobs_run_only_after_their_run_is_claimed(database, run):
+    async def scenario():
+        await _add_run("pending", WorkflowRunStatus.PENDING)
+        await _add_run("claimed-elsewhere", WorkflowRunStatus.PENDING)
+        await _add_run("cancelled", WorkflowRunStatus.CANCELLED)
+        assert await claim_workflow_run("claimed-elsewhere", owner_id="other-process")
+
+        executor = _Executor()
+        backend = InProcessQueueBackend()
+        queue = _queue(executor, backend)
+        for run_id in ("claimed-elsewhere", "cancelled", "pending", "pending"):
+            await backend.enqueue(WorkflowJob(job_id=run_id, workflow_type="job_search", user_id=1, session_id="session"))
+        while await backend.depth("job_search"):
+            delivery_id, job = await backend.dequeue("job_search", 0.1)
+            await queue._process("job_search", delivery_id, job)
+
+        async with AsyncSessionLocal() as db:
+            rows = {row.id: row for row in (await db.execute(select(WorkflowRun))).scalars()}
+        return executor.jobs, rows
+
+    jobs, rows = run(scenario())
+    # 重复投递只执行一次 / A duplicate delivery executes once
+    assert [job.job_id for job in jobs] == ["pending"]
+    assert rows["claimed-elsewhere"].owner_id == "other-process"
+    assert rows["cancelled"].status == WorkflowRunStatus.CANCELLED.value
+    assert rows["pending"].status == WorkflowRunStatus.RUNNING.value
+
+
+def test_restart_recovers_pending_and_interrupted_runs_once(database, run):
+    async def scenario():
+        await _add_run("pending", WorkflowRunStatus.PENDING)
+        await _add_run("interrupted", WorkflowRunStatus.INTERRUPTED, workflow_type="resume_analysis")
+        await _add_run("running", WorkflowRunStatus.RUNNING)
+        await _add_run("completed", WorkflowRunStatus.COMPLETED)
+        await _add_run("unknown-type", WorkflowRunStatus.PENDING, workflow_type="legacy")
+
+        executor = _Executor()
+        backend = InProcessQueueBackend()
+        queue = _queue(executor, backend)
+        # 另一个进程已经重新入队了同样的运行 / Another process has already re-enqueued the same runs
+        assert await queue._recover_jobs() == 2
+        await queue.start()
+        try:
+            for workflow_type in ("job_search", "resume_analysis"):
+                await backend._queues[workflow_type].join()
+        finally:
+            await queue.stop()
+        return executor.jobs
+
+    jobs = run(scenario())
+    assert sorted(job.job_id for job in jobs) == ["interrupted", "pending"]
+    assert all(job.priority == LLMPriority.BATCH for job in jobs)
+    assert {job.job_id: job.user_input for job in jobs}["pending"] == {"query": "pending"}
@@ -23,7 +23,7 @@ interface ChatMessage {
 }
 
 interface WebSocketMessage {
-  type: 'message' | 'error' | 'status'
+  type: 'message' | 'error' | 'status' | 'ping' | 'pong'
   role?: 'user' | 'assistant' | 'system'
   content?: string
   metadata?: any
@@ -97,6 +97,12 @@ export const useChatStore = defineStore('chat', () => {
   // 处理WebSocket消息 / Handle WebSocket message
   const handleWebSocketMessage = (data: WebSocketMessage) => {
     switch (data.type) {
+      case 'ping':
+        // 回复服务端心跳，保持连接 / Answer the server heartbeat to keep the connection alive
+        if (websocket.value?.readyState === WebSocket.OPEN) {
+          websocket.value.send(JSON.stringify({ type: 'pong' }))
+        }
+        break
       case 'message':
         if (data.role && data.content) {
           addMessage({